@@ -0,0 +1,3 @@
+"""
+Benchmark suites run by the scripts in scripts/ (never imported by the application)
+"""
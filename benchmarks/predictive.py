@@ -0,0 +1,436 @@
+"""
+Predictive Engine Benchmark
+
+Timing suite for the forecasting pipeline on synthetic and anonymized real
+balance histories. Every case (history, number of years, horizon) times the
+stages from_kbai_json, HistoricalAnalyzer.analyze, get_all_scenario_parameters,
+run_scenario, compare_scenarios and the end-to-end generate_prediction with
+the database mocked.
+
+Results are flat JSON records, one per case and stage, so the runs of two
+releases can be diffed with compare_results. With a profile directory each
+stage is also run under cProfile and dumped as a .prof file (readable with
+pstats or snakeviz).
+
+Used by scripts/benchmark_predictive.py. Kept outside the src package (it
+patches the models with unittest.mock), so the application never imports it.
+"""
+
+import copy
+import cProfile
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import time
+import types
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+import src.app.services.kbai.predictive.historical_aggregate_service as aggregate_module
+import src.app.services.kbai.predictive.predictive_service as predictive_module
+from src.app.database.models import KbaiBalance, KbaiHistoricalAggregate
+from src.app.services.kbai.predictive.core.formula_library import normalize_key
+from src.app.services.kbai.predictive.core.historical_analyzer import CONTRIBUTION_VERSION, HistoricalAnalyzer
+from src.app.services.kbai.predictive.core.parameterizer import Parameterizer
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.models.balance_sheet import PARSED_MODEL_VERSION, BalanceSheetData
+from src.app.services.kbai.predictive.models.scenario import Scenario
+
+BENCHMARK_FORMAT_VERSION = 1
+DEFAULT_YEARS = (2, 5, 10, 15)
+DEFAULT_HORIZONS = (1, 3, 5, 10)
+DEFAULT_REPEAT = 5
+STAGES = (
+    "from_kbai_json", "analyze", "parameters", "run_scenario", "compare_scenarios", "generate_prediction",
+)
+# Regressioni sotto questa differenza assoluta sono rumore di misura
+DEFAULT_MIN_DELTA_MS = 0.05
+# Ultimo anno delle serie sintetiche e anonimizzate
+BENCHMARK_LAST_YEAR = 2024
+BENCHMARK_COMPANY_ID = 1
+
+# Struttura completa dei bilanci estratti: le serie sintetiche hanno la stessa
+# dimensione dei JSON reali, così il costo del fuzzy matching è realistico
+TEMPLATE_PATH = Path(__file__).resolve().parents[1] / "src" / "integrations" / "balance.json"
+
+# Voci sintetiche: percorso JSON -> quota sui ricavi (media, deviazione annua)
+SYNTHETIC_CE = {
+    ("Conto_economico", "Valore_della_produzione", "Altri_ricavi_e_proventi",
+     "Totale_altri_ricavi_e_proventi"): (0.02, 0.005),
+    ("Conto_economico", "Costi_di_produzione", "Per_materie_prime,_sussidiarie_di_consumo_merci"): (0.35, 0.03),
+    ("Conto_economico", "Costi_di_produzione", "Per_servizi"): (0.15, 0.02),
+    ("Conto_economico", "Costi_di_produzione", "Per_godimento_di_terzi"): (0.03, 0.005),
+    ("Conto_economico", "Costi_di_produzione", "Ammortamento_e_svalutazioni",
+     "Totale_ammortamenti_e_svalutazioni"): (0.04, 0.005),
+    ("Conto_economico", "Costi_di_produzione", "Oneri_diversi_di_gestione"): (0.01, 0.002),
+    ("Conto_economico", "Proventi_e_oneri_finanziari", "Interessi_e_altri_oneri_finanziari",
+     "Totale_interessi_e_altri_oneri_finanziari"): (0.01, 0.002),
+}
+SYNTHETIC_SP = {
+    ("Stato_patrimoniale", "Attivo", "Immobilizzazioni", "Immobilizzazioni_immateriali",
+     "Totale_immobilizzazioni_immateriali"): (0.05, 0.01),
+    ("Stato_patrimoniale", "Attivo", "Immobilizzazioni", "Immobilizzazioni_materiali",
+     "Totale_immobilizzazioni_materiali"): (0.30, 0.03),
+    ("Stato_patrimoniale", "Attivo", "Attivo_circolante", "Rimanenze", "Totale_rimanenze"): (0.08, 0.01),
+    ("Stato_patrimoniale", "Attivo", "Attivo_circolante", "Crediti", "Verso_clienti"): (0.20, 0.03),
+    ("Stato_patrimoniale", "Attivo", "Attivo_circolante", "Disponibilità_liquide",
+     "Totale_disponibilità_liquide"): (0.06, 0.02),
+    ("Stato_patrimoniale", "Passivo", "Trattamento_di_fine_rapporto_di_lavoro_subordinato"): (0.05, 0.005),
+    ("Stato_patrimoniale", "Passivo", "Debiti", "Debiti_verso_fornitori"): (0.12, 0.02),
+    ("Stato_patrimoniale", "Passivo", "Debiti",
+     "Debiti_verso_banche_esigibili_entro_esercizio_successivo"): (0.05, 0.01),
+    ("Stato_patrimoniale", "Passivo", "Debiti",
+     "Debiti_verso_banche_esigibili_oltre_esercizio_successivo"): (0.15, 0.02),
+    ("Stato_patrimoniale", "Passivo", "Debiti", "Debiti_tributari"): (0.02, 0.005),
+}
+PERSONALE_PATH = ("Conto_economico", "Costi_di_produzione", "Per_il_personale")
+RICAVI_PATH = ("Conto_economico", "Valore_della_produzione", "Ricavi_delle_vendite_e_delle_prestazioni")
+IMPOSTE_PATH = ("Conto_economico", "Imposte_sul_reddito")
+PATRIMONIO_PATH = ("Stato_patrimoniale", "Passivo", "Patrimonio_netto")
+
+History = List[Tuple[int, Dict[str, Any]]]
+
+
+def _matching_key(node: Dict[str, Any], key: str) -> Optional[str]:
+    """Existing key equal to key once normalized, as the parser looks it up first"""
+    normalized = normalize_key(key)
+    return next((existing for existing in node if normalize_key(existing) == normalized), None)
+
+
+def _set_value(data: Dict[str, Any], path: Sequence[str], value: float):
+    """Set a leaf, reusing the template keys with the same normalized name"""
+    node = data
+    for key in path[:-1]:
+        matched = _matching_key(node, key)
+        if matched is None or not isinstance(node[matched], dict):
+            matched = key
+            node[matched] = {}
+        node = node[matched]
+    node[_matching_key(node, path[-1]) or path[-1]] = value
+
+
+def synthetic_history(
+    n_years: int, seed: int = 0, last_year: int = BENCHMARK_LAST_YEAR, template: Optional[Dict[str, Any]] = None,
+) -> History:
+    """
+    Deterministic synthetic history of n_years complete annual balances.
+
+    Revenues follow a company-specific drift with yearly noise; costs and
+    balance sheet items are noisy shares of revenue, equity accumulates the
+    net income. Balances use the full extraction template.
+
+    Returns:
+        [(year, balance JSON)] from the oldest year
+    """
+    if template is None:
+        template = json.loads(TEMPLATE_PATH.read_text())
+    rng = random.Random(seed)
+    ricavi = rng.uniform(500_000, 20_000_000)
+    crescita = rng.uniform(-0.05, 0.12)
+    capitale = ricavi * rng.uniform(0.03, 0.10)
+    riserve = ricavi * rng.uniform(0.0, 0.15)
+
+    history = []
+    for year in range(last_year - n_years + 1, last_year + 1):
+        balance = copy.deepcopy(template)
+        balance.pop("informazioni_generali", None)
+        _set_value(balance, RICAVI_PATH, round(ricavi, 2))
+
+        # Risultato ante imposte: altri ricavi positivi, costi e interessi negativi
+        risultato = ricavi
+        for path, (quota, volatilita) in SYNTHETIC_CE.items():
+            valore = max(0.0, ricavi * rng.gauss(quota, volatilita))
+            _set_value(balance, path, round(valore, 2))
+            risultato += valore if path[1] == "Valore_della_produzione" else -valore
+
+        personale = max(0.0, ricavi * rng.gauss(0.22, 0.02))
+        _set_value(balance, PERSONALE_PATH + ("Salari_e_stipendi",), round(personale * 0.70, 2))
+        _set_value(balance, PERSONALE_PATH + ("Oneri_sociali",), round(personale * 0.23, 2))
+        _set_value(balance, PERSONALE_PATH + ("Trattamento_di_fine_rapporto",), round(personale * 0.07, 2))
+        _set_value(balance, PERSONALE_PATH + ("Totale_costi_per_il_personale",), round(personale, 2))
+
+        risultato -= personale
+        imposte = max(0.0, risultato * 0.24)
+        utile = risultato - imposte
+        _set_value(balance, IMPOSTE_PATH, round(imposte, 2))
+
+        for path, (quota, volatilita) in SYNTHETIC_SP.items():
+            _set_value(balance, path, round(max(0.0, ricavi * rng.gauss(quota, volatilita)), 2))
+        _set_value(balance, PATRIMONIO_PATH + ("Capitale",), round(capitale, 2))
+        _set_value(balance, PATRIMONIO_PATH + ("Altre_riserve", "Totale_altre_riserve"), round(riserve, 2))
+        _set_value(balance, PATRIMONIO_PATH + ("Utile_perdita_dell_esercizio",), round(utile, 2))
+
+        history.append((year, balance))
+        riserve += max(0.0, utile)
+        ricavi *= max(0.5, 1 + crescita + rng.gauss(0, 0.05))
+    return history
+
+
+def _scale(node: Any, factor: float) -> Any:
+    """Multiply every amount of a balance JSON"""
+    if isinstance(node, dict):
+        return {key: _scale(value, factor) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_scale(value, factor) for value in node]
+    if isinstance(node, (int, float)) and not isinstance(node, bool):
+        return round(node * factor, 2)
+    return node
+
+
+def anonymize_history(history: History, rng: random.Random, last_year: int = BENCHMARK_LAST_YEAR) -> History:
+    """
+    Anonymize a real balance history for the benchmark.
+
+    General information (ids, names, tax codes) is dropped, all amounts are
+    scaled by one random factor (ratios, and so the engine's path, are kept)
+    and the years are shifted to end at last_year.
+    """
+    if not history:
+        return []
+    factor = rng.uniform(0.5, 2.0)
+    offset = last_year - max(year for year, _ in history)
+    anonymized = []
+    for year, balance in sorted(history, key=lambda item: item[0]):
+        data = {key: value for key, value in balance.items() if key != "informazioni_generali"}
+        anonymized.append((year + offset, _scale(data, factor)))
+    return anonymized
+
+
+def histories_to_json(histories: Dict[str, History]) -> Dict[str, Any]:
+    """File format of load_histories"""
+    return {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "histories": {
+            name: [{"year": year, "balance": balance} for year, balance in history]
+            for name, history in histories.items()
+        },
+    }
+
+
+def load_histories(path: str) -> Dict[str, History]:
+    """Anonymized real histories written by histories_to_json"""
+    data = json.loads(Path(path).read_text())
+    return {
+        name: [(entry["year"], entry["balance"]) for entry in entries]
+        for name, entries in data.get("histories", {}).items()
+    }
+
+
+def _scenarios(analyzer: HistoricalAnalyzer, horizon_years: int) -> List[Scenario]:
+    """The three standard scenarios, as generate_prediction builds them"""
+    scenarios = []
+    for scenario_type, params in Parameterizer(historical_analyzer=analyzer).get_all_scenario_parameters().items():
+        params.orizzonte_anni = horizon_years
+        scenarios.append(Scenario(name=scenario_type.value.capitalize(), parameters=params, type=scenario_type))
+    return scenarios
+
+
+def _mocked_database(stack: ExitStack, history: History):
+    """
+    Patch the queries of generate_prediction with the history's records.
+
+    The stored historical aggregate is current (steady state after upload);
+    writes go to a mock session.
+    """
+    records = [
+        KbaiBalance(
+            id_balance=index + 1, id_company=BENCHMARK_COMPANY_ID, year=year, month=None, type="final",
+            balance=balance,
+        )
+        for index, (year, balance) in enumerate(history)
+    ]
+    service = aggregate_module.HistoricalAggregateService()
+    aggregate = KbaiHistoricalAggregate(
+        id_company=BENCHMARK_COMPANY_ID, version=CONTRIBUTION_VERSION, parsed_model_version=PARSED_MODEL_VERSION,
+        contributions=[service._entry(record) for record in records],
+    )
+
+    company_query = stack.enter_context(patch.object(predictive_module.KbaiCompany, "query"))
+    company_query.get.return_value = types.SimpleNamespace(company_name="Benchmark")
+    balance_query = stack.enter_context(patch.object(predictive_module.KbaiBalance, "query"))
+    balance_query.options.return_value.filter.return_value.order_by.return_value.all.return_value = records
+    aggregate_query = stack.enter_context(patch.object(aggregate_module.KbaiHistoricalAggregate, "query"))
+    aggregate_query.get.return_value = aggregate
+    for model in (predictive_module.KbaiAnalysis, predictive_module.KbaiAnalysisKpi, predictive_module.KbaiReport):
+        stack.enter_context(patch.object(model, "query"))
+    stack.enter_context(patch.object(aggregate_module, "db", MagicMock()))
+    stack.enter_context(patch("src.extensions.db", MagicMock()))
+
+
+def _generate_prediction(horizon_years: int) -> Dict[str, Any]:
+    result = predictive_module.PredictiveService.generate_prediction(
+        BENCHMARK_COMPANY_ID, horizon_years=horizon_years, locale="en"
+    )
+    if result.get("status") != "success":
+        raise RuntimeError(f"generate_prediction failed: {result.get('message')}")
+    return result
+
+
+def _stage_calls(history: History, horizon_years: int) -> Dict[str, Callable[[], Any]]:
+    """One callable per stage, each fed with the products of the previous stages"""
+    storico = [BalanceSheetData.from_kbai_json(balance, year) for year, balance in history]
+    analyzer = HistoricalAnalyzer(storico)
+    analyzer.analyze()
+    scenarios = _scenarios(analyzer, horizon_years)
+    engine = ProjectionEngine(analyzer)
+    results = {scenario.name: result for scenario, result in zip(scenarios, engine.run_scenarios(scenarios))}
+
+    return {
+        "from_kbai_json": lambda: [BalanceSheetData.from_kbai_json(balance, year) for year, balance in history],
+        "analyze": lambda: HistoricalAnalyzer(storico).analyze(),
+        "parameters": lambda: Parameterizer(historical_analyzer=analyzer).get_all_scenario_parameters(),
+        "run_scenario": lambda: engine.run_scenario(scenarios[0]),
+        "compare_scenarios": lambda: engine.compare_scenarios(results),
+        "generate_prediction": lambda: _generate_prediction(horizon_years),
+    }
+
+
+def _summary(durations: List[float]) -> Dict[str, float]:
+    """min / median / mean / p95 (nearest rank) in milliseconds"""
+    ordered = sorted(durations)
+    return {
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p95_ms": round(ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)], 4),
+    }
+
+
+def _measure(call: Callable[[], Any], repeat: int) -> List[float]:
+    # Una chiamata a vuoto: import, cache e allocazioni iniziali restano fuori
+    call()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def _profile(call: Callable[[], Any], repeat: int, path: Path) -> str:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(repeat):
+        call()
+    profiler.disable()
+    profiler.dump_stats(str(path))
+    return str(path)
+
+
+def run_benchmark(
+    years: Iterable[int] = DEFAULT_YEARS,
+    horizons: Iterable[int] = DEFAULT_HORIZONS,
+    repeat: int = DEFAULT_REPEAT,
+    histories: Optional[Dict[str, History]] = None,
+    synthetic: bool = True,
+    stages: Iterable[str] = STAGES,
+    profile_dir: Optional[str] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Time the predictive stages on every (history, horizon) case.
+
+    Args:
+        years: History lengths of the synthetic cases
+        horizons: Projection horizons
+        repeat: Timed runs per stage (after one warm-up run)
+        histories: Anonymized real histories by name (see load_histories)
+        synthetic: Include the synthetic cases
+        stages: Stages to time (subset of STAGES)
+        profile_dir: If set, dump a cProfile .prof per case and stage there
+        seed: Seed of the synthetic histories
+
+    Returns:
+        {"format_version", "created_at", "environment", "settings",
+        "results": [{"history", "years", "horizon", "stage", "runs",
+        "min_ms", "median_ms", "mean_ms", "p95_ms", "profile"}]}
+    """
+    years, horizons, stages = list(years), list(horizons), list(stages)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    cases = []
+    if synthetic:
+        template = json.loads(TEMPLATE_PATH.read_text())
+        cases += [
+            ("synthetic", synthetic_history(n_years, seed=seed + n_years, template=template))
+            for n_years in years
+        ]
+    cases += sorted((histories or {}).items())
+
+    results = []
+    for name, history in cases:
+        for horizon in horizons:
+            with ExitStack() as stack:
+                if "generate_prediction" in stages:
+                    _mocked_database(stack, history)
+                calls = _stage_calls(history, horizon)
+                for stage in stages:
+                    record = {
+                        "history": name, "years": len(history), "horizon": horizon, "stage": stage, "runs": repeat,
+                        **_summary(_measure(calls[stage], repeat)),
+                        "profile": None,
+                    }
+                    if profile_dir:
+                        path = Path(profile_dir) / f"{name}-{len(history)}y-{horizon}h-{stage}.prof"
+                        record["profile"] = _profile(calls[stage], repeat, path)
+                    results.append(record)
+
+    return {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {"years": years, "horizons": horizons, "repeat": repeat, "seed": seed, "stages": stages},
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.20,
+    metric: str = "median_ms",
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[Dict[str, Any]]:
+    """
+    Cases of current slower than baseline by more than tolerance.
+
+    Records are matched on (history, years, horizon, stage); differences below
+    min_delta_ms are ignored as noise.
+
+    Returns:
+        [{"history", "years", "horizon", "stage", "baseline_ms", "current_ms", "ratio"}]
+    """
+    def key(record):
+        return record["history"], record["years"], record["horizon"], record["stage"]
+
+    reference = {key(record): record[metric] for record in baseline.get("results", [])}
+    regressions = []
+    for record in current.get("results", []):
+        before = reference.get(key(record))
+        after = record[metric]
+        if before is None or after - before <= min_delta_ms or after <= before * (1 + tolerance):
+            continue
+        history, years, horizon, stage = key(record)
+        regressions.append({
+            "history": history, "years": years, "horizon": horizon, "stage": stage,
+            "baseline_ms": before, "current_ms": after,
+            "ratio": round(after / before, 3) if before else None,
+        })
+    return regressions
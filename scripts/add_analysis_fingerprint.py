@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: Analysis balance fingerprint
+
+Adds kbai_balance.kbai_analysis.balance_fingerprint (SHA-256 of the sorted
+(id_balance, balance_type) set of an analysis) and the index used by the
+benchmark duplicate checks, then backfills existing analyses in batches from
+their kbai_analysis_kpi rows.
+
+Usage:
+    python scripts/add_analysis_fingerprint.py [--batch-size 500]
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models.kbai_balance.kbai_analysis import KbaiAnalysis
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = 'kbai_balance.kbai_analysis'
+
+STATEMENTS = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS balance_fingerprint VARCHAR(64)",
+    f"CREATE INDEX IF NOT EXISTS idx_kbai_analysis_fingerprint ON {TABLE} (balance_fingerprint, analysis_type)",
+]
+
+
+def add_analysis_fingerprint(batch_size: int = 500):
+    """Add the column and index and backfill fingerprints"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Adding analysis balance fingerprint...")
+            for statement in STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            logger.info("✅ Column and index added")
+
+            total = 0
+            last_id = 0
+            while True:
+                ids = [row.id_analysis for row in db.session.execute(text(
+                    f"SELECT id_analysis FROM {TABLE} "
+                    "WHERE balance_fingerprint IS NULL AND id_analysis > :last_id "
+                    "ORDER BY id_analysis LIMIT :limit"
+                ), {"last_id": last_id, "limit": batch_size}).fetchall()]
+                if not ids:
+                    break
+                last_id = ids[-1]
+
+                entries = {}
+                for row in db.session.execute(text(
+                    "SELECT id_analysis, id_balance, kpi_list_json->>'balance_type' AS balance_type "
+                    "FROM kbai_balance.kbai_analysis_kpi WHERE id_analysis = ANY(:ids)"
+                ), {"ids": ids}).fetchall():
+                    entries.setdefault(row.id_analysis, []).append((row.id_balance, row.balance_type))
+
+                updates = [
+                    {"id_analysis": id_analysis, "fingerprint": KbaiAnalysis.compute_balance_fingerprint(rows)}
+                    for id_analysis, rows in entries.items()
+                ]
+                if updates:
+                    db.session.execute(
+                        text(f"UPDATE {TABLE} SET balance_fingerprint = :fingerprint WHERE id_analysis = :id_analysis"),
+                        updates
+                    )
+                db.session.commit()
+                total += len(updates)
+                logger.info(f"  ✅ Backfilled {total} fingerprints")
+
+            logger.info(f"🎉 Analysis fingerprints ready ({total} rows backfilled)")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error adding analysis fingerprint: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add the balance-set fingerprint to kbai_analysis")
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per backfill batch')
+    args = parser.parse_args()
+    add_analysis_fingerprint(batch_size=args.batch_size)
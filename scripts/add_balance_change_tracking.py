@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: Balance change tracking
+
+Adds the change-tracking columns to kbai_balance.kbai_balances:
+- content_hash: SHA-256 of the canonical balance JSON
+- kpi_content_hash / kpi_formula_version: what the stored KPI set was calculated from
+
+Existing rows get their content_hash backfilled in batches. KPI columns are left
+empty, so each balance is recalculated once and stamped on its next KPI run.
+
+Usage:
+    python scripts/add_balance_change_tracking.py [--batch-size 500]
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models.kbai_balance.kbai_balances import KbaiBalance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = 'kbai_balance.kbai_balances'
+
+STATEMENTS = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS kpi_content_hash VARCHAR(64)",
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS kpi_formula_version VARCHAR(32)",
+]
+
+
+def add_balance_change_tracking(batch_size: int = 500):
+    """Add the columns and backfill content hashes"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Adding balance change tracking columns...")
+            for statement in STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            logger.info("✅ Columns added")
+
+            total = 0
+            while True:
+                rows = db.session.execute(text(
+                    f"SELECT id_balance, balance FROM {TABLE} "
+                    "WHERE content_hash IS NULL AND balance IS NOT NULL "
+                    "ORDER BY id_balance LIMIT :limit"
+                ), {"limit": batch_size}).fetchall()
+                if not rows:
+                    break
+
+                db.session.execute(
+                    text(f"UPDATE {TABLE} SET content_hash = :content_hash WHERE id_balance = :id_balance"),
+                    [
+                        {"id_balance": row.id_balance, "content_hash": KbaiBalance.compute_content_hash(row.balance)}
+                        for row in rows
+                    ]
+                )
+                db.session.commit()
+                total += len(rows)
+                logger.info(f"  ✅ Backfilled {total} content hashes")
+
+            logger.info(f"🎉 Balance change tracking ready ({total} rows backfilled)")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error adding balance change tracking: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add content hash / KPI version tracking to kbai_balances")
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per backfill batch')
+    args = parser.parse_args()
+    add_balance_change_tracking(batch_size=args.batch_size)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: Benchmark report list indexes
+
+Adds the indexes used by the paginated benchmark report list:
+- kbai_reports (id_analysis, time, id_report): join from analyses and
+  (time, id_report) ordering / keyset seek
+- kbai_analysis_kpi (id_analysis): balance slots of a page of analyses
+  (the primary key leads with id_balance)
+
+Usage:
+    python scripts/add_benchmark_list_indexes.py
+"""
+
+import sys
+import os
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.app import create_app
+from src.extensions import db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS idx_kbai_reports_analysis_time "
+    "ON kbai_balance.kbai_reports (id_analysis, time, id_report)",
+    "CREATE INDEX IF NOT EXISTS idx_kbai_analysis_kpi_analysis "
+    "ON kbai_balance.kbai_analysis_kpi (id_analysis)",
+]
+
+
+def add_benchmark_list_indexes():
+    """Create the benchmark report list indexes"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Adding benchmark report list indexes...")
+            for statement in STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            logger.info("🎉 Benchmark report list indexes ready")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error adding benchmark report list indexes: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    add_benchmark_list_indexes()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: Pre-dashboard balance counters
+
+Adds the stored balance counters to kbai.kbai_pre_dashboard (balance_count,
+first_balances, counters_updated_at) and backfills them for every company in
+one set-based UPDATE. Afterwards the counters are maintained by the balance
+upload, delete and import paths (KbaiPreDashboard.refresh_balance_counters);
+records left unfilled are computed on their first read.
+
+Usage:
+    python scripts/add_pre_dashboard_counters.py
+"""
+
+import sys
+import os
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.app import create_app
+from src.extensions import db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = 'kbai.kbai_pre_dashboard'
+
+STATEMENTS = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS balance_count INTEGER NOT NULL DEFAULT 0",
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS first_balances JSON",
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS counters_updated_at TIMESTAMP",
+]
+
+# Same rules as KbaiPreDashboard.refresh_balance_counters
+BACKFILL = f"""
+    UPDATE {TABLE} p
+    SET balance_count = COALESCE(c.balance_count, 0),
+        first_balances = COALESCE(c.first_balances, '[]'::json),
+        step_upload = p.step_upload OR COALESCE(c.balance_count, 0) >= 2,
+        counters_updated_at = NOW()
+    FROM {TABLE} p2
+    LEFT JOIN (
+        SELECT
+            b.id_company,
+            COUNT(*) AS balance_count,
+            to_json((array_agg(
+                json_build_object('id_balance', b.id_balance, 'file', NULLIF(b.file, ''))
+                ORDER BY b.created_at, b.id_balance
+            ))[1:2]) AS first_balances
+        FROM kbai_balance.kbai_balances b
+        WHERE b.is_deleted = FALSE
+          AND b.balance IS NOT NULL
+        GROUP BY b.id_company
+    ) c ON c.id_company = p2.id_company
+    WHERE p.id_company = p2.id_company
+"""
+
+# completed_flag follows the step flags (KbaiPreDashboard._update_completed_flag)
+COMPLETED_FLAG = f"""
+    UPDATE {TABLE}
+    SET completed_flag = TRUE
+    WHERE completed_flag = FALSE
+      AND step_upload AND step_compare AND step_competitor AND step_predictive
+"""
+
+
+def add_pre_dashboard_counters():
+    """Add the counter columns and backfill them"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Adding pre-dashboard balance counters...")
+            for statement in STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            logger.info("✅ Columns added")
+
+            result = db.session.execute(text(BACKFILL))
+            db.session.execute(text(COMPLETED_FLAG))
+            db.session.commit()
+            logger.info(f"🎉 Pre-dashboard counters backfilled for {result.rowcount} companies")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error adding pre-dashboard counters: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    add_pre_dashboard_counters()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: Persisted parsed balance model
+
+Adds the parsed financial model columns to kbai_balance.kbai_balances:
+- parsed_model: the CE/SP values of the predictive BalanceSheetData as a packed
+  float array (order: PARSED_MODEL_FIELDS)
+- parsed_model_version: PARSED_MODEL_VERSION the array was built with
+
+and backfills every balance with data whose model is missing or outdated, in
+batches. New and re-extracted balances are parsed at ingest (KbaiBalance
+validator); rerun this script after bumping PARSED_MODEL_VERSION.
+
+Usage:
+    python scripts/backfill_balance_parsed_model.py [--batch-size 500]
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, DOUBLE_PRECISION
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models.kbai_balance.kbai_balances import KbaiBalance
+from src.app.services.kbai.predictive.models.balance_sheet import PARSED_MODEL_VERSION
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = 'kbai_balance.kbai_balances'
+
+STATEMENTS = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS parsed_model DOUBLE PRECISION[]",
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS parsed_model_version SMALLINT",
+]
+
+SELECT_BATCH = text(
+    f"SELECT id_balance, balance FROM {TABLE} "
+    "WHERE balance IS NOT NULL AND parsed_model_version IS DISTINCT FROM :version "
+    "AND id_balance > :after ORDER BY id_balance LIMIT :limit"
+)
+
+UPDATE_MODEL = text(
+    f"UPDATE {TABLE} SET parsed_model = :parsed_model, parsed_model_version = :parsed_model_version "
+    "WHERE id_balance = :id_balance"
+).bindparams(bindparam('parsed_model', type_=ARRAY(DOUBLE_PRECISION)))
+
+
+def backfill_balance_parsed_model(batch_size: int = 500):
+    """Add the columns and backfill the parsed models"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Adding parsed balance model columns...")
+            for statement in STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            logger.info("✅ Columns added")
+
+            total = failed = 0
+            after = 0
+            while True:
+                rows = db.session.execute(
+                    SELECT_BATCH, {"version": PARSED_MODEL_VERSION, "after": after, "limit": batch_size}
+                ).fetchall()
+                if not rows:
+                    break
+
+                updates = []
+                for row in rows:
+                    parsed_model, parsed_model_version = KbaiBalance.compute_parsed_model(row.balance)
+                    if parsed_model is None:
+                        failed += 1
+                        continue
+                    updates.append({
+                        "id_balance": row.id_balance,
+                        "parsed_model": parsed_model,
+                        "parsed_model_version": parsed_model_version,
+                    })
+                if updates:
+                    db.session.execute(UPDATE_MODEL, updates)
+                db.session.commit()
+                after = rows[-1].id_balance
+                total += len(updates)
+                logger.info(f"  ✅ Backfilled {total} parsed models")
+
+            if failed:
+                logger.warning(f"⚠️ {failed} balances could not be parsed and keep reading their JSON")
+            logger.info(f"🎉 Parsed balance models ready ({total} rows backfilled, version {PARSED_MODEL_VERSION})")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error backfilling parsed balance models: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add and backfill the parsed financial model of kbai_balances")
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per backfill batch')
+    args = parser.parse_args()
+    backfill_balance_parsed_model(batch_size=args.batch_size)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Predictive Engine Benchmark
+
+Times the predictive pipeline stages on synthetic and anonymized real balance
+histories (see benchmarks/predictive.py) and writes the results as JSON. The
+database is mocked for the end-to-end generate_prediction stage, so the
+benchmark needs no data; --export-histories is the only mode that reads the
+database.
+
+Keep the JSON of each release and pass it as --compare to the next run: the
+script exits with status 2 when a stage got slower than --tolerance.
+
+Usage:
+    python scripts/benchmark_predictive.py --output benchmark.json
+    python scripts/benchmark_predictive.py --years 2 5 --horizons 3 --repeat 20 --profile-dir profiles/
+    python scripts/benchmark_predictive.py --histories real_histories.json --compare previous.json
+    python scripts/benchmark_predictive.py --export-histories real_histories.json --company 12 --company 15
+"""
+
+import sys
+import os
+import argparse
+import json
+import logging
+import random
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.app.database.models import KbaiBalance
+from benchmarks.predictive import (
+    DEFAULT_HORIZONS,
+    DEFAULT_REPEAT,
+    DEFAULT_YEARS,
+    STAGES,
+    anonymize_history,
+    compare_results,
+    histories_to_json,
+    load_histories,
+    run_benchmark,
+)
+from src.app.services.kbai.predictive.predictive_service import is_complete_balance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def export_histories(company_ids, path, seed):
+    """Write the complete annual balances of the companies, anonymized, for --histories"""
+    balances = (
+        KbaiBalance.query.filter(
+            KbaiBalance.id_company.in_(company_ids),
+            KbaiBalance.is_deleted == False,
+        )
+        .order_by(KbaiBalance.id_company, KbaiBalance.year.asc())
+        .all()
+    )
+    by_company = {}
+    for balance in balances:
+        if is_complete_balance(balance) and balance.balance:
+            by_company.setdefault(balance.id_company, []).append((balance.year, balance.balance))
+
+    # Nomi progressivi: l'id azienda non finisce nel file
+    rng = random.Random(seed)
+    histories = {
+        f"real_{index:02d}": anonymize_history(history, rng)
+        for index, (_, history) in enumerate(sorted(by_company.items()), start=1)
+    }
+    with open(path, 'w') as f:
+        json.dump(histories_to_json(histories), f)
+    logger.info(f"✅ Exported {len(histories)} anonymized histories to {path}")
+
+
+def main(args):
+    app = create_app()
+
+    with app.app_context():
+        if args.export_histories:
+            if not args.company:
+                logger.error("❌ --export-histories needs at least one --company")
+                sys.exit(1)
+            export_histories(args.company, args.export_histories, args.seed)
+            return
+
+        histories = load_histories(args.histories) if args.histories else None
+        logger.info("Running predictive benchmark...")
+        report = run_benchmark(
+            years=args.years,
+            horizons=args.horizons,
+            repeat=args.repeat,
+            histories=histories,
+            synthetic=not args.no_synthetic,
+            stages=args.stages,
+            profile_dir=args.profile_dir,
+            seed=args.seed,
+        )
+
+    for record in report['results']:
+        logger.info(
+            f"  {record['history']:<12} {record['years']:>2}y {record['horizon']:>2}h "
+            f"{record['stage']:<20} median {record['median_ms']:.3f} ms"
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logger.info(f"🎉 Benchmark results written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, tolerance=args.tolerance)
+        for regression in regressions:
+            logger.warning(
+                f"  ❌ {regression['history']} {regression['years']}y {regression['horizon']}h "
+                f"{regression['stage']}: {regression['baseline_ms']:.3f} -> {regression['current_ms']:.3f} ms "
+                f"(x{regression['ratio']})"
+            )
+        if regressions:
+            sys.exit(2)
+        logger.info(f"✅ No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the predictive engine stages")
+    parser.add_argument('--years', type=int, nargs='+', default=list(DEFAULT_YEARS),
+                        help='Synthetic history lengths')
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(DEFAULT_HORIZONS),
+                        help='Projection horizons')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per stage')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='Stages to time')
+    parser.add_argument('--histories', help='JSON file of anonymized real histories')
+    parser.add_argument('--no-synthetic', action='store_true', help='Skip the synthetic histories')
+    parser.add_argument('--profile-dir', help='Dump a cProfile .prof per case and stage here')
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='Previous JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.20, help='Allowed slowdown ratio (default 0.20)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of synthetic histories and anonymization')
+    parser.add_argument('--export-histories', help='Export anonymized real histories to this file and exit')
+    parser.add_argument('--company', type=int, action='append', help='Company to export (repeatable)')
+    main(parser.parse_args())
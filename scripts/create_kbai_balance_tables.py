@@ -12,6 +12,10 @@ This script creates all the tables for the KBAI balance schema in the kbai_balan
 - kbai_reports
 - kbai_goal_objectives
 - kbai_goal_progress
+- kbai_kpi_peer_distribution
+- kbai_prediction_summary
+- kbai_custom_scenarios
+- kbai_historical_aggregates
 
 Usage:
     python scripts/create_kbai_balance_tables.py
@@ -60,7 +64,11 @@ def create_kbai_balance_tables():
                 'kpi_logic',
                 'kbai_reports',
                 'kbai_goal_objectives',
-                'kbai_goal_progress'
+                'kbai_goal_progress',
+                'kbai_kpi_peer_distribution',
+                'kbai_prediction_summary',
+                'kbai_custom_scenarios',
+                'kbai_historical_aggregates'
             ]
             
             logger.info("📋 Created tables in kbai_balance schema:")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script: KBAI balance JSON -> JSONB
+
+Converts kbai_balance.kbai_balances.balance from JSON to JSONB and adds the
+generated KPI source columns (see KPI_SOURCE_PATHS in the KbaiBalance model):
+- balance column retyped to JSONB (GIN index with jsonb_path_ops)
+- STORED generated numeric columns for the KPI formula leaves
+- B-tree index on every generated column
+
+The script is idempotent and can be re-run safely.
+
+Usage:
+    python scripts/migrate_balance_jsonb.py            # apply
+    python scripts/migrate_balance_jsonb.py --dry-run  # print SQL only
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models.kbai_balance.kbai_balances import KPI_SOURCE_PATHS, kpi_source_expression
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = 'kbai_balance.kbai_balances'
+
+
+def build_statements():
+    """Build the ordered list of migration statements"""
+    statements = [
+        f"ALTER TABLE {TABLE} ALTER COLUMN balance TYPE JSONB USING balance::jsonb",
+        f"CREATE INDEX IF NOT EXISTS idx_kbai_balances_balance_gin ON {TABLE} USING GIN (balance jsonb_path_ops)",
+    ]
+    for name, path in KPI_SOURCE_PATHS.items():
+        statements.append(
+            f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {name} NUMERIC "
+            f"GENERATED ALWAYS AS ({kpi_source_expression(path)}) STORED"
+        )
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_kbai_balances_{name} ON {TABLE} ({name})")
+    return statements
+
+
+def migrate_balance_jsonb(dry_run: bool = False):
+    """Apply the JSONB migration"""
+    statements = build_statements()
+
+    if dry_run:
+        for statement in statements:
+            print(f"{statement};")
+        return
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            logger.info("Starting kbai_balances JSONB migration...")
+
+            current_type = db.session.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_schema = 'kbai_balance' AND table_name = 'kbai_balances' AND column_name = 'balance'"
+            )).scalar()
+
+            for statement in statements:
+                if current_type == 'jsonb' and 'ALTER COLUMN balance TYPE' in statement:
+                    logger.info("  ⏭️ balance column is already JSONB")
+                    continue
+                db.session.execute(text(statement))
+                logger.info(f"  ✅ {statement[:100]}")
+
+            db.session.commit()
+            logger.info("🎉 kbai_balances JSONB migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error migrating kbai_balances to JSONB: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate kbai_balances.balance to JSONB with KPI source columns")
+    parser.add_argument('--dry-run', action='store_true', help='Print the SQL statements without executing them')
+    args = parser.parse_args()
+    migrate_balance_jsonb(dry_run=args.dry_run)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Historical Aggregates Job
+
+Creates kbai_balance.kbai_historical_aggregates if missing and syncs the
+forecast historical aggregates of all (or some) companies from their balances
+(see HistoricalAggregateService). Run it once after deploying; afterwards the
+aggregates are updated incrementally when balances are uploaded or deleted,
+and lazily before a forecast if they are out of date.
+
+Usage:
+    python scripts/rebuild_historical_aggregates.py
+    python scripts/rebuild_historical_aggregates.py --company 12 --company 15
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models import KbaiCompany, KbaiHistoricalAggregate
+from src.app.services.kbai.predictive.historical_aggregate_service import historical_aggregate_service
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild_historical_aggregates(company_ids=None):
+    """Create the table if needed and sync the aggregates of the companies"""
+    app = create_app()
+
+    with app.app_context():
+        KbaiHistoricalAggregate.__table__.create(bind=db.engine, checkfirst=True)
+
+        if not company_ids:
+            company_ids = [
+                row.id_company for row in db.session.query(KbaiCompany.id_company).filter(
+                    KbaiCompany.is_deleted == False
+                ).order_by(KbaiCompany.id_company).all()
+            ]
+
+        logger.info(f"Syncing historical aggregates of {len(company_ids)} companies...")
+        failed = 0
+        for company_id in company_ids:
+            contributions, error = historical_aggregate_service.refresh_company(company_id)
+            if error:
+                failed += 1
+                logger.error(f"  ❌ company {company_id}: {error}")
+
+        if failed:
+            logger.error(f"❌ Historical aggregates job completed with {failed} failures")
+            sys.exit(1)
+        logger.info(f"🎉 Historical aggregates job completed for {len(company_ids)} companies")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the forecast historical aggregates")
+    parser.add_argument('--company', type=int, action='append', help='Company to sync (repeatable)')
+    args = parser.parse_args()
+    rebuild_historical_aggregates(args.company)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Peer KPI Distribution Job
+
+Creates kbai_balance.kbai_kpi_peer_distribution if missing and rebuilds it from
+kbai_kpi_values of all non-competitor companies (see PeerDistributionService).
+Run it once after deploying and periodically (e.g. nightly) as a safety net;
+day-to-day changes are applied incrementally when balance KPIs change.
+
+Usage:
+    python scripts/rebuild_peer_distributions.py
+    python scripts/rebuild_peer_distributions.py --division 62 --region Lazio --year 2024
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models import KbaiKpiPeerDistribution
+from src.app.api.v1.services.k_balance.peer_distribution_service import peer_distribution_service
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild_peer_distributions(division: str = None, region: str = None, year: int = None):
+    """Create the table if needed and rebuild all (or one) peer groups"""
+    app = create_app()
+
+    with app.app_context():
+        KbaiKpiPeerDistribution.__table__.create(bind=db.engine, checkfirst=True)
+
+        if division and region and year:
+            logger.info(f"Refreshing peer group division={division}, region={region}, year={year}...")
+            rows, error = peer_distribution_service.refresh_group(division, region, year)
+        else:
+            logger.info("Rebuilding all peer KPI distributions...")
+            rows, error = peer_distribution_service.rebuild_all()
+
+        if error:
+            logger.error(f"❌ Peer distribution job failed: {error}")
+            sys.exit(1)
+        logger.info(f"🎉 Peer distribution job completed: {rows} rows written")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild precomputed peer KPI distributions")
+    parser.add_argument('--division', help='ATECO division of a single group to refresh')
+    parser.add_argument('--region', help='Region of a single group to refresh')
+    parser.add_argument('--year', type=int, help='Year of a single group to refresh')
+    args = parser.parse_args()
+    rebuild_peer_distributions(args.division, args.region, args.year)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Portfolio Forecast Job
+
+Creates kbai_balance.kbai_prediction_summary if missing and forecasts a set of
+companies in batch (see PortfolioForecastService): balances are loaded with a
+few bulk queries, companies are forecast in a process pool and the per-year
+revenue, EBITDA and net income of each scenario are stored for the portfolio
+table. Companies whose balances did not change are skipped unless --force.
+
+This job is the only place the process pool is used: the API refresh
+(POST /predictive/portfolio/refresh) runs its forecasts in-process.
+
+Usage:
+    python scripts/run_portfolio_forecast.py                       # all companies
+    python scripts/run_portfolio_forecast.py --user-id 42
+    python scripts/run_portfolio_forecast.py --company-ids 1 2 3 --horizon 5 --workers 8
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.extensions import db
+from src.app.database.models import KbaiPredictionSummary
+from src.app.services.kbai.predictive.portfolio_service import portfolio_forecast_service
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def run_portfolio_forecast(user_id=None, company_ids=None, horizon=3, force=False, workers=None):
+    """Create the table if needed and forecast the selected companies"""
+    app = create_app()
+
+    with app.app_context():
+        KbaiPredictionSummary.__table__.create(bind=db.engine, checkfirst=True)
+
+        if user_id:
+            logger.info(f"Forecasting the companies of user {user_id}...")
+        elif company_ids:
+            logger.info(f"Forecasting {len(company_ids)} companies...")
+        else:
+            logger.info("Forecasting all companies...")
+
+        stats, error = portfolio_forecast_service.run(
+            company_ids=company_ids, user_id=user_id, horizon_years=horizon, force=force, workers=workers
+        )
+        if error:
+            logger.error(f"❌ Portfolio forecast job failed: {error}")
+            sys.exit(1)
+
+        for company_id, reason in stats['skipped'].items():
+            logger.warning(f"  ⚠️ Company {company_id} skipped: {reason}")
+        logger.info(
+            f"🎉 Portfolio forecast job completed: {stats['computed']} computed, "
+            f"{stats['unchanged']} unchanged, {len(stats['skipped'])} skipped"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast a portfolio of companies in batch")
+    parser.add_argument('--user-id', type=int, help='Forecast the companies mapped to this user')
+    parser.add_argument('--company-ids', type=int, nargs='+', help='Forecast these companies')
+    parser.add_argument('--horizon', type=int, default=3, help='Number of years to project')
+    parser.add_argument('--force', action='store_true', help='Recompute companies whose balances did not change')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: PORTFOLIO_FORECAST_WORKERS)')
+    args = parser.parse_args()
+    run_portfolio_forecast(args.user_id, args.company_ids, args.horizon, args.force, args.workers)
@@ -112,6 +112,12 @@ def create_app(config_class=None):
     # Register all namespaces for Swagger documentation
     register_all_namespaces(restx_api)
     
+    # Load zones/sectors/provinces into the process-wide reference data cache
+    from src.app.api.v1.services.common.reference_data_cache import reference_data_cache
+    if app.config.get('REFERENCE_DATA_PRELOAD', True):
+        with app.app_context():
+            reference_data_cache.warm()
+    
     # Log application startup
     app.logger.info(f"Flask Enterprise Backend Template started in {env_name} mode")
     
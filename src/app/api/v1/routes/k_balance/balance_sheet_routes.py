@@ -14,6 +14,8 @@ from src.common.response_utils import (
     success_response, error_response, internal_error_response
 )
 from src.common.localization import get_message
+from src.common.pagination import pagination_args
+from src.common.conditional import conditional_response, if_none_match, not_modified_response
 from src.app.api.v1.swaggers import (
     balance_sheet_ns,
     upload_parser,
@@ -193,7 +195,10 @@ class BalanceSheetsByCompany(Resource):
         params={
             'company_id': 'Company ID from URL',
             'page': 'Page number (default: 1)',
-            'per_page': 'Items per page (default: 10)'
+            'per_page': 'Items per page (default: 10)',
+            'pagination': "Pagination mode: 'page' (default) or 'keyset'",
+            'cursor': 'Keyset cursor (next_cursor of the previous page, implies keyset mode)',
+            'count': "Total count: 'exact' (default for pages), 'estimate' or 'none' (default for keyset)"
         },
         responses={
             200: ('Success', balance_sheets_list_response_model),
@@ -216,6 +221,9 @@ class BalanceSheetsByCompany(Resource):
         Query Parameters:
         - page: Page number (default: 1)
         - per_page: Items per page (default: 10, max: 100)
+        - pagination: 'page' (default) or 'keyset' (latest first, next_cursor in pagination)
+        - cursor: next_cursor of the previous keyset page
+        - count: 'exact', 'estimate' or 'none'
         
         Returns:
         - List of balance sheets without balance field
@@ -247,7 +255,8 @@ class BalanceSheetsByCompany(Resource):
                 company_id=company_id,
                 page=page,
                 per_page=per_page,
-                current_user=current_user
+                current_user=current_user,
+                **pagination_args(request.args)
             )
             
             # Return response
@@ -320,6 +329,11 @@ class BalanceSheetDetail(Resource):
                     status_code=401
                 )
             
+            # Conditional GET: answer 304 from the balance version before loading the JSON
+            etag = balance_sheet_service.get_balance_etag(id_balance, current_user)
+            if if_none_match(etag):
+                return not_modified_response(etag)
+
             # Call service to get balance sheet
             response_data, status_code = balance_sheet_service.get_by_id(
                 id_balance=id_balance,
@@ -328,11 +342,11 @@ class BalanceSheetDetail(Resource):
             
             # Return response
             if status_code == 200:
-                return success_response(
+                return conditional_response(success_response(
                     message=response_data['message'],
                     data=response_data['data'],
                     status_code=status_code
-                )
+                ), etag)
             else:
                 return error_response(
                     message=response_data.get('message', get_message('balance_retrieve_failed', locale)),
@@ -8,6 +8,7 @@ from flask import request, current_app
 from flask_restx import Resource
 
 from src.app.api.v1.services.k_balance.benchmark import BenchmarkService
+from src.app.api.v1.services.k_balance.peer_distribution_service import peer_distribution_service
 from src.app.api.middleware import require_auth0, get_current_user
 from src.common.response_utils import (
     success_response, error_response, internal_error_response
@@ -120,10 +121,13 @@ class GetBalanceSheetsForBenchmarkReport(Resource):
         params={
             'company_id': 'Company ID from URL',
             'page': 'Page number (default 1)',
-            'per_page': 'Items per page (default 10, max 100)'
+            'per_page': 'Items per page (default 10, max 100)',
+            'pagination': "Pagination mode: 'page' (default) or 'keyset'",
+            'cursor': 'Keyset cursor (next_cursor of the previous page, implies keyset mode)'
         },
         responses={
             200: ('Success', benchmarks_report_list_response),
+            400: 'Invalid pagination cursor',
             401: 'Authentication required',
             403: 'Access denied',
             500: ('Internal Error', internal_error_model)
@@ -137,6 +141,8 @@ class GetBalanceSheetsForBenchmarkReport(Resource):
         Query Parameters:
         - page: int, optional (default 1)
         - per_page: int, optional (default 10, max 100)
+        - pagination: str, optional ('page' or 'keyset')
+        - cursor: str, optional (next_cursor from the previous keyset page)
         
         Returns:
         - Paginated list of benchmark reports
@@ -154,13 +160,17 @@ class GetBalanceSheetsForBenchmarkReport(Resource):
             # Get pagination params
             page = int(request.args.get('page', 1))
             per_page = int(request.args.get('per_page', 10))
+            cursor = request.args.get('cursor') or None
+            keyset = request.args.get('pagination', 'page') == 'keyset'
             
             # Call service
             response_data, status_code = BenchmarkService().get_benchmark_report_list(
                 company_id=company_id,
                 current_user=current_user,
                 page=page,
-                per_page=per_page
+                per_page=per_page,
+                cursor=cursor,
+                keyset=keyset
             )
             
             if status_code == 200:
@@ -638,4 +648,67 @@ class GetCompetitorReportsByReportId(Resource):
             return internal_error_response(
                 message=get_message('competitor_reports_fetch_failed', locale),
                 error_details=str(e)
-            )
\ No newline at end of file
+            )
+
+# get api to place a company's KPIs in its sector/region peer distribution
+@benchmark_ns.route('/benchmark/peer-position/<int:company_id>')
+@benchmark_ns.param('company_id', 'Company ID to place in its peer distribution')
+class CompanyPeerPosition(Resource):
+    """Handle peer KPI distribution placement for a company."""
+
+    @benchmark_ns.doc(
+        'get_company_peer_position',
+        params={
+            'company_id': 'Company ID from URL',
+            'year': 'Balance year (default: latest year with data)'
+        },
+        responses={
+            200: 'Peer KPI position retrieved successfully',
+            401: 'Authentication required',
+            403: 'Access denied',
+            404: ('Not Found', not_found_error_model),
+            500: ('Internal Error', internal_error_model)
+        }
+    )
+    @require_auth0
+    def get(self, company_id):
+        """
+        Get the company's KPI values with p10/p25/p50/p75/p90 of its peer group
+        (same ATECO division, region and year, non-competitor companies).
+        
+        Query Parameters:
+        - year: Balance year (optional)
+        """
+        try:
+            current_user = get_current_user()
+            locale = request.headers.get('Accept-Language', 'en')
+            if not current_user:
+                return error_response(
+                    message=get_message('authentication_required', locale),
+                    status_code=401
+                )
+
+            year = request.args.get('year', type=int)
+            result, status_code = peer_distribution_service.get_company_peer_position(
+                current_user=current_user,
+                company_id=company_id,
+                year=year
+            )
+            if status_code == 200:
+                return success_response(
+                    message=result.get("message", get_message('peer_position_retrieved_success', locale)),
+                    data=result.get("data"),
+                    status_code=status_code
+                )
+            else:
+                return error_response(
+                    message=result.get("message", get_message('peer_position_retrieve_failed', locale)),
+                    data=result.get("data"),
+                    status_code=status_code
+                )
+        except Exception as e:
+            current_app.logger.error(f"Get company peer position error: {str(e)}")
+            return internal_error_response(
+                message=get_message('peer_position_retrieve_failed', locale),
+                error_details=str(e)
+            )
@@ -13,6 +13,7 @@ from src.common.response_utils import (
     success_response, error_response, internal_error_response
 )
 from src.common.localization import get_message
+from src.common.conditional import conditional_response, if_none_match, not_modified_response
 from src.app.api.v1.swaggers.k_balance.comparison_report_tab import (
     comparison_report_ns,
     comparison_report_request_model,
@@ -190,6 +191,11 @@ class GetComparisonReportByCompanyId(Resource):
                     status_code=401
                 )
             
+            # Conditional GET: answer 304 from the company data version before building the report
+            etag = comparison_report_service.get_report_etag(company_id, current_user)
+            if if_none_match(etag):
+                return not_modified_response(etag)
+
             # Call service to get report
             response_data, status_code = comparison_report_service.get_comparison_report_by_company_id(
                 company_id=company_id,
@@ -197,11 +203,11 @@ class GetComparisonReportByCompanyId(Resource):
             )
             
             if status_code == 200:
-                return success_response(
+                return conditional_response(success_response(
                     message=response_data['message'],
                     data=response_data['data'],
                     status_code=status_code
-                )
+                ), etag)
             else:
                 return error_response(
                     message=response_data.get('message', get_message('comparison_reports_retrieve_failed', locale)),
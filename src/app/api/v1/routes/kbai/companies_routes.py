@@ -24,6 +24,7 @@ from src.common.response_utils import (
     unauthorized_response, internal_error_response, not_found_response
 )
 from src.common.localization import get_message
+from src.common.pagination import pagination_args
 from src.app.api.v1.swaggers import (
     kbai_companies_ns,
     create_company_model,
@@ -140,9 +141,13 @@ class CompaniesList(Resource):
         'page': 'Page number (default: 1)',
         'per_page': 'Items per page (default: 15, max: 100)',
         'search': 'Search term for company name, contact person, or email',
-        'status': 'Filter by status flag (ACTIVE, INACTIVE, SUSPENDED)'
+        'status': 'Filter by status flag (ACTIVE, INACTIVE, SUSPENDED)',
+        'pagination': "Pagination mode: 'page' (default) or 'keyset'",
+        'cursor': 'Keyset cursor (next_cursor of the previous page, implies keyset mode)',
+        'count': "Total count: 'exact' (default for pages), 'estimate' or 'none' (default for keyset)"
     }, responses={
         200: ('Companies retrieved successfully', companies_list_response_model),
+        400: ('Invalid pagination cursor', validation_error_model),
         403: ('Permission denied', validation_error_model),
         500: ('Internal server error', internal_error_model)
     })
@@ -178,6 +183,7 @@ class CompaniesList(Resource):
                 page=page,
                 per_page=per_page,
                 search=search,
+                **pagination_args(request.args),
                 **filters
             )
 
@@ -5,7 +5,20 @@ API routes for KBAI Predictive Engine.
 from flask import request, jsonify, current_app
 from flask_restx import Resource, Namespace
 
-from src.app.services.kbai.predictive.predictive_service import PredictiveService
+from src.app.services.kbai.predictive.predictive_service import MAX_HORIZON_YEARS, PredictiveService
+from src.app.services.kbai.predictive.portfolio_service import portfolio_forecast_service
+from src.app.services.kbai.predictive.custom_scenario_service import custom_scenario_service
+from src.app.services.kbai.predictive.core.projection_engine import (
+    MONTE_CARLO_DEFAULT_PATHS,
+    MONTE_CARLO_MAX_PATHS,
+    MONTE_CARLO_MIN_PATHS,
+    SENSITIVITY_DEFAULT_DELTA,
+    SENSITIVITY_PARAMETERS,
+    SENSITIVITY_DEFAULT_TARGETS,
+    SENSITIVITY_KPIS,
+    SENSITIVITY_MAX_DELTA,
+)
+from src.app.services.kbai.predictive.core.projection_core import LINE_ITEMS
 from src.app.api.middleware import require_auth0, get_current_user
 from src.app.api.v1.services import kbai_companies_service
 from src.common.response_utils import (
@@ -16,17 +29,77 @@ from src.common.response_utils import (
     unauthorized_response,
 )
 from src.common.localization import get_message
+from src.common.conditional import (
+    conditional_response,
+    if_none_match,
+    not_modified_response,
+)
 
 # Create namespace
 predictive_ns = Namespace("predictive", description="KBAI Predictive Engine operations")
 
 
+def _check_company_access(company_id, locale):
+    """
+    Error response if the current user cannot view the company, else None.
+
+    - superadmin/staff: Can access ANY company
+    - admin/user: Can ONLY access their own companies
+    """
+    from src.app.database.models import KbaiCompany
+
+    company = KbaiCompany.findOne(
+        id_company=company_id, is_deleted=False, is_competitor=False
+    )
+
+    if not company:
+        return error_response(
+            message=get_message("company_not_found", locale), status_code=404
+        )
+
+    has_permission, error_msg = kbai_companies_service.check_company_permission(
+        current_user=get_current_user(),
+        company=company,
+        action="view",  # Generating a forecast is viewing/analyzing data
+    )
+
+    if not has_permission:
+        return error_response(
+            message=get_message("permission_denied", locale),
+            data={"reason": error_msg},
+            status_code=403,
+        )
+    return None
+
+
+def _check_horizon(horizon, locale):
+    """Error response unless the horizon is an integer from 1 to MAX_HORIZON_YEARS, else None"""
+    if isinstance(horizon, bool) or not isinstance(horizon, int) or not 1 <= horizon <= MAX_HORIZON_YEARS:
+        return error_response(
+            message=get_message(
+                "pred_invalid_horizon", locale, horizon=horizon, max_horizon=MAX_HORIZON_YEARS
+            ),
+            status_code=400,
+        )
+    return None
+
+
 @predictive_ns.route("/<int:company_id>/generate")
 class PredictiveGenerateResource(Resource):
     """Resource to generate financial predictions"""
 
     @predictive_ns.doc("generate_prediction")
-    @predictive_ns.param("horizon", "Number of years to project (default: 3)")
+    @predictive_ns.param("horizon", f"Number of years to project (1-{MAX_HORIZON_YEARS}, default: 3)")
+    @predictive_ns.param(
+        "mode",
+        "scenarios (default) or monte_carlo: also return P10/P50/P90 bands "
+        "of a stochastic simulation of the base scenario",
+    )
+    @predictive_ns.param(
+        "paths",
+        f"Monte Carlo paths ({MONTE_CARLO_MIN_PATHS}-{MONTE_CARLO_MAX_PATHS}, "
+        f"default: {MONTE_CARLO_DEFAULT_PATHS})",
+    )
     @require_auth0
     def get(self, company_id):
         """
@@ -40,59 +113,442 @@ class PredictiveGenerateResource(Resource):
         - admin/user: Can ONLY generate for their own companies
 
         Returns:
-            JSON object containing the prediction scenarios (Base, Optimistic, Pessimistic).
+            JSON object containing the prediction scenarios (Base, Optimistic, Pessimistic),
+            plus the Monte Carlo bands when mode=monte_carlo.
         """
         locale = request.headers.get("Accept-Language", "en")
 
         try:
             # 1. Authorization Check
-            current_user = get_current_user()
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            # 2. Parse Input
+            horizon = request.args.get("horizon", 3, type=int)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+            mode = request.args.get("mode", "scenarios")
+            if mode not in ("scenarios", "monte_carlo"):
+                return error_response(
+                    message=get_message("pred_invalid_mode", locale, mode=mode),
+                    status_code=400,
+                )
+
+            monte_carlo_paths = None
+            if mode == "monte_carlo":
+                monte_carlo_paths = request.args.get(
+                    "paths", MONTE_CARLO_DEFAULT_PATHS, type=int
+                )
+                if not MONTE_CARLO_MIN_PATHS <= monte_carlo_paths <= MONTE_CARLO_MAX_PATHS:
+                    return error_response(
+                        message=get_message(
+                            "pred_invalid_paths",
+                            locale,
+                            min_paths=MONTE_CARLO_MIN_PATHS,
+                            max_paths=MONTE_CARLO_MAX_PATHS,
+                        ),
+                        status_code=400,
+                    )
+
+            # 3. Conditional GET: skip the engine when the balances did not change
+            etag = PredictiveService.prediction_etag(
+                company_id, horizon, locale, monte_carlo_paths
+            )
+            if if_none_match(etag):
+                return not_modified_response(etag)
+
+            # 4. Call Service (memoized per balance fingerprint)
+            result = PredictiveService.get_prediction(
+                company_id, horizon, locale=locale, monte_carlo_paths=monte_carlo_paths
+            )
 
-            # Check company permissions using the existing service helper
+            if result["status"] == "error":
+                return error_response(message=result["message"], status_code=400)
 
-            # Fetch Company
-            from src.app.database.models import KbaiCompany
+            return conditional_response(
+                success_response(
+                    message=get_message("pred_prediction_success", locale),
+                    data=result["data"],
+                ),
+                etag,
+            )
 
-            company = KbaiCompany.findOne(
-                id_company=company_id, is_deleted=False, is_competitor=False
+        except Exception as e:
+            current_app.logger.error(f"Prediction API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
             )
 
-            if not company:
+
+@predictive_ns.route("/<int:company_id>/sensitivity")
+class PredictiveSensitivityResource(Resource):
+    """Resource to run a sensitivity (tornado) analysis of the base scenario"""
+
+    @predictive_ns.doc("sensitivity_analysis")
+    @predictive_ns.param("horizon", f"Number of years to project (1-{MAX_HORIZON_YEARS}, default: 3)")
+    @predictive_ns.param(
+        "delta",
+        f"Relative perturbation of each parameter (0-{SENSITIVITY_MAX_DELTA}, "
+        f"default: {SENSITIVITY_DEFAULT_DELTA})",
+    )
+    @predictive_ns.param(
+        "targets",
+        "Comma-separated line items or KPIs read in the last projected year "
+        f"(default: {','.join(SENSITIVITY_DEFAULT_TARGETS)})",
+    )
+    @require_auth0
+    def get(self, company_id):
+        """
+        Rank the drivers of a company's forecast.
+
+        Each forecast parameter is perturbed by -delta and +delta and the
+        resulting swing of every target is returned, sorted by magnitude.
+
+        Permissions:
+        - superadmin/staff: Can analyze ANY company
+        - admin/user: Can ONLY analyze their own companies
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            horizon = request.args.get("horizon", 3, type=int)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+            delta = request.args.get("delta", SENSITIVITY_DEFAULT_DELTA, type=float)
+            if not 0 < delta <= SENSITIVITY_MAX_DELTA:
+                return error_response(
+                    message=get_message(
+                        "pred_invalid_delta", locale, delta=delta, max_delta=SENSITIVITY_MAX_DELTA
+                    ),
+                    status_code=400,
+                )
+
+            targets = [
+                target.strip()
+                for target in request.args.get("targets", "").split(",")
+                if target.strip()
+            ] or list(SENSITIVITY_DEFAULT_TARGETS)
+            invalid = [
+                target for target in targets
+                if target not in LINE_ITEMS and target not in SENSITIVITY_KPIS
+            ]
+            if invalid:
                 return error_response(
-                    message=get_message("company_not_found", locale), status_code=404
+                    message=get_message(
+                        "pred_invalid_targets", locale, targets=", ".join(invalid)
+                    ),
+                    status_code=400,
                 )
 
-            has_permission, error_msg = kbai_companies_service.check_company_permission(
-                current_user=current_user,
-                company=company,
-                action="view",  # Generating a forecast is viewing/analyzing data
+            result = PredictiveService.generate_sensitivity(
+                company_id, horizon, delta=delta, targets=targets, locale=locale
+            )
+
+            if result["status"] == "error":
+                return error_response(message=result["message"], status_code=400)
+
+            return success_response(
+                message=get_message("pred_sensitivity_success", locale),
+                data=result["data"],
             )
 
-            if not has_permission:
+        except Exception as e:
+            current_app.logger.error(f"Sensitivity API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+
+@predictive_ns.route("/<int:company_id>/goal-seek")
+class PredictiveGoalSeekResource(Resource):
+    """Resource to solve the base scenario for a target KPI"""
+
+    @predictive_ns.doc("goal_seek")
+    @predictive_ns.param("target", "Line item or KPI to reach (e.g. EBITDA_Margin)", required=True)
+    @predictive_ns.param("value", "Target value (KPIs as ratios: 0.12 = 12%)", required=True)
+    @predictive_ns.param(
+        "parameters",
+        "Comma-separated free parameters; several are scaled together "
+        f"(one of: {', '.join(SENSITIVITY_PARAMETERS)})",
+        required=True,
+    )
+    @predictive_ns.param("horizon", f"Number of years to project (1-{MAX_HORIZON_YEARS}, default: 3)")
+    @predictive_ns.param("year", "Projected year of the target (default: last one)")
+    @require_auth0
+    def get(self, company_id):
+        """
+        Find the parameter values that bring a target to a given value.
+
+        Example: which revenue growth gives a 12% EBITDA margin in year 3
+        (target=EBITDA_Margin&value=0.12&parameters=tasso_crescita).
+
+        Returns:
+            The solved parameters, the value reached and the full projection
+            of the base scenario with those parameters.
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            horizon = request.args.get("horizon", 3, type=int)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+
+            target = request.args.get("target", "").strip()
+            value = request.args.get("value", type=float)
+            if not target or value is None:
                 return error_response(
-                    message=get_message("permission_denied", locale),
-                    data={"reason": error_msg},
-                    status_code=403,
+                    message=get_message("pred_invalid_goal", locale), status_code=400
+                )
+            if target not in LINE_ITEMS and target not in SENSITIVITY_KPIS:
+                return error_response(
+                    message=get_message("pred_invalid_targets", locale, targets=target),
+                    status_code=400,
                 )
 
-            # 2. Parse Input
-            horizon = request.args.get("horizon", 3, type=int)
+            parameters = [
+                name.strip()
+                for name in request.args.get("parameters", "").split(",")
+                if name.strip()
+            ]
+            invalid = [name for name in parameters if name not in SENSITIVITY_PARAMETERS]
+            if not parameters or invalid:
+                return error_response(
+                    message=get_message(
+                        "pred_invalid_parameters", locale, parameters=", ".join(invalid)
+                    ),
+                    status_code=400,
+                )
 
-            # 3. Call Service
-            result = PredictiveService.generate_prediction(
-                company_id, horizon, locale=locale
+            result = PredictiveService.generate_goal_seek(
+                company_id,
+                target,
+                value,
+                parameters,
+                horizon_years=horizon,
+                year=request.args.get("year", type=int),
+                locale=locale,
             )
 
             if result["status"] == "error":
                 return error_response(message=result["message"], status_code=400)
 
             return success_response(
-                message=get_message("pred_prediction_success", locale),
+                message=get_message("pred_goal_seek_success", locale),
                 data=result["data"],
             )
 
         except Exception as e:
-            current_app.logger.error(f"Prediction API error: {str(e)}")
+            current_app.logger.error(f"Goal seek API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+
+@predictive_ns.route("/portfolio")
+class PredictivePortfolioResource(Resource):
+    """Resource to read the stored forecasts of a user's companies"""
+
+    @predictive_ns.doc("prediction_portfolio")
+    @predictive_ns.param("user_id", "User whose companies to list (superadmin/staff only, default: current user)")
+    @require_auth0
+    def get(self):
+        """
+        Portfolio table of next-year forecasts.
+
+        Returns the revenue, EBITDA and net income per year of the base,
+        optimistic and pessimistic scenarios of every company mapped to the
+        user, as stored by the batch forecasting job. Companies whose balances
+        changed since are flagged as stale.
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            result, status_code = portfolio_forecast_service.get_portfolio(
+                current_user=get_current_user(),
+                user_id=request.args.get("user_id", type=int),
+            )
+            if status_code == 200:
+                return success_response(message=result["message"], data=result["data"])
+            return error_response(message=result["message"], status_code=status_code)
+
+        except Exception as e:
+            current_app.logger.error(f"Prediction portfolio API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+
+@predictive_ns.route("/portfolio/refresh")
+class PredictivePortfolioRefreshResource(Resource):
+    """Resource to start the batch forecast of the current user's companies"""
+
+    @predictive_ns.doc("refresh_prediction_portfolio")
+    @predictive_ns.param("horizon", f"Number of years to project (1-{MAX_HORIZON_YEARS}, default: 3)")
+    @require_auth0
+    def post(self):
+        """
+        Recompute the forecast summaries of the current user's companies.
+
+        Runs in the background; companies whose balances did not change are
+        skipped. Returns 409 while a refresh for the user is still running.
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            horizon = request.args.get("horizon", 3, type=int)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+
+            started = portfolio_forecast_service.run_async(
+                user_id=get_current_user().id_user,
+                horizon_years=horizon,
+            )
+            if not started:
+                return error_response(
+                    message=get_message("pred_portfolio_refresh_running", locale),
+                    status_code=409,
+                )
+            return success_response(
+                message=get_message("pred_portfolio_refresh_started", locale),
+                status_code=202,
+            )
+
+        except Exception as e:
+            current_app.logger.error(f"Prediction portfolio refresh API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+
+@predictive_ns.route("/<int:company_id>/scenarios")
+class PredictiveCustomScenariosResource(Resource):
+    """Resource to run and save custom forecast scenarios"""
+
+    @predictive_ns.doc("list_custom_scenarios")
+    @predictive_ns.param("run", "true to also project the saved scenarios on the latest balances")
+    @predictive_ns.param("horizon", f"Number of years to project (1-{MAX_HORIZON_YEARS}, default: 3)")
+    @require_auth0
+    def get(self, company_id):
+        """
+        List the saved custom scenarios of a company, optionally re-running them.
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            horizon = request.args.get("horizon", 3, type=int)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+
+            result, status_code = custom_scenario_service.list_scenarios(
+                company_id,
+                run=request.args.get("run", "false").lower() == "true",
+                horizon_years=horizon,
+            )
+            if status_code == 200:
+                return success_response(message=result["message"], data=result["data"])
+            return error_response(message=result["message"], status_code=status_code)
+
+        except Exception as e:
+            current_app.logger.error(f"Custom scenarios API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+    @predictive_ns.doc("run_custom_scenarios")
+    @require_auth0
+    def post(self, company_id):
+        """
+        Project named custom scenarios (at most 20) together with the base one.
+
+        Body:
+            {
+                "horizon": 3,
+                "save": false,
+                "scenarios": [
+                    {
+                        "name": "Espansione",
+                        "description": "...",
+                        "modifiers": {"revenue_growth_modifier": 0.2},
+                        "overrides": {"tasso_crescita": 0.08, "variazione_organico": 3}
+                    }
+                ]
+            }
+
+        All scenarios are projected in one engine pass on the company's cached
+        historical analysis; with save=true the definitions are stored (by name)
+        and can be re-run with GET ?run=true.
+        """
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            body = request.get_json(silent=True) or {}
+            horizon = body.get("horizon", 3)
+            invalid_horizon = _check_horizon(horizon, locale)
+            if invalid_horizon:
+                return invalid_horizon
+
+            result, status_code = custom_scenario_service.run_scenarios(
+                company_id,
+                body.get("scenarios"),
+                horizon_years=horizon,
+                save=bool(body.get("save", False)),
+                user_id=get_current_user().id_user,
+            )
+            if status_code == 200:
+                return success_response(message=result["message"], data=result["data"])
+            return error_response(message=result["message"], status_code=status_code)
+
+        except Exception as e:
+            current_app.logger.error(f"Custom scenarios API error: {str(e)}")
+            return internal_error_response(
+                message=get_message("default_error", locale), error_details=str(e)
+            )
+
+
+@predictive_ns.route("/<int:company_id>/scenarios/<int:scenario_id>")
+class PredictiveCustomScenarioResource(Resource):
+    """Resource to delete a saved custom scenario"""
+
+    @predictive_ns.doc("delete_custom_scenario")
+    @require_auth0
+    def delete(self, company_id, scenario_id):
+        """Delete a saved custom scenario of a company"""
+        locale = request.headers.get("Accept-Language", "en")
+
+        try:
+            denied = _check_company_access(company_id, locale)
+            if denied:
+                return denied
+
+            result, status_code = custom_scenario_service.delete_scenario(company_id, scenario_id)
+            if status_code == 200:
+                return success_response(message=result["message"])
+            return error_response(message=result["message"], status_code=status_code)
+
+        except Exception as e:
+            current_app.logger.error(f"Custom scenario delete API error: {str(e)}")
             return internal_error_response(
                 message=get_message("default_error", locale), error_details=str(e)
             )
@@ -6,6 +6,8 @@ from flask import current_app
 from src.common.localization import get_message
 from src.extensions import db
 from src.app.database.models.kbai import KbaiCompany, KbaiZone, KbaiCompanyZone, KbaiSector, KbaiCompanySector, ProvinceRegion
+from src.app.api.v1.services.common.reference_data_cache import reference_data_cache
+from src.app.api.v1.services.kbai.pre_dashboard_service import kbai_pre_dashboard_service
 from src.app.database.models.kbai_balance.kbai_balances import KbaiBalance
 from src.app.database.models.public.tb_licences import TbLicences
 from src.app.database.models.public.licence_admin import LicenceAdmin
@@ -469,25 +471,10 @@ class CompanyImportService:
             existing = KbaiCompany.findOne(vat=vat, is_deleted=False)
             if existing:
                 # Return data directly from DB
-                # Get region from zone if available
-                region = None
-                zone_mapping = KbaiCompanyZone.query.filter_by(id_company=existing.id_company, primary_flag=True).first()
-                if zone_mapping:
-                    zone = KbaiZone.query.get(zone_mapping.id_zone)
-                    if zone:
-                        region = zone.region
-                ateco = None
-                division = (
-    db.session.query(KbaiSector.division)
-    .join(
-        KbaiCompanySector,
-        KbaiCompanySector.id_sector == KbaiSector.id_sector
-    )
-    .filter(
-        KbaiCompanySector.id_company == existing.id_company
-    )
-    .scalar()
-)
+                # Get region and ateco division from the primary zone/sector mappings
+                profile = reference_data_cache.company_profile(existing.id_company) or {}
+                region = profile.get('region')
+                division = profile.get('division')
                 return {
                     "message": get_message('company_found_db', locale),
                     "id_company": existing.id_company,
@@ -579,9 +566,9 @@ class CompanyImportService:
         
         # Try to look up region from province if possible
         if province:
-             pr = db.session.query(ProvinceRegion).filter(text("UPPER(province) = :p")).params(p=province.upper()).first()
-             if pr:
-                 zone_data["region"] = pr.region
+             region = reference_data_cache.region_for_province(province)
+             if region:
+                 zone_data["region"] = region
 
         ateco_full = summary.get("mainActivity", {}).get("code", "")
         # ATECO division is first 2 digits
@@ -789,6 +776,8 @@ class CompanyImportService:
 
                 # If the with block finishes without exceptions, commit the whole session to persist changes
                 db.session.commit()
+                if imported_balances:
+                    kbai_pre_dashboard_service.refresh_counters(id_company)
                 msg = f"Successfully Imported all available balancesheets for company {id_company}"
                 print(msg)
                 current_app.logger.info(msg)
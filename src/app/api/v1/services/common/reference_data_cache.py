@@ -0,0 +1,337 @@
+"""
+Reference Data Cache
+
+Process-wide in-memory cache for the slowly changing KBAI reference data that
+is read on almost every company, benchmark and import call:
+- KbaiSector rows, keyed by id, by (division, region) and by division
+- ProvinceRegion, keyed by province
+- KbaiZone rows, keyed by id (filled on demand, zones are created per company)
+
+Sectors and provinces are loaded in one pass and reloaded when REFERENCE_DATA_TTL
+expires or the version counter is bumped through invalidate(). Lookups that miss
+fall through to the database, so rows added between refreshes are still found.
+ORM writes on the underlying models invalidate the affected entries when their
+session commits; other processes and bulk query updates rely on the TTL.
+
+The primary KbaiCompanyZone / KbaiCompanySector mapping of a company is not
+cached: it changes with ordinary company edits, which must be visible to every
+process at once, so company_profile() reads it live in one joined query.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func
+from sqlalchemy.orm import Session, object_session
+
+from src.app.database.models.kbai import (
+    KbaiCompany,
+    KbaiCompanySector,
+    KbaiCompanyZone,
+    KbaiSector,
+    KbaiZone,
+    ProvinceRegion,
+)
+from src.extensions import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+# Upper bound for the on-demand zone entries before they are dropped
+MAX_ON_DEMAND_ENTRIES = 50000
+# session.info key of the invalidations collected until commit
+_PENDING_KEY = 'reference_data_invalidations'
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    return value.strip().upper() if value else None
+
+
+def _sector_entry(row) -> Dict[str, Any]:
+    return {
+        'id_sector': row.id_sector,
+        'section': row.section,
+        'division': row.division,
+        'region': row.region,
+        'year': row.year,
+        'geographic_area': row.geographic_area,
+    }
+
+
+def _zone_entry(row) -> Dict[str, Any]:
+    return {
+        'id_zone': row.id_zone,
+        'city': row.city,
+        'region': row.region,
+        'country': row.country,
+    }
+
+
+class ReferenceDataCache:
+    """In-memory lookups for zones, sectors and provinces, plus live company primary mappings"""
+
+    def __init__(self, ttl: int = None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._version = 0
+        self._loaded_version = None
+        self._loaded_at = 0.0
+
+        self._sectors_by_id: Dict[int, Dict[str, Any]] = {}
+        self._sectors_by_division_region: Dict[tuple, Dict[str, Any]] = {}
+        self._sectors_by_division: Dict[str, List[Dict[str, Any]]] = {}
+        self._province_regions: Dict[str, str] = {}
+        self._zones: Dict[int, Dict[str, Any]] = {}
+
+    # --------------------------------------------------------------------------
+    # Refresh / invalidation
+    # --------------------------------------------------------------------------
+    @property
+    def version(self) -> int:
+        """Counter bumped on every full invalidation"""
+        return self._version
+
+    def _get_ttl(self) -> int:
+        if self._ttl is not None:
+            return self._ttl
+        if has_app_context():
+            return current_app.config.get('REFERENCE_DATA_TTL', DEFAULT_TTL)
+        return DEFAULT_TTL
+
+    def _is_stale(self) -> bool:
+        return (
+            self._loaded_version != self._version
+            or time.monotonic() - self._loaded_at > self._get_ttl()
+        )
+
+    def load(self):
+        """(Re)load sectors and provinces and drop the on-demand entries"""
+        with self._lock:
+            version = self._version
+            sectors = db.session.query(
+                KbaiSector.id_sector, KbaiSector.section, KbaiSector.division,
+                KbaiSector.region, KbaiSector.year, KbaiSector.geographic_area
+            ).order_by(KbaiSector.id_sector).all()
+            provinces = db.session.query(ProvinceRegion.province, ProvinceRegion.region).all()
+
+            sectors_by_id = {}
+            sectors_by_division_region = {}
+            sectors_by_division = {}
+            for row in sectors:
+                entry = _sector_entry(row)
+                sectors_by_id[row.id_sector] = entry
+                # Lowest id wins for duplicated (division, region) pairs
+                sectors_by_division_region.setdefault((row.division, _normalize(row.region)), entry)
+                sectors_by_division.setdefault(row.division, []).append(entry)
+
+            self._sectors_by_id = sectors_by_id
+            self._sectors_by_division_region = sectors_by_division_region
+            self._sectors_by_division = sectors_by_division
+            self._province_regions = {_normalize(row.province): row.region for row in provinces}
+            self._zones = {}
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            logger.info(f"Reference data cache loaded: {len(sectors_by_id)} sectors, {len(provinces)} provinces")
+
+    def _ensure_loaded(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.load()
+
+    def warm(self) -> bool:
+        """Load the cache eagerly (used at startup); returns False if the database is not reachable"""
+        try:
+            self.load()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Reference data cache warm-up skipped: {str(e)}")
+            return False
+
+    def invalidate(self):
+        """Drop everything; the next lookup reloads sectors and provinces"""
+        with self._lock:
+            self._version += 1
+            self._zones = {}
+
+    def invalidate_zone(self, id_zone: int):
+        """Drop one cached zone"""
+        self._zones.pop(id_zone, None)
+
+    def _remember(self, store: dict, key, value):
+        if len(store) >= MAX_ON_DEMAND_ENTRIES:
+            store.clear()
+        store[key] = value
+
+    # --------------------------------------------------------------------------
+    # Sectors / provinces
+    # --------------------------------------------------------------------------
+    def get_sector(self, id_sector: int) -> Optional[Dict[str, Any]]:
+        """Sector by id"""
+        self._ensure_loaded()
+        sector = self._sectors_by_id.get(id_sector)
+        if sector is None and id_sector is not None:
+            row = db.session.query(
+                KbaiSector.id_sector, KbaiSector.section, KbaiSector.division,
+                KbaiSector.region, KbaiSector.year, KbaiSector.geographic_area
+            ).filter(KbaiSector.id_sector == id_sector).first()
+            if row:
+                sector = _sector_entry(row)
+                self._sectors_by_id[id_sector] = sector
+        return sector
+
+    def find_sector(self, division: str, region: str) -> Optional[Dict[str, Any]]:
+        """Sector for an ATECO division and region (region compared case-insensitively)"""
+        if not division or not region:
+            return None
+        self._ensure_loaded()
+        key = (division, _normalize(region))
+        sector = self._sectors_by_division_region.get(key)
+        if sector is None:
+            row = db.session.query(
+                KbaiSector.id_sector, KbaiSector.section, KbaiSector.division,
+                KbaiSector.region, KbaiSector.year, KbaiSector.geographic_area
+            ).filter(
+                KbaiSector.division == division,
+                func.upper(KbaiSector.region) == key[1]
+            ).order_by(KbaiSector.id_sector).first()
+            if row:
+                sector = _sector_entry(row)
+                self._sectors_by_division_region[key] = sector
+        return sector
+
+    def sector_ids(self, division: str, geographic_area: int = None) -> List[int]:
+        """Ids of all sectors of an ATECO division, optionally restricted to a geographic area"""
+        self._ensure_loaded()
+        return [
+            sector['id_sector'] for sector in self._sectors_by_division.get(division, [])
+            if geographic_area is None or sector['geographic_area'] == geographic_area
+        ]
+
+    def region_for_province(self, province: str) -> Optional[str]:
+        """Region name for a province (case-insensitive)"""
+        if not province:
+            return None
+        self._ensure_loaded()
+        key = _normalize(province)
+        region = self._province_regions.get(key)
+        if region is None:
+            region = db.session.query(ProvinceRegion.region).filter(
+                func.upper(ProvinceRegion.province) == key
+            ).scalar()
+            if region:
+                self._province_regions[key] = region
+        return region
+
+    # --------------------------------------------------------------------------
+    # Zones / company primary mappings
+    # --------------------------------------------------------------------------
+    def get_zone(self, id_zone: int) -> Optional[Dict[str, Any]]:
+        """Zone by id"""
+        self._ensure_loaded()
+        zone = self._zones.get(id_zone)
+        if zone is None and id_zone is not None:
+            row = db.session.query(
+                KbaiZone.id_zone, KbaiZone.city, KbaiZone.region, KbaiZone.country
+            ).filter(KbaiZone.id_zone == id_zone).first()
+            if row:
+                zone = _zone_entry(row)
+                self._remember(self._zones, id_zone, zone)
+        return zone
+
+    def company_profile(self, id_company: int) -> Optional[Dict[str, Any]]:
+        """
+        Primary zone and sector attributes of a company (read live, never cached).
+
+        Returns:
+            dict with id_zone, region, country, id_sector, division and
+            geographic_area (None values when a mapping is missing), or
+            None if the company does not exist
+        """
+        row = (
+            db.session.query(
+                KbaiCompany.id_company,
+                KbaiZone.id_zone, KbaiZone.region, KbaiZone.country,
+                KbaiSector.id_sector, KbaiSector.division, KbaiSector.geographic_area
+            )
+            .outerjoin(KbaiCompanyZone, and_(
+                KbaiCompanyZone.id_company == KbaiCompany.id_company,
+                KbaiCompanyZone.primary_flag == True
+            ))
+            .outerjoin(KbaiZone, KbaiZone.id_zone == KbaiCompanyZone.id_zone)
+            .outerjoin(KbaiCompanySector, and_(
+                KbaiCompanySector.id_company == KbaiCompany.id_company,
+                KbaiCompanySector.primary_flag == True
+            ))
+            .outerjoin(KbaiSector, KbaiSector.id_sector == KbaiCompanySector.id_sector)
+            .filter(KbaiCompany.id_company == id_company)
+            .first()
+        )
+        if not row:
+            return None
+
+        return {
+            'id_zone': row.id_zone,
+            'region': row.region,
+            'country': row.country,
+            'id_sector': row.id_sector,
+            'division': row.division,
+            'geographic_area': row.geographic_area,
+        }
+
+
+# Global instance
+reference_data_cache = ReferenceDataCache()
+
+
+# --------------------------------------------------------------------------
+# Automatic invalidation on ORM writes (applied when the session commits)
+# --------------------------------------------------------------------------
+def _pending(target) -> Optional[Dict[str, Any]]:
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault(_PENDING_KEY, {'reload': False, 'zones': set()})
+
+
+def _on_zone_change(mapper, connection, target):
+    pending = _pending(target)
+    if pending is None:
+        reference_data_cache.invalidate_zone(target.id_zone)
+    else:
+        pending['zones'].add(target.id_zone)
+
+
+def _on_reference_table_change(mapper, connection, target):
+    pending = _pending(target)
+    if pending is None:
+        reference_data_cache.invalidate()
+    else:
+        pending['reload'] = True
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if pending['reload']:
+        reference_data_cache.invalidate()
+    for id_zone in pending['zones']:
+        reference_data_cache.invalidate_zone(id_zone)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(KbaiZone, _event_name, _on_zone_change)
+    event.listen(KbaiSector, _event_name, _on_reference_table_change)
+    event.listen(ProvinceRegion, _event_name, _on_reference_table_change)
+
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_rollback)
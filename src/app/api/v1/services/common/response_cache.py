@@ -0,0 +1,363 @@
+"""
+Response Cache
+
+Caches (response_data, status_code) results of read-heavy service methods in
+the Flask-Caching `cache` (simple backend in development/tests, Redis in
+production) and invalidates them by tag:
+- 'company:<id>'  everything shown for one company (balances, KPIs, analyses,
+                  benchmark/comparison reports, pre-dashboard)
+- 'companies'     company lists (bumped together with any company tag, since
+                  list rows carry per-company KPI status)
+- 'prediction:<id>' memoized predictive results of one company; only balance
+                  writes bump it (the predictive service itself writes the
+                  company's analyses while computing)
+
+Every tag has a version stored in the cache; entry keys include the current
+versions of their tags, so invalidating a tag only replaces its version and the
+stale entries are never read again (they expire through RESPONSE_CACHE_TIMEOUT).
+
+Entries are keyed by the user-visible scope (role for superadmin/staff, user id
+otherwise), the Accept-Language locale and the call parameters. Only 200
+results are cached. ORM writes on the tracked models invalidate their tags when
+the session commits; bulk/text() deletes call invalidate_company() explicitly.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from src.app.database.models import (
+    AnalysisKpiInfo,
+    KbaiAnalysis,
+    KbaiAnalysisKpi,
+    KbaiBalance,
+    KbaiCompany,
+    KbaiCompanySector,
+    KbaiCompanyZone,
+    KbaiKpiValue,
+    KbaiPreDashboard,
+    KbaiReport,
+    TbUserCompany,
+)
+from src.extensions import cache, db
+
+logger = logging.getLogger(__name__)
+
+COMPANIES_TAG = 'companies'
+DEFAULT_TIMEOUT = 60
+# Roles that see every company share one cache scope per role
+GLOBAL_SCOPE_ROLES = ('superadmin', 'staff')
+
+_PENDING_TAGS_KEY = 'response_cache_tags'
+_BALANCE_COMPANY_KEY = 'response_cache_balance_company'
+# Analyses written in the current flush, resolved to companies in after_flush
+_PENDING_ANALYSES_KEY = 'response_cache_analyses'
+_ANALYSIS_COMPANIES_KEY = 'response_cache_analysis_companies'
+
+
+def _analysis_companies(connection, analysis_ids) -> List[int]:
+    """Companies whose balances take part in the analyses"""
+    return list(connection.execute(
+        select(KbaiBalance.id_company).distinct()
+        .join(KbaiAnalysisKpi, KbaiAnalysisKpi.id_balance == KbaiBalance.id_balance)
+        .where(KbaiAnalysisKpi.id_analysis.in_(list(analysis_ids)))
+    ).scalars())
+
+
+def _companies_by_analysis(connection, analysis_ids) -> Dict[int, List[int]]:
+    """Companies of each analysis, with one query"""
+    companies = {id_analysis: [] for id_analysis in analysis_ids}
+    for id_analysis, id_company in connection.execute(
+        select(KbaiAnalysisKpi.id_analysis, KbaiBalance.id_company).distinct()
+        .join(KbaiBalance, KbaiBalance.id_balance == KbaiAnalysisKpi.id_balance)
+        .where(KbaiAnalysisKpi.id_analysis.in_(list(analysis_ids)))
+    ):
+        companies[id_analysis].append(id_company)
+    return companies
+
+
+def company_tag(id_company) -> str:
+    return f'company:{id_company}'
+
+
+def prediction_tag(id_company) -> str:
+    return f'prediction:{id_company}'
+
+
+def cache_scope(user) -> str:
+    """Cache scope of a user: shared per role for superadmin/staff, per user otherwise"""
+    if user is None:
+        return 'anonymous'
+    role = (getattr(user, 'role', None) or '').lower()
+    if role in GLOBAL_SCOPE_ROLES:
+        return f'role:{role}'
+    return f'user:{getattr(user, "id_user", None)}'
+
+
+class ResponseCache:
+    """Tag-invalidated cache for service results"""
+
+    KEY_PREFIX = 'rc:'
+    TAG_PREFIX = 'rc_tag:'
+
+    def _backend(self):
+        """Cache backend, or None when disabled or not initialized for this app"""
+        if not has_app_context() or not current_app.config.get('RESPONSE_CACHE_ENABLED', False):
+            return None
+        try:
+            return cache.cache
+        except (KeyError, AttributeError):
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self._backend() is not None
+
+    def _timeout(self) -> int:
+        return current_app.config.get('RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+    # --------------------------------------------------------------------------
+    # Tags
+    # --------------------------------------------------------------------------
+    def _tag_versions(self, backend, tags: List[str]) -> List[str]:
+        keys = [self.TAG_PREFIX + tag for tag in tags]
+        versions = list(backend.get_many(*keys)) if keys else []
+        for index, version in enumerate(versions):
+            if version is None:
+                # First use of the tag: whoever adds it first wins
+                backend.add(keys[index], uuid.uuid4().hex, timeout=0)
+                versions[index] = backend.get(keys[index])
+        return versions
+
+    def tag_version(self, *tags: str) -> Optional[str]:
+        """
+        Combined current version of the tags (changes on every invalidation).
+
+        Used as a cheap ETag source; None when the cache is disabled or unavailable.
+        """
+        backend = self._backend()
+        if backend is None:
+            return None
+        try:
+            return ':'.join(self._tag_versions(backend, list(tags)))
+        except Exception as e:
+            logger.warning(f"Response cache tag lookup failed for {list(tags)}: {str(e)}")
+            return None
+
+    def invalidate(self, *tags: str):
+        """Give the tags new versions so entries built on the old ones are never read again"""
+        backend = self._backend()
+        if backend is None or not tags:
+            return
+        try:
+            backend.set_many({self.TAG_PREFIX + tag: uuid.uuid4().hex for tag in set(tags)}, timeout=0)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed for {sorted(set(tags))}: {str(e)}")
+
+    def invalidate_company(self, *company_ids):
+        """Invalidate everything cached for the companies, including company lists and predictions"""
+        company_ids = [id_company for id_company in company_ids if id_company]
+        self.invalidate(
+            COMPANIES_TAG,
+            *[company_tag(id_company) for id_company in company_ids],
+            *[prediction_tag(id_company) for id_company in company_ids]
+        )
+
+    def analysis_companies(self, analysis_ids) -> List[int]:
+        """
+        Companies taking part in the analyses, for invalidating after bulk deletes.
+
+        Resolve them before the analysis KPI rows are deleted; skipped (empty)
+        when the cache is disabled.
+        """
+        if not analysis_ids or not self.enabled:
+            return []
+        return _analysis_companies(db.session.connection(), analysis_ids)
+
+    # --------------------------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------------------------
+    def _key(
+        self, namespace: str, scope: str, params: Dict[str, Any], versions: List[str],
+        locale: Optional[str] = None
+    ) -> str:
+        if locale is None and has_request_context():
+            locale = request.headers.get('Accept-Language', 'en')
+        payload = json.dumps([scope, locale, params, versions], sort_keys=True, default=str)
+        return f"{self.KEY_PREFIX}{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Tuple[Dict[str, Any], int]],
+        tags: Iterable[str] = (),
+        scope: str = 'anonymous',
+        locale: Optional[str] = None,
+        timeout: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Return the cached result for (namespace, scope, params) or compute and store it.
+
+        locale defaults to the request's Accept-Language (pass it explicitly
+        outside requests); timeout to RESPONSE_CACHE_TIMEOUT. Falls back to
+        compute() when the cache is disabled or unavailable.
+        """
+        backend = self._backend()
+        if backend is None:
+            return compute()
+
+        try:
+            key = self._key(namespace, scope, params, self._tag_versions(backend, list(tags)), locale)
+            cached = backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed for {namespace}: {str(e)}")
+            return compute()
+        if cached is not None:
+            return cached
+
+        result = compute()
+        if result[1] == 200:
+            try:
+                backend.set(key, result, timeout=timeout or self._timeout())
+            except Exception as e:
+                logger.warning(f"Response cache store failed for {namespace}: {str(e)}")
+        return result
+
+    def cached(self, namespace: str, tags: Callable[[Dict[str, Any]], Iterable[str]]):
+        """
+        Decorator for service methods returning (response_data, status_code).
+
+        tags receives the bound call arguments. A current_user argument (or the
+        authenticated user of the request) selects the cache scope and is not
+        part of the parameters.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self._backend() is None:
+                    return func(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+                arguments.pop('self', None)
+                user = arguments.pop('current_user', None)
+                if user is None:
+                    from src.app.api.middleware.auth0_verify import get_current_user
+                    user = get_current_user()
+                params = {**arguments.pop('kwargs', {}), **arguments}
+
+                return self.get_or_compute(
+                    namespace, params, lambda: func(*args, **kwargs),
+                    tags=tags(params), scope=cache_scope(user)
+                )
+
+            return wrapper
+        return decorator
+
+
+# Global instance
+response_cache = ResponseCache()
+
+
+# --------------------------------------------------------------------------
+# Automatic invalidation on ORM writes (applied when the session commits)
+# --------------------------------------------------------------------------
+def _pending_tags(target) -> Optional[set]:
+    session = object_session(target)
+    if session is None or response_cache._backend() is None:
+        return None
+    return session.info.setdefault(_PENDING_TAGS_KEY, set())
+
+
+def _balance_company(connection, target, id_balance) -> Optional[int]:
+    memo = object_session(target).info.setdefault(_BALANCE_COMPANY_KEY, {})
+    if id_balance not in memo:
+        memo[id_balance] = connection.execute(
+            select(KbaiBalance.id_company).where(KbaiBalance.id_balance == id_balance)
+        ).scalar()
+    return memo[id_balance]
+
+
+def _add_company_tags(pending: set, *company_ids):
+    pending.add(COMPANIES_TAG)
+    pending.update(company_tag(id_company) for id_company in company_ids if id_company)
+
+
+def _on_company_row_change(mapper, connection, target):
+    pending = _pending_tags(target)
+    if pending is not None:
+        _add_company_tags(pending, target.id_company)
+
+
+def _on_balance_write(mapper, connection, target):
+    pending = _pending_tags(target)
+    if pending is not None:
+        _add_company_tags(pending, target.id_company)
+        pending.add(prediction_tag(target.id_company))
+
+
+def _on_balance_row_change(mapper, connection, target):
+    pending = _pending_tags(target)
+    if pending is not None:
+        _add_company_tags(pending, _balance_company(connection, target, target.id_balance))
+
+
+def _on_analysis_row_change(mapper, connection, target):
+    if _pending_tags(target) is not None:
+        object_session(target).info.setdefault(_PENDING_ANALYSES_KEY, set()).add(target.id_analysis)
+
+
+def _after_flush(session, flush_context):
+    analysis_ids = session.info.pop(_PENDING_ANALYSES_KEY, None)
+    if not analysis_ids:
+        return
+    memo = session.info.setdefault(_ANALYSIS_COMPANIES_KEY, {})
+    missing = [id_analysis for id_analysis in analysis_ids if id_analysis not in memo]
+    if missing:
+        memo.update(_companies_by_analysis(session.connection(), missing))
+    pending = session.info.setdefault(_PENDING_TAGS_KEY, set())
+    for id_analysis in analysis_ids:
+        _add_company_tags(pending, *memo[id_analysis])
+
+
+def _clear_session_state(session):
+    for key in (_BALANCE_COMPANY_KEY, _PENDING_ANALYSES_KEY, _ANALYSIS_COMPANIES_KEY):
+        session.info.pop(key, None)
+
+
+def _after_commit(session):
+    tags = session.info.pop(_PENDING_TAGS_KEY, None)
+    _clear_session_state(session)
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_TAGS_KEY, None)
+    _clear_session_state(session)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(KbaiBalance, _event_name, _on_balance_write)
+    for _model in (KbaiCompany, KbaiCompanyZone, KbaiCompanySector, KbaiPreDashboard, TbUserCompany):
+        event.listen(_model, _event_name, _on_company_row_change)
+    event.listen(KbaiKpiValue, _event_name, _on_balance_row_change)
+    event.listen(KbaiAnalysisKpi, _event_name, _on_balance_row_change)
+    for _model in (KbaiAnalysis, KbaiReport, AnalysisKpiInfo):
+        event.listen(_model, _event_name, _on_analysis_row_change)
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_rollback)
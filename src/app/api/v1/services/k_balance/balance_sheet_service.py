@@ -11,9 +11,11 @@ import tempfile
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 import openpyxl
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from flask import current_app, request
 from src.common.localization import get_message
+from src.common.pagination import InvalidCursorError, keyset_pagination
+from src.common.conditional import make_etag, locale_part
 
 from src.app.database.models import (
     KbaiBalance, 
@@ -33,6 +35,9 @@ from src.integrations.excel_script_2 import extract_bilancio_abbreviato_from_xls
 from src.integrations.xls_date_format_extract import extract_balance_year, detect_excel_format
 # from src.app.api.v1.services.common.upload import FileUploadService
 from src.app.api.v1.services.k_balance.comparison_report_service import ComparisonReportService
+from src.app.api.v1.services.k_balance.peer_distribution_service import peer_distribution_service
+from src.app.api.v1.services.common.response_cache import response_cache, company_tag
+from src.app.api.v1.services.kbai.pre_dashboard_service import kbai_pre_dashboard_service
 
 import logging
 logger = logging.getLogger(__name__)
@@ -422,34 +427,25 @@ class BalanceSheetService:
                 "referenceBalanceSheet"
             ]
 
-            # 1. Find benchmark analyses using this balance
-            raw_analysis_ids = (
-                db.session.query(KbaiAnalysisKpi.id_analysis)
-                .filter(
-                    KbaiAnalysisKpi.id_balance == balance.id_balance,
-                    KbaiAnalysisKpi.kpi_list_json["balance_type"].astext.in_(benchmark_balance_types)
-                )
-                .distinct()
-                .all()
-            )
-
-            analysis_ids = [a[0] for a in raw_analysis_ids]
-
-            # 1.5. Also find competitor analyses using this balance
-            raw_competitor_analysis_ids = (
-                db.session.query(KbaiAnalysisKpi.id_analysis)
-                .filter(
-                    KbaiAnalysisKpi.id_balance == balance.id_balance,
-                    KbaiAnalysisKpi.kpi_list_json["balance_type"].astext == "competitor"
-                )
-                .distinct()
-                .all()
-            )
-
-            competitor_analysis_ids = [a[0] for a in raw_competitor_analysis_ids]
+            # 1. Find benchmark and competitor analyses using this balance (one query)
+            rows = db.session.execute(
+                text("""
+                    SELECT DISTINCT id_analysis, kpi_list_json ->> 'balance_type' AS balance_type
+                    FROM kbai_balance.kbai_analysis_kpi
+                    WHERE id_balance = :id_balance
+                      AND kpi_list_json ->> 'balance_type' IN :balance_types
+                """).bindparams(bindparam("balance_types", expanding=True)),
+                {
+                    "id_balance": balance.id_balance,
+                    "balance_types": benchmark_balance_types + ["competitor"]
+                }
+            ).fetchall()
+
+            analysis_ids = sorted({r.id_analysis for r in rows if r.balance_type != "competitor"})
+            competitor_analysis_ids = sorted({r.id_analysis for r in rows if r.balance_type == "competitor"})
             
             # Combine both benchmark and competitor analysis IDs
-            all_analysis_ids = list(set(analysis_ids + competitor_analysis_ids))
+            all_analysis_ids = sorted(set(analysis_ids + competitor_analysis_ids))
 
             logger.info(
                 "Balance id=%s is used in %d benchmark analyses: %s and %d competitor analyses: %s",
@@ -466,65 +462,30 @@ class BalanceSheetService:
                     balance.id_balance
                 )
 
-            if all_analysis_ids:
-                # 2. Delete reports
-                result = db.session.execute(
-                    text("""
-                        DELETE FROM kbai_balance.kbai_reports
-                        WHERE id_analysis IN :analysis_ids
-                    """),
-                    {"analysis_ids": tuple(all_analysis_ids)}
-                )
-                logger.info(
-                    "Deleted %d rows from kbai_reports for analyses %s",
-                    result.rowcount,
-                    all_analysis_ids
-                )
+            # Companies sharing these analyses (e.g. benchmark owners) see them disappear too
+            affected_companies = response_cache.analysis_companies(all_analysis_ids)
 
-                # 3. Delete analysis KPI info
-                result = db.session.execute(
-                    text("""
-                        DELETE FROM kbai_balance.analysis_kpi_info
-                        WHERE id_analysis IN :analysis_ids
-                    """),
-                    {"analysis_ids": tuple(all_analysis_ids)}
-                )
-                logger.info(
-                    "Deleted %d rows from analysis_kpi_info for analyses %s",
-                    result.rowcount,
-                    all_analysis_ids
-                )
-
-                # 4. Delete analysis KPIs
-                result = db.session.execute(
-                    text("""
-                        DELETE FROM kbai_balance.kbai_analysis_kpi
-                        WHERE id_analysis IN :analysis_ids
-                    """),
-                    {"analysis_ids": tuple(all_analysis_ids)}
-                )
-                logger.info(
-                    "Deleted %d rows from kbai_analysis_kpi for analyses %s",
-                    result.rowcount,
-                    all_analysis_ids
-                )
-
-                # 5. Delete analyses
-                result = db.session.execute(
-                    text("""
-                        DELETE FROM kbai_balance.kbai_analysis
-                        WHERE id_analysis IN :analysis_ids
-                    """),
-                    {"analysis_ids": tuple(all_analysis_ids)}
-                )
-                logger.info(
-                    "Deleted %d rows from kbai_analysis for analyses %s",
-                    result.rowcount,
-                    all_analysis_ids
-                )
+            if all_analysis_ids:
+                # 2-5. Delete reports, analysis KPI info, analysis KPIs and analyses (children first)
+                for table in ("kbai_reports", "analysis_kpi_info", "kbai_analysis_kpi", "kbai_analysis"):
+                    result = db.session.execute(
+                        text(f"""
+                            DELETE FROM kbai_balance.{table}
+                            WHERE id_analysis IN :analysis_ids
+                        """).bindparams(bindparam("analysis_ids", expanding=True)),
+                        {"analysis_ids": all_analysis_ids}
+                    )
+                    logger.info(
+                        "Deleted %d rows from %s for analyses %s",
+                        result.rowcount,
+                        table,
+                        all_analysis_ids
+                    )
 
             db.session.add(balance)
             db.session.commit()
+            # Raw DELETEs bypass the ORM events of the response cache
+            response_cache.invalidate_company(*affected_companies)
 
             logger.info(
                 "Soft delete completed successfully for balance id=%s",
@@ -557,11 +518,15 @@ class BalanceSheetService:
         Hard delete ALL balance sheets (including soft-deleted) for given year/month
         and all their related data.
         
-        Deletes:
-        1. KbaiKpiValue records
-        2. KpiLogic records (via id_kpi)
-        3. KbaiAnalysisKpi records
-        4. KbaiBalance records (hard delete)
+        Runs a fixed number of set-based statements in one transaction, however many
+        KPIs and analyses are involved. Deletes, children first:
+        1. KbaiReport records of affected analyses
+        2. AnalysisKpiInfo records of the deleted KPIs and of orphaned analyses
+        3. KpiLogic records (via id_kpi)
+        4. KbaiKpiValue records
+        5. KbaiAnalysisKpi records
+        6. KbaiAnalysis records left without any AnalysisKpi (orphaned)
+        7. KbaiBalance records (hard delete)
         
         Args:
             company_id: Company ID
@@ -571,112 +536,121 @@ class BalanceSheetService:
         Returns:
             None on success, (error_dict, status_code) on failure
         """
+        # ALL balances for the period (including soft-deleted)
+        balance_ids_sql = """
+            SELECT id_balance FROM kbai_balance.kbai_balances
+            WHERE id_company = :company_id
+              AND year = :year
+              AND month IS NOT DISTINCT FROM :month
+        """
+        kpi_ids_sql = f"""
+            SELECT id_kpi FROM kbai_balance.kbai_kpi_values
+            WHERE id_balance IN ({balance_ids_sql})
+        """
+        params = {"company_id": company_id, "year": year, "month": month}
+
         try:
-            # Step 1: Find ALL balances (including soft-deleted)
-            all_balances = (
-                KbaiBalance.query
-                .filter_by(
-                    id_company=company_id,
-                    year=year,
-                    month=month
-                )
-                # Don't filter by is_deleted - get ALL (including soft-deleted)
-                .all()
-            )
-            
-            if not all_balances:
-                logger.info(
-                    f"No existing balances found for company {company_id}, "
-                    f"year {year}, month {month}"
+            # Affected analyses, flagged when every AnalysisKpi belongs to the deleted balances
+            affected = db.session.execute(
+                text(f"""
+                    SELECT DISTINCT ak.id_analysis,
+                        NOT EXISTS (
+                            SELECT 1 FROM kbai_balance.kbai_analysis_kpi other
+                            WHERE other.id_analysis = ak.id_analysis
+                              AND other.id_balance NOT IN ({balance_ids_sql})
+                        ) AS orphaned
+                    FROM kbai_balance.kbai_analysis_kpi ak
+                    WHERE ak.id_balance IN ({balance_ids_sql})
+                """),
+                params
+            ).fetchall()
+            affected_analysis_ids = sorted(r.id_analysis for r in affected)
+            orphaned_analysis_ids = sorted(r.id_analysis for r in affected if r.orphaned)
+            affected_companies = response_cache.analysis_companies(affected_analysis_ids)
+
+            analysis_ids_param = bindparam("analysis_ids", expanding=True)
+            orphaned_ids_param = bindparam("orphaned_ids", expanding=True)
+
+            # Step 1: Reports of affected analyses
+            reports_count = 0
+            if affected_analysis_ids:
+                result = db.session.execute(
+                    text("""
+                        DELETE FROM kbai_balance.kbai_reports
+                        WHERE id_analysis IN :analysis_ids
+                    """).bindparams(analysis_ids_param),
+                    {"analysis_ids": affected_analysis_ids}
                 )
-                return None
-            
-            balance_ids = [b.id_balance for b in all_balances]
-            logger.info(
-                f"Found {len(balance_ids)} balance(s) to hard delete: {balance_ids} "
-                f"(company={company_id}, year={year}, month={month})"
-            )
-            
-            # Step 1: Get KPI IDs FIRST (before deleting)
-            kpi_values = KbaiKpiValue.query.filter(
-                KbaiKpiValue.id_balance.in_(balance_ids)
-            ).all()
-
-            kpi_ids = [kpi.id_kpi for kpi in kpi_values]
-
-            # Step 2: Delete KpiLogic records FIRST (child of KbaiKpiValue)
-            kpi_logics = []
-            if kpi_ids:
-                kpi_logics = KpiLogic.query.filter(
-                    KpiLogic.id_kpi.in_(kpi_ids)
-                ).all()
-                
-                if kpi_logics:
-                    logger.info(f"Deleting {len(kpi_logics)} KPI logic records")
-                    for kpi_logic in kpi_logics:
-                        db.session.delete(kpi_logic)
-
-            # Step 3: Delete KbaiKpiValue records (parent of KpiLogic)
-            if kpi_values:
-                logger.info(f"Deleting {len(kpi_values)} KPI value records")
-                for kpi_value in kpi_values:
-                    db.session.delete(kpi_value)
+                reports_count = result.rowcount
 
-            # Step 4: Get affected analysis IDs from KbaiAnalysisKpi (before deleting)
-            analysis_kpis = KbaiAnalysisKpi.query.filter(
-                KbaiAnalysisKpi.id_balance.in_(balance_ids)
-            ).all()
+            # Step 2: KPI info referencing deleted KPIs or orphaned analyses
+            result = db.session.execute(
+                text(f"""
+                    DELETE FROM kbai_balance.analysis_kpi_info
+                    WHERE id_kpi IN ({kpi_ids_sql})
+                       OR id_analysis IN :orphaned_ids
+                """).bindparams(orphaned_ids_param),
+                {**params, "orphaned_ids": orphaned_analysis_ids}
+            )
+            kpi_infos_count = result.rowcount
 
-            affected_analysis_ids = list(set([ak.id_analysis for ak in analysis_kpis]))
+            # Step 3: KpiLogic records (child of KbaiKpiValue)
+            result = db.session.execute(
+                text(f"DELETE FROM kbai_balance.kpi_logic WHERE id_kpi IN ({kpi_ids_sql})"),
+                params
+            )
+            kpi_logics_count = result.rowcount
 
-            # Step 5: Delete KbaiReport using SQL (child of KbaiAnalysis)
-            reports_count = 0
-            if affected_analysis_ids:
-                delete_reports_sql = text("""
-                    DELETE FROM kbai_balance.kbai_reports
-                    WHERE id_analysis IN :analysis_ids
-                """)
-                result = db.session.execute(delete_reports_sql, {"analysis_ids": tuple(affected_analysis_ids)})
-                reports_count = result.rowcount
-                logger.info(f"Deleted {reports_count} report records using SQL")
+            # Step 4: KbaiKpiValue records
+            result = db.session.execute(
+                text(f"DELETE FROM kbai_balance.kbai_kpi_values WHERE id_balance IN ({balance_ids_sql})"),
+                params
+            )
+            kpi_values_count = result.rowcount
 
-            # Step 6: Delete KbaiAnalysisKpi records (junction table - child of KbaiAnalysis)
-            if analysis_kpis:
-                logger.info(
-                    f"Deleting {len(analysis_kpis)} AnalysisKpi records. "
-                    f"Affected analysis IDs: {affected_analysis_ids}"
-                )
-                for analysis_kpi in analysis_kpis:
-                    db.session.delete(analysis_kpi)
+            # Step 5: KbaiAnalysisKpi records (junction table - child of KbaiAnalysis)
+            result = db.session.execute(
+                text(f"DELETE FROM kbai_balance.kbai_analysis_kpi WHERE id_balance IN ({balance_ids_sql})"),
+                params
+            )
+            analysis_kpis_count = result.rowcount
 
-            # Step 7: Delete KbaiAnalysis using SQL (only orphaned - no remaining AnalysisKpi)
+            # Step 6: Orphaned KbaiAnalysis records
             analyses_count = 0
-            if affected_analysis_ids:
-                delete_analyses_sql = text("""
-                    DELETE FROM kbai_balance.kbai_analysis
-                    WHERE id_analysis IN :analysis_ids
-                    AND NOT EXISTS (
-                        SELECT 1 FROM kbai_balance.kbai_analysis_kpi
-                        WHERE kbai_analysis_kpi.id_analysis = kbai_analysis.id_analysis
-                    )
-                """)
-                result = db.session.execute(delete_analyses_sql, {"analysis_ids": tuple(affected_analysis_ids)})
+            if orphaned_analysis_ids:
+                result = db.session.execute(
+                    text("""
+                        DELETE FROM kbai_balance.kbai_analysis
+                        WHERE id_analysis IN :orphaned_ids
+                    """).bindparams(orphaned_ids_param),
+                    {"orphaned_ids": orphaned_analysis_ids}
+                )
                 analyses_count = result.rowcount
-                logger.info(f"Deleted {analyses_count} analysis records using SQL (orphaned analyses)")
 
-            # Step 8: Hard delete balance records
-            logger.info(f"Hard deleting {len(all_balances)} balance record(s)")
-            for balance in all_balances:
-                db.session.delete(balance)
-            
+            # Step 7: Hard delete balance records
+            result = db.session.execute(
+                text(f"DELETE FROM kbai_balance.kbai_balances WHERE id_balance IN ({balance_ids_sql})"),
+                params
+            )
+            balances_count = result.rowcount
+
             # Commit all deletions in one transaction
             db.session.commit()
-            
+            response_cache.invalidate_company(company_id, *affected_companies)
+
+            if not balances_count:
+                logger.info(
+                    f"No existing balances found for company {company_id}, "
+                    f"year {year}, month {month}"
+                )
+                return None
+
             logger.info(
-                f"Successfully hard deleted {len(balance_ids)} balance(s) and all related data. "
-                f"Deleted: {len(kpi_values)} KPIs, {len(kpi_logics)} KPI logics, "
-                f"{len(analysis_kpis)} AnalysisKPIs, {reports_count} Reports, "
-                f"{analyses_count} Analyses"
+                f"Successfully hard deleted {balances_count} balance(s) and all related data "
+                f"(company={company_id}, year={year}, month={month}). "
+                f"Deleted: {kpi_values_count} KPIs, {kpi_logics_count} KPI logics, "
+                f"{kpi_infos_count} KPI infos, {analysis_kpis_count} AnalysisKPIs, "
+                f"{reports_count} Reports, {analyses_count} Analyses"
             )
             
             return None
@@ -865,6 +839,7 @@ class BalanceSheetService:
             if lookup_error:
                 return lookup_error
 
+            unchanged_balance = None
             if existing_balance and existing_balance.is_deleted is not True:
                 if not overwrite:
                     return {
@@ -872,20 +847,31 @@ class BalanceSheetService:
                         'message': get_message('balance_sheet_exists', locale)
                     }, 400
 
-                # Hard delete ALL existing balances (including soft-deleted) and related data
-                hard_delete_error = self._hard_delete_balance_and_related_data(
-                    company_id=company_id,
-                    year=year,
-                    month=month
-                )
-                
-                if hard_delete_error:
-                    return hard_delete_error
-                
-                logger.info(
-                    f"Hard deleted all existing balances for company {company_id}, "
-                    f"year {year}, month {month}. Proceeding with new upload."
-                )
+                # Identical re-upload: keep the existing balance with its KPIs and comparisons
+                if (
+                    existing_balance.content_hash is not None
+                    and existing_balance.content_hash == KbaiBalance.compute_content_hash(balance_json)
+                ):
+                    unchanged_balance = existing_balance
+                    logger.info(
+                        f"Uploaded balance for company {company_id}, year {year}, month {month} is identical "
+                        f"to balance {existing_balance.id_balance}. Keeping existing data."
+                    )
+                else:
+                    # Hard delete ALL existing balances (including soft-deleted) and related data
+                    hard_delete_error = self._hard_delete_balance_and_related_data(
+                        company_id=company_id,
+                        year=year,
+                        month=month
+                    )
+                    
+                    if hard_delete_error:
+                        return hard_delete_error
+                    
+                    logger.info(
+                        f"Hard deleted all existing balances for company {company_id}, "
+                        f"year {year}, month {month}. Proceeding with new upload."
+                    )
             
             # Step 5: Upload file to S3 using existing FileUploadService
             # Temporarily commented out for testing
@@ -939,7 +925,13 @@ class BalanceSheetService:
                 'balance': balance_json  # JSONB field
             }
             
-            balance, error = KbaiBalance.create(balance_data)
+            if unchanged_balance is not None:
+                # Only descriptive fields can differ; the balance JSON is identical
+                balance = unchanged_balance
+                balance_data.pop('balance')
+                _, error = balance.update(balance_data)
+            else:
+                balance, error = KbaiBalance.create(balance_data)
             
             if error:
                 logger.error(f"Error creating balance record: {error}")
@@ -949,6 +941,12 @@ class BalanceSheetService:
                 }, 500
             
             logger.info(f"Balance record created: {balance.id_balance}")
+            kbai_pre_dashboard_service.refresh_counters(company_id)
+            
+            # Add the new (or replacing) balance to the forecast historical aggregate
+            from src.app.services.kbai.predictive.historical_aggregate_service import historical_aggregate_service
+
+            historical_aggregate_service.refresh_company(company_id)
             
             # Step 7.5: Auto-generate comparison report if conditions are met
             try:
@@ -988,6 +986,14 @@ class BalanceSheetService:
                     exc_info=True
                 )
             
+            # Step 7.6: Warm the prediction cache for the forecast page
+            try:
+                from src.app.services.kbai.predictive.predictive_service import PredictiveService
+
+                PredictiveService.precompute_prediction_async(company_id, locale)
+            except Exception as e:
+                logger.error(f"Error scheduling prediction precompute after upload: {str(e)}")
+            
             # Step 7: Cleanup temp file
             try:
                 if temp_file_path and os.path.exists(temp_file_path):
@@ -1018,12 +1024,16 @@ class BalanceSheetService:
                 'message': get_message('balance_sheet_upload_failed', locale)
             }, 500
     
+    @response_cache.cached('company_balance_sheets', tags=lambda params: [company_tag(params['company_id'])])
     def get_by_company_id(
         self,
         company_id: int,
         page: int = 1,
         per_page: int = 10,
-        current_user: TbUser = None
+        current_user: TbUser = None,
+        cursor: str = None,
+        keyset: bool = False,
+        count_mode: str = 'exact'
     ) -> Tuple[Dict[str, Any], int]:
         """
         Get balance sheets by company ID (without balance field).
@@ -1032,6 +1042,9 @@ class BalanceSheetService:
             company_id: Company ID
             page: Page number (default: 1)
             per_page: Items per page (default: 10)
+            cursor: Keyset cursor from the previous page (implies keyset)
+            keyset: Keyset pagination, latest first, instead of page numbers
+            count_mode: Total count mode: 'exact', 'estimate' or 'none'
             
         Returns:
             Tuple of (response_data, status_code)
@@ -1055,11 +1068,22 @@ class BalanceSheetService:
                 }, 400
             
             # Query balance sheets for company
-            records, total, error = KbaiBalance.find(
-                page=page,
-                per_page=per_page,
-                id_company=company_id
-            )
+            # balance JSON is deferred, it is never part of the list response
+            try:
+                records, total, error = KbaiBalance.find(
+                    page=page,
+                    per_page=per_page,
+                    include_balance=False,
+                    cursor=cursor,
+                    keyset=keyset,
+                    count_mode=count_mode,
+                    id_company=company_id
+                )
+            except InvalidCursorError:
+                return {
+                    'error': get_message('validation_error', locale),
+                    'message': get_message('invalid_pagination_cursor', locale)
+                }, 400
             
             if error:
                 logger.error(f"Error querying balance sheets: {error}")
@@ -1068,28 +1092,26 @@ class BalanceSheetService:
                     'message': get_message('balance_sheets_retrieve_failed', locale)
                 }, 500
             
-            # Convert to dict and exclude balance field
-            balance_sheets = []
-            for record in records:
-                record_dict = record.to_dict()
-                # Remove balance field
-                record_dict.pop('balance', None)
-                balance_sheets.append(record_dict)
+            # Convert to dict without balance field
+            balance_sheets = [record.to_dict(include_balance=False) for record in records]
             
             # Calculate pagination
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+            if keyset or cursor:
+                pagination = keyset_pagination(records, per_page, total)
+            else:
+                pagination = {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': total,
+                    'pages': (total + per_page - 1) // per_page if total is not None else None
+                }
             
             logger.info(f"Retrieved {len(balance_sheets)} balance sheets for company {company_id}")
             
             return {
                 'message': get_message('balance_sheets_retrieved_success', locale),
                 'data': balance_sheets,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': total_pages
-                },
+                'pagination': pagination,
                 'success': True
             }, 200
             
@@ -1101,6 +1123,41 @@ class BalanceSheetService:
                 'message': get_message('balance_sheets_retrieve_failed', locale)
             }, 500
     
+    def get_balance_etag(self, id_balance: int, current_user: TbUser) -> Optional[str]:
+        """
+        ETag for get_by_id from the balance metadata and content hash, without
+        loading the balance JSON.
+
+        Returns None when the balance is missing, not accessible or has no
+        content hash yet, so the caller falls back to the full request path.
+        """
+        try:
+            row = db.session.query(
+                KbaiBalance.id_company,
+                KbaiBalance.content_hash,
+                KbaiBalance.balance.is_(None).label('no_data'),
+                KbaiBalance.year,
+                KbaiBalance.month,
+                KbaiBalance.type,
+                KbaiBalance.mode,
+                KbaiBalance.file,
+                KbaiBalance.note,
+                KbaiBalance.created_at
+            ).filter(
+                KbaiBalance.id_balance == id_balance,
+                KbaiBalance.is_deleted == False
+            ).first()
+            if not row or (row.content_hash is None and not row.no_data):
+                return None
+
+            has_access, _ = self.check_company_access(current_user, row.id_company)
+            if not has_access:
+                return None
+            return make_etag('balance', id_balance, *row, locale_part())
+        except Exception as e:
+            logger.warning(f"Could not compute ETag for balance {id_balance}: {str(e)}")
+            return None
+
     def get_by_id(
         self,
         id_balance: int,
@@ -1250,6 +1307,15 @@ class BalanceSheetService:
                 return error_dict, error_status
             
             logger.info(f"Balance sheet deleted: {id_balance}")
+            kbai_pre_dashboard_service.refresh_counters(balance.id_company)
+            
+            # Drop the deleted balance from its peer KPI distribution group
+            peer_distribution_service.refresh_for_company_year(balance.id_company, balance.year)
+            
+            # Drop the deleted balance from the forecast historical aggregate
+            from src.app.services.kbai.predictive.historical_aggregate_service import historical_aggregate_service
+
+            historical_aggregate_service.refresh_company(balance.id_company)
             
             # Step: Auto-generate comparison report if conditions are met
             try:
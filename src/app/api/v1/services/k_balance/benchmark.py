@@ -3,9 +3,10 @@ Banchmark Service
 
 Handles financial KPI between benchmark balance sheets (years).
 """
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
-from sqlalchemy import or_
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
 import logging
 
 from src.app.database.models import (
@@ -23,17 +24,20 @@ from src.app.database.models import (
 from flask import request
 from collections import defaultdict
 from src.app.api.v1.services.k_balance.comparison_report_service import ComparisonReportService
+from src.app.api.v1.services.common.reference_data_cache import reference_data_cache
+from src.app.api.v1.services.common.response_cache import response_cache, company_tag
 from .kpi_status_services import (
     store_analysis_kpi_info, 
     calculate_kpi_statuses, 
     calculate_goal_percentage,
     calculate_competitor_kpi_statuses,
-    build_competitor_kpi_insight
 )
+from .competitor_insight_service import competitor_insight_service
 
 # from src.app.database.models.kbai_balance.kbai_kpi_values import KbaiKpiValue
 from src.extensions import db
 from src.common.localization import get_message
+from src.common.pagination import encode_cursor, keyset_query, InvalidCursorError
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +85,7 @@ class BenchmarkService:
                 conditions.append(cond)
 
             
-            query = KbaiBalance.query.filter(
+            query = KbaiBalance.metadata_query().filter(
                 KbaiBalance.id_company == company_id,
                 or_(*conditions)  # OR all conditions
             )
@@ -103,56 +107,6 @@ class BenchmarkService:
 
             balance_ids = [b.id_balance for b in balances]
 
-            # 3.5. Check if benchmark report already exists with same balance sheets
-            benchmark_balance_types = [
-                "balanceSheetToCompare",
-                "comparitiveBalancesheet",
-                "referenceBalanceSheet"
-            ]
-            
-            # Get all existing BENCHMARK analyses for this company
-            existing_benchmark_analyses = (
-                db.session.query(KbaiAnalysis)
-                .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
-                .join(KbaiBalance, KbaiAnalysisKpi.id_balance == KbaiBalance.id_balance)
-                .filter(
-                    KbaiAnalysis.analysis_type == "BENCHMARK",
-                    KbaiBalance.id_company == company_id,
-                    KbaiBalance.is_deleted == False
-                )
-                .distinct()
-                .all()
-            )
-            
-            # Check each existing benchmark analysis for exact balance match
-            for existing_analysis in existing_benchmark_analyses:
-                existing_analysis_kpis = KbaiAnalysisKpi.query.filter_by(
-                    id_analysis=existing_analysis.id_analysis
-                ).all()
-                
-                # Get balance IDs from this analysis (only benchmark types, not competitor)
-                existing_balance_ids = set()
-                for ak in existing_analysis_kpis:
-                    if ak.kpi_list_json and ak.kpi_list_json.get("balance_type") in benchmark_balance_types:
-                        existing_balance_ids.add(ak.id_balance)
-                
-                # Compare with current balance_ids (convert to set for comparison)
-                current_balance_ids_set = set(balance_ids)
-                
-                # If exact match found, return error
-                if existing_balance_ids == current_balance_ids_set and len(existing_balance_ids) > 0:
-                    # Get the existing report name for better error message
-                    existing_report = KbaiReport.query.filter_by(
-                        id_analysis=existing_analysis.id_analysis,
-                        type="BENCHMARK"
-                    ).first()
-                    
-                    report_name_info = existing_report.name if existing_report else "existing benchmark report"
-                    years_str = ", ".join(str(b.year) for b in sorted(balances, key=lambda x: x.year))
-                    return {
-                        "message": get_message("benchmark_report_already_exists", locale)
-                    }, 400
-
             # Create spec to key mapping
             spec_to_key = {}
             keys = ["balanceSheetToCompare", "comparitiveBalancesheet", "referenceBalanceSheet"]
@@ -163,6 +117,25 @@ class BenchmarkService:
                         key = (spec["year"], spec["budgetType"], spec["month"])
                     spec_to_key[key] = keys[i]
 
+            def _balance_type_for(balance):
+                # Try exact match first, then without month
+                return spec_to_key.get((balance.year, balance.type, balance.month), "") or spec_to_key.get((balance.year, balance.type), "")
+
+            # 3.5. Check if benchmark report already exists with same balance sheets
+            # (indexed lookup on the (id_balance, balance_type) fingerprint)
+            balance_fingerprint = KbaiAnalysis.compute_balance_fingerprint(
+                (b.id_balance, _balance_type_for(b)) for b in balances
+            )
+            existing_analysis = (
+                KbaiAnalysis.fingerprint_query(balance_fingerprint, analysis_type="BENCHMARK")
+                .with_entities(KbaiAnalysis.id_analysis)
+                .first()
+            )
+            if existing_analysis:
+                return {
+                    "message": get_message("benchmark_report_already_exists", locale)
+                }, 400
+
             kpi_values = KbaiKpiValue.query.filter(
                 KbaiKpiValue.id_balance.in_(balance_ids)
             ).all()
@@ -183,7 +156,8 @@ class BenchmarkService:
             analysis = KbaiAnalysis(
                 analysis_name=f"benchmark_generated {report_name}",
                 analysis_type="BENCHMARK",
-                time=datetime.utcnow()
+                time=datetime.utcnow(),
+                balance_fingerprint=balance_fingerprint
             )
             db.session.add(analysis)
             db.session.flush()
@@ -227,10 +201,7 @@ class BenchmarkService:
             for id_balance, kpis in kpis_by_balance.items():
                 year = year_by_balance.get(id_balance)
                 balance = balances_dict.get(id_balance)
-                balance_type = ""
-                if balance:
-                    # Try exact match first, then without month
-                    balance_type = spec_to_key.get((balance.year, balance.type, balance.month), "") or spec_to_key.get((balance.year, balance.type), "")
+                balance_type = _balance_type_for(balance) if balance else ""
                 kpi_json = {
                     "kpis": kpis,
                     "year": year,
@@ -471,10 +442,7 @@ class BenchmarkService:
                 }, 400
             
             # Query balance sheets for company
-            records = KbaiBalance.query.filter_by(
-                id_company=company_id,
-                is_deleted=False
-            ).all()
+            records = KbaiBalance.metadata_query(id_company=company_id).all()
             if not records:
                 return {
                     'message': get_message("no_balance_sheets_found", locale),
@@ -585,22 +553,33 @@ class BenchmarkService:
 
 
     # get benchmark report list by company id
+    @response_cache.cached('benchmark_report_list', tags=lambda params: [company_tag(params['company_id'])])
     def get_benchmark_report_list(
         self,
         company_id: int,
         current_user: TbUser,
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        keyset: bool = False
     ) -> Tuple[Dict[str, Any], int]:
         """
         Get benchmark report list with pagination.
         Returns paginated list of benchmark reports with balances mapped to keys.
 
+        Reports are ordered newest first (time, id_report). The page of reports
+        and its balance summary columns are fetched in one joined query. With
+        keyset=True (or a cursor) the page is selected with a (time, id_report)
+        seek instead of OFFSET and the response carries next_cursor instead of
+        totals.
+
         Args:
             company_id: Company ID
             current_user: Current authenticated user
-            page: Page number (default 1)
+            page: Page number (default 1, ignored in keyset mode)
             per_page: Items per page (default 10)
+            cursor: Opaque cursor returned as next_cursor by the previous page
+            keyset: Use keyset pagination (implied by cursor)
 
         Returns:
             Tuple of (response_data, status_code)
@@ -612,119 +591,122 @@ class BenchmarkService:
                 page = 1
             if per_page < 1 or per_page > 100:
                 per_page = 10
+            keyset = keyset or cursor is not None
 
             # 1. Check access
             has_access, error_msg = ComparisonReportService().check_company_access(current_user, company_id)
             if not has_access:
                 return {"message": error_msg}, 403
 
-            # 2. Get all balances for this company
-            balances = KbaiBalance.query.filter_by(id_company=company_id, is_deleted=False).all()
-            if not balances:
-                return {
-                    "success": False,
-                    "message": get_message("no_benchmark_reports_found", locale),
-                    "data": {
-                        "balance_sheets": [],
-                        "pagination": {
-                            "page": page,
-                            "per_page": per_page,
-                            "total": 0,
-                            "total_pages": 0
-                        }
-                    }
-                }, 200
-
-            balance_ids = [b.id_balance for b in balances]
-            id_to_balance_info = {b.id_balance: b for b in balances}
+            # 2. BENCHMARK reports with at least one active balance of this company
+            company_balance_exists = (
+                db.session.query(KbaiAnalysisKpi.id_analysis)
+                .join(KbaiBalance, KbaiBalance.id_balance == KbaiAnalysisKpi.id_balance)
+                .filter(
+                    KbaiAnalysisKpi.id_analysis == KbaiReport.id_analysis,
+                    KbaiBalance.id_company == company_id,
+                    KbaiBalance.is_deleted == False
+                )
+                .exists()
+            )
+            reports_query = (
+                db.session.query(KbaiReport.id_report, KbaiReport.name, KbaiReport.time, KbaiReport.id_analysis)
+                .join(KbaiAnalysis, KbaiAnalysis.id_analysis == KbaiReport.id_analysis)
+                .filter(KbaiAnalysis.analysis_type == "BENCHMARK", company_balance_exists)
+            )
 
-            # 3. Get analysis_kpi entries for these balances
-            analysis_kpis = KbaiAnalysisKpi.query.filter(
-                KbaiAnalysisKpi.id_balance.in_(balance_ids)
-            ).all()
+            total_reports = None
+            if keyset:
+                # One extra row tells whether another page exists
+                try:
+                    page_query = keyset_query(
+                        reports_query, KbaiReport.time, KbaiReport.id_report, per_page, cursor
+                    )
+                except InvalidCursorError:
+                    return {
+                        'error': 'Validation error',
+                        'message': get_message('invalid_pagination_cursor', locale)
+                    }, 400
+            else:
+                total_reports = reports_query.order_by(None).count()
+                page_query = reports_query.order_by(
+                    KbaiReport.time.desc().nulls_last(), KbaiReport.id_report.desc()
+                ).offset((page - 1) * per_page).limit(per_page)
+
+            # 3. Page of reports joined with their balance slots and file names
+            page_reports = page_query.subquery()
+            rows = (
+                db.session.query(
+                    page_reports.c.id_report,
+                    page_reports.c.name,
+                    page_reports.c.time,
+                    KbaiAnalysisKpi.kpi_list_json["balance_type"].as_string().label("balance_type"),
+                    KbaiBalance.id_balance,
+                    KbaiBalance.file
+                )
+                .select_from(page_reports)
+                .outerjoin(KbaiAnalysisKpi, KbaiAnalysisKpi.id_analysis == page_reports.c.id_analysis)
+                .outerjoin(KbaiBalance, and_(
+                    KbaiBalance.id_balance == KbaiAnalysisKpi.id_balance,
+                    KbaiBalance.id_company == company_id,
+                    KbaiBalance.is_deleted == False
+                ))
+                .order_by(page_reports.c.time.desc().nulls_last(), page_reports.c.id_report.desc())
+                .all()
+            )
 
-            if not analysis_kpis:
-                return {
-                    "sucess": False,
-                    "message": get_message("no_benchmark_reports_found", locale),
-                    "data": {
-                    "balance_sheets": [],
-                        "pagination": {
-                            "page": page,
-                            "per_page": per_page,
-                            "total": 0,
-                            "total_pages": 0
-                        }
+            reports = {}
+            for row in rows:
+                report = reports.get(row.id_report)
+                if report is None:
+                    report = reports[row.id_report] = {
+                        "id_report": row.id_report,
+                        "name": row.name,
+                        "time": row.time,
+                        "balances": {}
                     }
-                }, 200
-
-            # Extract all analysis_ids linked to these balances
-            analysis_ids = {ak.id_analysis for ak in analysis_kpis}
-
-            # 4. Get only BENCHMARK analyses from these IDs
-            benchmark_analyses = KbaiAnalysis.query.filter(
-                KbaiAnalysis.id_analysis.in_(analysis_ids),
-                KbaiAnalysis.analysis_type == "BENCHMARK"
-            ).all()
-
-            if not benchmark_analyses:
+                if row.id_balance is not None and row.balance_type:
+                    report["balances"][row.balance_type] = row.file or ""
+
+            output = list(reports.values())
+            has_more = keyset and len(output) > per_page
+            output = output[:per_page]
+            next_cursor = encode_cursor([output[-1]["time"], output[-1]["id_report"]]) if has_more else None
+            for report in output:
+                report["time"] = report["time"].isoformat() if report["time"] else None
+
+            if not output and not cursor and not total_reports:
+                pagination = {"per_page": per_page, "next_cursor": None, "has_more": False} if keyset else {
+                    "page": page,
+                    "per_page": per_page,
+                    "total": 0,
+                    "total_pages": 0
+                }
                 return {
                     "success": False,
                     "message": get_message("no_benchmark_reports_found", locale),
                     "data": {
                         "balance_sheets": [],
-                        "pagination": {
-                            "page": page,
-                            "per_page": per_page,
-                            "total": 0,
-                            "total_pages": 0
-                        }
+                        "pagination": pagination
                     }
                 }, 200
 
-            benchmark_analysis_ids = [a.id_analysis for a in benchmark_analyses]
-
-            # 5. Get total count of reports for pagination
-            total_reports = KbaiReport.query.filter(
-                KbaiReport.id_analysis.in_(benchmark_analysis_ids)
-            ).count()
-
-            total_pages = (total_reports + per_page - 1) // per_page
-
-            # 6. Get paginated reports
-            reports = KbaiReport.query.filter(
-                KbaiReport.id_analysis.in_(benchmark_analysis_ids)
-            ).offset((page - 1) * per_page).limit(per_page).all()
-
-            output = []
-            for report in reports:
-                balances_obj = {}
-                for ak in analysis_kpis:
-                    if ak.id_analysis == report.id_analysis:
-                        balance = id_to_balance_info.get(ak.id_balance)
-                        if balance:
-                            balance_type = ak.kpi_list_json.get("balance_type", "") if ak.kpi_list_json else ""
-                            if balance_type:
-                                balances_obj[balance_type] = balance.file or ""
-
-                output.append({
-                    "id_report": report.id_report,
-                    "name": report.name,
-                    "time": report.time.isoformat() if report.time else None,
-                    "balances": balances_obj
-                })
+            if keyset:
+                pagination = {"per_page": per_page, "next_cursor": next_cursor, "has_more": has_more}
+            else:
+                pagination = {
+                    "page": page,
+                    "per_page": per_page,
+                    "total": total_reports,
+                    "total_pages": (total_reports + per_page - 1) // per_page
+                }
 
             return {
                 "success": True,
                 "message": get_message("benchmark_reports_retrieved", locale),
                 "data": {
                     "balance_sheets": output,
-                    "pagination": {
-                        "page": page,
-                        "per_page": per_page,
-                        "total": total_reports,
-                        "total_pages": total_pages
-                    }
+                    "pagination": pagination
                 }
             }, 200
 
@@ -766,6 +748,9 @@ class BenchmarkService:
 
             # CASCADE DELETE: Find and delete all competitor reports (child reports)
             competitor_reports = KbaiReport.query.filter_by(parent_report_id=report_id).all()
+            affected_companies = response_cache.analysis_companies(
+                [analysis.id_analysis] + [r.id_analysis for r in competitor_reports]
+            )
             
             for competitor_report in competitor_reports:
                 competitor_analysis_id = competitor_report.id_analysis
@@ -803,6 +788,8 @@ class BenchmarkService:
             KbaiAnalysis.query.filter_by(id_analysis=analysis.id_analysis).delete()
             
             db.session.commit()
+            # Bulk query deletes bypass the ORM events of the response cache
+            response_cache.invalidate_company(company_id, *affected_companies)
 
             deleted_count = len(competitor_reports)
             message = get_message("benchmark_deleted_with_competitors", locale, count=deleted_count) if deleted_count > 0 else get_message("benchmark_deleted_successfully", locale)
@@ -927,37 +914,31 @@ class BenchmarkService:
                 return {"message": get_message("competitor_balance_not_found", locale)}, 404
 
             # 5.5) Check if this competitor has already been added to this benchmark report
-            existing_competitor_reports = KbaiReport.query.filter_by(
-                parent_report_id=parent_report_id
-            ).all()
-            
-            for existing_report in existing_competitor_reports:
-                existing_analysis = KbaiAnalysis.query.filter_by(
-                    id_analysis=existing_report.id_analysis
-                ).first()
-                
-                if not existing_analysis:
-                    continue
-                
-                # Check if this competitor balance is already in this analysis
-                existing_competitor_mapping = KbaiAnalysisKpi.query.filter_by(
-                    id_analysis=existing_analysis.id_analysis,
-                    id_balance=competitor_balance.id_balance
-                ).first()
-                
-                if existing_competitor_mapping:
-                    if existing_competitor_mapping.kpi_list_json and \
-                       existing_competitor_mapping.kpi_list_json.get("balance_type") == "competitor":
-                        competitor_name = competitor.company_name if competitor else "Competitor"
-                        return {
-                            "message": get_message("competitor_benchmark_already_exists", locale)
-                        }, 400
+            # (parent balances + competitor balance fingerprint, indexed lookup)
+            balance_fingerprint = KbaiAnalysis.compute_balance_fingerprint(
+                [
+                    (ak.id_balance, (ak.kpi_list_json or {}).get("balance_type"))
+                    for ak in parent_analysis_kpis
+                ] + [(competitor_balance.id_balance, "competitor")]
+            )
+            existing_competitor_analysis = (
+                KbaiAnalysis.fingerprint_query(balance_fingerprint, analysis_type="BENCHMARK_COMPETITOR")
+                .join(KbaiReport, KbaiReport.id_analysis == KbaiAnalysis.id_analysis)
+                .filter(KbaiReport.parent_report_id == parent_report_id)
+                .with_entities(KbaiAnalysis.id_analysis)
+                .first()
+            )
+            if existing_competitor_analysis:
+                return {
+                    "message": get_message("competitor_benchmark_already_exists", locale)
+                }, 400
 
             # 6) Create NEW analysis for competitor comparison
             new_analysis = KbaiAnalysis(
                 analysis_name=f"{comparison_name or 'Competitor Comparison'}",
                 analysis_type="BENCHMARK_COMPETITOR",
-                time=datetime.utcnow()
+                time=datetime.utcnow(),
+                balance_fingerprint=balance_fingerprint
             )
             db.session.add(new_analysis)
             db.session.flush()
@@ -972,150 +953,27 @@ class BenchmarkService:
                 )
                 db.session.add(new_mapping)
 
-            # 8) Add competitor balance to new analysis
-            competitor_kpis = KbaiKpiValue.query.filter_by(
-                id_balance=competitor_balance.id_balance
-            ).all()
-
-            kpi_map: Dict[str, float] = {}
-            for kv in competitor_kpis:
-                kpi_map[kv.kpi_name] = float(kv.value) if kv.value is not None else None
-
+            # 8) Add competitor balance to new analysis (KPI map filled in step 9)
             competitor_mapping = KbaiAnalysisKpi(
                 id_analysis=new_analysis_id,
                 id_balance=competitor_balance.id_balance,
                 kpi_list_json={
-                    "kpis": kpi_map,
+                    "kpis": {},
                     "year": competitor_balance.year,
                     "balance_type": "competitor",
                     "missing_fields": [],
                 },
             )
             db.session.add(competitor_mapping)
+            db.session.flush()
 
-            # 9) Recompute KPI insights for competitor comparison (competitor-specific calculation)
-            all_balance_ids = parent_balance_ids + [competitor_balance.id_balance]
-            all_balances = KbaiBalance.query.filter(
-                KbaiBalance.id_balance.in_(all_balance_ids)
-            ).all()
-            all_kpi_values = KbaiKpiValue.query.filter(
-                KbaiKpiValue.id_balance.in_(all_balance_ids)
-            ).all()
-
-            # Separate benchmark and competitor data
-            benchmark_kpi_data = defaultdict(list)  # {kpi_name: [(year, value), ...]}
-            competitor_kpi_data = {}  # {kpi_name: value}
-            benchmark_years = []
-
-            balances_dict = {b.id_balance: b for b in all_balances}
-            
-            for kv in all_kpi_values:
-                balance = balances_dict.get(kv.id_balance)
-                if not balance:
-                    continue
-                
-                value = float(kv.value) if kv.value is not None else None
-                
-                # Check if this balance is competitor
-                is_competitor = (balance.id_balance == competitor_balance.id_balance)
-                
-                if is_competitor:
-                    competitor_kpi_data[kv.kpi_name] = value
-                else:
-                    benchmark_kpi_data[kv.kpi_name].append((balance.year, value))
-                    benchmark_years.append(balance.year)
-
-            # Calculate competitor statuses (competitor vs benchmark)
-            competitor_statuses = calculate_competitor_kpi_statuses(
-                competitor_kpi_data, benchmark_kpi_data
+            # 9) Compute competitor KPI insights (deviation, synthesis, suggestion, KpiLogic)
+            # in one batch with bulk writes
+            competitor_insight_service.recompute_analyses(
+                parent_report_id,
+                KbaiAnalysisKpi.query.filter_by(id_analysis=new_analysis_id).all(),
+                force=True
             )
-
-            # Build insights and store in AnalysisKpiInfo for competitor KPIs only
-            for kpi_name, comp_value in competitor_kpi_data.items():
-                benchmark_values = benchmark_kpi_data.get(kpi_name, [])
-                
-                if not benchmark_values:
-                    continue
-                
-                values = [v for _, v in sorted(benchmark_values)]
-                benchmark_baseline = sum(values) / len(values) if values else 0
-                benchmark_min = min(values) if values else 0
-                benchmark_max = max(values) if values else 0
-                
-                # Calculate deviation: ((Competitor - Benchmark Baseline) / Benchmark Baseline) * 100
-                deviation = None
-                if benchmark_baseline != 0 and comp_value is not None:
-                    try:
-                        # Same formula as comparison report: ((new - old) / abs(old)) * 100
-                        deviation = ((comp_value - benchmark_baseline) / abs(benchmark_baseline)) * 100
-                        # Store full numeric deviation (rounded to 2 decimals, no artificial range limit)
-                        deviation = round(deviation, 2)
-                    except (ZeroDivisionError, TypeError, ValueError) as e:
-                        logger.warning(f"Error calculating deviation for {kpi_name}: {str(e)}")
-                        deviation = None
-                
-                status = competitor_statuses.get(kpi_name, "AVERAGE")
-                
-                insight = build_competitor_kpi_insight(
-                    kpi_name=kpi_name,
-                    competitor_value=comp_value,
-                    benchmark_baseline=benchmark_baseline,
-                    benchmark_min=benchmark_min,
-                    benchmark_max=benchmark_max,
-                    benchmark_years=benchmark_years,
-                    status=status
-                )
-                
-                # Get KPI value record for id_kpi (from competitor balance)
-                kv_record = next(
-                    (kv for kv in all_kpi_values 
-                     if kv.kpi_name == kpi_name and kv.id_balance == competitor_balance.id_balance), 
-                    None
-                )
-                if not kv_record:
-                    continue
-                
-                # Update competitor KbaiKpiValue with deviation
-                try:
-                    kv_record.deviation = deviation
-                    kv_record.source = f"competitor_benchmark_{parent_report_id}"
-                    db.session.add(kv_record)
-
-                    # Also update KpiLogic thresholds based on this deviation so that
-                    # new competitor benchmark entries immediately get correct
-                    # critical/acceptable percentages.
-                    try:
-                        from src.app.api.v1.services.k_balance.comparison_report_service import (
-                            comparison_report_service,
-                        )
-                        comparison_report_service._update_kpi_logic_for_value(kv_record)
-                    except Exception as inner_e:
-                        # Log but don't fail competitor benchmark creation
-                        logger.error(
-                            "Failed to update KpiLogic from competitor deviation for id_kpi %s: %s",
-                            getattr(kv_record, "id_kpi", None),
-                            str(inner_e),
-                        )
-
-                    logger.info(
-                        f"Updated deviation for competitor KPI '{kpi_name}': {deviation}% "
-                        f"(Competitor: {comp_value}, Baseline: {benchmark_baseline})"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to update deviation for competitor KPI {kpi_name}: {str(e)}"
-                    )
-                
-                # Store in AnalysisKpiInfo (competitor-specific synthesis and suggestion)
-                record = AnalysisKpiInfo(
-                    id_analysis=new_analysis_id,
-                    id_kpi=kv_record.id_kpi,
-                    synthesis=insight["synthesis"],
-                    suggestion=insight["suggestion"],
-                    note=None
-                )
-                db.session.merge(record)
-            
             db.session.commit()
 
             # 10) Create NEW report
@@ -1147,50 +1005,45 @@ class BenchmarkService:
             if not parent_report_id:
                 return {"message": get_message("parent_report_id_required", locale)}, 400
 
-            # 1) Get parent company context
-            parent_report = KbaiReport.query.filter_by(id_report=parent_report_id, type="BENCHMARK").first()
-            if not parent_report:
+            # 1) Get parent company context (report -> analysis KPI -> balance in one query)
+            parent = (
+                db.session.query(KbaiReport.id_report, KbaiAnalysisKpi.id_balance, KbaiBalance.id_company)
+                .outerjoin(KbaiAnalysisKpi, KbaiAnalysisKpi.id_analysis == KbaiReport.id_analysis)
+                .outerjoin(KbaiBalance, KbaiBalance.id_balance == KbaiAnalysisKpi.id_balance)
+                .filter(KbaiReport.id_report == parent_report_id, KbaiReport.type == "BENCHMARK")
+                .first()
+            )
+            if not parent:
                 return {"message": get_message("parent_benchmark_not_found", locale)}, 404
 
-            parent_analysis_kpi = KbaiAnalysisKpi.query.filter_by(id_analysis=parent_report.id_analysis).first()
-            if not parent_analysis_kpi:
+            if parent.id_balance is None:
                 return {"message": get_message("no_balances_found_in_parent", locale)}, 400
             
-            parent_balance = KbaiBalance.query.get(parent_analysis_kpi.id_balance)
-            if not parent_balance:
+            if parent.id_company is None:
                 return {"message": get_message("main_company_balance_not_found", locale)}, 400
             
-            parent_company_id = parent_balance.id_company
+            parent_company_id = parent.id_company
 
             # Check access
             has_access, error_msg = ComparisonReportService().check_company_access(current_user, parent_company_id)
             if not has_access:
                 return {"message": error_msg}, 403
 
-            # 2) Extract Parent Attributes
-            from src.app.database.models.kbai import KbaiCompanyZone, KbaiZone, KbaiCompanySector, KbaiSector
-            
-            parent_region = None
-            parent_ateco_division = None
-            parent_geographic_area = None
-            parent_country = "Italy"
-
-            zone_mapping = KbaiCompanyZone.query.filter_by(id_company=parent_company_id, primary_flag=True).first()
-            if zone_mapping:
-                zone = KbaiZone.query.get(zone_mapping.id_zone)
-                if zone:
-                    parent_region = zone.region
-                    parent_country = zone.country or "Italy"
-
-            sector_mapping = KbaiCompanySector.query.filter_by(id_company=parent_company_id, primary_flag=True).first()
-            if sector_mapping:
-                sector = KbaiSector.query.get(sector_mapping.id_sector)
-                if sector:
-                    parent_ateco_division = sector.division
-                    parent_geographic_area = sector.geographic_area
-
-            # 3) Build Competitor Query only for parent company
-            query = db.session.query(KbaiCompany).filter(
+            # 2) Extract Parent Attributes (primary zone and sector, reference data cache)
+            from src.app.database.models.kbai import KbaiCompanyZone, KbaiZone, KbaiCompanySector
+
+            parent_attributes = reference_data_cache.company_profile(parent_company_id) or {}
+            parent_region = parent_attributes.get("region")
+            parent_country = parent_attributes.get("country") or "Italy"
+            parent_ateco_division = parent_attributes.get("division")
+            parent_geographic_area = parent_attributes.get("geographic_area")
+
+            # 3) Build Competitor Query only for parent company, loading balance
+            # metadata for all competitors in one extra IN query
+            query = db.session.query(KbaiCompany).options(
+                selectinload(KbaiCompany.balances.and_(KbaiBalance.is_deleted == False))
+                .load_only(KbaiBalance.id_balance, KbaiBalance.year, KbaiBalance.type, KbaiBalance.file)
+            ).filter(
                 KbaiCompany.is_deleted == False,
                 KbaiCompany.is_competitor == True,
                 KbaiCompany.parent_company_id == parent_company_id
@@ -1205,8 +1058,8 @@ class BenchmarkService:
                     query = query.join(KbaiCompanyZone, KbaiCompany.id_company == KbaiCompanyZone.id_company)\
                                  .join(KbaiZone, KbaiCompanyZone.id_zone == KbaiZone.id_zone)\
                                  .join(KbaiCompanySector, KbaiCompany.id_company == KbaiCompanySector.id_company)\
-                                 .join(KbaiSector, KbaiCompanySector.id_sector == KbaiSector.id_sector)\
-                                 .filter(KbaiZone.region == parent_region, KbaiSector.division == parent_ateco_division)
+                                 .filter(KbaiZone.region == parent_region,
+                                         KbaiCompanySector.id_sector.in_(reference_data_cache.sector_ids(parent_ateco_division)))
             elif tipologia == "Nazionale":
                 if not parent_country or not parent_ateco_division:
                     query = query.filter(KbaiCompany.parent_company_id == parent_company_id)
@@ -1214,22 +1067,21 @@ class BenchmarkService:
                     query = query.join(KbaiCompanyZone, KbaiCompany.id_company == KbaiCompanyZone.id_company)\
                                  .join(KbaiZone, KbaiCompanyZone.id_zone == KbaiZone.id_zone)\
                                  .join(KbaiCompanySector, KbaiCompany.id_company == KbaiCompanySector.id_company)\
-                                 .join(KbaiSector, KbaiCompanySector.id_sector == KbaiSector.id_sector)\
-                                 .filter(KbaiZone.country == parent_country, KbaiSector.division == parent_ateco_division)
+                                 .filter(KbaiZone.country == parent_country,
+                                         KbaiCompanySector.id_sector.in_(reference_data_cache.sector_ids(parent_ateco_division)))
             elif tipologia == "Macro Area":
                 if parent_geographic_area is None or not parent_ateco_division:
                     query = query.filter(KbaiCompany.parent_company_id == parent_company_id)
                 else:
+                    sector_ids = reference_data_cache.sector_ids(parent_ateco_division, geographic_area=parent_geographic_area)
                     query = query.join(KbaiCompanySector, KbaiCompany.id_company == KbaiCompanySector.id_company)\
-                                 .join(KbaiSector, KbaiCompanySector.id_sector == KbaiSector.id_sector)\
-                                 .filter(KbaiSector.geographic_area == parent_geographic_area, KbaiSector.division == parent_ateco_division)
+                                 .filter(KbaiCompanySector.id_sector.in_(sector_ids))
 
             companies = query.all()
 
-            # 4) Extract Companies + Nested Balances
+            # 4) Extract Companies + Nested Balances (already loaded)
             result_data = []
             for company in companies:
-                balances = KbaiBalance.query.filter_by(id_company=company.id_company, is_deleted=False).all()
                 result_data.append({
                     "id_company": company.id_company,
                     "company_name": company.company_name,
@@ -1239,7 +1091,7 @@ class BenchmarkService:
                             "year": b.year,
                             "type": b.type,
                             "file": b.file
-                        } for b in balances
+                        } for b in company.balances
                     ]
                 })
 
@@ -3,6 +3,11 @@ from typing import Dict, Any, Optional
 from difflib import get_close_matches
 import re
 
+# Version of the KPI formulas implemented by FinancialKPIAnalyzer.
+# Bump it whenever a formula changes so stored KPI sets are recalculated.
+KPI_FORMULA_VERSION = "1"
+
+
 class FuzzyKeyMatcher:
     """Helper class for fuzzy matching JSON keys"""
     
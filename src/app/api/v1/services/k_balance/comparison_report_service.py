@@ -10,6 +10,7 @@ import re
 import logging
 from flask import current_app, request
 from src.common.localization import get_message
+from src.common.conditional import make_etag, locale_part
 
 from src.app.database.models import (
     KbaiBalance,
@@ -25,11 +26,18 @@ from src.app.database.models import (
 )
 from src.app.database.models.kbai.kbai_companies import KbaiCompany
 # from src.app.database.models.kbai_balance.kbai_kpi_values import KbaiKpiValue
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from src.extensions import db
 from .comparison_report import (
     FinancialKPIAnalyzer,
     compare_kpis,
+    KPI_FORMULA_VERSION,
 )
+from .kpi_status_services import kpi_logic_percentages
+from .peer_distribution_service import peer_distribution_service
+from .competitor_insight_service import competitor_insight_service
+from src.app.api.v1.services.common.response_cache import response_cache, company_tag
 
 logger = logging.getLogger(__name__)
 
@@ -244,16 +252,7 @@ class ComparisonReportService:
                     )
                     deviation = None
 
-            critical_percentage: float = 0.0
-            acceptable_percentage: float = 0.0
-
-            if deviation is not None:
-                if deviation < 0.0:
-                    critical_percentage = deviation
-                    acceptable_percentage = 0.0
-                elif deviation >= 0.0:
-                    critical_percentage = 0.0
-                    acceptable_percentage = deviation
+            critical_percentage, acceptable_percentage = kpi_logic_percentages(deviation)
             existing_logic = KpiLogic.findOne(id_kpi=kpi_value.id_kpi)
 
             if existing_logic:
@@ -302,6 +301,76 @@ class ComparisonReportService:
             # Re-raise so outer try/except surfaces the real DB error
             raise
     
+    def _mark_kpis_current(self, balance: KbaiBalance) -> None:
+        """
+        Record on the balance that its stored KPI set matches its current content
+        and KPI formula version, so later recalculations can be skipped.
+        If the KPI set changed, the balance's peer distribution group and the
+        competitor benchmark insights built on it are refreshed.
+        """
+        was_current = balance.kpis_up_to_date(KPI_FORMULA_VERSION)
+        ok, err = balance.update({
+            'kpi_content_hash': balance.content_hash,
+            'kpi_formula_version': KPI_FORMULA_VERSION,
+        })
+        if not ok:
+            logger.warning(
+                f"Failed to record KPI version for balance {balance.id_balance}: {err}"
+            )
+        elif not was_current:
+            peer_distribution_service.refresh_for_company_year(balance.id_company, balance.year)
+            competitor_insight_service.refresh_for_balance(balance.id_balance)
+
+    def _comparison_is_current(self, analysis: KbaiAnalysis, balances: list) -> bool:
+        """
+        Check that a comparison was built from the balances' current content with the
+        current KPI formulas. Comparisons stored before hashes/versions were recorded
+        are considered current.
+        """
+        current_hashes = {b.id_balance: b.content_hash for b in balances}
+        for ak in analysis.analysis_kpis:
+            info = ak.kpi_list_json or {}
+            formula_version = info.get('formula_version')
+            if formula_version is not None and formula_version != KPI_FORMULA_VERSION:
+                return False
+            recorded_hash = info.get('content_hash')
+            current_hash = current_hashes.get(ak.id_balance)
+            if recorded_hash and current_hash and recorded_hash != current_hash:
+                return False
+        return True
+
+    def _find_current_comparison(
+        self,
+        older_balance: KbaiBalance,
+        newer_balance: KbaiBalance
+    ) -> Optional[KbaiAnalysis]:
+        """
+        Return the latest year comparison between two balance sheets, or None if there is
+        none or it is stale (one of the balances changed or the KPI formulas were updated).
+        """
+        existing_analysis = (
+            db.session.query(KbaiAnalysis)
+            .options(selectinload(KbaiAnalysis.analysis_kpis))
+            .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
+            .filter(
+                KbaiAnalysisKpi.id_balance.in_([newer_balance.id_balance, older_balance.id_balance]),
+                KbaiAnalysis.analysis_type == 'year_comparison'
+            )
+            .group_by(KbaiAnalysis.id_analysis)
+            .having(db.func.count(KbaiAnalysisKpi.id_balance.distinct()) == 2)
+            .order_by(KbaiAnalysis.time.desc())
+            .first()
+        )
+        if existing_analysis and not self._comparison_is_current(
+            existing_analysis, [older_balance, newer_balance]
+        ):
+            logger.info(
+                f"Comparison {existing_analysis.id_analysis} between balances "
+                f"{older_balance.id_balance} and {newer_balance.id_balance} is stale"
+            )
+            return None
+        return existing_analysis
+
     def check_company_access(
         self,
         current_user: TbUser,
@@ -389,7 +458,8 @@ class ComparisonReportService:
                     locale = request.headers.get('Accept-Language', 'en')
             except (RuntimeError, AttributeError):
                 pass
-            balance = KbaiBalance.query.filter_by(id_balance=id_balance, is_deleted = False).first()
+            # Balance JSON is only loaded if the KPIs actually need recalculating
+            balance = KbaiBalance.metadata_query(id_balance=id_balance).first()
             
             if not balance:
                 return {
@@ -397,6 +467,20 @@ class ComparisonReportService:
                     'data': None
                 }, 404
             
+            if balance.kpis_up_to_date(KPI_FORMULA_VERSION):
+                logger.info(
+                    f"KPIs for balance {id_balance} are up to date "
+                    f"(formula version {KPI_FORMULA_VERSION}). Skipping recalculation."
+                )
+                return {
+                    'message': get_message('kpi_calc_up_to_date', locale),
+                    'data': {
+                        'id_balance': id_balance,
+                        'year': balance.year,
+                        'unchanged': True
+                    }
+                }, 200
+            
             if not balance.balance:
                 return {
                     'message': get_message('balance_sheet_no_data', locale),
@@ -417,6 +501,7 @@ class ComparisonReportService:
                     source=source,
                     comparison=None,  # No comparison, just store KPIs
                 )
+                self._mark_kpis_current(balance)
             except Exception as e:
                 logger.error(
                     f"Error storing KPI values for balance {id_balance}: {str(e)}",
@@ -497,10 +582,7 @@ class ComparisonReportService:
             # Get all balance sheets with balance data, ordered by year DESC only
             # Group by year and get the most recent balance sheet for each year
             balances_by_year = (
-                KbaiBalance.query
-                .filter_by(id_company=company_id)
-                .filter(KbaiBalance.balance.isnot(None))
-                .filter(KbaiBalance.is_deleted == False)
+                KbaiBalance.metadata_query(with_data=True, id_company=company_id)
                 .order_by(KbaiBalance.year.desc(), KbaiBalance.month.desc())
                 .all()
             )
@@ -550,19 +632,8 @@ class ComparisonReportService:
             
             # Check if the newly uploaded year is one of the last 2 years
             if newly_uploaded_year in last_two_years:
-                # Check if comparison already exists for these two balance sheets
-                existing_analysis = (
-                    db.session.query(KbaiAnalysis)
-                    .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
-                    .filter(
-                        KbaiAnalysisKpi.id_balance.in_([last_balance.id_balance, second_last_balance.id_balance]),
-                        KbaiAnalysis.analysis_type == 'year_comparison'
-                    )
-                    .group_by(KbaiAnalysis.id_analysis)
-                    .having(db.func.count(KbaiAnalysisKpi.id_balance.distinct()) == 2)
-                    .order_by(KbaiAnalysis.time.desc())
-                    .first()
-                )
+                # Check if a current comparison already exists for these two balance sheets
+                existing_analysis = self._find_current_comparison(second_last_balance, last_balance)
                 
                 if existing_analysis:
                     logger.info(
@@ -771,6 +842,8 @@ class ComparisonReportService:
                     source=f"comparison_year_{balance_year2.year}",
                     comparison=comparison,
                 )
+                self._mark_kpis_current(balance_year1)
+                self._mark_kpis_current(balance_year2)
             except Exception as e:
                 logger.error(
                     "Error storing KPI values into KbaiKpiValue: %s",
@@ -852,7 +925,9 @@ class ComparisonReportService:
                 'kpi_list_json': {
                     'kpis': kpis_year1,
                     'year': balance_year1.year,
-                    'missing_fields': analyzer1.missing_fields
+                    'missing_fields': analyzer1.missing_fields,
+                    'content_hash': balance_year1.content_hash,
+                    'formula_version': KPI_FORMULA_VERSION
                 }
             })
             
@@ -866,7 +941,9 @@ class ComparisonReportService:
                 'kpi_list_json': {
                     'kpis': kpis_year2,
                     'year': balance_year2.year,
-                    'missing_fields': analyzer2.missing_fields
+                    'missing_fields': analyzer2.missing_fields,
+                    'content_hash': balance_year2.content_hash,
+                    'formula_version': KPI_FORMULA_VERSION
                 }
             })
             
@@ -918,6 +995,72 @@ class ComparisonReportService:
                 'error': str(e)
             }, 500
 
+    def _load_company_comparison_analyses(self, company_id: int) -> list:
+        """
+        Load year-comparison analyses of a company (newest first) with their
+        analysis KPIs and balances eager-loaded, so iterating them issues no further queries.
+        """
+        analysis_ids = (
+            select(KbaiAnalysisKpi.id_analysis)
+            .join(KbaiBalance, KbaiAnalysisKpi.id_balance == KbaiBalance.id_balance)
+            .where(
+                KbaiBalance.id_company == company_id,
+                KbaiBalance.is_deleted == False  # Filter out deleted balance sheets
+            )
+        )
+        return (
+            db.session.query(KbaiAnalysis)
+            .options(
+                selectinload(KbaiAnalysis.analysis_kpis)
+                .selectinload(KbaiAnalysisKpi.balance)
+                .defer(KbaiBalance.balance)
+            )
+            .filter(
+                KbaiAnalysis.id_analysis.in_(analysis_ids),
+                KbaiAnalysis.analysis_type == 'year_comparison'
+            )
+            .order_by(KbaiAnalysis.time.desc())
+            .all()
+        )
+
+    def _valid_analysis_kpi_data(self, analysis) -> Optional[list]:
+        """
+        Return [{'year', 'kpis'}, ...] sorted by year (older first) for a comparison
+        whose two balance sheets still exist, or None for an incomplete/stale comparison.
+        """
+        if len(analysis.analysis_kpis) < 2:
+            return None
+        kpi_data = []
+        for ak in analysis.analysis_kpis:
+            balance = ak.balance
+            # Only process if balance exists and is not deleted
+            if balance and balance.is_deleted == False and ak.kpi_list_json:
+                kpi_data.append({
+                    'year': balance.year,
+                    'kpis': ak.kpi_list_json.get('kpis', {})
+                })
+        if len(kpi_data) < 2:
+            return None
+        kpi_data.sort(key=lambda x: x['year'])
+        return kpi_data
+
+    def get_report_etag(self, company_id: int, current_user: TbUser) -> Optional[str]:
+        """
+        ETag for get_comparison_report_by_company_id from the company's response
+        cache tag version, which changes on every write to its balances, KPIs
+        and analyses.
+
+        Returns None when the response cache is disabled or the user has no access.
+        """
+        version = response_cache.tag_version(company_tag(company_id))
+        if version is None:
+            return None
+        has_access, _ = self.check_company_access(current_user, company_id)
+        if not has_access:
+            return None
+        return make_etag('comparison_report', company_id, version, KPI_FORMULA_VERSION, locale_part())
+
+    @response_cache.cached('comparison_report_by_company', tags=lambda params: [company_tag(params['company_id'])])
     def get_comparison_report_by_company_id(
         self,
         company_id: int,
@@ -946,10 +1089,7 @@ class ComparisonReportService:
             
             # Get all balance sheets for this company with balance data
             all_balances = (
-                KbaiBalance.query
-                .filter_by(id_company=company_id)
-                .filter(KbaiBalance.balance.isnot(None))
-                .filter(KbaiBalance.is_deleted == False)
+                KbaiBalance.metadata_query(with_data=True, id_company=company_id)
                 .order_by(KbaiBalance.year.desc())
                 .all()
             )
@@ -989,19 +1129,8 @@ class ComparisonReportService:
                 last_balance = year_to_balance[last_year]
                 second_last_balance = year_to_balance[second_last_year]
                 
-                # Check if comparison already exists for these two balance sheets
-                existing_analysis = (
-                    db.session.query(KbaiAnalysis)
-                    .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
-                    .filter(
-                        KbaiAnalysisKpi.id_balance.in_([last_balance.id_balance, second_last_balance.id_balance]),
-                        KbaiAnalysis.analysis_type == 'year_comparison'
-                    )
-                    .group_by(KbaiAnalysis.id_analysis)
-                    .having(db.func.count(KbaiAnalysisKpi.id_balance.distinct()) == 2)
-                    .order_by(KbaiAnalysis.time.desc())
-                    .first()
-                )
+                # Check if a current comparison already exists for these two balance sheets
+                existing_analysis = self._find_current_comparison(second_last_balance, last_balance)
                 
                 # If no comparison exists, generate it automatically
                 if not existing_analysis:
@@ -1032,177 +1161,62 @@ class ComparisonReportService:
                             exc_info=True
                         )
             
-            # Get all analyses for this company through balance sheets
-            # Filter out analyses that reference deleted balance sheets
-            analyses_query = (
-                db.session.query(KbaiAnalysis)
-                .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
-                .join(KbaiBalance, KbaiAnalysisKpi.id_balance == KbaiBalance.id_balance)
-                .filter(
-                    KbaiBalance.id_company == company_id,
-                    KbaiBalance.is_deleted == False,  # Filter out deleted balance sheets
-                    KbaiAnalysis.analysis_type == 'year_comparison'
-                )
-                .distinct()
-                .order_by(KbaiAnalysis.time.desc())
-            )
-            
-            all_analyses = analyses_query.all()
+            # Get all analyses for this company through balance sheets, with their
+            # analysis KPIs and balances eager-loaded in two extra IN queries
+            # (deleted balance sheets are filtered out below)
+            all_analyses = self._load_company_comparison_analyses(company_id)
             
             # Collect all years' KPI values from all sources
             all_years_kpis = {}  # {kpi_name: {year: value}}
             latest_comparison_metrics = {}  # {kpi_name: {Absolute_Change, Change_%}}
-            latest_kpis_year1 = {}
-            latest_kpis_year2 = {}
             
             # Step 1: Get KPIs from comparison reports (KbaiAnalysisKpi)
-            # Find the latest valid comparison (where both balance sheets exist and are not deleted)
-            if all_analyses:
-                latest_analysis = None
-                latest_kpi_data = []
-                
-                for analysis in all_analyses:
-                    # Get analysis KPIs for this comparison
-                    analysis_kpis = (
-                        KbaiAnalysisKpi.query
-                        .filter_by(id_analysis=analysis.id_analysis)
-                        .all()
-                    )
-                    
-                    if len(analysis_kpis) >= 2:
-                        # Get balance sheets for this comparison (filter deleted)
-                        balance_ids = [ak.id_balance for ak in analysis_kpis]
-                        balances = (
-                            KbaiBalance.query
-                            .filter(KbaiBalance.id_balance.in_(balance_ids))
-                            .filter(KbaiBalance.is_deleted == False)  # Filter out deleted balance sheets
-                            .all()
-                        )
-                        balance_dict = {b.id_balance: b for b in balances}
-                        
-                        # Check if we have both balance sheets (valid comparison)
-                        valid_kpi_data = []
-                        for ak in analysis_kpis:
-                            balance = balance_dict.get(ak.id_balance)
-                            if balance and balance.is_deleted == False and ak.kpi_list_json:  # Only process if balance exists and is not deleted
-                                year = balance.year
-                                kpis = ak.kpi_list_json.get('kpis', {})
-                                valid_kpi_data.append({
-                                    'year': year,
-                                    'kpis': kpis
-                                })
-                        
-                        # Only use this as latest if we have both years (valid comparison)
-                        if len(valid_kpi_data) >= 2:
-                            # Sort by year to ensure correct order (older first, newer second)
-                            valid_kpi_data.sort(key=lambda x: x['year'])
-                            latest_kpi_data = valid_kpi_data
-                            latest_analysis = analysis
-                            latest_kpis_year1 = latest_kpi_data[0]['kpis']  # Older year
-                            latest_kpis_year2 = latest_kpi_data[1]['kpis']  # Newer year
-                            
-                            # Store all years' values from latest comparison
-                            for kpi_data in latest_kpi_data:
-                                year = kpi_data['year']
-                                kpis = kpi_data['kpis']
-                                for kpi_name, kpi_value in kpis.items():
-                                    if kpi_name not in all_years_kpis:
-                                        all_years_kpis[kpi_name] = {}
-                                    all_years_kpis[kpi_name][year] = float(kpi_value) if kpi_value is not None else 0.0
-                            
-                            # Calculate latest comparison metrics (newer vs older)
-                            if latest_kpis_year1 and latest_kpis_year2:
-                                latest_comparison = compare_kpis(latest_kpis_year1, latest_kpis_year2)
-                                for kpi_name, comparison_data in latest_comparison.items():
-                                    latest_comparison_metrics[kpi_name] = {
-                                        'Absolute_Change': comparison_data.get('Absolute_Change'),
-                                        'Change_%': comparison_data.get('Change_%')
-                                    }
-                            
-                            # Found valid latest comparison, break
-                            break
+            # The latest valid comparison (both balance sheets exist and are not deleted)
+            # provides the change metrics; older ones only fill in missing years
+            latest_found = False
+            for analysis in all_analyses:
+                kpi_data = self._valid_analysis_kpi_data(analysis)
+                if kpi_data is None:
+                    continue
                 
-                # Process remaining comparisons (previous comparisons) to get more years' data
-                # Skip the latest_analysis if we found one
-                analyses_to_process = all_analyses
-                if latest_analysis:
-                    # Skip the latest analysis and any analyses before it (they're already processed or invalid)
-                    latest_index = next((i for i, a in enumerate(all_analyses) if a.id_analysis == latest_analysis.id_analysis), -1)
-                    analyses_to_process = all_analyses[latest_index + 1:] if latest_index >= 0 else all_analyses
+                for item in kpi_data:
+                    year = item['year']
+                    for kpi_name, kpi_value in item['kpis'].items():
+                        years_data = all_years_kpis.setdefault(kpi_name, {})
+                        # Only add if not already present (latest comparison takes priority)
+                        if year not in years_data:
+                            years_data[year] = float(kpi_value) if kpi_value is not None else 0.0
                 
-                for prev_analysis in analyses_to_process:
-                    prev_analysis_kpis = (
-                        KbaiAnalysisKpi.query
-                        .filter_by(id_analysis=prev_analysis.id_analysis)
-                        .all()
-                    )
-                    
-                    if len(prev_analysis_kpis) >= 2:
-                        prev_balance_ids = [ak.id_balance for ak in prev_analysis_kpis]
-                        prev_balances = (
-                            KbaiBalance.query
-                            .filter(KbaiBalance.id_balance.in_(prev_balance_ids))
-                            .filter(KbaiBalance.is_deleted == False)  # Filter out deleted balance sheets
-                            .all()
-                        )
-                        
-                        prev_balance_dict = {b.id_balance: b for b in prev_balances}
-                        
-                        # Only process if we have both balance sheets (valid comparison)
-                        prev_kpi_data = []
-                        for ak in prev_analysis_kpis:
-                            balance = prev_balance_dict.get(ak.id_balance)
-                            if balance and balance.is_deleted == False and ak.kpi_list_json:  # Only process if balance exists and is not deleted
-                                year = balance.year
-                                kpis = ak.kpi_list_json.get('kpis', {})
-                                prev_kpi_data.append({
-                                    'year': year,
-                                    'kpis': kpis
-                                })
-                        
-                        # Only store data if we have a valid comparison (both years)
-                        if len(prev_kpi_data) >= 2:
-                            for kpi_data in prev_kpi_data:
-                                year = kpi_data['year']
-                                kpis = kpi_data['kpis']
-                                
-                                # Store all years' values
-                                for kpi_name, kpi_value in kpis.items():
-                                    if kpi_name not in all_years_kpis:
-                                        all_years_kpis[kpi_name] = {}
-                                    # Only add if not already present (comparison data takes priority)
-                                    if year not in all_years_kpis[kpi_name]:
-                                        all_years_kpis[kpi_name][year] = float(kpi_value) if kpi_value is not None else 0.0
-            
-            # Step 2: Get KPIs from kbai_kpi_values for all balance sheets
+                if not latest_found:
+                    latest_found = True
+                    # Calculate latest comparison metrics (newer vs older)
+                    latest_kpis_year1 = kpi_data[0]['kpis']  # Older year
+                    latest_kpis_year2 = kpi_data[1]['kpis']  # Newer year
+                    if latest_kpis_year1 and latest_kpis_year2:
+                        latest_comparison = compare_kpis(latest_kpis_year1, latest_kpis_year2)
+                        for kpi_name, comparison_data in latest_comparison.items():
+                            latest_comparison_metrics[kpi_name] = {
+                                'Absolute_Change': comparison_data.get('Absolute_Change'),
+                                'Change_%': comparison_data.get('Change_%')
+                            }
+            
+            # Step 2: Get KPIs from kbai_kpi_values for all balance sheets in one query
             # This will include years that don't have comparison reports (like 2025)
-            all_balance_ids = [b.id_balance for b in all_balances]
+            balance_year = {b.id_balance: b.year for b in all_balances}
             
             kpi_values = (
-                KbaiKpiValue.query
-                .filter(KbaiKpiValue.id_balance.in_(all_balance_ids))
+                db.session.query(KbaiKpiValue.id_balance, KbaiKpiValue.kpi_name, KbaiKpiValue.value)
+                .filter(KbaiKpiValue.id_balance.in_(list(balance_year.keys())))
                 .all()
             )
             
-            # Group KPI values by balance_id and then by kpi_name
-            balance_kpis = {}  # {id_balance: {kpi_name: value}}
-            for kpi_value in kpi_values:
-                if kpi_value.id_balance not in balance_kpis:
-                    balance_kpis[kpi_value.id_balance] = {}
-                balance_kpis[kpi_value.id_balance][kpi_value.kpi_name] = float(kpi_value.value) if kpi_value.value is not None else 0.0
-            
             # Add KPIs from kbai_kpi_values to all_years_kpis
-            for balance in all_balances:
-                if balance.id_balance in balance_kpis:
-                    year = balance.year
-                    kpis = balance_kpis[balance.id_balance]
-                    
-                    for kpi_name, kpi_value in kpis.items():
-                        if kpi_name not in all_years_kpis:
-                            all_years_kpis[kpi_name] = {}
-                        # Only add if not already present (comparison data takes priority)
-                        if year not in all_years_kpis[kpi_name]:
-                            all_years_kpis[kpi_name][year] = kpi_value
+            for id_balance, kpi_name, value in kpi_values:
+                year = balance_year[id_balance]
+                years_data = all_years_kpis.setdefault(kpi_name, {})
+                # Only add if not already present (comparison data takes priority)
+                if year not in years_data:
+                    years_data[year] = float(value) if value is not None else 0.0
             
             # Build final Comparison object
             final_comparison = {}
@@ -1221,13 +1235,7 @@ class ComparisonReportService:
             # Get missing fields from latest analysis if available
             all_missing = []
             if all_analyses:
-                latest_analysis = all_analyses[0]
-                analysis_kpis = (
-                    KbaiAnalysisKpi.query
-                    .filter_by(id_analysis=latest_analysis.id_analysis)
-                    .all()
-                )
-                for ak in analysis_kpis:
+                for ak in all_analyses[0].analysis_kpis:
                     if ak.kpi_list_json and ak.kpi_list_json.get('missing_fields'):
                         all_missing.extend(ak.kpi_list_json.get('missing_fields', []))
             all_missing = list(set(all_missing))
@@ -1289,10 +1297,7 @@ class ComparisonReportService:
             
             # Get all remaining active balance sheets with balance data, ordered by year DESC
             balances_by_year = (
-                KbaiBalance.query
-                .filter_by(id_company=company_id)
-                .filter(KbaiBalance.balance.isnot(None))
-                .filter(KbaiBalance.is_deleted == False)
+                KbaiBalance.metadata_query(with_data=True, id_company=company_id)
                 .order_by(KbaiBalance.year.desc(), KbaiBalance.month.desc())
                 .all()
             )
@@ -1329,19 +1334,8 @@ class ComparisonReportService:
             last_balance = year_to_balance[last_year]
             second_last_balance = year_to_balance[second_last_year]
             
-            # Check if comparison already exists for these two balance sheets
-            existing_analysis = (
-                db.session.query(KbaiAnalysis)
-                .join(KbaiAnalysisKpi, KbaiAnalysis.id_analysis == KbaiAnalysisKpi.id_analysis)
-                .filter(
-                    KbaiAnalysisKpi.id_balance.in_([last_balance.id_balance, second_last_balance.id_balance]),
-                    KbaiAnalysis.analysis_type == 'year_comparison'
-                )
-                .group_by(KbaiAnalysis.id_analysis)
-                .having(db.func.count(KbaiAnalysisKpi.id_balance.distinct()) == 2)
-                .order_by(KbaiAnalysis.time.desc())
-                .first()
-            )
+            # Check if a current comparison already exists for these two balance sheets
+            existing_analysis = self._find_current_comparison(second_last_balance, last_balance)
             
             if existing_analysis:
                 logger.info(
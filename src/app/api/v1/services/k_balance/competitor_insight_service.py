@@ -0,0 +1,348 @@
+"""
+Competitor Insight Service
+
+Builds the KPI insights of competitor benchmark comparisons (BENCHMARK_COMPETITOR
+analyses: competitor balance vs. the benchmark balances of the parent report) for
+all KPIs and competitors of a benchmark report in one batch, and persists them
+with one statement per table:
+- analysis_kpi_info   synthesis/suggestion per (analysis, KPI), bulk upsert
+- kbai_kpi_values     deviation/source of the competitor KPI values
+- kpi_logic           critical/acceptable thresholds derived from the deviations
+
+The competitor mapping of each analysis records the KPI versions of the balances
+its insights were built from (kpi_list_json['insights_source']); recomputation
+skips competitors whose balances did not change since.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import logging
+
+from sqlalchemy import BigInteger, Numeric, String, Text, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.app.database.models import KbaiAnalysisKpi, KbaiBalance, KbaiKpiValue, KbaiReport
+from src.app.api.v1.services.common.response_cache import response_cache
+from src.extensions import db
+from .kpi_status_services import (
+    build_competitor_kpi_insight,
+    evaluate_competitor_status,
+    kpi_logic_percentages,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPETITOR_BALANCE_TYPE = 'competitor'
+
+UPSERT_INSIGHTS = text("""
+    INSERT INTO kbai_balance.analysis_kpi_info (id_analysis, id_kpi, synthesis, suggestion, note)
+    SELECT r.id_analysis, r.id_kpi, r.synthesis, r.suggestion, NULL
+    FROM unnest(:id_analysis, :id_kpi, :synthesis, :suggestion)
+        AS r(id_analysis, id_kpi, synthesis, suggestion)
+    ON CONFLICT (id_analysis, id_kpi) DO UPDATE SET
+        synthesis = EXCLUDED.synthesis,
+        suggestion = EXCLUDED.suggestion,
+        note = EXCLUDED.note
+""").bindparams(
+    bindparam('id_analysis', type_=ARRAY(BigInteger)),
+    bindparam('id_kpi', type_=ARRAY(BigInteger)),
+    bindparam('synthesis', type_=ARRAY(Text)),
+    bindparam('suggestion', type_=ARRAY(Text)),
+)
+
+UPDATE_DEVIATIONS = text("""
+    UPDATE kbai_balance.kbai_kpi_values v
+    SET deviation = r.deviation,
+        source = :source
+    FROM unnest(:id_kpi, :deviation) AS r(id_kpi, deviation)
+    WHERE v.id_kpi = r.id_kpi
+""").bindparams(
+    bindparam('source', type_=String),
+    bindparam('id_kpi', type_=ARRAY(BigInteger)),
+    bindparam('deviation', type_=ARRAY(Numeric)),
+)
+
+UPSERT_KPI_LOGIC = text("""
+    INSERT INTO kbai_balance.kpi_logic (id_kpi, critical_percentage, acceptable_percentage)
+    SELECT r.id_kpi, r.critical_percentage, r.acceptable_percentage
+    FROM unnest(:id_kpi, :critical_percentage, :acceptable_percentage)
+        AS r(id_kpi, critical_percentage, acceptable_percentage)
+    ON CONFLICT (id_kpi) DO UPDATE SET
+        critical_percentage = EXCLUDED.critical_percentage,
+        acceptable_percentage = EXCLUDED.acceptable_percentage
+""").bindparams(
+    bindparam('id_kpi', type_=ARRAY(BigInteger)),
+    bindparam('critical_percentage', type_=ARRAY(Numeric)),
+    bindparam('acceptable_percentage', type_=ARRAY(Numeric)),
+)
+
+
+def insights_source(balances: Iterable[Any]) -> str:
+    """Fingerprint of the KPI sets of an analysis' balances (KPI content hash + formula version)"""
+    parts = sorted(
+        f"{b.id_balance}:{b.kpi_content_hash}:{b.kpi_formula_version}" for b in balances
+    )
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def benchmark_stats(
+    benchmark_values: Iterable[Tuple[int, Any]]
+) -> Tuple[Dict[str, Tuple[float, float, float]], List[int]]:
+    """
+    Per-KPI statistics of the benchmark balances.
+
+    Args:
+        benchmark_values: (year, kpi value row) pairs of the benchmark balances
+
+    Returns:
+        ({kpi_name: (baseline, min, max)}, sorted benchmark years)
+    """
+    values_by_kpi = defaultdict(list)
+    years = set()
+    for year, kv in benchmark_values:
+        years.add(year)
+        if kv.value is not None:
+            values_by_kpi[kv.kpi_name].append(float(kv.value))
+
+    stats = {
+        kpi_name: (sum(values) / len(values), min(values), max(values))
+        for kpi_name, values in values_by_kpi.items()
+    }
+    return stats, sorted(years)
+
+
+def build_competitor_insights(
+    competitor_values: Iterable[Any],
+    stats: Dict[str, Tuple[float, float, float]],
+    benchmark_years: List[int]
+) -> List[Dict[str, Any]]:
+    """
+    Insight rows of one competitor against precomputed benchmark statistics.
+
+    KPIs without benchmark values are skipped; a KPI without a competitor value
+    still gets its insight, with no deviation.
+
+    Returns:
+        [{'id_kpi', 'kpi_name', 'deviation', 'synthesis', 'suggestion'}, ...]
+    """
+    rows = []
+    for kv in competitor_values:
+        kpi_stats = stats.get(kv.kpi_name)
+        if kpi_stats is None:
+            continue
+        baseline, benchmark_min, benchmark_max = kpi_stats
+        comp_value = float(kv.value) if kv.value is not None else None
+
+        # Same formula as comparison report: ((new - old) / abs(old)) * 100
+        deviation = None
+        if baseline != 0 and comp_value is not None:
+            deviation = round(((comp_value - baseline) / abs(baseline)) * 100, 2)
+
+        insight = build_competitor_kpi_insight(
+            kpi_name=kv.kpi_name,
+            competitor_value=comp_value,
+            benchmark_baseline=baseline,
+            benchmark_min=benchmark_min,
+            benchmark_max=benchmark_max,
+            benchmark_years=benchmark_years,
+            status=evaluate_competitor_status(comp_value, baseline, kv.kpi_name)
+        )
+        rows.append({
+            'id_kpi': kv.id_kpi,
+            'kpi_name': kv.kpi_name,
+            'deviation': deviation,
+            'synthesis': insight['synthesis'],
+            'suggestion': insight['suggestion'],
+        })
+    return rows
+
+
+class CompetitorInsightService:
+    """Batch computation and bulk persistence of competitor benchmark insights"""
+
+    def persist(self, rows: List[Dict[str, Any]], source: str) -> None:
+        """
+        Write insight rows (with id_analysis) in three bulk statements.
+
+        The caller commits.
+        """
+        if not rows:
+            return
+        db.session.execute(UPSERT_INSIGHTS, {
+            'id_analysis': [row['id_analysis'] for row in rows],
+            'id_kpi': [row['id_kpi'] for row in rows],
+            'synthesis': [row['synthesis'] for row in rows],
+            'suggestion': [row['suggestion'] for row in rows],
+        })
+
+        # A competitor KPI value has one deviation; the last analysis wins
+        deviations = {row['id_kpi']: row['deviation'] for row in rows}
+        thresholds = [kpi_logic_percentages(deviation) for deviation in deviations.values()]
+        db.session.execute(UPDATE_DEVIATIONS, {
+            'source': source,
+            'id_kpi': list(deviations),
+            'deviation': list(deviations.values()),
+        })
+        db.session.execute(UPSERT_KPI_LOGIC, {
+            'id_kpi': list(deviations),
+            'critical_percentage': [critical for critical, _ in thresholds],
+            'acceptable_percentage': [acceptable for _, acceptable in thresholds],
+        })
+
+    def recompute_analyses(
+        self,
+        parent_report_id: int,
+        mappings: List[KbaiAnalysisKpi],
+        force: bool = False
+    ) -> Tuple[int, List[int]]:
+        """
+        Recompute the insights of the competitor analyses the mappings belong to.
+
+        Analyses whose balances' KPI sets match the recorded insights source are
+        skipped unless force is set. The caller commits.
+
+        Returns:
+            tuple: (number of analyses recomputed, companies of the recomputed analyses)
+        """
+        balance_ids = {m.id_balance for m in mappings}
+        balances = {
+            row.id_balance: row
+            for row in db.session.query(
+                KbaiBalance.id_balance,
+                KbaiBalance.id_company,
+                KbaiBalance.year,
+                KbaiBalance.kpi_content_hash,
+                KbaiBalance.kpi_formula_version,
+            ).filter(KbaiBalance.id_balance.in_(balance_ids)).all()
+        }
+
+        by_analysis = defaultdict(list)
+        for mapping in mappings:
+            by_analysis[mapping.id_analysis].append(mapping)
+
+        stale = []
+        for id_analysis, analysis_mappings in by_analysis.items():
+            competitor = next(
+                (m for m in analysis_mappings
+                 if (m.kpi_list_json or {}).get('balance_type') == COMPETITOR_BALANCE_TYPE),
+                None
+            )
+            if competitor is None:
+                continue
+            source = insights_source(
+                balances[m.id_balance] for m in analysis_mappings if m.id_balance in balances
+            )
+            if force or (competitor.kpi_list_json or {}).get('insights_source') != source:
+                benchmark_ids = tuple(sorted(
+                    m.id_balance for m in analysis_mappings
+                    if m is not competitor and m.id_balance in balances
+                ))
+                stale.append((id_analysis, competitor, benchmark_ids, source))
+
+        if not stale:
+            return 0, []
+
+        # One KPI value query for every balance of the analyses to recompute
+        needed_ids = set()
+        for _, competitor, benchmark_ids, _ in stale:
+            needed_ids.add(competitor.id_balance)
+            needed_ids.update(benchmark_ids)
+        values_by_balance = defaultdict(list)
+        for kv in db.session.query(
+            KbaiKpiValue.id_kpi, KbaiKpiValue.id_balance, KbaiKpiValue.kpi_name, KbaiKpiValue.value
+        ).filter(KbaiKpiValue.id_balance.in_(needed_ids)).all():
+            values_by_balance[kv.id_balance].append(kv)
+
+        # Competitors of one benchmark share its balances: statistics are computed once
+        stats_by_benchmark = {}
+        rows = []
+        for id_analysis, competitor, benchmark_ids, source in stale:
+            if benchmark_ids not in stats_by_benchmark:
+                stats_by_benchmark[benchmark_ids] = benchmark_stats(
+                    (balances[id_balance].year, kv)
+                    for id_balance in benchmark_ids
+                    for kv in values_by_balance[id_balance]
+                )
+            stats, benchmark_years = stats_by_benchmark[benchmark_ids]
+
+            competitor_values = values_by_balance[competitor.id_balance]
+            rows.extend(
+                dict(row, id_analysis=id_analysis)
+                for row in build_competitor_insights(competitor_values, stats, benchmark_years)
+            )
+            competitor.kpi_list_json = {
+                **(competitor.kpi_list_json or {}),
+                'kpis': {
+                    kv.kpi_name: float(kv.value) if kv.value is not None else None
+                    for kv in competitor_values
+                },
+                'insights_source': source,
+            }
+
+        self.persist(rows, source=f"competitor_benchmark_{parent_report_id}")
+        logger.info(
+            f"Recomputed {len(rows)} competitor KPI insights for {len(stale)} analyses "
+            f"of benchmark report {parent_report_id}"
+        )
+        return len(stale), sorted({
+            balances[id_balance].id_company for id_balance in needed_ids if id_balance in balances
+        })
+
+    def recompute_for_report(self, parent_report_id: int, force: bool = False) -> Tuple[int, Optional[str]]:
+        """
+        Recompute the insights of a benchmark report's competitor comparisons
+        whose balances changed.
+
+        Returns:
+            tuple: (number of analyses recomputed, error)
+        """
+        try:
+            analysis_ids = db.session.query(KbaiReport.id_analysis).filter(
+                KbaiReport.parent_report_id == parent_report_id
+            )
+            mappings = KbaiAnalysisKpi.query.filter(
+                KbaiAnalysisKpi.id_analysis.in_(analysis_ids.scalar_subquery())
+            ).all()
+            count, company_ids = self.recompute_analyses(parent_report_id, mappings, force=force)
+            if count:
+                db.session.commit()
+                # The bulk statements bypass the ORM write hooks
+                response_cache.invalidate_company(*company_ids)
+            return count, None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                f"Error recomputing competitor insights for benchmark report {parent_report_id}: {str(e)}",
+                exc_info=True
+            )
+            return 0, str(e)
+
+    def refresh_for_balance(self, id_balance: int) -> Tuple[int, Optional[str]]:
+        """Recompute the competitor comparisons built on a balance after its KPI set changed"""
+        try:
+            parent_report_ids = [
+                row.parent_report_id
+                for row in db.session.query(KbaiReport.parent_report_id).distinct()
+                .join(KbaiAnalysisKpi, KbaiAnalysisKpi.id_analysis == KbaiReport.id_analysis)
+                .filter(
+                    KbaiAnalysisKpi.id_balance == id_balance,
+                    KbaiReport.parent_report_id.isnot(None)
+                ).all()
+            ]
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error finding competitor comparisons of balance {id_balance}: {str(e)}")
+            return 0, str(e)
+
+        total = 0
+        for parent_report_id in parent_report_ids:
+            count, error = self.recompute_for_report(parent_report_id)
+            if error:
+                return total, error
+            total += count
+        return total, None
+
+
+# Global instance
+competitor_insight_service = CompetitorInsightService()
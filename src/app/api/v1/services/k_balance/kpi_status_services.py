@@ -453,6 +453,21 @@ def build_competitor_suggestion(
     return base_suggestion + competitive_advice
 
 
+def kpi_logic_percentages(deviation) -> tuple:
+    """
+    KpiLogic thresholds for a KPI deviation: negative deviations are critical,
+    the others acceptable.
+
+    Returns:
+        (critical_percentage, acceptable_percentage)
+    """
+    if deviation is None:
+        return 0.0, 0.0
+    if deviation < 0.0:
+        return deviation, 0.0
+    return 0.0, deviation
+
+
 def calculate_competitor_kpi_statuses(
     competitor_kpi_data: Dict[str, float],
     benchmark_kpi_data: Dict[str, list]
@@ -505,7 +520,9 @@ def build_competitor_kpi_insight(
     )
     
     # Calculate percentage difference
-    pct_diff = ((competitor_value - benchmark_baseline) / abs(benchmark_baseline)) * 100 if benchmark_baseline != 0 else 0
+    pct_diff = 0
+    if competitor_value is not None and benchmark_baseline:
+        pct_diff = ((competitor_value - benchmark_baseline) / abs(benchmark_baseline)) * 100
     
     # Build competitor-specific synthesis
     synthesis = build_competitor_synthesis(
@@ -0,0 +1,246 @@
+"""
+Peer Distribution Service
+
+Maintains kbai_kpi_peer_distribution: p10/p25/p50/p75/p90 of every KPI across
+non-competitor companies, grouped by sector division (primary sector), region
+(primary zone) and balance year. Each company contributes one balance per year
+(the most recent month, same rule as the comparison reports).
+
+The full table is rebuilt by scripts/rebuild_peer_distributions.py; single groups
+are refreshed incrementally whenever a balance's KPI set changes or a balance is
+deleted.
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from flask import request
+from sqlalchemy import text
+
+from src.app.database.models import KbaiBalance, KbaiCompany, KbaiKpiValue, KbaiKpiPeerDistribution
+from src.app.database.models.kbai_balance.kbai_kpi_peer_distribution import normalize_peer_region
+from src.app.api.v1.services.common.reference_data_cache import reference_data_cache
+from src.extensions import db
+from src.common.localization import get_message
+
+logger = logging.getLogger(__name__)
+
+
+# One balance per (company, year) for non-competitor companies with a primary
+# zone and sector; {group_filter} narrows it to a single peer group.
+PEER_BALANCES_CTE = """
+    WITH peer_balances AS (
+        SELECT DISTINCT ON (b.id_company, b.year)
+            b.id_balance,
+            b.year,
+            s.division,
+            UPPER(TRIM(z.region)) AS region
+        FROM kbai_balance.kbai_balances b
+        JOIN kbai.kbai_companies c ON c.id_company = b.id_company
+        JOIN kbai.kbai_company_zone cz ON cz.id_company = c.id_company AND cz.primary_flag = TRUE
+        JOIN kbai.kbai_zone z ON z.id_zone = cz.id_zone
+        JOIN kbai.kbai_company_sector cs ON cs.id_company = c.id_company AND cs.primary_flag = TRUE
+        JOIN kbai.kbai_sectors s ON s.id_sector = cs.id_sector
+        WHERE b.is_deleted = FALSE
+          AND c.is_deleted = FALSE
+          AND COALESCE(c.is_competitor, FALSE) = FALSE
+          AND s.division IS NOT NULL
+          AND z.region IS NOT NULL
+          {group_filter}
+        ORDER BY b.id_company, b.year, b.month DESC, b.id_balance DESC
+    )
+"""
+
+UPSERT_DISTRIBUTIONS = """
+    INSERT INTO kbai_balance.kbai_kpi_peer_distribution
+        (division, region, year, kpi_name, sample_size, p10, p25, p50, p75, p90, mean, updated_at)
+    SELECT
+        pb.division,
+        pb.region,
+        pb.year,
+        v.kpi_name,
+        COUNT(*),
+        percentile_cont(0.10) WITHIN GROUP (ORDER BY v.value),
+        percentile_cont(0.25) WITHIN GROUP (ORDER BY v.value),
+        percentile_cont(0.50) WITHIN GROUP (ORDER BY v.value),
+        percentile_cont(0.75) WITHIN GROUP (ORDER BY v.value),
+        percentile_cont(0.90) WITHIN GROUP (ORDER BY v.value),
+        AVG(v.value),
+        NOW()
+    FROM peer_balances pb
+    JOIN kbai_balance.kbai_kpi_values v ON v.id_balance = pb.id_balance
+    GROUP BY pb.division, pb.region, pb.year, v.kpi_name
+    ON CONFLICT (division, region, year, kpi_name) DO UPDATE SET
+        sample_size = EXCLUDED.sample_size,
+        p10 = EXCLUDED.p10,
+        p25 = EXCLUDED.p25,
+        p50 = EXCLUDED.p50,
+        p75 = EXCLUDED.p75,
+        p90 = EXCLUDED.p90,
+        mean = EXCLUDED.mean,
+        updated_at = EXCLUDED.updated_at
+"""
+
+GROUP_FILTER = "AND s.division = :division AND UPPER(TRIM(z.region)) = :region AND b.year = :year"
+
+
+class PeerDistributionService:
+    """Builds and queries the precomputed peer KPI distributions"""
+
+    def rebuild_all(self) -> Tuple[int, Optional[str]]:
+        """
+        Recompute every peer group from scratch.
+
+        Returns:
+            tuple: (number of distribution rows written, error)
+        """
+        try:
+            db.session.execute(text("DELETE FROM kbai_balance.kbai_kpi_peer_distribution"))
+            result = db.session.execute(text(
+                PEER_BALANCES_CTE.format(group_filter="") + UPSERT_DISTRIBUTIONS
+            ))
+            db.session.commit()
+            logger.info(f"Rebuilt peer KPI distributions: {result.rowcount} rows")
+            return result.rowcount, None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error rebuilding peer KPI distributions: {str(e)}", exc_info=True)
+            return 0, str(e)
+
+    def refresh_group(self, division: str, region: str, year: int) -> Tuple[int, Optional[str]]:
+        """
+        Recompute the distributions of one (division, region, year) peer group.
+
+        Returns:
+            tuple: (number of distribution rows written, error)
+        """
+        params = {'division': division, 'region': normalize_peer_region(region), 'year': year}
+        try:
+            # Drop the group first so KPIs that no longer have values disappear
+            db.session.execute(text(
+                "DELETE FROM kbai_balance.kbai_kpi_peer_distribution "
+                "WHERE division = :division AND region = :region AND year = :year"
+            ), params)
+            result = db.session.execute(text(
+                PEER_BALANCES_CTE.format(group_filter=GROUP_FILTER) + UPSERT_DISTRIBUTIONS
+            ), params)
+            db.session.commit()
+            logger.info(
+                f"Refreshed peer KPI distribution for division={division}, "
+                f"region={params['region']}, year={year}: {result.rowcount} rows"
+            )
+            return result.rowcount, None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                f"Error refreshing peer KPI distribution for division={division}, "
+                f"region={region}, year={year}: {str(e)}",
+                exc_info=True
+            )
+            return 0, str(e)
+
+    def refresh_for_company_year(self, id_company: int, year: int) -> Tuple[int, Optional[str]]:
+        """Refresh the peer group a company's balance for a year belongs to (competitors are skipped)"""
+        try:
+            is_competitor = db.session.query(KbaiCompany.is_competitor).filter(
+                KbaiCompany.id_company == id_company
+            ).scalar()
+            if is_competitor:
+                return 0, None
+
+            profile = reference_data_cache.company_profile(id_company) or {}
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error resolving peer group for company {id_company}: {str(e)}")
+            return 0, str(e)
+
+        if not profile.get('division') or not profile.get('region'):
+            return 0, None
+        return self.refresh_group(profile['division'], profile['region'], year)
+
+    def refresh_for_balance(self, id_balance: int) -> Tuple[int, Optional[str]]:
+        """Refresh the peer group of a balance after its KPI set changed"""
+        try:
+            balance = db.session.query(KbaiBalance.id_company, KbaiBalance.year).filter(
+                KbaiBalance.id_balance == id_balance
+            ).first()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error loading balance {id_balance} for peer refresh: {str(e)}")
+            return 0, str(e)
+        if not balance:
+            return 0, None
+        return self.refresh_for_company_year(balance.id_company, balance.year)
+
+    def get_company_peer_position(self, current_user, company_id: int, year: int = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Place a company's KPIs in its peer distribution.
+
+        Uses the company's balance for the given year (latest year if omitted)
+        and the precomputed distribution of its division/region/year group.
+
+        Returns:
+            Tuple of (response_data, status_code)
+        """
+        locale = request.headers.get('Accept-Language', 'en')
+        try:
+            from src.app.api.v1.services.k_balance.comparison_report_service import ComparisonReportService
+
+            has_access, error_msg = ComparisonReportService().check_company_access(current_user, company_id)
+            if not has_access:
+                return {"message": error_msg}, 403
+
+            profile = reference_data_cache.company_profile(company_id)
+            if profile is None:
+                return {"message": get_message("company_not_found", locale)}, 404
+
+            query = KbaiBalance.metadata_query(with_data=True, id_company=company_id)
+            if year is not None:
+                query = query.filter(KbaiBalance.year == year)
+            balance = query.order_by(
+                KbaiBalance.year.desc(), KbaiBalance.month.desc(), KbaiBalance.id_balance.desc()
+            ).first()
+            if not balance:
+                return {"message": get_message("no_balance_sheets_found", locale)}, 404
+
+            kpi_values = db.session.query(KbaiKpiValue.kpi_name, KbaiKpiValue.value).filter(
+                KbaiKpiValue.id_balance == balance.id_balance
+            ).all()
+
+            distributions = {}
+            if profile.get('division') and profile.get('region'):
+                distributions = {
+                    row.kpi_name: row
+                    for row in KbaiKpiPeerDistribution.lookup(profile['division'], profile['region'], balance.year)
+                }
+
+            kpis = []
+            for kpi_name, value in kpi_values:
+                value = float(value) if value is not None else None
+                distribution = distributions.get(kpi_name)
+                item = {"kpi_name": kpi_name, "value": value, "distribution": None, "position": None}
+                if distribution:
+                    item["distribution"] = distribution.to_dict()
+                    item["position"] = distribution.position(value)
+                kpis.append(item)
+
+            return {
+                "message": get_message("peer_position_retrieved_success", locale),
+                "data": {
+                    "id_company": company_id,
+                    "id_balance": balance.id_balance,
+                    "year": balance.year,
+                    "division": profile.get('division'),
+                    "region": profile.get('region'),
+                    "kpis": kpis
+                },
+                "success": True
+            }, 200
+
+        except Exception as e:
+            logger.error(f"Error in get_company_peer_position: {str(e)}", exc_info=True)
+            return {"message": get_message("peer_position_retrieve_failed", locale), "error_details": str(e)}, 500
+
+
+# Global instance
+peer_distribution_service = PeerDistributionService()
@@ -4,9 +4,12 @@ from datetime import datetime
 
 from flask import current_app, request
 from src.common.localization import get_message
+from src.common.pagination import InvalidCursorError, keyset_pagination
 
 from src.app.database.models import KbaiCompany, TbLicences, TbUser, TbUserCompany, kbai_balance
 from src.app.api.v1.services.public.license_service import LicenseManager
+from src.app.api.v1.services.common.reference_data_cache import reference_data_cache
+from src.app.api.v1.services.common.response_cache import response_cache, COMPANIES_TAG
 from src.extensions import db
 
 logger = logging.getLogger(__name__)
@@ -182,14 +185,8 @@ class KbaiCompaniesService:
                     'success': False
                 }, 400
                 
-            from src.app.database.models.kbai import KbaiSector
-            from sqlalchemy import func
-            
             division = ateco_val[:2] if len(ateco_val) >= 2 else ateco_val
-            sector_exists = db.session.query(KbaiSector).filter(
-                KbaiSector.division == division,
-                func.upper(KbaiSector.region) == func.upper(region_val)
-            ).first()
+            sector_exists = reference_data_cache.find_sector(division, region_val)
             
             if not sector_exists:
                 return {
@@ -258,29 +255,25 @@ class KbaiCompaniesService:
             # Handle ateco -> lookup and link sector
             if ateco_value and region_value:
                 try:
-                    from src.app.database.models.kbai import KbaiSector, KbaiCompanySector
-                    from sqlalchemy import func
+                    from src.app.database.models.kbai import KbaiCompanySector
                     
                     # Extract division (first 2 digits of ateco)
                     division = ateco_value[:2] if len(ateco_value) >= 2 else ateco_value
                     
                     # Lookup sector by division and region
-                    sector = db.session.query(KbaiSector).filter(
-                        KbaiSector.division == division,
-                        func.upper(KbaiSector.region) == func.upper(region_value)
-                    ).first()
+                    sector = reference_data_cache.find_sector(division, region_value)
                     
                     if sector:
                         # Link company to sector
                         company_sector, cs_error = KbaiCompanySector.create({
                             'id_company': company.id_company,
-                            'id_sector': sector.id_sector,
+                            'id_sector': sector['id_sector'],
                             'primary_flag': True
                         })
                         if cs_error:
                             current_app.logger.warning(f"Error linking company to sector: {cs_error}")
                         else:
-                            current_app.logger.info(f"Company {company.id_company} linked to sector {sector.id_sector}")
+                            current_app.logger.info(f"Company {company.id_company} linked to sector {sector['id_sector']}")
                     else:
                         current_app.logger.warning(f"No sector found for division={division} and region={region_value}")
                 except Exception as e:
@@ -354,29 +347,12 @@ class KbaiCompaniesService:
             # Fetch region and ateco details
             company_data = company.to_dict()
             
-            # 1. Get region from Primary Zone
-            from src.app.database.models.kbai import KbaiCompanyZone, KbaiZone
-            zone_mapping = KbaiCompanyZone.query.filter_by(
-                id_company=company.id_company, 
-                primary_flag=True
-            ).first()
-            
-            if zone_mapping:
-                zone = KbaiZone.query.get(zone_mapping.id_zone)
-                if zone:
-                    company_data['region'] = zone.region
-            
-            # 2. Get ateco from Primary Sector
-            from src.app.database.models.kbai import KbaiCompanySector, KbaiSector
-            sector_mapping = KbaiCompanySector.query.filter_by(
-                id_company=company.id_company, 
-                primary_flag=True
-            ).first()
-            
-            if sector_mapping:
-                sector = KbaiSector.query.get(sector_mapping.id_sector)
-                if sector:
-                    company_data['ateco'] = sector.division
+            # Region from primary zone, ateco from primary sector (reference data cache)
+            profile = reference_data_cache.company_profile(company.id_company) or {}
+            if profile.get('id_zone'):
+                company_data['region'] = profile['region']
+            if profile.get('id_sector'):
+                company_data['ateco'] = profile['division']
 
             return {
                 'message': get_message('company_retrieved_success', locale),
@@ -448,27 +424,14 @@ class KbaiCompaniesService:
             current_region = None
             current_ateco = None
             
-            from src.app.database.models.kbai import KbaiCompanyZone, KbaiZone, KbaiCompanySector, KbaiSector
+            from src.app.database.models.kbai import KbaiCompanyZone, KbaiZone, KbaiCompanySector
             
-            # Get current region mapping
-            zone_mapping = KbaiCompanyZone.query.filter_by(
-                id_company=company.id_company, 
-                primary_flag=True
-            ).first()
-            if zone_mapping:
-                zone = KbaiZone.query.get(zone_mapping.id_zone)
-                if zone:
-                    current_region = zone.region
-            
-            # Get current ateco mapping
-            sector_mapping = KbaiCompanySector.query.filter_by(
-                id_company=company.id_company, 
-                primary_flag=True
-            ).first()
-            if sector_mapping:
-                sector = KbaiSector.query.get(sector_mapping.id_sector)
-                if sector:
-                    current_ateco = sector.division
+            # Get current region and ateco mapping
+            profile = reference_data_cache.company_profile(company.id_company) or {}
+            if profile.get('id_zone'):
+                current_region = profile['region']
+            if profile.get('id_sector'):
+                current_ateco = profile['division']
 
             # VALIDATION: Check region and ateco combination if being updated
             new_region = (region_value.strip() if region_value else None) or current_region
@@ -481,12 +444,8 @@ class KbaiCompaniesService:
                         'success': False
                     }, 400
                 
-                from sqlalchemy import func
                 div = new_ateco[:2] if len(new_ateco) >= 2 else new_ateco
-                s_exists = db.session.query(KbaiSector).filter(
-                    KbaiSector.division == div,
-                    func.upper(KbaiSector.region) == func.upper(new_region)
-                ).first()
+                s_exists = reference_data_cache.find_sector(div, new_region)
                 
                 if not s_exists:
                     return {
@@ -516,6 +475,10 @@ class KbaiCompaniesService:
                         
                         if not zone_error:
                             # Update or create link
+                            zone_mapping = KbaiCompanyZone.query.filter_by(
+                                id_company=company.id_company,
+                                primary_flag=True
+                            ).first()
                             if zone_mapping:
                                 zone_mapping.id_zone = new_zone.id_zone
                             else:
@@ -536,20 +499,20 @@ class KbaiCompaniesService:
                 
                 if (ateco_value or region_value) and a_val and r_val:
                     try:
-                        from sqlalchemy import func
                         division = a_val[:2] if len(a_val) >= 2 else a_val
-                        sector = db.session.query(KbaiSector).filter(
-                            KbaiSector.division == division,
-                            func.upper(KbaiSector.region) == func.upper(r_val)
-                        ).first()
+                        sector = reference_data_cache.find_sector(division, r_val)
                         
                         if sector:
+                            sector_mapping = KbaiCompanySector.query.filter_by(
+                                id_company=company.id_company,
+                                primary_flag=True
+                            ).first()
                             if sector_mapping:
-                                sector_mapping.id_sector = sector.id_sector
+                                sector_mapping.id_sector = sector['id_sector']
                             else:
                                 KbaiCompanySector.create({
                                     'id_company': company.id_company,
-                                    'id_sector': sector.id_sector,
+                                    'id_sector': sector['id_sector'],
                                     'primary_flag': True
                                 })
                             db.session.commit()
@@ -653,8 +616,10 @@ class KbaiCompaniesService:
     # -----------------------------------------------------------------------
     # FIND - Find companies with filtering and pagination
     # -----------------------------------------------------------------------
+    @response_cache.cached('companies', tags=lambda params: [COMPANIES_TAG])
     def find(self, page: int = 1, per_page: int = None, 
-             search: str = None, **filters) -> Tuple[Dict[str, Any], int]:
+             search: str = None, cursor: str = None, keyset: bool = False,
+             count_mode: str = 'exact', **filters) -> Tuple[Dict[str, Any], int]:
         """
         Find companies with filtering and pagination (always sorted by latest first)
         
@@ -662,6 +627,9 @@ class KbaiCompaniesService:
             page: Page number (1-based)
             per_page: Items per page
             search: Search term for company name, contact person, or email
+            cursor: Keyset cursor from the previous page (implies keyset)
+            keyset: Keyset pagination on (created_at, id_company) instead of page numbers
+            count_mode: Total count mode: 'exact', 'estimate' or 'none'
             **filters: Field filters like email='test@example.com', id_licence=1, status_flag='ACTIVE', etc.
             
         Returns:
@@ -684,14 +652,23 @@ class KbaiCompaniesService:
             page = max(1, page)
             
             # Use flexible model method with is_deleted filter
-            companies, total, error = KbaiCompany.find(
-                page=page,
-                per_page=per_page,
-                search=search,
-                is_deleted=False,
-                is_competitor=False,
-                **filters
-            )
+            try:
+                companies, total, error = KbaiCompany.find(
+                    page=page,
+                    per_page=per_page,
+                    search=search,
+                    cursor=cursor,
+                    keyset=keyset,
+                    count_mode=count_mode,
+                    is_deleted=False,
+                    is_competitor=False,
+                    **filters
+                )
+            except InvalidCursorError:
+                return {
+                    'error': 'Validation error',
+                    'message': get_message('invalid_pagination_cursor', locale)
+                }, 400
             
             if error:
                 current_app.logger.error(f"Error finding companies: {error}")
@@ -714,15 +691,20 @@ class KbaiCompaniesService:
                 ebitda_status = self.calculate_ebitda_status(company_data['id_company'])
                 company_data['ebitda_status'] = ebitda_status
                 
-            return {
-                'message': get_message('companies_retrieved_success', locale),
-                'data': companies_data,
-                'pagination': {
+            if keyset or cursor:
+                pagination = keyset_pagination(companies, per_page, total)
+            else:
+                pagination = {
                     'page': page,
                     'per_page': per_page,
                     'total': total,
-                    'pages': (total + per_page - 1) // per_page
-                },
+                    'pages': (total + per_page - 1) // per_page if total is not None else None
+                }
+
+            return {
+                'message': get_message('companies_retrieved_success', locale),
+                'data': companies_data,
+                'pagination': pagination,
                 'success': True
             }, 200
             
@@ -905,6 +887,7 @@ class KbaiCompaniesService:
     # -----------------------------------------------------------------------
     # FIND BY USER - Get companies assigned to specific user (with pagination)
     # -----------------------------------------------------------------------
+    @response_cache.cached('user_companies', tags=lambda params: [COMPANIES_TAG])
     def find_by_user(self, tb_user_id: int, page: int = 1, per_page: int = None, 
                      search: str = None, status: str = None) -> Tuple[Dict[str, Any], int]:
         """
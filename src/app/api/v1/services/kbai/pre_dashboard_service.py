@@ -11,6 +11,7 @@ from flask import current_app, request
 from src.common.localization import get_message
 
 from src.app.database.models import KbaiPreDashboard, KbaiCompany
+from src.app.api.v1.services.common.response_cache import response_cache, company_tag
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,28 @@ class KbaiPreDashboardService:
     def __init__(self):
         pass
     
+    # -----------------------------------------------------------------------
+    # REFRESH COUNTERS - Keep stored balance counters in sync after writes
+    # -----------------------------------------------------------------------
+    def refresh_counters(self, company_id: int) -> bool:
+        """
+        Recompute the stored balance counters of a company's pre-dashboard.
+        
+        Called by the balance upload, delete and import paths so that reads
+        never have to count balances. Failures are logged, not raised.
+        
+        Args:
+            company_id: Company ID
+            
+        Returns:
+            True if the counters were refreshed
+        """
+        pre_dashboard, error = KbaiPreDashboard.refresh_balance_counters(company_id)
+        if error:
+            logger.warning(f"Could not refresh pre-dashboard counters for company {company_id}: {error}")
+            return False
+        return True
+    
     # -----------------------------------------------------------------------
     # CHECK BALANCE SHEET COUNT - Check if company has enough balance sheets
     # -----------------------------------------------------------------------
@@ -28,6 +51,9 @@ class KbaiPreDashboardService:
         Check if company has at least 2 balance sheets (required for comparison step).
         Returns count, flag (true if >= 2), and file names as objects with id_balance.
         
+        Reads the stored pre-dashboard counters; they are computed once if the
+        record predates them.
+        
         Args:
             company_id: Company ID
             
@@ -35,41 +61,12 @@ class KbaiPreDashboardService:
             Dictionary with count, flag, and file names as objects with id_balance
         """
         try:
-            from src.app.database.models import KbaiBalance
-            
-            # Get all balance sheets that are not deleted and have balance data
-            balance_sheets = (
-                KbaiBalance.query
-                .filter_by(id_company=company_id, is_deleted=False)
-                .filter(KbaiBalance.balance.isnot(None))
-                .order_by(KbaiBalance.created_at.asc())
-                .all()
-            )
-            
-            total_count = len(balance_sheets)
-
-            display_balance_sheets = balance_sheets[:2]
-            balance_count = len(display_balance_sheets)
-            
-            # Extract file info as objects with id_balance
-            file_names = []
-            for balance_sheet in display_balance_sheets:
-                file_info = {
-                    'id_balance': balance_sheet.id_balance,
-                    'file': balance_sheet.file if balance_sheet.file else None
-                }
-                file_names.append(file_info)
-            
-            # Flag is true if count >= 2 (user has uploaded 2 balance sheets)
-            flag = total_count >= 2
-            
-            return {
-                'balance_sheet_count': balance_count,
-                'flag': flag,
-                'file_names': file_names,
-                'can_compare': flag,
-                'step_compare_enabled': flag
-            }
+            pre_dashboard = KbaiPreDashboard.findOne(id_company=company_id)
+            if pre_dashboard and pre_dashboard.counters_updated_at is None:
+                pre_dashboard, _ = KbaiPreDashboard.refresh_balance_counters(company_id)
+            if not pre_dashboard:
+                raise ValueError("Pre-dashboard record not found")
+            return pre_dashboard.balance_status()
             
         except Exception as e:
             current_app.logger.error(f"Error checking balance sheet count for company {company_id}: {str(e)}")
@@ -85,6 +82,7 @@ class KbaiPreDashboardService:
     # -----------------------------------------------------------------------
     # FIND ONE - Get pre-dashboard by company ID
     # -----------------------------------------------------------------------
+    @response_cache.cached('pre_dashboard', tags=lambda params: [company_tag(params['company_id'])])
     def findOne(self, company_id: int) -> Tuple[Dict[str, Any], int]:
         """
         Get pre-dashboard by company ID
@@ -97,18 +95,26 @@ class KbaiPreDashboardService:
         """
         try:
             locale = request.headers.get('Accept-Language', 'en')
-            # Check if company exists
-            company = KbaiCompany.findOne(id_company=company_id)
-            if not company:
-                return {
-                    'error': 'Not found',
-                    'message': get_message('company_not_found', locale)
-                }, 404
-            
-            # Get pre-dashboard record
+            # Single primary-key lookup; counters are maintained on balance writes
             pre_dashboard = KbaiPreDashboard.findOne(id_company=company_id)
             
+            if pre_dashboard and pre_dashboard.counters_updated_at is None:
+                # Record predates the stored counters: compute them once
+                refreshed, refresh_error = KbaiPreDashboard.refresh_balance_counters(company_id)
+                if refreshed:
+                    pre_dashboard = refreshed
+                else:
+                    logger.error(f"Failed to compute pre-dashboard counters for company {company_id}: {refresh_error}")
+            
             if not pre_dashboard:
+                # Check if company exists
+                company = KbaiCompany.findOne(id_company=company_id)
+                if not company:
+                    return {
+                        'error': 'Not found',
+                        'message': get_message('company_not_found', locale)
+                    }, 404
+                
                 # Pre-dashboard should have been created when company was created
                 # Return detailed diagnostic information to help identify the issue
                 error_details = {
@@ -130,42 +136,21 @@ class KbaiPreDashboardService:
                         'suggestion': 'Check company creation logs for pre-dashboard creation errors. Verify table schema matches between environments.'
                     }
                 }
-                
+            
                 current_app.logger.error(
                     f"Pre-dashboard not found for company {company_id}. "
                     f"Company exists but pre-dashboard was never created. "
                     f"Check company creation logs for errors."
                 )
-                
+            
                 return {
                     'error': 'Not found',
                     'message': get_message('pre_dashboard_not_found_msg', locale),
                     'details': error_details
                 }, 404
-            
-            
-            # Add balance sheet count check with count, flag, and file names
-            balance_check = self.check_balance_sheet_count(company_id)
-            
-            # Auto-update step_upload if 2 or more balance sheets exist
-            if balance_check['balance_sheet_count'] >= 2 and not pre_dashboard.step_upload:
-                success, update_error = pre_dashboard.update({'step_upload': True})
-                if success:
-                    logger.info(f"Auto-updated step_upload to true for company {company_id} (balance_count: {balance_check['balance_sheet_count']})")
-                    # Re-query to get updated object from database
-                    pre_dashboard = KbaiPreDashboard.findOne(id_company=company_id)
-                    if pre_dashboard:
-                        # Get updated data after step_upload update
-                        pre_dashboard_data = pre_dashboard.to_dict()
-                    else:
-                        logger.error(f"Failed to re-query pre-dashboard after update for company {company_id}")
-                        pre_dashboard_data = pre_dashboard.to_dict()
-                else:
-                    logger.error(f"Failed to auto-update step_upload for company {company_id}: {update_error}")
-                    pre_dashboard_data = pre_dashboard.to_dict()
-            else:
-                # Get pre-dashboard data (no update needed)
-                pre_dashboard_data = pre_dashboard.to_dict()
+
+            balance_check = pre_dashboard.balance_status()
+            pre_dashboard_data = pre_dashboard.to_dict()
             
             pre_dashboard_data['step_status'] = {
                 'balance_sheet_count': balance_check['balance_sheet_count'],
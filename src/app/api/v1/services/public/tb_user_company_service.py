@@ -11,6 +11,7 @@ from datetime import datetime
 from flask import current_app
 from src.extensions import db
 from src.app.database.models import TbUserCompany, KbaiCompany, TbUser
+from src.app.api.v1.services.common.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -142,8 +143,15 @@ class TbUserCompanyService:
             Tuple of (success, error_message, removed_count)
         """
         try:
+            company_ids = [
+                row.id_company for row in
+                db.session.query(TbUserCompany.id_company).filter_by(id_user=user_id).all()
+            ]
             count = TbUserCompany.query.filter_by(id_user=user_id).delete()
             db.session.commit()
+            # Bulk query deletes bypass the ORM events of the response cache: drop the
+            # cached results of the companies so the revoked access is checked again
+            response_cache.invalidate_company(*company_ids)
             
             logger.info(f"Removed {count} company mappings for user {user_id}")
             return True, None, count
@@ -208,6 +216,10 @@ class TbUserCompanyService:
                     logger.info(f"Removed company {company_id} from user {user_id}")
             
             db.session.commit()
+            if companies_to_remove:
+                # Bulk query deletes bypass the ORM events of the response cache: drop the
+                # cached results of the companies so the revoked access is checked again
+                response_cache.invalidate_company(*companies_to_remove)
             
             update_info = {
                 'companies_added': added_count,
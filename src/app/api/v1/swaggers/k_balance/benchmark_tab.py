@@ -160,7 +160,7 @@ benchmarks_report_list_response = benchmark_ns.model('BenchmarksReportrListRespo
         example='Benchmark reports retrieved successfully'
     ),
     'data': fields.Raw(
-        description='Benchmark report data',
+        description='Benchmark report data (keyset mode pagination: per_page, next_cursor, has_more)',
         example={
             'balance_sheets': [
                {
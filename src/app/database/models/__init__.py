@@ -34,6 +34,10 @@ from .kbai_balance import (
     KbaiReport,
     KbaiGoalObjective,
     KbaiGoalProgress,
+    KbaiKpiPeerDistribution,
+    KbaiPredictionSummary,
+    KbaiCustomScenario,
+    KbaiHistoricalAggregate,
 )
 
 __all__ = [
@@ -62,6 +66,10 @@ __all__ = [
     'KbaiReport',
     'KbaiGoalObjective',
     'KbaiGoalProgress',
+    'KbaiKpiPeerDistribution',
+    'KbaiPredictionSummary',
+    'KbaiCustomScenario',
+    'KbaiHistoricalAggregate',
     'KbaiThreshold',
 ]
 
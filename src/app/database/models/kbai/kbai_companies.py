@@ -269,7 +269,9 @@ class KbaiCompany(Base):
     # Find companies with filtering and pagination
     # -----------------------------------------------------------------------------
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None, **filters) -> Tuple[List['KbaiCompany'], int, str]:
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact',
+             **filters) -> Tuple[List['KbaiCompany'], Optional[int], str]:
         """
         Find companies with filtering and pagination (always sorted by latest first)
         
@@ -278,6 +280,10 @@ class KbaiCompany(Base):
             per_page: Items per page
             search: Search term for company name, contact person, or email
             select_columns: List of column names to select (optional)
+            cursor: Keyset cursor from a previous page (implies keyset)
+            keyset: Page on (created_at, id_company) instead of OFFSET; the result
+                list is then a KeysetPage carrying next_cursor
+            count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none' (total is None)
             **filters: Field filters like email='test@example.com', id_licence=1, status_flag='ACTIVE', etc.
             
         Returns:
@@ -289,10 +295,20 @@ class KbaiCompany(Base):
             KbaiCompany.find(email='test@example.com')  # Filter by email
             KbaiCompany.find(id_licence=1, status_flag='ACTIVE')  # Multiple filters
             KbaiCompany.find(search='Tech')  # Search in company name
+            KbaiCompany.find(keyset=True, count_mode='none')  # First keyset page, no COUNT
+            KbaiCompany.find(cursor=companies.next_cursor)  # Next keyset page
         """
+        from src.common.pagination import InvalidCursorError, keyset_query, keyset_page, resolve_total
+
+        keyset = keyset or bool(cursor)
         try:
             # Build select statement
             if select_columns:
+                # Keyset cursors are built from the sort key and primary key
+                if keyset:
+                    select_columns = list(select_columns) + [
+                        name for name in ('created_at', 'id_company') if name not in select_columns
+                    ]
                 # Convert column names to actual column objects
                 columns = []
                 for col_name in select_columns:
@@ -338,11 +354,16 @@ class KbaiCompany(Base):
                         cls.email.ilike(f'%{search}%')
                     )
                 )
-            total = db.session.execute(count_stmt).scalar()
+            total = resolve_total(
+                count_mode, lambda: db.session.execute(count_stmt).scalar(), stmt=stmt.order_by(None)
+            )
             
             # Get paginated results
-            offset = (page - 1) * per_page
-            stmt = stmt.offset(offset).limit(per_page)
+            if keyset:
+                stmt = keyset_query(stmt, cls.created_at, cls.id_company, per_page, cursor)
+            else:
+                offset = (page - 1) * per_page
+                stmt = stmt.offset(offset).limit(per_page)
             
             if select_columns:
                 # When using select_columns, we get Row objects
@@ -351,8 +372,12 @@ class KbaiCompany(Base):
                 # When selecting full objects, use scalars() to get KbaiCompany objects
                 result = db.session.scalars(stmt).all()
             
+            if keyset:
+                result = keyset_page(result, per_page, 'created_at', 'id_company')
             return result, total, None
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return [], 0, f"Error listing companies: {str(e)}"
     
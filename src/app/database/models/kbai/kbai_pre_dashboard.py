@@ -5,7 +5,7 @@ Tracks the progress of a company through pre-dashboard setup or data processing
 Each company has one pre-dashboard record that tracks completion of various steps.
 """
 
-from sqlalchemy import Column, BigInteger, Boolean, DateTime, ForeignKey, Index, select
+from sqlalchemy import Column, BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, JSON, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.exc import SQLAlchemyError
 from src.extensions import db
@@ -37,6 +37,12 @@ class KbaiPreDashboard(Base):
     
     # Overall completion
     completed_flag = Column(Boolean, default=False, nullable=False)  # All steps completed
+
+    # Balance counters maintained by the balance upload/delete/import paths
+    # (see refresh_balance_counters); NULL counters_updated_at means never computed
+    balance_count = Column(Integer, default=0, nullable=False, server_default='0')  # Active balances with data
+    first_balances = Column(JSON)  # First two balances with data: [{'id_balance', 'file'}]
+    counters_updated_at = Column(DateTime)
     
     # Relationships
     company = relationship('KbaiCompany', back_populates='pre_dashboard')
@@ -180,6 +186,71 @@ class KbaiPreDashboard(Base):
             db.session.rollback()
             return False, f"Error updating pre-dashboard record: {str(e)}"
     
+    # -----------------------------------------------------------------------------
+    # Refresh stored balance counters
+    # -----------------------------------------------------------------------------
+    @classmethod
+    def refresh_balance_counters(cls, id_company: int) -> Tuple[Optional['KbaiPreDashboard'], str]:
+        """
+        Recompute the stored balance counters of a company after its balances changed
+        
+        Stores the number of active balances with data and the first two of them
+        (by upload time), and marks step_upload once two balances exist.
+        
+        Args:
+            id_company: Company ID
+            
+        Returns:
+            Tuple of (updated_pre_dashboard, error_message)
+        """
+        from src.app.database.models.kbai_balance.kbai_balances import KbaiBalance
+
+        try:
+            pre_dashboard = db.session.get(cls, id_company)
+            if not pre_dashboard:
+                return None, "Pre-dashboard record not found"
+
+            total = KbaiBalance.count_with_data(id_company)
+            first_balances = (
+                KbaiBalance.metadata_query(with_data=True, id_company=id_company)
+                .with_entities(KbaiBalance.id_balance, KbaiBalance.file)
+                .order_by(KbaiBalance.created_at.asc(), KbaiBalance.id_balance.asc())
+                .limit(2)
+                .all()
+            ) if total else []
+
+            pre_dashboard.balance_count = total
+            pre_dashboard.first_balances = [
+                {'id_balance': row.id_balance, 'file': row.file if row.file else None}
+                for row in first_balances
+            ]
+            pre_dashboard.counters_updated_at = datetime.utcnow()
+            if total >= 2 and not pre_dashboard.step_upload:
+                pre_dashboard.step_upload = True
+                pre_dashboard._update_completed_flag()
+
+            db.session.commit()
+            return pre_dashboard, None
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, f"Database error: {str(e)}"
+        except Exception as e:
+            db.session.rollback()
+            return None, f"Error refreshing pre-dashboard counters: {str(e)}"
+
+    def balance_status(self) -> Dict[str, Any]:
+        """Balance sheet status from the stored counters (first two balances and their files)"""
+        file_names = list(self.first_balances or [])
+        flag = (self.balance_count or 0) >= 2
+        return {
+            'balance_sheet_count': len(file_names),
+            'flag': flag,
+            'file_names': file_names,
+            'can_compare': flag,
+            'step_compare_enabled': flag
+        }
+
     # -----------------------------------------------------------------------------
     # Delete pre-dashboard record
     # -----------------------------------------------------------------------------
@@ -16,6 +16,10 @@ from .kpi_logic import KpiLogic
 from .kbai_reports import KbaiReport
 from .kbai_goal_objectives import KbaiGoalObjective
 from .kbai_goal_progress import KbaiGoalProgress
+from .kbai_kpi_peer_distribution import KbaiKpiPeerDistribution
+from .kbai_prediction_summary import KbaiPredictionSummary
+from .kbai_custom_scenarios import KbaiCustomScenario
+from .kbai_historical_aggregates import KbaiHistoricalAggregate
 
 __all__ = [
     'KbaiBalance',
@@ -26,5 +30,9 @@ __all__ = [
     'KpiLogic',
     'KbaiReport',
     'KbaiGoalObjective',
-    'KbaiGoalProgress'
+    'KbaiGoalProgress',
+    'KbaiKpiPeerDistribution',
+    'KbaiPredictionSummary',
+    'KbaiCustomScenario',
+    'KbaiHistoricalAggregate',
 ]
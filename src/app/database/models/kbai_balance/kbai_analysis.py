@@ -1,7 +1,9 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, func
+from sqlalchemy import Column, BigInteger, String, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from datetime import datetime
+from typing import Iterable, Optional, Tuple
+import hashlib
 
 from src.extensions import db
 
@@ -13,12 +15,17 @@ class KbaiAnalysis(Base):
     KBAI Analysis model for storing analysis data
     """
     __tablename__ = 'kbai_analysis'
-    __table_args__ = {'schema': 'kbai_balance'}
+    __table_args__ = (
+        Index('idx_kbai_analysis_fingerprint', 'balance_fingerprint', 'analysis_type'),
+        {'schema': 'kbai_balance'}
+    )
 
     id_analysis = Column(BigInteger, primary_key=True, autoincrement=True)
     analysis_name = Column(String(255), nullable=False)
     analysis_type = Column(String(255), nullable=False)
     time = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # SHA-256 of the sorted (id_balance, balance_type) set mapped to this analysis
+    balance_fingerprint = Column(String(64))
     # created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     # updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     # is_deleted = Column(String(1), default='N', nullable=False)
@@ -29,6 +36,23 @@ class KbaiAnalysis(Base):
     analysis_kpi_infos = relationship('AnalysisKpiInfo', back_populates='analysis')
     reports = relationship('KbaiReport', back_populates='analysis')
 
+    @staticmethod
+    def compute_balance_fingerprint(entries: Iterable[Tuple[int, Optional[str]]]) -> Optional[str]:
+        """SHA-256 of the sorted (id_balance, balance_type) set of an analysis (None when empty)"""
+        pairs = sorted({(int(id_balance), balance_type or '') for id_balance, balance_type in entries})
+        if not pairs:
+            return None
+        canonical = ','.join(f'{id_balance}:{balance_type}' for id_balance, balance_type in pairs)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def fingerprint_query(cls, fingerprint: str, analysis_type: str = None):
+        """Query analyses with the given balance fingerprint (indexed equality lookup)"""
+        query = cls.query.filter(cls.balance_fingerprint == fingerprint)
+        if analysis_type:
+            query = query.filter(cls.analysis_type == analysis_type)
+        return query
+
     def to_dict(self):
         """Convert model to dictionary"""
         return {
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, String, func
+from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, String, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSON
 from datetime import datetime
@@ -13,7 +13,11 @@ class KbaiAnalysisKpi(Base):
     KBAI Analysis KPI junction model
     """
     __tablename__ = 'kbai_analysis_kpi'
-    __table_args__ = {'schema': 'kbai_balance'}
+    __table_args__ = (
+        # Primary key leads with id_balance; lookups by analysis need their own index
+        Index('idx_kbai_analysis_kpi_analysis', 'id_analysis'),
+        {'schema': 'kbai_balance'}
+    )
 
     id_balance = Column(BigInteger, ForeignKey('kbai_balance.kbai_balances.id_balance'), primary_key=True)
     id_analysis = Column(BigInteger, ForeignKey('kbai_balance.kbai_analysis.id_analysis'), primary_key=True)
@@ -1,19 +1,58 @@
-from sqlalchemy import JSON, Column, BigInteger, SmallInteger, String, Text, ForeignKey, DateTime, Boolean
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import TIMESTAMP, JSONB
+from sqlalchemy import Column, BigInteger, SmallInteger, String, Text, ForeignKey, DateTime, Boolean, Numeric, Computed, Index, func
+from sqlalchemy.orm import relationship, defer, validates
+from sqlalchemy.dialects.postgresql import TIMESTAMP, JSONB, ARRAY, DOUBLE_PRECISION
 from datetime import datetime
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
 
 from src.extensions import db
 
 Base = db.Model
 
+logger = logging.getLogger(__name__)
+
+# Balance JSON leaves used by the KPI formulas, extracted into generated columns.
+# Paths follow the canonical extraction layout; balances stored with a different
+# key spelling simply yield NULL here (the KPI analyzer still matches them fuzzily).
+KPI_SOURCE_PATHS = {
+    'tot_valore_produzione': ('Conto_economico', 'Valore_della_produzione', 'Totale_valore_della_produzione'),
+    'tot_altri_ricavi': ('Conto_economico', 'Valore_della_produzione', 'Altri_ricavi_e_proventi',
+                         'Totale_altri_ricavi_e_proventi'),
+    'tot_costi_produzione': ('Conto_economico', 'Costi_di_produzione', 'Totale_costi_della_produzione'),
+    'tot_ammortamenti': ('Conto_economico', 'Costi_di_produzione', 'Ammortamento_e_svalutazioni',
+                         'Totale_ammortamenti_e_svalutazioni'),
+    'oneri_diversi_gestione': ('Conto_economico', 'Costi_di_produzione', 'Oneri_diversi_di_gestione'),
+    'totale_attivo': ('Stato_patrimoniale', 'Attivo', 'Totale_attivo'),
+    'totale_patrimonio_netto': ('Stato_patrimoniale', 'Passivo', 'Patrimonio_netto', 'Totale_patrimonio_netto'),
+}
+
+
+def kpi_source_expression(path) -> str:
+    """SQL expression extracting a numeric leaf from the balance JSONB (NULL if missing or not a number)"""
+    pointer = '{' + ','.join(path) + '}'
+    return (
+        f"CASE WHEN jsonb_typeof(balance #> '{pointer}') = 'number' "
+        f"THEN (balance #>> '{pointer}')::numeric END"
+    )
+
+
+def _kpi_source_column(name: str) -> Column:
+    return Column(Numeric, Computed(kpi_source_expression(KPI_SOURCE_PATHS[name]), persisted=True))
+
 
 class KbaiBalance(Base):
     """
     KBAI Balance model for storing company balance data
     """
     __tablename__ = 'kbai_balances'
-    __table_args__ = {'schema': 'kbai_balance'}
+    __table_args__ = (
+        Index('idx_kbai_balances_balance_gin', 'balance', postgresql_using='gin',
+              postgresql_ops={'balance': 'jsonb_path_ops'}),
+        *(Index(f'idx_kbai_balances_{name}', name) for name in KPI_SOURCE_PATHS),
+        {'schema': 'kbai_balance'}
+    )
 
     id_balance = Column(BigInteger, primary_key=True, autoincrement=True)
     id_company = Column(BigInteger, ForeignKey('kbai.kbai_companies.id_company'), nullable=False)
@@ -23,19 +62,86 @@ class KbaiBalance(Base):
     mode = Column(String(255), nullable=False)
     file = Column(Text)
     note = Column(Text)
-    balance = Column(JSON, nullable=True)  # Store extracted JSON data
+    balance = Column(JSONB, nullable=True)  # Store extracted JSON data
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     is_deleted = Column(Boolean, default=False, nullable=False)
     deleted_at = Column(DateTime)
 
+    # Change tracking: hash of the balance JSON, and the hash/formula version
+    # the stored KPI set (kbai_kpi_values) was last calculated from
+    content_hash = Column(String(64))
+    kpi_content_hash = Column(String(64))
+    kpi_formula_version = Column(String(32))
+
+    # Parsed financial model: the balance JSON parsed once at ingest into the
+    # packed CE/SP values of the predictive BalanceSheetData (PARSED_MODEL_FIELDS)
+    parsed_model = Column(ARRAY(DOUBLE_PRECISION))
+    parsed_model_version = Column(SmallInteger)
+
+    # Generated (read-only) KPI source columns, see KPI_SOURCE_PATHS
+    tot_valore_produzione = _kpi_source_column('tot_valore_produzione')
+    tot_altri_ricavi = _kpi_source_column('tot_altri_ricavi')
+    tot_costi_produzione = _kpi_source_column('tot_costi_produzione')
+    tot_ammortamenti = _kpi_source_column('tot_ammortamenti')
+    oneri_diversi_gestione = _kpi_source_column('oneri_diversi_gestione')
+    totale_attivo = _kpi_source_column('totale_attivo')
+    totale_patrimonio_netto = _kpi_source_column('totale_patrimonio_netto')
+
     # Relationships
     company = relationship('KbaiCompany', backref='balances')
     kpi_values = relationship('KbaiKpiValue', back_populates='balance')
     analysis_kpis = relationship('KbaiAnalysisKpi', back_populates='balance')
 
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
+    @staticmethod
+    def compute_content_hash(balance_data) -> Optional[str]:
+        """SHA-256 of the canonical JSON serialization of balance data (None when there is no data)"""
+        if balance_data is None:
+            return None
+        canonical = json.dumps(balance_data, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def compute_parsed_model(balance_data):
+        """
+        (parsed_model, parsed_model_version) of balance data.
+
+        (None, None) when there is no data or it cannot be parsed; readers then
+        fall back to parsing the JSON.
+        """
+        from src.app.services.kbai.predictive.models.balance_sheet import (
+            PARSED_MODEL_VERSION,
+            parse_balance_model,
+        )
+        try:
+            values = parse_balance_model(balance_data)
+        except Exception as e:
+            logger.warning(f"Could not parse balance model: {str(e)}")
+            return None, None
+        return (values, PARSED_MODEL_VERSION) if values is not None else (None, None)
+
+    @validates('balance')
+    def _track_content_hash(self, key, value):
+        """Keep content_hash and the parsed model in sync whenever the balance JSON is assigned"""
+        self.content_hash = self.compute_content_hash(value)
+        self.parsed_model, self.parsed_model_version = self.compute_parsed_model(value)
+        return value
+
+    def kpis_up_to_date(self, formula_version: str) -> bool:
+        """True if the stored KPI set was calculated from the current content with the given formula version"""
+        return (
+            self.content_hash is not None
+            and self.kpi_content_hash == self.content_hash
+            and self.kpi_formula_version == formula_version
+        )
+
+    def to_dict(self, include_balance: bool = True):
+        """
+        Convert model to dictionary.
+
+        Pass include_balance=False for rows loaded through metadata_query(),
+        otherwise reading self.balance triggers a lazy load of the deferred column.
+        """
+        data = {
             'id_balance': self.id_balance,
             'id_company': self.id_company,
             'year': self.year,
@@ -44,11 +150,13 @@ class KbaiBalance(Base):
             'mode': self.mode,
             'file': self.file,
             'note': self.note,
-            'balance': self.balance,  # JSONB field
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'is_deleted': self.is_deleted,
             'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
         }
+        if include_balance:
+            data['balance'] = self.balance  # JSONB field
+        return data
 
     @classmethod
     def create(cls, balance_data: dict):
@@ -70,9 +178,138 @@ class KbaiBalance(Base):
         return cls.query.filter_by(**filters, is_deleted=False).first()
 
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, **filters):
-        """Find balance records with pagination"""
-        query = cls.query.filter_by(is_deleted=False)
+    def metadata_query(cls, with_data: bool = False, **filters):
+        """
+        Query active balance records without loading the balance JSON column.
+
+        Use for list/lookup paths that only need ids, years, types and file names.
+
+        Args:
+            with_data: Only include balances that have extracted balance data
+            **filters: Column equality filters (e.g. id_company=1)
+        """
+        query = cls.query.options(defer(cls.balance)).filter_by(is_deleted=False, **filters)
+        if with_data:
+            query = query.filter(cls.balance.isnot(None))
+        return query
+
+    @classmethod
+    def content_fingerprint(cls, id_company: int) -> Optional[str]:
+        """
+        SHA-256 over (id, period, type, content_hash) of a company's active balances with data.
+
+        Changes whenever a balance is added, deleted, re-extracted or changes
+        type (draft/final decides whether it can anchor a forecast); a cheap
+        version for payloads derived from all of a company's balances. None when
+        a balance has no content_hash yet (rows older than change tracking).
+        """
+        return cls.content_fingerprints([id_company])[id_company]
+
+    @classmethod
+    def content_fingerprints(cls, company_ids) -> Dict[int, Optional[str]]:
+        """content_fingerprint of several companies with a single query"""
+        company_ids = list(company_ids)
+        grouped = {id_company: [] for id_company in company_ids}
+        if company_ids:
+            rows = db.session.query(
+                cls.id_company, cls.id_balance, cls.year, cls.month, cls.type, cls.content_hash
+            ).filter(
+                cls.id_company.in_(company_ids),
+                cls.is_deleted == False,
+                cls.balance.isnot(None)
+            ).order_by(cls.id_company, cls.id_balance).all()
+            for row in rows:
+                grouped[row.id_company].append(row)
+
+        fingerprints = {}
+        for id_company, rows in grouped.items():
+            if any(row.content_hash is None for row in rows):
+                fingerprints[id_company] = None
+                continue
+            canonical = '|'.join(
+                f"{row.id_balance}:{row.year}:{row.month}:{row.type}:{row.content_hash}" for row in rows
+            )
+            fingerprints[id_company] = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return fingerprints
+
+    @classmethod
+    def count_with_data(cls, id_company: int) -> int:
+        """Count active balances with extracted data for a company (single COUNT query)"""
+        return db.session.query(func.count(cls.id_balance)).filter(
+            cls.id_company == id_company,
+            cls.is_deleted == False,
+            cls.balance.isnot(None)
+        ).scalar() or 0
+
+    @classmethod
+    def ebitda_expression(cls):
+        """
+        SQL expression for EBITDA built from the generated columns, mirroring
+        FinancialKPIAnalyzer: (valore produzione - altri ricavi) - (costi produzione - ammortamenti - oneri diversi)
+        """
+        return (
+            (cls.tot_valore_produzione - func.coalesce(cls.tot_altri_ricavi, 0))
+            - (cls.tot_costi_produzione
+               - func.coalesce(cls.tot_ammortamenti, 0)
+               - func.coalesce(cls.oneri_diversi_gestione, 0))
+        )
+
+    @classmethod
+    def find_by_kpi_source(cls, column: str, min_value=None, max_value=None, descending: bool = True,
+                           limit: int = None, **filters):
+        """
+        Filter and sort active balances by a generated KPI source column (or 'ebitda') in SQL.
+
+        The balance JSON is deferred; rows with a NULL value for the column are excluded.
+
+        Args:
+            column: One of KPI_SOURCE_PATHS or 'ebitda'
+            min_value / max_value: Optional inclusive bounds
+            descending: Sort direction
+            limit: Optional row limit
+            **filters: Column equality filters (e.g. id_company=1, year=2024)
+
+        Returns:
+            tuple: (records, error)
+        """
+        if column == 'ebitda':
+            expression = cls.ebitda_expression()
+        elif column in KPI_SOURCE_PATHS:
+            expression = getattr(cls, column)
+        else:
+            return [], f"Unsupported KPI source column: {column}"
+
+        query = cls.metadata_query(**filters).filter(expression.isnot(None))
+        if min_value is not None:
+            query = query.filter(expression >= min_value)
+        if max_value is not None:
+            query = query.filter(expression <= max_value)
+        query = query.order_by(expression.desc() if descending else expression.asc(), cls.id_balance)
+        if limit:
+            query = query.limit(limit)
+        return query.all(), None
+
+    def kpi_sources(self) -> dict:
+        """Return the generated KPI source values as floats (None when not extracted)"""
+        values = {name: getattr(self, name) for name in KPI_SOURCE_PATHS}
+        return {name: float(value) if value is not None else None for name, value in values.items()}
+
+    @classmethod
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None, include_balance: bool = True,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact', **filters):
+        """
+        Find balance records with pagination (include_balance=False defers the balance JSON)
+
+        keyset=True (or a cursor) pages on (created_at, id_balance), latest first,
+        instead of OFFSET; records is then a KeysetPage carrying next_cursor.
+        count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none'.
+        """
+        from src.common.pagination import keyset_query, keyset_page, resolve_total
+
+        if include_balance:
+            query = cls.query.filter_by(is_deleted=False)
+        else:
+            query = cls.metadata_query()
         
         # Apply filters
         for key, value in filters.items():
@@ -88,9 +325,13 @@ class KbaiBalance(Base):
             )
         
         # Get total count
-        total = query.count()
+        total = resolve_total(count_mode, query.count, stmt=query.statement)
         
         # Apply pagination
+        if keyset or cursor:
+            rows = keyset_query(query, cls.created_at, cls.id_balance, per_page, cursor).all()
+            return keyset_page(rows, per_page, 'created_at', 'id_balance'), total, None
+
         offset = (page - 1) * per_page
         records = query.offset(offset).limit(per_page).all()
         
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+from src.extensions import db
+
+Base = db.Model
+
+
+class KbaiCustomScenario(Base):
+    """
+    Saved custom forecast scenario of a company.
+
+    definition holds the validated scenario ({"modifiers": {...}, "overrides":
+    {...}}) applied on top of the company's base parameters, so saved scenarios
+    can be re-run against the latest balances.
+    """
+    __tablename__ = 'kbai_custom_scenarios'
+    __table_args__ = (
+        Index('idx_kbai_custom_scenarios_company_name', 'id_company', 'name', unique=True),
+        {'schema': 'kbai_balance'}
+    )
+
+    id_scenario = Column(BigInteger, primary_key=True, autoincrement=True)
+    id_company = Column(BigInteger, ForeignKey('kbai.kbai_companies.id_company'), nullable=False)
+    name = Column(String(100), nullable=False)
+    description = Column(Text)
+    definition = Column(JSONB, nullable=False)
+    created_by = Column(BigInteger, ForeignKey('public.tb_user.id_user'))
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id_scenario': self.id_scenario,
+            'id_company': self.id_company,
+            'name': self.name,
+            'description': self.description,
+            'definition': self.definition,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
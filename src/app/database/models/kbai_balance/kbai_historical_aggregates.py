@@ -0,0 +1,37 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+from src.extensions import db
+
+Base = db.Model
+
+
+class KbaiHistoricalAggregate(Base):
+    """
+    Persisted historical aggregates of a company for the predictive engine.
+
+    contributions holds one entry per complete annual balance (the
+    YearContribution values plus id_balance and the content_hash they were
+    computed from), so adding, replacing or deleting a balance only touches
+    its own entry. version / parsed_model_version record the calculation the
+    entries came from; rows of an older calculation are rebuilt on next sync.
+    """
+    __tablename__ = 'kbai_historical_aggregates'
+    __table_args__ = {'schema': 'kbai_balance'}
+
+    id_company = Column(BigInteger, ForeignKey('kbai.kbai_companies.id_company'), primary_key=True)
+    version = Column(SmallInteger, nullable=False)
+    parsed_model_version = Column(SmallInteger, nullable=False)
+    contributions = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id_company': self.id_company,
+            'version': self.version,
+            'parsed_model_version': self.parsed_model_version,
+            'contributions': self.contributions,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,93 @@
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, Numeric, DateTime, Index
+from datetime import datetime
+from typing import Optional
+
+from src.extensions import db
+
+Base = db.Model
+
+# Percentile columns stored per distribution row, as (percentile, column name)
+PEER_PERCENTILES = ((10, 'p10'), (25, 'p25'), (50, 'p50'), (75, 'p75'), (90, 'p90'))
+
+
+def normalize_peer_region(region: Optional[str]) -> Optional[str]:
+    """Region key used in the distribution table (zones store free-text region names)"""
+    return region.strip().upper() if region else None
+
+
+class KbaiKpiPeerDistribution(Base):
+    """
+    Precomputed peer KPI distribution per sector division, region and year.
+
+    Aggregated from kbai_kpi_values of non-competitor companies (one balance per
+    company and year) by PeerDistributionService.
+    """
+    __tablename__ = 'kbai_kpi_peer_distribution'
+    __table_args__ = (
+        Index('idx_kbai_kpi_peer_distribution_lookup', 'division', 'region', 'year', 'kpi_name', unique=True),
+        {'schema': 'kbai_balance'}
+    )
+
+    id_distribution = Column(BigInteger, primary_key=True, autoincrement=True)
+    division = Column(String(10), nullable=False)
+    region = Column(String(100), nullable=False)
+    year = Column(SmallInteger, nullable=False)
+    kpi_name = Column(String(255), nullable=False)
+    sample_size = Column(Integer, nullable=False)
+    p10 = Column(Numeric)
+    p25 = Column(Numeric)
+    p50 = Column(Numeric)
+    p75 = Column(Numeric)
+    p90 = Column(Numeric)
+    mean = Column(Numeric)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        data = {
+            'division': self.division,
+            'region': self.region,
+            'year': self.year,
+            'kpi_name': self.kpi_name,
+            'sample_size': self.sample_size,
+            'mean': float(self.mean) if self.mean is not None else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+        for _, name in PEER_PERCENTILES:
+            value = getattr(self, name)
+            data[name] = float(value) if value is not None else None
+        return data
+
+    def position(self, value: float) -> dict:
+        """
+        Place a value in this distribution.
+
+        Returns:
+            dict with 'percentile' (linear interpolation between the stored
+            percentiles, clamped to the p10..p90 range) and 'band'
+            ('below_p10', 'p10_p25', ..., 'above_p90')
+        """
+        points = [(rank, float(getattr(self, name))) for rank, name in PEER_PERCENTILES
+                  if getattr(self, name) is not None]
+        if value is None or not points:
+            return {'percentile': None, 'band': None}
+
+        if value < points[0][1]:
+            return {'percentile': points[0][0], 'band': f'below_p{points[0][0]}'}
+        if value > points[-1][1]:
+            return {'percentile': points[-1][0], 'band': f'above_p{points[-1][0]}'}
+
+        for (low_rank, low), (high_rank, high) in zip(points, points[1:]):
+            if low <= value <= high:
+                ratio = (value - low) / (high - low) if high > low else 0.5
+                percentile = low_rank + ratio * (high_rank - low_rank)
+                return {'percentile': round(percentile, 1), 'band': f'p{low_rank}_p{high_rank}'}
+        return {'percentile': points[0][0], 'band': f'p{points[0][0]}'}
+
+    @classmethod
+    def lookup(cls, division: str, region: str, year: int, kpi_names=None):
+        """Distribution rows for one peer group (single indexed lookup)"""
+        query = cls.query.filter_by(division=division, region=normalize_peer_region(region), year=year)
+        if kpi_names:
+            query = query.filter(cls.kpi_name.in_(list(kpi_names)))
+        return query.all()
@@ -76,8 +76,17 @@ class KbaiKpiValue(Base):
         return cls.query.filter_by(**filters).first()
 
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, **filters):
-        """Find KPI value records with pagination"""
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact', **filters):
+        """
+        Find KPI value records with pagination
+
+        keyset=True (or a cursor) pages on id_kpi instead of OFFSET; records is
+        then a KeysetPage carrying next_cursor.
+        count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none'.
+        """
+        from src.common.pagination import keyset_query, keyset_page, resolve_total
+
         query = cls.query.filter_by()
         
         # Apply filters
@@ -94,9 +103,18 @@ class KbaiKpiValue(Base):
             )
         
         # Get total count
-        total = query.count()
+        unfiltered = not filters and not search
+        total = resolve_total(
+            count_mode, query.count,
+            stmt=None if unfiltered else query.statement,
+            table=cls.__table__
+        )
         
         # Apply pagination
+        if keyset or cursor:
+            rows = keyset_query(query, cls.id_kpi, cls.id_kpi, per_page, cursor, descending=False).all()
+            return keyset_page(rows, per_page, 'id_kpi', 'id_kpi'), total, None
+
         offset = (page - 1) * per_page
         records = query.offset(offset).limit(per_page).all()
         
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, String, Numeric, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from src.extensions import db
+
+Base = db.Model
+
+
+class KbaiPredictionSummary(Base):
+    """
+    Summarized forecast per company, scenario and projected year.
+
+    Written by PortfolioForecastService (batch forecasting job) and read by the
+    portfolio table; source_fingerprint is the KbaiBalance.content_fingerprint
+    the forecast was computed from, so unchanged companies are skipped.
+    """
+    __tablename__ = 'kbai_prediction_summary'
+    __table_args__ = (
+        Index('idx_kbai_prediction_summary_lookup', 'id_company', 'scenario', 'year', unique=True),
+        {'schema': 'kbai_balance'}
+    )
+
+    id_summary = Column(BigInteger, primary_key=True, autoincrement=True)
+    id_company = Column(BigInteger, ForeignKey('kbai.kbai_companies.id_company'), nullable=False)
+    scenario = Column(String(20), nullable=False)
+    year = Column(SmallInteger, nullable=False)
+    base_year = Column(SmallInteger, nullable=False)
+    horizon_years = Column(SmallInteger, nullable=False)
+    ricavi = Column(Numeric)
+    ebitda = Column(Numeric)
+    utile_netto = Column(Numeric)
+    source_fingerprint = Column(String(64))
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id_company': self.id_company,
+            'scenario': self.scenario,
+            'year': self.year,
+            'base_year': self.base_year,
+            'horizon_years': self.horizon_years,
+            'ricavi': float(self.ricavi) if self.ricavi is not None else None,
+            'ebitda': float(self.ebitda) if self.ebitda is not None else None,
+            'utile_netto': float(self.utile_netto) if self.utile_netto is not None else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, BigInteger, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from datetime import datetime
@@ -13,7 +13,11 @@ class KbaiReport(Base):
     KBAI Reports model for storing report data
     """
     __tablename__ = 'kbai_reports'
-    __table_args__ = {'schema': 'kbai_balance'}
+    __table_args__ = (
+        # Report lists: join from analyses, newest first with id_report as tiebreaker
+        Index('idx_kbai_reports_analysis_time', 'id_analysis', 'time', 'id_report'),
+        {'schema': 'kbai_balance'}
+    )
 
     id_report = Column(BigInteger, primary_key=True, autoincrement=True)
     id_analysis = Column(BigInteger, ForeignKey('kbai_balance.kbai_analysis.id_analysis'), nullable=False)
@@ -5,7 +5,7 @@ Junction table for many-to-many relationship between employees and companies.
 Each employee can be associated with multiple companies.
 """
 
-from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, Index, select
+from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, Index, func, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.exc import SQLAlchemyError
 from src.extensions import db
@@ -158,7 +158,9 @@ class KbaiEmployeeCompanyMap(Base):
     # Find mappings with filtering and pagination
     # -----------------------------------------------------------------------------
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, select_columns=None, **filters) -> Tuple[List['KbaiEmployeeCompanyMap'], int, str]:
+    def find(cls, page: int = 1, per_page: int = 10, select_columns=None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact',
+             **filters) -> Tuple[List['KbaiEmployeeCompanyMap'], Optional[int], str]:
         """
         Find employee-company mappings with filtering and pagination
         
@@ -166,6 +168,10 @@ class KbaiEmployeeCompanyMap(Base):
             page: Page number (1-based)
             per_page: Items per page
             select_columns: List of column names to select (optional)
+            cursor: Keyset cursor from a previous page (implies keyset)
+            keyset: Page on (id_company, id_evaluation) instead of OFFSET; the result list is
+                then a KeysetPage carrying next_cursor
+            count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none' (total is None)
             **filters: Field filters like id_company=1, id_evaluation=1, etc.
             
         Returns:
@@ -176,9 +182,17 @@ class KbaiEmployeeCompanyMap(Base):
             KbaiEmployeeCompanyMap.find(id_company=1)  # Filter by company
             KbaiEmployeeCompanyMap.find(id_evaluation=1)  # Filter by employee
         """
+        from src.common.pagination import InvalidCursorError, keyset_query, keyset_page, resolve_total
+
+        keyset = keyset or bool(cursor)
         try:
             # Build select statement
             if select_columns:
+                # Keyset cursors are built from the sort key and primary key
+                if keyset:
+                    select_columns = list(select_columns) + [
+                        name for name in ('id_company', 'id_evaluation') if name not in select_columns
+                    ]
                 # Convert column names to actual column objects
                 columns = []
                 for col_name in select_columns:
@@ -200,19 +214,28 @@ class KbaiEmployeeCompanyMap(Base):
             # stmt = stmt.order_by(cls.created_at.desc())
             
             # Get total count
-            count_stmt = select(cls)
+            count_stmt = select(func.count()).select_from(cls)
             for key, value in filters.items():
                 if hasattr(cls, key):
                     count_stmt = count_stmt.where(getattr(cls, key) == value)
-            total = db.session.execute(count_stmt).rowcount
+            total = resolve_total(
+                count_mode, lambda: db.session.execute(count_stmt).scalar(), stmt=stmt
+            )
             
             # Get paginated results
+            if keyset:
+                stmt = keyset_query(stmt, cls.id_company, cls.id_evaluation, per_page, cursor, descending=False)
+                result = db.session.execute(stmt).all()
+                return keyset_page(result, per_page, 'id_company', 'id_evaluation'), total, None
+
             offset = (page - 1) * per_page
             stmt = stmt.offset(offset).limit(per_page)
             result = db.session.execute(stmt).all()
             
             return result, total, None
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return [], 0, f"Error listing employee-company mappings: {str(e)}"
 
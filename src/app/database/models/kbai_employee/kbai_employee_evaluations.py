@@ -5,7 +5,7 @@ Stores employee evaluation records with scores, dates, and evaluator information
 Each evaluation is linked to an employee and contains KPI information.
 """
 
-from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Date, Text, ForeignKey, Index, select, desc
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Date, Text, ForeignKey, Index, func, select, desc
 from sqlalchemy.orm import relationship
 from sqlalchemy.exc import SQLAlchemyError
 from src.extensions import db
@@ -210,7 +210,9 @@ class KbaiEmployeeEvaluation(Base):
     # Find evaluations with filtering and pagination
     # -----------------------------------------------------------------------------
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None, **filters) -> Tuple[List['KbaiEmployeeEvaluation'], int, str]:
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact',
+             **filters) -> Tuple[List['KbaiEmployeeEvaluation'], Optional[int], str]:
         """
         Find employee evaluations with filtering and pagination
         
@@ -219,6 +221,10 @@ class KbaiEmployeeEvaluation(Base):
             per_page: Items per page
             search: Search term for notes or kpi
             select_columns: List of column names to select (optional)
+            cursor: Keyset cursor from a previous page (implies keyset)
+            keyset: Page on id_evaluation instead of OFFSET; the result list is
+                then a KeysetPage carrying next_cursor
+            count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none' (total is None)
             **filters: Field filters like employee_id=1, evaluator_id=5, kpi='SALES', etc.
             
         Returns:
@@ -230,9 +236,17 @@ class KbaiEmployeeEvaluation(Base):
             KbaiEmployeeEvaluation.find(evaluator_id=5, kpi='SALES')  # Multiple filters
             KbaiEmployeeEvaluation.find(search='excellent')  # Search in notes
         """
+        from src.common.pagination import InvalidCursorError, keyset_query, keyset_page, resolve_total
+
+        keyset = keyset or bool(cursor)
         try:
             # Build select statement
             if select_columns:
+                # Keyset cursors are built from the sort key and primary key
+                if keyset:
+                    select_columns = list(select_columns) + [
+                        name for name in ('id_evaluation',) if name not in select_columns
+                    ]
                 # Convert column names to actual column objects
                 columns = []
                 for col_name in select_columns:
@@ -257,7 +271,7 @@ class KbaiEmployeeEvaluation(Base):
                 )
                         
             # Get total count
-            count_stmt = select(cls)
+            count_stmt = select(func.count()).select_from(cls)
             for key, value in filters.items():
                 if hasattr(cls, key):
                     count_stmt = count_stmt.where(getattr(cls, key) == value)
@@ -265,15 +279,24 @@ class KbaiEmployeeEvaluation(Base):
                 count_stmt = count_stmt.where(
                     cls.notes.ilike(f'%{search}%') | cls.kpi.ilike(f'%{search}%')
                 )
-            total = db.session.execute(count_stmt).rowcount
+            total = resolve_total(
+                count_mode, lambda: db.session.execute(count_stmt).scalar(), stmt=stmt
+            )
             
             # Get paginated results
+            if keyset:
+                stmt = keyset_query(stmt, cls.id_evaluation, cls.id_evaluation, per_page, cursor, descending=False)
+                result = db.session.execute(stmt).all()
+                return keyset_page(result, per_page, 'id_evaluation', 'id_evaluation'), total, None
+
             offset = (page - 1) * per_page
             stmt = stmt.offset(offset).limit(per_page)
             result = db.session.execute(stmt).all()
             
             return result, total, None
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return [], 0, f"Error listing employee evaluations: {str(e)}"
 
@@ -5,7 +5,7 @@ Represents employees with hierarchical management structure.
 Each employee has a manager (self-referencing) and can be associated with multiple companies and evaluations.
 """
 
-from sqlalchemy import Column, BigInteger, String, DateTime, Boolean, ForeignKey, or_, desc, Index, select
+from sqlalchemy import Column, BigInteger, String, DateTime, Boolean, ForeignKey, or_, desc, Index, func, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.exc import SQLAlchemyError
 from src.extensions import db
@@ -247,7 +247,9 @@ class KbaiEmployee(Base):
     # Find employees with filtering and pagination
     # -----------------------------------------------------------------------------
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None, **filters) -> Tuple[List['KbaiEmployee'], int, str]:
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact',
+             **filters) -> Tuple[List['KbaiEmployee'], Optional[int], str]:
         """
         Find employees with filtering and pagination (always sorted by latest first)
         
@@ -256,6 +258,10 @@ class KbaiEmployee(Base):
             per_page: Items per page
             search: Search term for name, surname, or email
             select_columns: List of column names to select (optional)
+            cursor: Keyset cursor from a previous page (implies keyset)
+            keyset: Page on id_evaluation instead of OFFSET; the result list is
+                then a KeysetPage carrying next_cursor
+            count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none' (total is None)
             **filters: Field filters like email='test@example.com', id_manager=1, status='ACTIVE', etc.
             
         Returns:
@@ -268,9 +274,17 @@ class KbaiEmployee(Base):
             KbaiEmployee.find(id_manager=5, status='ACTIVE')  # Multiple filters
             KbaiEmployee.find(search='John')  # Search in name/surname
         """
+        from src.common.pagination import InvalidCursorError, keyset_query, keyset_page, resolve_total
+
+        keyset = keyset or bool(cursor)
         try:
             # Build select statement
             if select_columns:
+                # Keyset cursors are built from the sort key and primary key
+                if keyset:
+                    select_columns = list(select_columns) + [
+                        name for name in ('id_evaluation',) if name not in select_columns
+                    ]
                 # Convert column names to actual column objects
                 columns = []
                 for col_name in select_columns:
@@ -303,7 +317,7 @@ class KbaiEmployee(Base):
             # stmt = stmt.order_by(desc(cls.created_at))
             
             # Get total count (without column selection for accurate count)
-            count_stmt = select(cls)
+            count_stmt = select(func.count()).select_from(cls)
             for key, value in filters.items():
                 if hasattr(cls, key):
                     count_stmt = count_stmt.where(getattr(cls, key) == value)
@@ -315,15 +329,24 @@ class KbaiEmployee(Base):
                         cls.email.ilike(f'%{search}%')
                     )
                 )
-            total = db.session.execute(count_stmt).rowcount
+            total = resolve_total(
+                count_mode, lambda: db.session.execute(count_stmt).scalar(), stmt=stmt
+            )
             
             # Get paginated results
+            if keyset:
+                stmt = keyset_query(stmt, cls.id_evaluation, cls.id_evaluation, per_page, cursor, descending=False)
+                result = db.session.execute(stmt).all()
+                return keyset_page(result, per_page, 'id_evaluation', 'id_evaluation'), total, None
+
             offset = (page - 1) * per_page
             stmt = stmt.offset(offset).limit(per_page)
             result = db.session.execute(stmt).all()
             
             return result, total, None
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return [], 0, f"Error listing employees: {str(e)}"
 
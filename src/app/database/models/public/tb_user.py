@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, Text, ForeignKey, Boolean, SmallInteger, or_, desc, select, ARRAY, Integer
+from sqlalchemy import Column, BigInteger, String, DateTime, Text, ForeignKey, Boolean, SmallInteger, or_, desc, select, func, ARRAY, Integer
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.exc import SQLAlchemyError
@@ -236,7 +236,9 @@ class TbUser(Base):
     # Find users with pagination
     # -------------------------------------------------------------------------
     @classmethod
-    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None, **filters) -> Tuple[List['TbUser'], int, str]:
+    def find(cls, page: int = 1, per_page: int = 10, search: str = None, select_columns=None,
+             cursor: str = None, keyset: bool = False, count_mode: str = 'exact',
+             **filters) -> Tuple[List['TbUser'], Optional[int], str]:
         """
         Find users with filtering and pagination
         
@@ -245,6 +247,10 @@ class TbUser(Base):
             per_page: Items per page
             search: Search term for email, name, or surname
             select_columns: List of column names to select (optional)
+            cursor: Keyset cursor from a previous page (implies keyset)
+            keyset: Page on (created_at, id_user) instead of OFFSET; the result
+                list is then a KeysetPage carrying next_cursor
+            count_mode: 'exact' (COUNT), 'estimate' (planner estimate) or 'none' (total is None)
             **filters: Field filters like role='admin', status='ACTIVE', etc.
             
         Returns:
@@ -256,7 +262,11 @@ class TbUser(Base):
             TbUser.find(role='admin', status='ACTIVE')
             TbUser.find(search='john')
             TbUser.find(id_admin=5)  # All users created by admin with id=5
+            TbUser.find(keyset=True, count_mode='none')  # First keyset page, no COUNT
         """
+        from src.common.pagination import InvalidCursorError, keyset_query, keyset_page, resolve_total
+
+        keyset = keyset or bool(cursor)
         try:
             # If no select_columns, use query (returns TbUser objects)
             if not select_columns:
@@ -285,15 +295,24 @@ class TbUser(Base):
                 query = query.order_by(desc(cls.created_at))
                 
                 # Get total count
-                total = query.count()
+                total = resolve_total(count_mode, query.count, stmt=query.order_by(None).statement)
                 
                 # Get paginated results
+                if keyset:
+                    users = keyset_query(query, cls.created_at, cls.id_user, per_page, cursor).all()
+                    return keyset_page(users, per_page, 'created_at', 'id_user'), total, None
+
                 offset = (page - 1) * per_page
                 users = query.offset(offset).limit(per_page).all()
                 
                 return users, total, None
             
             # If select_columns provided, use select statement (returns Row objects)
+            if keyset:
+                # Keyset cursors are built from the sort key and primary key
+                select_columns = list(select_columns) + [
+                    name for name in ('created_at', 'id_user') if name not in select_columns
+                ]
             columns = []
             for col_name in select_columns:
                 if hasattr(cls, col_name):
@@ -327,7 +346,7 @@ class TbUser(Base):
             stmt = stmt.order_by(desc(cls.created_at))
             
             # Get total count
-            count_stmt = select(cls)
+            count_stmt = select(func.count(cls.id_user))
             for key, value in filters.items():
                 if hasattr(cls, key):
                     column = getattr(cls, key)
@@ -343,15 +362,23 @@ class TbUser(Base):
                         cls.surname.ilike(f'%{search}%')
                     )
                 )
-            total = db.session.execute(count_stmt).scalar()
+            total = resolve_total(
+                count_mode, lambda: db.session.execute(count_stmt).scalar(), stmt=stmt.order_by(None)
+            )
             
             # Get paginated results
+            if keyset:
+                result = db.session.execute(keyset_query(stmt, cls.created_at, cls.id_user, per_page, cursor)).all()
+                return keyset_page(result, per_page, 'created_at', 'id_user'), total, None
+
             offset = (page - 1) * per_page
             stmt = stmt.offset(offset).limit(per_page)
             result = db.session.execute(stmt).all()
             
             return result, total, None
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return [], 0, f"Error listing users: {str(e)}"
 
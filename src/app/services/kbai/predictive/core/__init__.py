@@ -7,6 +7,7 @@ Contains:
 - kpi_calculator: KPI calculations (ROI, ROE, ROS, etc.)
 - parameterizer: Parameter management and scenario handling
 - projection_engine: Main projection engine for CE and SP
+- projection_core: Array-backed projection of many scenarios at once
 """
 
 from .formula_library import (
@@ -10,7 +10,8 @@ Reference: STEP 1 from mappa_logica_previsione.md
 """
 
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field, fields
+import statistics
 from ..models.balance_sheet import BalanceSheetData
 from .formula_library import (
     calcola_cagr,
@@ -94,21 +95,140 @@ class HistoricalMetrics:
         }
 
 
+@dataclass
+class ParameterDistribution:
+    """
+    Distribuzione (normale troncata) di un parametro di previsione,
+    stimata dalla variabilità storica. Usata dalla simulazione Monte Carlo.
+    """
+    mean: float
+    std: float
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mean": round(self.mean, 4),
+            "std": round(self.std, 4),
+            "min": self.min_value,
+            "max": self.max_value,
+        }
+
+
+# Volatilità minime: con pochi bilanci la deviazione storica sottostima l'incertezza
+# (assoluta, relativa alla media, limiti)
+DISTRIBUTION_FLOORS = {
+    "tasso_crescita": (0.03, 0.0, (-0.50, 0.50)),
+    "inflazione": (0.01, 0.0, (-0.02, 0.15)),
+    "perc_materie_prime": (0.0, 0.05, (0.0, 1.0)),
+    "perc_servizi": (0.0, 0.05, (0.0, 1.0)),
+    "perc_godimento_terzi": (0.0, 0.05, (0.0, 1.0)),
+    "dso": (0.0, 0.10, (0.0, 365.0)),
+    "dpo": (0.0, 0.10, (0.0, 365.0)),
+    "doh": (0.0, 0.10, (0.0, 365.0)),
+}
+DEFAULT_INFLAZIONE = 0.02
+
+
+# Versione del calcolo dei contributi annuali: incrementarla quando cambia
+# YearContribution.from_balance, così gli aggregati persistiti vengono ricalcolati
+CONTRIBUTION_VERSION = 1
+
+
+@dataclass
+class YearContribution:
+    """
+    Contributo di un bilancio completo alle metriche storiche: valori della
+    serie e rapporti annuali (None se il bilancio non entra nella media).
+
+    Le metriche di HistoricalAnalyzer dipendono dai bilanci solo attraverso
+    questi valori, che possono quindi essere persistiti per azienda e
+    aggiornati un bilancio alla volta.
+    """
+    year: int
+    ricavi: float
+    ebitda: float
+    utile: float
+    # Rapporti su ricavi (None se ricavi <= 0)
+    ros: Optional[float] = None
+    ebitda_margin: Optional[float] = None
+    mdc: Optional[float] = None
+    perc_materie_prime: Optional[float] = None
+    perc_servizi: Optional[float] = None
+    perc_godimento_terzi: Optional[float] = None
+    perc_personale: Optional[float] = None
+    perc_ammortamenti: Optional[float] = None
+    # Giorni capitale circolante (None se non calcolabili)
+    dso: Optional[float] = None
+    dpo: Optional[float] = None
+    doh: Optional[float] = None
+
+    @classmethod
+    def from_balance(cls, balance: BalanceSheetData) -> "YearContribution":
+        """Calcola il contributo di un bilancio"""
+        ce = balance.conto_economico
+        ricavi = ce.valore_produzione.ricavi_totali
+        contributo = cls(year=balance.year, ricavi=ricavi, ebitda=ce.ebitda, utile=ce.utile_netto)
+        if ricavi <= 0:
+            return contributo
+
+        cp = ce.costi_produzione
+        contributo.ros = ce.utile_netto / ricavi
+        contributo.ebitda_margin = ce.ebitda / ricavi
+        contributo.mdc = (ricavi - cp.costi_variabili) / ricavi
+        contributo.perc_materie_prime = cp.materie_prime / ricavi
+        contributo.perc_servizi = cp.servizi / ricavi
+        contributo.perc_godimento_terzi = cp.godimento_terzi / ricavi
+        contributo.perc_personale = cp.personale / ricavi
+        contributo.perc_ammortamenti = cp.ammortamenti / ricavi
+
+        sp = balance.stato_patrimoniale
+        crediti = sp.attivo.circolante.crediti_commerciali
+        if crediti > 0:
+            contributo.dso = crediti / ricavi * 365
+        debiti_forn = sp.passivo.debiti_fornitori
+        costi_diretti = cp.materie_prime
+        if debiti_forn > 0 and costi_diretti > 0:
+            contributo.dpo = debiti_forn / costi_diretti * 365
+        magazzino = sp.attivo.circolante.rimanenze
+        if magazzino > 0 and costi_diretti > 0:
+            contributo.doh = magazzino / costi_diretti * 365
+        return contributo
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "YearContribution":
+        return cls(**{f.name: data.get(f.name) for f in fields(cls)})
+
+
 class HistoricalAnalyzer:
     """
     Analizzatore storico per bilanci.
     Calcola CAGR, trend, medie e indicatori base.
     """
 
-    def __init__(self, balances: List[BalanceSheetData]):
+    def __init__(
+        self,
+        balances: List[BalanceSheetData],
+        contributi: Optional[List[YearContribution]] = None,
+    ):
         """
         Args:
             balances: Lista bilanci ordinata dal più vecchio al più recente
+            contributi: Contributi annuali già calcolati (aggregati persistiti);
+                in tal caso basta passare in balances il bilancio base
         """
         # Ordina per anno
         self.balances = sorted(balances, key=lambda b: b.year)
+        if contributi is None:
+            contributi = [YearContribution.from_balance(b) for b in self.balances]
+        self.contributi = sorted(contributi, key=lambda c: c.year)
         self.metrics = HistoricalMetrics()
         self._warnings: List[str] = []
+        # Serie annuali di rapporti e giorni CCN (per la stima delle distribuzioni)
+        self._serie_annuali: Dict[str, List[float]] = {}
 
     @property
     def warnings(self) -> List[str]:
@@ -116,7 +236,7 @@ class HistoricalAnalyzer:
 
     @property
     def n_years(self) -> int:
-        return len(self.balances)
+        return len(self.contributi)
 
     @property
     def anno_base(self) -> int:
@@ -139,11 +259,11 @@ class HistoricalAnalyzer:
         Returns:
             HistoricalMetrics con tutti gli indicatori calcolati
         """
-        if not self.balances:
+        if not self.contributi:
             self._warnings.append("Nessun bilancio fornito per l'analisi")
             return self.metrics
 
-        if len(self.balances) < 2:
+        if len(self.contributi) < 2:
             self._warnings.append(
                 "Almeno 2 bilanci richiesti per calcolare CAGR. "
                 "Verranno usati solo i valori dell'ultimo anno."
@@ -168,29 +288,14 @@ class HistoricalAnalyzer:
 
     def _extract_time_series(self):
         """Estrae le serie storiche dai bilanci"""
-        self.metrics.anni = []
-        self.metrics.ricavi_storici = []
-        self.metrics.ebitda_storici = []
-        self.metrics.utile_storici = []
-
-        for balance in self.balances:
-            self.metrics.anni.append(balance.year)
-
-            # Ricavi totali
-            ricavi = balance.conto_economico.valore_produzione.ricavi_totali
-            self.metrics.ricavi_storici.append(ricavi)
-
-            # EBITDA
-            ebitda = balance.conto_economico.ebitda
-            self.metrics.ebitda_storici.append(ebitda)
-
-            # Utile netto
-            utile = balance.conto_economico.utile_netto
-            self.metrics.utile_storici.append(utile)
+        self.metrics.anni = [c.year for c in self.contributi]
+        self.metrics.ricavi_storici = [c.ricavi for c in self.contributi]
+        self.metrics.ebitda_storici = [c.ebitda for c in self.contributi]
+        self.metrics.utile_storici = [c.utile for c in self.contributi]
 
     def _calculate_cagr(self):
         """Calcola CAGR per ricavi, EBITDA e utile"""
-        if len(self.balances) < 2:
+        if len(self.contributi) < 2:
             # Con un solo anno, usa tasso di crescita settore default
             self.metrics.cagr_ricavi = 0.02  # 2% default
             self.metrics.cagr_ebitda = 0.02
@@ -237,41 +342,24 @@ class HistoricalAnalyzer:
 
     def _calculate_averages(self):
         """Calcola medie storiche e percentuali"""
-        ros_values = []
-        ebitda_margin_values = []
-        mdc_values = []
-
-        perc_materie = []
-        perc_servizi = []
-        perc_godimento = []
-        perc_personale = []
-        perc_ammortamenti = []
-
-        for balance in self.balances:
-            ricavi = balance.conto_economico.valore_produzione.ricavi_totali
-            if ricavi <= 0:
-                continue
-
-            # ROS = Utile / Ricavi
-            ros = balance.conto_economico.utile_netto / ricavi
-            ros_values.append(ros)
-
-            # EBITDA Margin = EBITDA / Ricavi
-            ebitda_m = balance.conto_economico.ebitda / ricavi
-            ebitda_margin_values.append(ebitda_m)
-
-            # MdC = (Ricavi - Costi variabili) / Ricavi
-            costi_var = balance.conto_economico.costi_produzione.costi_variabili
-            mdc = (ricavi - costi_var) / ricavi
-            mdc_values.append(mdc)
-
-            # Percentuali costi su ricavi
-            cp = balance.conto_economico.costi_produzione
-            perc_materie.append(cp.materie_prime / ricavi if ricavi > 0 else 0)
-            perc_servizi.append(cp.servizi / ricavi if ricavi > 0 else 0)
-            perc_godimento.append(cp.godimento_terzi / ricavi if ricavi > 0 else 0)
-            perc_personale.append(cp.personale / ricavi if ricavi > 0 else 0)
-            perc_ammortamenti.append(cp.ammortamenti / ricavi if ricavi > 0 else 0)
+        # Solo gli anni con ricavi positivi (rapporti valorizzati)
+        validi = [c for c in self.contributi if c.ros is not None]
+
+        ros_values = [c.ros for c in validi]
+        ebitda_margin_values = [c.ebitda_margin for c in validi]
+        mdc_values = [c.mdc for c in validi]
+
+        perc_materie = [c.perc_materie_prime for c in validi]
+        perc_servizi = [c.perc_servizi for c in validi]
+        perc_godimento = [c.perc_godimento_terzi for c in validi]
+        perc_personale = [c.perc_personale for c in validi]
+        perc_ammortamenti = [c.perc_ammortamenti for c in validi]
+
+        self._serie_annuali.update({
+            "perc_materie_prime": perc_materie,
+            "perc_servizi": perc_servizi,
+            "perc_godimento_terzi": perc_godimento,
+        })
 
         # Calcola medie
         self.metrics.ros_medio = calcola_media(ros_values)
@@ -293,33 +381,11 @@ class HistoricalAnalyzer:
 
     def _calculate_working_capital_metrics(self):
         """Calcola metriche capitale circolante (DSO, DPO, DOH)"""
-        dso_values = []
-        dpo_values = []
-        doh_values = []
-
-        for balance in self.balances:
-            ricavi = balance.conto_economico.valore_produzione.ricavi_totali
-            if ricavi <= 0:
-                continue
-
-            # DSO = Crediti / Ricavi * 365
-            crediti = balance.stato_patrimoniale.attivo.circolante.crediti_commerciali
-            if crediti > 0:
-                dso = crediti / ricavi * 365
-                dso_values.append(dso)
-
-            # DPO = Debiti fornitori / Costi diretti * 365
-            debiti_forn = balance.stato_patrimoniale.passivo.debiti_fornitori
-            costi_diretti = balance.conto_economico.costi_produzione.materie_prime
-            if debiti_forn > 0 and costi_diretti > 0:
-                dpo = debiti_forn / costi_diretti * 365
-                dpo_values.append(dpo)
-
-            # DOH = Magazzino / Costi diretti * 365
-            magazzino = balance.stato_patrimoniale.attivo.circolante.rimanenze
-            if magazzino > 0 and costi_diretti > 0:
-                doh = magazzino / costi_diretti * 365
-                doh_values.append(doh)
+        dso_values = [c.dso for c in self.contributi if c.dso is not None]
+        dpo_values = [c.dpo for c in self.contributi if c.dpo is not None]
+        doh_values = [c.doh for c in self.contributi if c.doh is not None]
+
+        self._serie_annuali.update({"dso": dso_values, "dpo": dpo_values, "doh": doh_values})
 
         # Usa medie o default
         self.metrics.dso_medio = calcola_media(dso_values) if dso_values else 60.0
@@ -363,6 +429,46 @@ class HistoricalAnalyzer:
         else:
             self.metrics.salario_medio_stimato = 35000  # Default
 
+    def fit_parameter_distributions(self) -> Dict[str, ParameterDistribution]:
+        """
+        Stima le distribuzioni dei parametri stocastici dalla variabilità storica:
+        crescita ricavi (variazioni annue), inflazione, percentuali di costo su
+        ricavi e DSO/DPO/DOH. Richiede analyze().
+
+        La deviazione standard non scende sotto i minimi di DISTRIBUTION_FLOORS.
+
+        Returns:
+            Dict nome parametro -> ParameterDistribution
+        """
+        metrics = self.metrics
+        crescite = [
+            corrente / precedente - 1
+            for precedente, corrente in zip(metrics.ricavi_storici, metrics.ricavi_storici[1:])
+            if precedente > 0 and corrente > 0
+        ]
+        serie = {
+            "tasso_crescita": (metrics.cagr_ricavi, crescite),
+            "inflazione": (DEFAULT_INFLAZIONE, []),
+            "perc_materie_prime": (metrics.perc_materie_prime, self._serie_annuali.get("perc_materie_prime", [])),
+            "perc_servizi": (metrics.perc_servizi, self._serie_annuali.get("perc_servizi", [])),
+            "perc_godimento_terzi": (metrics.perc_godimento_terzi, self._serie_annuali.get("perc_godimento_terzi", [])),
+            "dso": (metrics.dso_medio, self._serie_annuali.get("dso", [])),
+            "dpo": (metrics.dpo_medio, self._serie_annuali.get("dpo", [])),
+            "doh": (metrics.doh_medio, self._serie_annuali.get("doh", [])),
+        }
+
+        distributions = {}
+        for nome, (media, valori) in serie.items():
+            minimo_assoluto, minimo_relativo, (limite_min, limite_max) = DISTRIBUTION_FLOORS[nome]
+            std_storica = statistics.stdev(valori) if len(valori) >= 2 else 0.0
+            distributions[nome] = ParameterDistribution(
+                mean=media,
+                std=max(std_storica, minimo_assoluto, abs(media) * minimo_relativo),
+                min_value=limite_min,
+                max_value=limite_max,
+            )
+        return distributions
+
     def get_base_values(self) -> Dict[str, float]:
         """
         Ritorna i valori base (ultimo anno) per le proiezioni.
@@ -410,7 +516,7 @@ class HistoricalAnalyzer:
         Returns:
             Dict con analisi qualitativa del trend
         """
-        if len(self.balances) < 2:
+        if len(self.contributi) < 2:
             return {"status": "insufficient_data", "trend": "unknown"}
 
         # Determina trend ricavi
@@ -28,6 +28,15 @@ from ..models.scenario import (
 )
 from .historical_analyzer import HistoricalAnalyzer, HistoricalMetrics
 
+# Override accettati da Parameterizer.create_custom_parameters
+CUSTOM_PARAMETER_KEYS = (
+    "tasso_crescita", "growth_mode", "inflazione", "aliquota_imposte",
+    "variazione_materie", "variazione_servizi",
+    "n_dipendenti", "variazione_organico", "aumento_salariale", "salario_medio",
+    "dso", "dpo", "doh", "investimento", "anno_investimento", "vita_utile",
+    "tasso_interesse_debito", "orizzonte_anni",
+)
+
 
 class Parameterizer:
     """
@@ -163,13 +172,15 @@ class Parameterizer:
 
     def create_custom_parameters(
         self,
+        params: Optional[ForecastParameters] = None,
         **kwargs
     ) -> ForecastParameters:
         """
         Create custom parameters with specific overrides.
 
         Args:
-            **kwargs: Parameter overrides
+            params: Parameters to start from (default: base parameters)
+            **kwargs: Parameter overrides (CUSTOM_PARAMETER_KEYS)
                 - tasso_crescita: Revenue growth rate
                 - inflazione: Inflation rate
                 - variazione_organico: Personnel change
@@ -179,7 +190,7 @@ class Parameterizer:
         Returns:
             ForecastParameters with overrides
         """
-        params = deepcopy(self.base_params)
+        params = deepcopy(params or self.base_params)
 
         # Revenue overrides
         if "tasso_crescita" in kwargs:
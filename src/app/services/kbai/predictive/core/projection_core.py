@@ -0,0 +1,289 @@
+"""
+Projection Core - STEP 3-4 (array-backed)
+
+Evaluates the projection formulas for many scenarios at once on a NumPy array
+of shape (scenarios x years x line items). The historical base ratios are
+derived once per base balance (BaseRatios); every year is computed for all
+scenarios in one vectorized step with the same formula_library functions and
+operation order as the scalar rules, so results match them exactly.
+
+Used by ProjectionEngine for the deterministic scenarios (one row per scenario)
+and the Monte Carlo mode (one row per simulated path).
+"""
+
+from typing import Dict, List, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..models.parameters import ForecastParameters, GrowthMode
+from .formula_library import (
+    calcola_materie_prime,
+    calcola_servizi,
+    calcola_tfr,
+    calcola_ebitda,
+    calcola_ebit,
+    calcola_utile_ante_imposte,
+    calcola_interessi_passivi,
+    calcola_crediti,
+    calcola_magazzino,
+    calcola_debiti_fornitori,
+    calcola_capitale_circolante,
+)
+
+# Line items of a projected year (the numeric fields of YearProjection)
+LINE_ITEMS = (
+    "ricavi", "altri_ricavi", "materie_prime", "servizi", "godimento_terzi",
+    "personale", "salari", "oneri_sociali", "tfr", "ammortamenti",
+    "accantonamenti", "oneri_diversi", "interessi_passivi",
+    "ebitda", "ebit", "utile_ante_imposte", "imposte", "utile_netto",
+    "immobilizzazioni", "crediti", "magazzino", "liquidita", "patrimonio_netto",
+    "debiti_finanziari", "debiti_fornitori", "tfr_fondo", "ccn",
+)
+ITEM_INDEX = {name: index for index, name in enumerate(LINE_ITEMS)}
+
+
+@dataclass(frozen=True)
+class BaseRatios:
+    """Percentuali storiche su ricavi dell'anno base (default se ricavi <= 0)"""
+    perc_materie: float
+    perc_servizi: float
+    perc_godimento: float
+
+    @classmethod
+    def from_base_values(cls, base: Dict[str, float]) -> "BaseRatios":
+        def perc(voce: str, default: float) -> float:
+            return base.get(voce, 0) / base.get("ricavi", 1) if base.get("ricavi", 0) > 0 else default
+
+        return cls(
+            perc_materie=perc("materie_prime", 0.30),
+            perc_servizi=perc("servizi", 0.20),
+            perc_godimento=perc("godimento_terzi", 0.05),
+        )
+
+
+@dataclass
+class ScenarioDrivers:
+    """
+    Drivers of the projection, one row per scenario (or simulated path).
+
+    Year-dependent drivers have shape (scenarios, years); the others
+    (scenarios, 1). Index drivers are the compounded factors of the base values
+    for each year (e.g. (1 + inflazione) ** n), computed with Python's pow for
+    the deterministic scenarios so they match the scalar formulas bit for bit.
+    """
+    # (scenarios, years)
+    fattore_ricavi: np.ndarray
+    inflazione: np.ndarray
+    inflazione_materie: np.ndarray
+    indice_inflazione: np.ndarray
+    indice_oneri_diversi: np.ndarray
+    indice_salariale: np.ndarray
+    # (scenarios, 1)
+    perc_materie: np.ndarray
+    perc_servizi: np.ndarray
+    perc_godimento: np.ndarray
+    variazione_materie: np.ndarray
+    variazione_servizi: np.ndarray
+    n_dipendenti: np.ndarray
+    salario_medio: np.ndarray
+    aliquota_oneri: np.ndarray
+    aliquota_tfr: np.ndarray
+    investimento: np.ndarray
+    vita_utile: np.ndarray
+    anno_investimento: np.ndarray
+    tasso_interesse: np.ndarray
+    variazione_debito: np.ndarray
+    aliquota_imposte: np.ndarray
+    distribuzione_dividendi: np.ndarray
+    dso: np.ndarray
+    dpo: np.ndarray
+    doh: np.ndarray
+
+    @property
+    def n_scenarios(self) -> int:
+        return self.fattore_ricavi.shape[0]
+
+    @property
+    def n_years(self) -> int:
+        return self.fattore_ricavi.shape[1]
+
+    @classmethod
+    def from_parameters(
+        cls,
+        parameters: Sequence[ForecastParameters],
+        base: Dict[str, float],
+        ratios: BaseRatios,
+        n_years: int
+    ) -> "ScenarioDrivers":
+        """Deterministic drivers of the given scenarios over n_years"""
+        anni_n = range(1, n_years + 1)
+
+        def column(getter) -> np.ndarray:
+            return np.array([[float(getter(p))] for p in parameters])
+
+        def per_year(getter) -> np.ndarray:
+            return np.array([[float(getter(p, n)) for n in anni_n] for p in parameters])
+
+        def fattore_ricavi(p: ForecastParameters, n: int) -> float:
+            if p.revenue.growth_mode == GrowthMode.GEOMETRIC:
+                return (1 + p.revenue.tasso_crescita) ** n
+            return 1 + p.revenue.tasso_crescita * n
+
+        return cls(
+            fattore_ricavi=per_year(fattore_ricavi),
+            inflazione=per_year(lambda p, n: p.macro.inflazione),
+            inflazione_materie=per_year(lambda p, n: p.macro.inflazione_materie),
+            indice_inflazione=per_year(lambda p, n: (1 + p.macro.inflazione) ** n),
+            indice_oneri_diversi=per_year(
+                lambda p, n: (1 + p.macro.inflazione + p.costs.variazione_oneri_diversi) ** n
+            ),
+            indice_salariale=per_year(lambda p, n: (1 + p.personnel.aumento_salariale) ** n),
+            perc_materie=np.full((len(parameters), 1), ratios.perc_materie),
+            perc_servizi=np.full((len(parameters), 1), ratios.perc_servizi),
+            perc_godimento=np.full((len(parameters), 1), ratios.perc_godimento),
+            variazione_materie=column(lambda p: p.costs.variazione_materie),
+            variazione_servizi=column(lambda p: p.costs.variazione_servizi),
+            n_dipendenti=column(lambda p: p.personnel.n_dipendenti_attuali + p.personnel.variazione_organico),
+            salario_medio=column(lambda p: p.personnel.salario_medio or base.get("salari", 35000)),
+            aliquota_oneri=column(lambda p: p.personnel.aliquota_oneri),
+            aliquota_tfr=column(lambda p: p.personnel.aliquota_tfr),
+            investimento=column(lambda p: p.investment.investimento_totale),
+            vita_utile=column(lambda p: p.investment.vita_utile),
+            anno_investimento=column(lambda p: p.investment.anno_investimento),
+            tasso_interesse=column(lambda p: p.financial.tasso_interesse_debito),
+            variazione_debito=column(lambda p: p.financial.variazione_debito_finanziario),
+            aliquota_imposte=column(lambda p: p.macro.aliquota_imposte),
+            distribuzione_dividendi=column(lambda p: p.financial.distribuzione_dividendi),
+            dso=column(lambda p: p.working_capital.dso),
+            dpo=column(lambda p: p.working_capital.dpo),
+            doh=column(lambda p: p.working_capital.doh),
+        )
+
+
+class ProjectionArray:
+    """Projected line items of all scenarios: values[scenario, year, item]"""
+
+    def __init__(self, values: np.ndarray, anni: List[int]):
+        self.values = values
+        self.anni = anni
+
+    def item(self, name: str) -> np.ndarray:
+        """(scenarios, years) view of one line item"""
+        return self.values[:, :, ITEM_INDEX[name]]
+
+    def row(self, scenario: int, year_index: int) -> Dict[str, float]:
+        """Line items of one scenario and year as Python floats"""
+        return dict(zip(LINE_ITEMS, self.values[scenario, year_index].tolist()))
+
+
+def project(
+    base: Dict[str, float],
+    drivers: ScenarioDrivers,
+    anni: List[int]
+) -> ProjectionArray:
+    """
+    Project all scenarios over the years.
+
+    Each year is evaluated for every scenario at once; balance-sheet items roll
+    forward from the previous year (the base values for the first year).
+
+    Args:
+        base: Base year values (HistoricalAnalyzer.get_base_values())
+        drivers: Scenario drivers
+        anni: Projected years (len == drivers.n_years)
+
+    Returns:
+        ProjectionArray of shape (scenarios, years, len(LINE_ITEMS))
+    """
+    n_scenarios = drivers.n_scenarios
+    values = np.zeros((n_scenarios, len(anni), len(LINE_ITEMS)))
+
+    def start(voce: str) -> np.ndarray:
+        return np.full((n_scenarios, 1), float(base.get(voce, 0)))
+
+    prev_immobilizzazioni = start("immobilizzazioni")
+    prev_debiti_finanziari = start("debiti_finanziari")
+    prev_tfr_fondo = start("tfr")
+    prev_patrimonio_netto = start("patrimonio_netto")
+
+    for y in range(len(anni)):
+        anno_n = y + 1
+        col = slice(y, y + 1)
+        inflazione = drivers.inflazione[:, col]
+
+        # Conto economico
+        ricavi = base.get("ricavi", 0) * drivers.fattore_ricavi[:, col]
+        altri_ricavi = base.get("altri_ricavi", 0) * drivers.indice_inflazione[:, col]
+        materie_prime = calcola_materie_prime(
+            ricavi, drivers.perc_materie, drivers.inflazione_materie[:, col], drivers.variazione_materie
+        )
+        servizi = calcola_servizi(ricavi, drivers.perc_servizi, inflazione, drivers.variazione_servizi)
+        godimento_terzi = ricavi * drivers.perc_godimento * (1 + inflazione)
+
+        # Same rule as calcola_personale
+        salari = drivers.n_dipendenti * drivers.salario_medio * drivers.indice_salariale[:, col]
+        oneri_sociali = salari * drivers.aliquota_oneri
+        personale = salari + oneri_sociali
+        tfr = calcola_tfr(salari, drivers.aliquota_tfr)
+
+        # Same rule as calcola_ammortamenti
+        nuova_quota = (
+            (drivers.investimento > 0) & (drivers.vita_utile > 0) & (anno_n >= drivers.anno_investimento)
+        )
+        ammortamenti = base.get("ammortamenti", 0) + np.divide(
+            drivers.investimento, drivers.vita_utile,
+            out=np.zeros((n_scenarios, 1)), where=nuova_quota
+        )
+        accantonamenti = base.get("accantonamenti", 0) * drivers.indice_inflazione[:, col]
+        oneri_diversi = base.get("oneri_diversi", 0) * drivers.indice_oneri_diversi[:, col]
+
+        ebitda = calcola_ebitda(
+            ricavi, materie_prime + servizi + godimento_terzi, personale, altri_ricavi
+        )
+        ebit = calcola_ebit(ebitda, ammortamenti, accantonamenti, oneri_diversi)
+        interessi_passivi = calcola_interessi_passivi(prev_debiti_finanziari, drivers.tasso_interesse)
+        utile_ante_imposte = calcola_utile_ante_imposte(ebit=ebit, oneri_finanziari=interessi_passivi)
+        imposte = np.where(utile_ante_imposte > 0, utile_ante_imposte * drivers.aliquota_imposte, 0.0)
+        utile_netto = utile_ante_imposte - imposte
+
+        # Stato patrimoniale
+        immobilizzazioni = prev_immobilizzazioni - ammortamenti + np.where(
+            anno_n == drivers.anno_investimento, drivers.investimento, 0.0
+        )
+        crediti = calcola_crediti(ricavi, drivers.dso)
+        magazzino = calcola_magazzino(materie_prime, drivers.doh)
+        debiti_fornitori = calcola_debiti_fornitori(materie_prime + servizi, drivers.dpo)
+        ccn = calcola_capitale_circolante(crediti, magazzino, debiti_fornitori)
+        debiti_finanziari = prev_debiti_finanziari * (1 + drivers.variazione_debito)
+        tfr_fondo = prev_tfr_fondo + tfr
+        patrimonio_netto = (
+            prev_patrimonio_netto + utile_netto - utile_netto * drivers.distribuzione_dividendi
+        )
+        # Liquidità residuale per quadratura semplificata
+        liquidita = np.maximum(0.0, (
+            patrimonio_netto + debiti_finanziari + debiti_fornitori + tfr_fondo
+            - immobilizzazioni - crediti - magazzino
+        ))
+
+        year_items = {
+            "ricavi": ricavi, "altri_ricavi": altri_ricavi, "materie_prime": materie_prime,
+            "servizi": servizi, "godimento_terzi": godimento_terzi, "personale": personale,
+            "salari": salari, "oneri_sociali": oneri_sociali, "tfr": tfr,
+            "ammortamenti": ammortamenti, "accantonamenti": accantonamenti,
+            "oneri_diversi": oneri_diversi, "interessi_passivi": interessi_passivi,
+            "ebitda": ebitda, "ebit": ebit, "utile_ante_imposte": utile_ante_imposte,
+            "imposte": imposte, "utile_netto": utile_netto, "immobilizzazioni": immobilizzazioni,
+            "crediti": crediti, "magazzino": magazzino, "liquidita": liquidita,
+            "patrimonio_netto": patrimonio_netto, "debiti_finanziari": debiti_finanziari,
+            "debiti_fornitori": debiti_fornitori, "tfr_fondo": tfr_fondo, "ccn": ccn,
+        }
+        for name, value in year_items.items():
+            values[:, y, ITEM_INDEX[name]] = np.broadcast_to(value, (n_scenarios, 1))[:, 0]
+
+        prev_immobilizzazioni = immobilizzazioni
+        prev_debiti_finanziari = debiti_finanziari
+        prev_tfr_fondo = tfr_fondo
+        prev_patrimonio_netto = patrimonio_netto
+
+    return ProjectionArray(values, list(anni))
@@ -7,34 +7,68 @@ Calculates projected Conto Economico and Stato Patrimoniale for 1-3 years.
 Reference: STEP 3-4 from mappa_logica_previsione.md
 """
 
-from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
 from copy import deepcopy
 
+import numpy as np
+
 from ..models.balance_sheet import BalanceSheetData
 from ..models.parameters import ForecastParameters, GrowthMode
-from ..models.scenario import ScenarioType, ScenarioResult, ScenarioModifiers
-from .formula_library import (
-    calcola_ricavi,
-    calcola_costi_variabili,
-    calcola_costi_fissi,
-    calcola_materie_prime,
-    calcola_servizi,
-    calcola_personale,
-    calcola_tfr,
-    calcola_ammortamenti,
-    calcola_ebitda,
-    calcola_ebit,
-    calcola_utile_ante_imposte,
-    calcola_utile_netto,
-    calcola_interessi_passivi,
-    calcola_crediti,
-    calcola_magazzino,
-    calcola_debiti_fornitori,
-    calcola_capitale_circolante,
+from ..models.scenario import (
+    Scenario, ScenarioType, ScenarioResult, ScenarioModifiers, MonteCarloResult, SensitivityResult,
+    GoalSeekResult,
 )
+from . import projection_core
 from .kpi_calculator import KPICalculator
-from .historical_analyzer import HistoricalAnalyzer
+from .historical_analyzer import HistoricalAnalyzer, ParameterDistribution
+
+MONTE_CARLO_DEFAULT_PATHS = 10000
+MONTE_CARLO_MIN_PATHS = 100
+MONTE_CARLO_MAX_PATHS = 50000
+MONTE_CARLO_PERCENTILES = (10, 50, 90)
+
+# Parametri perturbati dall'analisi di sensitività: nome -> (sezione, campo) di ForecastParameters
+SENSITIVITY_PARAMETERS = {
+    "tasso_crescita": ("revenue", "tasso_crescita"),
+    "inflazione": ("macro", "inflazione"),
+    "inflazione_materie": ("macro", "inflazione_materie"),
+    "aumento_salariale": ("personnel", "aumento_salariale"),
+    "n_dipendenti": ("personnel", "n_dipendenti_attuali"),
+    "salario_medio": ("personnel", "salario_medio"),
+    "dso": ("working_capital", "dso"),
+    "dpo": ("working_capital", "dpo"),
+    "doh": ("working_capital", "doh"),
+    "tasso_interesse": ("financial", "tasso_interesse_debito"),
+    "aliquota_imposte": ("macro", "aliquota_imposte"),
+}
+# Obiettivi: voci proiettate (projection_core.LINE_ITEMS) o KPI di KPICalculator
+SENSITIVITY_KPIS = (
+    "ROI", "ROE", "ROS", "EBITDA_Margin", "MdC", "Leverage", "Indice_Indebitamento", "Current_Ratio",
+)
+SENSITIVITY_DEFAULT_TARGETS = ("ebitda", "utile_netto")
+SENSITIVITY_DEFAULT_DELTA = 0.10
+SENSITIVITY_MAX_DELTA = 0.50
+
+# Intervalli di ricerca di default per un singolo parametro libero
+GOAL_SEEK_BOUNDS = {
+    "tasso_crescita": (-0.50, 1.00),
+    "inflazione": (-0.05, 0.20),
+    "inflazione_materie": (-0.05, 0.30),
+    "aumento_salariale": (-0.20, 0.30),
+    "n_dipendenti": (0.0, 1000.0),
+    "salario_medio": (0.0, 200000.0),
+    "dso": (0.0, 365.0),
+    "dpo": (0.0, 365.0),
+    "doh": (0.0, 365.0),
+    "tasso_interesse": (0.0, 0.30),
+    "aliquota_imposte": (0.0, 0.60),
+}
+# Con più parametri liberi si cerca un moltiplicatore comune dei valori di partenza
+GOAL_SEEK_SCALE_BOUNDS = (0.0, 3.0)
+GOAL_SEEK_GRID_POINTS = 17
+GOAL_SEEK_TOLERANCE = 1e-6
+GOAL_SEEK_MAX_ITERATIONS = 50
 
 
 @dataclass
@@ -140,6 +174,7 @@ class ProjectionEngine:
         """
         self.historical = historical_analyzer
         self.base_values = base_values or historical_analyzer.get_base_values()
+        self.base_ratios = projection_core.BaseRatios.from_base_values(self.base_values)
         self.kpi_calculator = KPICalculator()
         self._warnings: List[str] = []
 
@@ -160,58 +195,297 @@ class ProjectionEngine:
         Returns:
             ScenarioResult with projections and KPIs
         """
-        params = scenario.parameters
-        scenario_name = scenario.name
-        
-        # Extract modifiers from params if available (set by Parameterizer)
-        modifiers_data = params.custom_overrides.get("modifiers_applied")
-        if modifiers_data:
-            modifiers = ScenarioModifiers.from_dict(modifiers_data)
-        else:
-            modifiers = ScenarioModifiers(name=scenario_name)
-
-        # Determine scenario type from name
-        scenario_type = ScenarioType.BASE
-        name_lower = scenario_name.lower()
-        if "ottimis" in name_lower:
-            scenario_type = ScenarioType.OTTIMISTICO
-        elif "pessimis" in name_lower:
-            scenario_type = ScenarioType.PESSIMISTICO
-
-        result = ScenarioResult(
-            scenario_type=scenario_type,
-            scenario_name=scenario_name,
-            modifiers=modifiers
-        )
+        return self.run_scenarios([scenario])[0]
 
-        # Get previous year values (start from base)
-        prev_projection = self._create_base_projection()
+    def run_scenarios(self, scenarios: List[object]) -> List[ScenarioResult]:
+        """
+        Generate projections for several scenarios in one pass.
+
+        All scenarios share the base ratios and are projected together on one
+        (scenarios x years x line items) array (see projection_core); the
+        YearProjection objects of each result are built from its rows.
 
-        # Project each year
-        for i, year in enumerate(params.get_anni_previsione()):
-            anno_n = i + 1  # 1, 2, 3
+        Args:
+            scenarios: Configured Scenario objects with the same horizon
 
-            projection = self._project_year(
-                anno_n=anno_n,
-                year=year,
-                params=params,
-                prev_projection=prev_projection
+        Returns:
+            ScenarioResult per scenario, in the same order
+        """
+        if not scenarios:
+            return []
+        array = self.project_array([scenario.parameters for scenario in scenarios])
+        anni = array.anni
+
+        results = []
+        for index, scenario in enumerate(scenarios):
+            scenario_name = scenario.name
+
+            # Extract modifiers from params if available (set by Parameterizer)
+            modifiers_data = scenario.parameters.custom_overrides.get("modifiers_applied")
+            if modifiers_data:
+                modifiers = ScenarioModifiers.from_dict(modifiers_data)
+            else:
+                modifiers = ScenarioModifiers(name=scenario_name)
+
+            # Determine scenario type from name (custom scenarios keep their type)
+            scenario_type = ScenarioType.BASE
+            name_lower = scenario_name.lower()
+            if scenario.type == ScenarioType.CUSTOM:
+                scenario_type = ScenarioType.CUSTOM
+            elif "ottimis" in name_lower:
+                scenario_type = ScenarioType.OTTIMISTICO
+            elif "pessimis" in name_lower:
+                scenario_type = ScenarioType.PESSIMISTICO
+
+            result = ScenarioResult(
+                scenario_type=scenario_type,
+                scenario_name=scenario_name,
+                modifiers=modifiers
             )
+            for year_index, year in enumerate(anni):
+                projection = YearProjection(year=year, **array.row(index, year_index))
+                result.projections.append(projection)
+                result.kpis[year] = self._calculate_kpis(projection)
+
+            result.warnings = self._warnings.copy()
+            results.append(result)
+
+        return results
+
+    def project_array(self, parameters: Sequence[ForecastParameters]) -> projection_core.ProjectionArray:
+        """
+        Project the line items of several parameter sets in one vectorized pass.
 
-            # Calculate KPIs for this year
-            kpis = self._calculate_kpis(projection)
+        Args:
+            parameters: Forecast parameters with the same horizon
 
-            # Store results
-            # Updated to use new list/dict structure in ScenarioResult
-            result.projections.append(projection) # Store full object or dict, let's store object for now as service converts it
-            result.kpis[year] = kpis
+        Returns:
+            ProjectionArray (parameter sets x years x line items)
+        """
+        anni = parameters[0].get_anni_previsione()
+        return projection_core.project(
+            self.base_values,
+            projection_core.ScenarioDrivers.from_parameters(
+                parameters, self.base_values, self.base_ratios, len(anni)
+            ),
+            anni
+        )
 
-            # Update previous for next iteration
-            prev_projection = projection
+    def run_sensitivity(
+        self,
+        params: ForecastParameters,
+        delta: float = SENSITIVITY_DEFAULT_DELTA,
+        targets: Sequence[str] = SENSITIVITY_DEFAULT_TARGETS,
+        parameters: Optional[Sequence[str]] = None,
+        year: Optional[int] = None
+    ) -> SensitivityResult:
+        """
+        Tornado analysis: perturb each parameter by -delta and +delta (relative).
+
+        The starting scenario and all 2 x len(parameters) perturbed variants are
+        projected together in one project_array() pass; targets are read in the
+        given year (default: last projected year). Elasticities are central
+        differences, (swing / |target|) / (2 * delta); None when the parameter
+        or the target is zero.
+
+        Args:
+            params: Starting parameters (usually the base scenario)
+            delta: Relative perturbation (0.10 = ±10%)
+            targets: Line items (e.g. "ebitda") or KPI names (e.g. "ROE")
+            parameters: Names from SENSITIVITY_PARAMETERS (default: all)
+            year: Projected year to compare
+
+        Returns:
+            SensitivityResult with the ranked tornado rows per target
+        """
+        names = list(parameters or SENSITIVITY_PARAMETERS)
+        anni = params.get_anni_previsione()
+        year = year or anni[-1]
+        year_index = anni.index(year)
+
+        partenza = {name: self._sensitivity_value(params, name) for name in names}
+        variants = [params]
+        for name in names:
+            for sign in (-1, 1):
+                variant = deepcopy(params)
+                section, attr = SENSITIVITY_PARAMETERS[name]
+                setattr(getattr(variant, section), attr, partenza[name] * (1 + sign * delta))
+                variants.append(variant)
+
+        target_values = self._target_values(self.project_array(variants), targets, year_index)
+
+        result = SensitivityResult(anno=year, delta=delta, parametri=partenza)
+        for target in targets:
+            values = target_values[target]
+            base_value = values[0]
+            rows = []
+            for index, name in enumerate(names):
+                basso, alto = values[1 + 2 * index], values[2 + 2 * index]
+                swing = alto - basso
+                elasticita = (
+                    swing / abs(base_value) / (2 * delta)
+                    if partenza[name] != 0 and base_value != 0 else None
+                )
+                rows.append({
+                    "parametro": name,
+                    "basso": round(basso, 4),
+                    "alto": round(alto, 4),
+                    "swing": round(swing, 4),
+                    "elasticita": round(elasticita, 4) if elasticita is not None else None,
+                })
+            rows.sort(key=lambda row: abs(row["swing"]), reverse=True)
+            result.valori_base[target] = round(base_value, 4)
+            result.tornado[target] = rows
 
         result.warnings = self._warnings.copy()
         return result
 
+    def goal_seek(
+        self,
+        params: ForecastParameters,
+        target: str,
+        valore_obiettivo: float,
+        parametri: Sequence[str],
+        year: Optional[int] = None,
+        bounds: Optional[Tuple[float, float]] = None,
+        tolleranza: float = GOAL_SEEK_TOLERANCE,
+        max_iterazioni: int = GOAL_SEEK_MAX_ITERATIONS
+    ) -> GoalSeekResult:
+        """
+        Solve for the free parameter(s) that bring a target to a given value.
+
+        With one free parameter its value is searched within bounds (default
+        GOAL_SEEK_BOUNDS); with several, a common multiplier of their starting
+        values is searched (default GOAL_SEEK_SCALE_BOUNDS). A grid over the
+        bounds is projected in one project_array() pass to bracket the root
+        closest to the starting point, then secant (finite-difference Newton)
+        steps kept inside the bracket (Illinois) refine it, one single-path
+        projection each. Only the solution is run through the full
+        run_scenario() formatting.
+
+        Args:
+            params: Starting parameters (usually the base scenario)
+            target: Line item (e.g. "ebitda") or KPI name (e.g. "EBITDA_Margin")
+            valore_obiettivo: Value the target must reach (KPIs as ratios, 0.12 = 12%)
+            parametri: Names from SENSITIVITY_PARAMETERS
+            year: Projected year of the target (default: last projected year)
+            bounds: Search interval of the value (one parameter) or multiplier
+            tolleranza: Relative tolerance on the target
+            max_iterazioni: Maximum engine evaluations
+
+        Returns:
+            GoalSeekResult; raggiunto is False when the bounds contain no solution
+            (parametri then holds the closest grid point)
+        """
+        names = [parametri] if isinstance(parametri, str) else list(parametri)
+        anni = params.get_anni_previsione()
+        year = year or anni[-1]
+        year_index = anni.index(year)
+
+        partenza = {name: self._sensitivity_value(params, name) for name in names}
+        if len(names) == 1:
+            lo, hi = bounds or GOAL_SEEK_BOUNDS[names[0]]
+            start = partenza[names[0]]
+            valori = lambda x: {names[0]: x}
+        else:
+            lo, hi = bounds or GOAL_SEEK_SCALE_BOUNDS
+            start = 1.0
+            valori = lambda x: {name: partenza[name] * x for name in names}
+
+        def variant(x: float) -> ForecastParameters:
+            variant = deepcopy(params)
+            for name, value in valori(x).items():
+                section, attr = SENSITIVITY_PARAMETERS[name]
+                setattr(getattr(variant, section), attr, value)
+            return variant
+
+        def residui(xs: List[float]) -> List[float]:
+            array = self.project_array([variant(x) for x in xs])
+            return [value - valore_obiettivo for value in self._target_values(array, [target], year_index)[target]]
+
+        soglia = tolleranza * max(1.0, abs(valore_obiettivo))
+        warnings = []
+
+        # 1. Bracketing: the whole grid in one batched pass
+        grid = np.linspace(lo, hi, GOAL_SEEK_GRID_POINTS).tolist()
+        f_grid = residui(grid)
+        iterazioni = 1
+        brackets = [
+            (grid[i], grid[i + 1], f_grid[i], f_grid[i + 1])
+            for i in range(len(grid) - 1)
+            if f_grid[i] * f_grid[i + 1] < 0
+        ]
+        best = min(range(len(grid)), key=lambda i: abs(f_grid[i]))
+        x, fx = grid[best], f_grid[best]
+
+        if abs(fx) > soglia and brackets:
+            # 2. Secant steps inside the bracket closest to the starting point
+            a, b, fa, fb = min(brackets, key=lambda bracket: abs((bracket[0] + bracket[1]) / 2 - start))
+            while iterazioni < max_iterazioni:
+                x = b - fb * (b - a) / (fb - fa)
+                if not min(a, b) < x < max(a, b):
+                    x = (a + b) / 2
+                fx = residui([x])[0]
+                iterazioni += 1
+                if abs(fx) <= soglia or abs(b - a) <= 1e-12 * max(1.0, abs(x)):
+                    break
+                if fx * fb < 0:
+                    a, fa = b, fb
+                else:
+                    fa /= 2
+                b, fb = x, fx
+        elif abs(fx) > soglia:
+            warnings.append(
+                f"{target} non raggiunge {valore_obiettivo} con {', '.join(names)} in [{lo}, {hi}]"
+            )
+
+        raggiunto = abs(fx) <= soglia
+        if brackets and not raggiunto:
+            warnings.append(f"Nessuna convergenza in {max_iterazioni} iterazioni")
+
+        scenario = self.run_scenario(Scenario(name="Base", parameters=variant(x), type=ScenarioType.BASE))
+        return GoalSeekResult(
+            obiettivo=target,
+            valore_obiettivo=valore_obiettivo,
+            anno=year,
+            parametri_iniziali=partenza,
+            parametri={name: round(value, 6) for name, value in valori(x).items()},
+            valore_ottenuto=round(fx + valore_obiettivo, 6),
+            raggiunto=raggiunto,
+            iterazioni=iterazioni,
+            scenario=scenario,
+            warnings=warnings + scenario.warnings,
+        )
+
+    def _target_values(
+        self, array: projection_core.ProjectionArray, targets: Sequence[str], year_index: int
+    ) -> Dict[str, List[float]]:
+        """Values of line items or KPIs in one projected year, per projected parameter set"""
+        kpis = []
+        if any(target not in projection_core.ITEM_INDEX for target in targets):
+            year = array.anni[year_index]
+            kpis = [
+                self._calculate_kpis(YearProjection(year=year, **array.row(index, year_index)))
+                for index in range(array.values.shape[0])
+            ]
+        return {
+            target: (
+                array.item(target)[:, year_index].tolist()
+                if target in projection_core.ITEM_INDEX
+                else [kpi.get(target, 0.0) for kpi in kpis]
+            )
+            for target in targets
+        }
+
+    def _sensitivity_value(self, params: ForecastParameters, name: str) -> float:
+        """Value of a sensitivity parameter as the projection uses it"""
+        section, attr = SENSITIVITY_PARAMETERS[name]
+        value = getattr(getattr(params, section), attr)
+        if name == "salario_medio":
+            # Same fallback as the projection (historical salaries)
+            value = value or self.base_values.get("salari", 35000)
+        return float(value)
+
     def _create_base_projection(self) -> YearProjection:
         """Create projection from base values (year 0)"""
         base = self.base_values
@@ -240,225 +514,152 @@ class ProjectionEngine:
             tfr_fondo=base.get("tfr", 0),
         )
 
-    def _project_year(
+    def run_monte_carlo(
         self,
-        anno_n: int,
-        year: int,
         params: ForecastParameters,
-        prev_projection: YearProjection
-    ) -> YearProjection:
+        distributions: Optional[Dict[str, ParameterDistribution]] = None,
+        n_paths: int = MONTE_CARLO_DEFAULT_PATHS,
+        seed: Optional[int] = None
+    ) -> MonteCarloResult:
         """
-        Project a single year.
+        Stochastic projection: all paths at once as (paths x years) arrays.
+
+        Revenue growth and inflation are sampled per path and year, cost ratios
+        and DSO/DPO/DOH per path. Each distribution is centered on the value the
+        deterministic projection uses for the same parameters, with the spread
+        fitted by HistoricalAnalyzer.fit_parameter_distributions(); the paths are
+        then projected together like deterministic scenarios (projection_core).
 
         Args:
-            anno_n: Year number (1, 2, 3)
-            year: Actual year (e.g., 2025)
-            params: Forecast parameters
-            prev_projection: Previous year projection
+            params: Forecast parameters (usually the base scenario)
+            distributions: Override distributions (default: fitted from history)
+            n_paths: Number of simulated paths
+            seed: Random seed (same seed and inputs give the same result)
 
         Returns:
-            YearProjection for the year
+            MonteCarloResult with P10/P50/P90 bands and KPI distributions
         """
-        proj = YearProjection(year=year)
+        if distributions is None:
+            distributions = self.historical.fit_parameter_distributions()
+        rng = np.random.default_rng(seed)
         base = self.base_values
-
-        # ====================================================================
-        # RICAVI
-        # ====================================================================
-        growth_mode = (
-            "geometric" if params.revenue.growth_mode == GrowthMode.GEOMETRIC
-            else "constant"
-        )
-        proj.ricavi = calcola_ricavi(
-            ricavi_base=base.get("ricavi", 0),
-            tasso_crescita=params.revenue.tasso_crescita,
-            anno_n=anno_n,
-            growth_mode=growth_mode
-        )
-
-        # Altri ricavi (costanti o indicizzati)
-        proj.altri_ricavi = base.get("altri_ricavi", 0) * (
-            1 + params.macro.inflazione
-        ) ** anno_n
-
-        # ====================================================================
-        # COSTI VARIABILI
-        # ====================================================================
-        # Percentuali storiche
-        perc_materie = (
-            base.get("materie_prime", 0) / base.get("ricavi", 1)
-            if base.get("ricavi", 0) > 0 else 0.30
-        )
-        perc_servizi = (
-            base.get("servizi", 0) / base.get("ricavi", 1)
-            if base.get("ricavi", 0) > 0 else 0.20
-        )
-        perc_godimento = (
-            base.get("godimento_terzi", 0) / base.get("ricavi", 1)
-            if base.get("ricavi", 0) > 0 else 0.05
-        )
-
-        proj.materie_prime = calcola_materie_prime(
-            ricavi=proj.ricavi,
-            perc_materie=perc_materie,
-            inflazione_materie=params.macro.inflazione_materie,
-            variazione=params.costs.variazione_materie
-        )
-
-        proj.servizi = calcola_servizi(
-            ricavi=proj.ricavi,
-            perc_servizi=perc_servizi,
-            inflazione=params.macro.inflazione,
-            variazione=params.costs.variazione_servizi
-        )
-
-        proj.godimento_terzi = proj.ricavi * perc_godimento * (
-            1 + params.macro.inflazione
-        )
-
-        # ====================================================================
-        # PERSONALE
-        # ====================================================================
-        n_dipendenti = (
-            params.personnel.n_dipendenti_attuali +
-            params.personnel.variazione_organico
-        )
-        salario = params.personnel.salario_medio or base.get("salari", 35000)
-
-        proj.salari, proj.oneri_sociali, proj.personale = calcola_personale(
-            n_dipendenti=n_dipendenti,
-            salario_medio=salario,
-            aumento_salariale=params.personnel.aumento_salariale,
-            anno_n=anno_n,
-            aliquota_oneri=params.personnel.aliquota_oneri
-        )
-
-        proj.tfr = calcola_tfr(
-            costo_personale=proj.salari,
-            aliquota_tfr=params.personnel.aliquota_tfr
-        )
-
-        # ====================================================================
-        # AMMORTAMENTI
-        # ====================================================================
-        proj.ammortamenti = calcola_ammortamenti(
-            ammortamenti_storici=base.get("ammortamenti", 0),
-            investimento=params.investment.investimento_totale,
-            vita_utile=params.investment.vita_utile,
-            anno_investimento=params.investment.anno_investimento,
-            anno_corrente=anno_n
-        )
-
-        # ====================================================================
-        # ALTRI COSTI
-        # ====================================================================
-        proj.accantonamenti = base.get("accantonamenti", 0) * (
-            1 + params.macro.inflazione
-        ) ** anno_n
-
-        proj.oneri_diversi = calcola_costi_fissi(
-            costi_fissi_base=base.get("oneri_diversi", 0),
-            anno_n=anno_n,
-            inflazione=params.macro.inflazione,
-            variazione_aggiuntiva=params.costs.variazione_oneri_diversi
-        )
-
-        # ====================================================================
-        # RISULTATI CE
-        # ====================================================================
-        proj.ebitda = calcola_ebitda(
-            ricavi=proj.ricavi,
-            costi_variabili=proj.costi_variabili,
-            costo_personale=proj.personale,
-            altri_ricavi=proj.altri_ricavi
-        )
-
-        proj.ebit = calcola_ebit(
-            ebitda=proj.ebitda,
-            ammortamenti=proj.ammortamenti,
-            accantonamenti=proj.accantonamenti,
-            oneri_diversi=proj.oneri_diversi
-        )
-
-        # Interessi passivi
-        proj.interessi_passivi = calcola_interessi_passivi(
-            debiti_finanziari=prev_projection.debiti_finanziari,
-            tasso_interesse=params.financial.tasso_interesse_debito
-        )
-
-        proj.utile_ante_imposte = calcola_utile_ante_imposte(
-            ebit=proj.ebit,
-            oneri_finanziari=proj.interessi_passivi
-        )
-
-        proj.imposte = (
-            proj.utile_ante_imposte * params.macro.aliquota_imposte
-            if proj.utile_ante_imposte > 0 else 0
-        )
-
-        proj.utile_netto = proj.utile_ante_imposte - proj.imposte
-
-        # ====================================================================
-        # STATO PATRIMONIALE
-        # ====================================================================
-        # Immobilizzazioni
-        proj.immobilizzazioni = (
-            prev_projection.immobilizzazioni -
-            proj.ammortamenti +
-            (params.investment.investimento_totale
-             if anno_n == params.investment.anno_investimento else 0)
-        )
-
-        # Capitale circolante
-        proj.crediti = calcola_crediti(
-            ricavi=proj.ricavi,
-            dso=params.working_capital.dso
-        )
-
-        proj.magazzino = calcola_magazzino(
-            costi_diretti=proj.materie_prime,
-            doh=params.working_capital.doh
-        )
-
-        proj.debiti_fornitori = calcola_debiti_fornitori(
-            costi_diretti=proj.materie_prime + proj.servizi,
-            dpo=params.working_capital.dpo
-        )
-
-        proj.ccn = calcola_capitale_circolante(
-            crediti=proj.crediti,
-            magazzino=proj.magazzino,
-            debiti_fornitori=proj.debiti_fornitori
+        anni = params.get_anni_previsione()
+        shape_anni = (n_paths, len(anni))
+        shape_path = (n_paths, 1)
+
+        def sample(name: str, mean: float, shape: Tuple[int, int]) -> np.ndarray:
+            distribution = distributions.get(name)
+            if distribution is None:
+                return np.full(shape, float(mean))
+            values = rng.normal(mean, distribution.std, size=shape)
+            if distribution.min_value is None and distribution.max_value is None:
+                return values
+            return np.clip(values, distribution.min_value, distribution.max_value)
+
+        crescita = sample("tasso_crescita", params.revenue.tasso_crescita, shape_anni)
+        if params.revenue.growth_mode == GrowthMode.GEOMETRIC:
+            fattore_ricavi = np.cumprod(1 + crescita, axis=1)
+        else:
+            fattore_ricavi = 1 + np.cumsum(crescita, axis=1)
+        inflazione = sample("inflazione", params.macro.inflazione, shape_anni)
+
+        def costante(value: float) -> np.ndarray:
+            return np.full((1, 1), float(value))
+
+        # Personale, ammortamenti e debito non dipendono dai parametri campionati
+        drivers = projection_core.ScenarioDrivers(
+            fattore_ricavi=fattore_ricavi,
+            inflazione=inflazione,
+            # Le materie seguono lo shock d'inflazione generale attorno alla loro inflazione settoriale
+            inflazione_materie=params.macro.inflazione_materie + (inflazione - params.macro.inflazione),
+            indice_inflazione=np.cumprod(1 + inflazione, axis=1),
+            indice_oneri_diversi=np.cumprod(1 + inflazione + params.costs.variazione_oneri_diversi, axis=1),
+            indice_salariale=np.array([[
+                (1 + params.personnel.aumento_salariale) ** n for n in range(1, len(anni) + 1)
+            ]]),
+            perc_materie=sample("perc_materie_prime", self.base_ratios.perc_materie, shape_path),
+            perc_servizi=sample("perc_servizi", self.base_ratios.perc_servizi, shape_path),
+            perc_godimento=sample("perc_godimento_terzi", self.base_ratios.perc_godimento, shape_path),
+            variazione_materie=costante(params.costs.variazione_materie),
+            variazione_servizi=costante(params.costs.variazione_servizi),
+            n_dipendenti=costante(params.personnel.n_dipendenti_attuali + params.personnel.variazione_organico),
+            salario_medio=costante(params.personnel.salario_medio or base.get("salari", 35000)),
+            aliquota_oneri=costante(params.personnel.aliquota_oneri),
+            aliquota_tfr=costante(params.personnel.aliquota_tfr),
+            investimento=costante(params.investment.investimento_totale),
+            vita_utile=costante(params.investment.vita_utile),
+            anno_investimento=costante(params.investment.anno_investimento),
+            tasso_interesse=costante(params.financial.tasso_interesse_debito),
+            variazione_debito=costante(params.financial.variazione_debito_finanziario),
+            aliquota_imposte=costante(params.macro.aliquota_imposte),
+            distribuzione_dividendi=costante(params.financial.distribuzione_dividendi),
+            dso=sample("dso", params.working_capital.dso, shape_path),
+            dpo=sample("dpo", params.working_capital.dpo, shape_path),
+            doh=sample("doh", params.working_capital.doh, shape_path),
         )
+        array = projection_core.project(base, drivers, anni)
+        ricavi, ebitda, ebit = array.item("ricavi"), array.item("ebitda"), array.item("ebit")
+        utile_netto, liquidita = array.item("utile_netto"), array.item("liquidita")
+        patrimonio_netto = array.item("patrimonio_netto")
+        immobilizzazioni, ccn = array.item("immobilizzazioni"), array.item("ccn")
+
+        def ratio(numeratore: np.ndarray, denominatore: np.ndarray) -> np.ndarray:
+            # Same convention as KPICalculator: 0 when the denominator is not positive
+            numeratore, denominatore = np.broadcast_arrays(numeratore, denominatore)
+            return np.divide(
+                numeratore, denominatore,
+                out=np.zeros(numeratore.shape), where=denominatore > 0
+            )
 
-        # Debiti finanziari (per ora costanti)
-        proj.debiti_finanziari = prev_projection.debiti_finanziari * (
-            1 + params.financial.variazione_debito_finanziario
-        )
+        kpi = {
+            "ROI": ratio(ebit, immobilizzazioni + ccn),
+            "ROE": ratio(utile_netto, patrimonio_netto),
+            "ROS": ratio(utile_netto, ricavi),
+            "EBITDA_Margin": ratio(ebitda, ricavi),
+        }
 
-        # TFR fondo
-        proj.tfr_fondo = prev_projection.tfr_fondo + proj.tfr
+        grandezze = {
+            "ricavi": ricavi,
+            "ebitda": ebitda,
+            "utile_netto": utile_netto,
+            "liquidita": liquidita,
+            "patrimonio_netto": patrimonio_netto,
+        }
 
-        # Patrimonio netto
-        dividendi = proj.utile_netto * params.financial.distribuzione_dividendi
-        proj.patrimonio_netto = (
-            prev_projection.patrimonio_netto +
-            proj.utile_netto -
-            dividendi
+        return MonteCarloResult(
+            n_paths=n_paths,
+            anni=anni,
+            bande={name: self._quantile_bands(values, anni, 2) for name, values in grandezze.items()},
+            kpi={name: self._quantile_bands(values, anni, 4) for name, values in kpi.items()},
+            probabilita={
+                year: {
+                    "perdita": round(float(p_perdita), 4),
+                    "liquidita_esaurita": round(float(p_liquidita), 4),
+                }
+                for year, p_perdita, p_liquidita in zip(
+                    anni, (utile_netto < 0).mean(axis=0), (liquidita <= 0).mean(axis=0)
+                )
+            },
+            distribuzioni={name: distribution.to_dict() for name, distribution in distributions.items()},
+            seed=seed,
+            warnings=self._warnings.copy(),
         )
 
-        # Liquidità (residuale per quadratura semplificata)
-        proj.liquidita = max(0, (
-            proj.patrimonio_netto +
-            proj.debiti_finanziari +
-            proj.debiti_fornitori +
-            proj.tfr_fondo -
-            proj.immobilizzazioni -
-            proj.crediti -
-            proj.magazzino
-        ))
-
-        return proj
+    @staticmethod
+    def _quantile_bands(values: np.ndarray, anni: List[int], digits: int) -> Dict[int, Dict[str, float]]:
+        """P10/P50/P90 and mean per year of a (paths x years) array"""
+        quantiles = np.percentile(values, MONTE_CARLO_PERCENTILES, axis=0)
+        means = values.mean(axis=0)
+        return {
+            year: {
+                **{
+                    f"p{percentile}": round(float(quantiles[index, column]), digits)
+                    for index, percentile in enumerate(MONTE_CARLO_PERCENTILES)
+                },
+                "mean": round(float(means[column]), digits),
+            }
+            for column, year in enumerate(anni)
+        }
 
     def _calculate_kpis(self, projection: YearProjection) -> Dict[str, float]:
         """Calculate KPIs for a projection"""
@@ -495,15 +696,14 @@ class ProjectionEngine:
         Returns:
             Dict of scenario name to results
         """
-        results = {}
-
-        for scenario_type, params in scenario_params.items():
-            scenario_name = scenario_type.value.capitalize()
-            result = self.project(params, scenario_name=scenario_name)
-            result.scenario_type = scenario_type
-            results[scenario_name] = result
-
-        return results
+        scenarios = [
+            Scenario(name=scenario_type.value.capitalize(), parameters=params, type=scenario_type)
+            for scenario_type, params in scenario_params.items()
+        ]
+        return {
+            scenario.name: result
+            for scenario, result in zip(scenarios, self.run_scenarios(scenarios))
+        }
 
     def compare_scenarios(
         self,
@@ -0,0 +1,373 @@
+"""
+Custom Scenario Service
+
+Named custom scenarios on top of a company's base forecast parameters. Each
+scenario is a set of ScenarioModifiers and/or Parameterizer overrides; all
+scenarios of a request are projected together with the base scenario in one
+ProjectionEngine.run_scenarios pass.
+
+The historical analysis, base parameters and engine of a company are kept in a
+process-wide cache keyed by the balance content fingerprint, so repeated
+requests skip loading and analyzing the balances, and new balances are picked
+up automatically. Definitions can be saved (kbai_custom_scenarios) and re-run
+against the latest balances.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context, request
+
+from src.app.database.models import KbaiBalance, KbaiCustomScenario
+from src.common.localization import get_message
+from src.extensions import db
+
+from .core.parameterizer import CUSTOM_PARAMETER_KEYS, Parameterizer
+from .core.projection_engine import ProjectionEngine
+from .models.parameters import GrowthMode
+from .models.scenario import Scenario, ScenarioModifiers, ScenarioType
+from .predictive_service import DEFAULT_HORIZON_YEARS, PredictiveService
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_SCENARIO_MAX = 20
+CUSTOM_SCENARIO_NAME_MAX_LENGTH = 100
+DEFAULT_PARAMETER_CACHE_SIZE = 256
+# Modificatori accettati (campi numerici di ScenarioModifiers)
+CUSTOM_MODIFIER_KEYS = (
+    "revenue_growth_modifier", "cost_materie_modifier", "cost_servizi_modifier",
+    "inflation_modifier", "interest_rate_modifier", "personnel_change",
+)
+# Il nome dello scenario di riferimento, sempre proiettato insieme ai custom
+BASE_SCENARIO_NAME = "Base"
+
+
+@dataclass
+class CompanyForecastContext:
+    """Analysis products reused by every custom scenario run of a company"""
+    company_name: str
+    parameterizer: Parameterizer
+    engine: ProjectionEngine
+
+
+class ParameterCache:
+    """
+    LRU of CompanyForecastContext per (company, balance fingerprint).
+
+    Companies without a fingerprint (balances older than change tracking) are
+    always analyzed and never cached.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[tuple, CompanyForecastContext]" = OrderedDict()
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is not None:
+            return self._max_entries
+        if has_app_context():
+            return current_app.config.get('PREDICTION_PARAMETER_CACHE_SIZE', DEFAULT_PARAMETER_CACHE_SIZE)
+        return DEFAULT_PARAMETER_CACHE_SIZE
+
+    def get(self, company_id: int, locale: str) -> Tuple[Optional[CompanyForecastContext], Optional[Dict[str, Any]]]:
+        """
+        Context of a company, analyzing its balances on a miss.
+
+        Returns:
+            tuple: (context, error dict from PredictiveService._load_history)
+        """
+        fingerprint = KbaiBalance.content_fingerprint(company_id)
+        key = (company_id, fingerprint)
+        if fingerprint is not None:
+            with self._lock:
+                context = self._entries.get(key)
+                if context is not None:
+                    self._entries.move_to_end(key)
+                    return context, None
+
+        history = PredictiveService._load_history(company_id, locale)
+        if history["status"] == "error":
+            return None, history
+        analyzer = history["analyzer"]
+        context = CompanyForecastContext(
+            company_name=history["company"].company_name,
+            parameterizer=Parameterizer(historical_analyzer=analyzer),
+            engine=ProjectionEngine(analyzer),
+        )
+
+        if fingerprint is not None:
+            with self._lock:
+                # Contexts of older balance versions can no longer be hit
+                for stale in [cached for cached in self._entries if cached[0] == company_id]:
+                    del self._entries[stale]
+                self._entries[key] = context
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return context, None
+
+    def invalidate(self, company_id: Optional[int] = None):
+        """Drop one company's contexts, or all of them"""
+        with self._lock:
+            if company_id is None:
+                self._entries.clear()
+                return
+            for key in [cached for cached in self._entries if cached[0] == company_id]:
+                del self._entries[key]
+
+
+parameter_cache = ParameterCache()
+
+
+def parse_scenario_definitions(raw: Any) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Validate the custom scenarios of a request.
+
+    Each scenario is {"name", "description"?, "modifiers"?: {CUSTOM_MODIFIER_KEYS},
+    "overrides"?: {CUSTOM_PARAMETER_KEYS}}; values must be numbers (growth_mode
+    a GrowthMode value). The horizon is set per request, not per scenario.
+
+    Returns:
+        tuple: (normalized definitions, reason when invalid)
+    """
+    if not isinstance(raw, list) or not raw:
+        return [], "scenarios must be a non-empty list"
+    if len(raw) > CUSTOM_SCENARIO_MAX:
+        return [], f"at most {CUSTOM_SCENARIO_MAX} scenarios per request"
+
+    definitions = []
+    names = set()
+    for index, item in enumerate(raw, start=1):
+        if not isinstance(item, dict):
+            return [], f"scenario {index} must be an object"
+        name = str(item.get("name") or "").strip()
+        if not name or len(name) > CUSTOM_SCENARIO_NAME_MAX_LENGTH:
+            return [], f"scenario {index} needs a name of at most {CUSTOM_SCENARIO_NAME_MAX_LENGTH} characters"
+        if name.lower() == BASE_SCENARIO_NAME.lower() or name.lower() in names:
+            return [], f"scenario name '{name}' is reserved or repeated"
+        names.add(name.lower())
+
+        sections = {}
+        for section, allowed in (("modifiers", CUSTOM_MODIFIER_KEYS), ("overrides", CUSTOM_PARAMETER_KEYS)):
+            values = item.get(section) or {}
+            if not isinstance(values, dict):
+                return [], f"'{name}': {section} must be an object"
+            unknown = [key for key in values if key not in allowed or key == "orizzonte_anni"]
+            if unknown:
+                return [], f"'{name}': unknown {section} {', '.join(sorted(unknown))}"
+            for key, value in values.items():
+                if key == "growth_mode":
+                    if value not in {mode.value for mode in GrowthMode}:
+                        return [], f"'{name}': invalid growth_mode {value}"
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return [], f"'{name}': {key} must be a number"
+            sections[section] = dict(values)
+
+        if not sections["modifiers"] and not sections["overrides"]:
+            return [], f"'{name}': no modifiers or overrides"
+        definitions.append({
+            "name": name,
+            "description": str(item.get("description") or ""),
+            "modifiers": sections["modifiers"],
+            "overrides": sections["overrides"],
+        })
+    return definitions, None
+
+
+class CustomScenarioService:
+    """Runs, saves and re-runs custom forecast scenarios"""
+
+    def run_scenarios(
+        self,
+        company_id: int,
+        raw_scenarios: Any,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        save: bool = False,
+        user_id: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Validate, optionally save, and project custom scenarios with the base one.
+
+        Returns:
+            tuple: (response data, status code)
+        """
+        locale = request.headers.get('Accept-Language', 'en')
+        definitions, reason = parse_scenario_definitions(raw_scenarios)
+        if reason:
+            return {'message': get_message('pred_invalid_scenarios', locale, reason=reason)}, 400
+
+        try:
+            data, error = self._evaluate(company_id, definitions, horizon_years, locale)
+            if error:
+                return {'message': error}, 400
+
+            if save:
+                saved = self._save(company_id, definitions, user_id)
+                for name, scenario_id in saved.items():
+                    data['scenari'][name]['id_scenario'] = scenario_id
+
+            return {'message': get_message('pred_custom_scenarios_success', locale), 'data': data}, 200
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error running custom scenarios for company {company_id}: {str(e)}", exc_info=True)
+            return {'message': get_message('default_error', locale), 'error': str(e)}, 500
+
+    def list_scenarios(
+        self, company_id: int, run: bool = False, horizon_years: int = DEFAULT_HORIZON_YEARS
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Saved scenarios of a company; with run, also their projections on the
+        latest balances (one engine pass).
+
+        Returns:
+            tuple: (response data, status code)
+        """
+        locale = request.headers.get('Accept-Language', 'en')
+        try:
+            saved = KbaiCustomScenario.query.filter_by(id_company=company_id).order_by(
+                KbaiCustomScenario.name.asc()
+            ).all()
+            data = {'scenarios': [scenario.to_dict() for scenario in saved]}
+
+            if run and saved:
+                definitions = [
+                    {'name': scenario.name, 'description': scenario.description or '', **scenario.definition}
+                    for scenario in saved
+                ]
+                projections, error = self._evaluate(company_id, definitions, horizon_years, locale)
+                if error:
+                    return {'message': error}, 400
+                for scenario in saved:
+                    projections['scenari'][scenario.name]['id_scenario'] = scenario.id_scenario
+                data['projections'] = projections
+
+            return {'message': get_message('pred_custom_scenarios_success', locale), 'data': data}, 200
+
+        except Exception as e:
+            logger.error(f"Error listing custom scenarios for company {company_id}: {str(e)}", exc_info=True)
+            return {'message': get_message('default_error', locale), 'error': str(e)}, 500
+
+    def delete_scenario(self, company_id: int, scenario_id: int) -> Tuple[Dict[str, Any], int]:
+        """Delete a saved scenario of a company"""
+        locale = request.headers.get('Accept-Language', 'en')
+        try:
+            scenario = KbaiCustomScenario.query.filter_by(id_company=company_id, id_scenario=scenario_id).first()
+            if not scenario:
+                return {'message': get_message('pred_custom_scenario_not_found', locale)}, 404
+            db.session.delete(scenario)
+            db.session.commit()
+            return {'message': get_message('pred_custom_scenario_deleted', locale)}, 200
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error deleting custom scenario {scenario_id}: {str(e)}", exc_info=True)
+            return {'message': get_message('default_error', locale), 'error': str(e)}, 500
+
+    def _evaluate(
+        self, company_id: int, definitions: List[Dict[str, Any]], horizon_years: int, locale: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Project the base scenario and the definitions together on the cached context"""
+        context, error = parameter_cache.get(company_id, locale)
+        if error:
+            return None, error["message"]
+        parameterizer = context.parameterizer
+
+        base = parameterizer.get_parameters_for_scenario(ScenarioType.BASE)
+        base.orizzonte_anni = horizon_years
+        scenarios = [Scenario(name=BASE_SCENARIO_NAME, parameters=base, type=ScenarioType.BASE)]
+        validation = {BASE_SCENARIO_NAME: []}
+        for definition in definitions:
+            params = parameterizer.get_base_parameters()
+            if definition["modifiers"]:
+                params = parameterizer.apply_modifiers(params, ScenarioModifiers.from_dict({
+                    "name": definition["name"],
+                    "description": definition["description"],
+                    **definition["modifiers"],
+                }))
+            params = parameterizer.create_custom_parameters(
+                params, **definition["overrides"], orizzonte_anni=horizon_years
+            )
+            validation[definition["name"]] = parameterizer.validate_parameters(params)
+            scenarios.append(Scenario(
+                name=definition["name"], parameters=params, type=ScenarioType.CUSTOM,
+                description=definition["description"],
+            ))
+
+        # All scenarios in one engine pass
+        results = {
+            scenario.name: result
+            for scenario, result in zip(scenarios, context.engine.run_scenarios(scenarios))
+        }
+
+        definitions_by_name = {definition["name"]: definition for definition in definitions}
+        data = {
+            'company_id': company_id,
+            'company_name': context.company_name,
+            'anno_base': base.anno_base,
+            'orizzonte_anni': horizon_years,
+            'scenari': {},
+            'confronto_scenari': context.engine.compare_scenarios(results),
+        }
+        for name, result in results.items():
+            definition = definitions_by_name.get(name, {})
+            data['scenari'][name] = {
+                'nome': name,
+                'tipo': result.scenario_type.value,
+                'descrizione': definition.get('description', ''),
+                'definizione': {
+                    'modifiers': definition.get('modifiers', {}),
+                    'overrides': definition.get('overrides', {}),
+                },
+                'previsioni': {
+                    str(projection.year): {
+                        'ricavi': round(projection.ricavi, 2),
+                        'ebitda': round(projection.ebitda, 2),
+                        'ebit': round(projection.ebit, 2),
+                        'utile_netto': round(projection.utile_netto, 2),
+                        'patrimonio_netto': round(projection.patrimonio_netto, 2),
+                        'debiti_finanziari': round(projection.debiti_finanziari, 2),
+                        'totale_attivo': round(projection.totale_attivo, 2),
+                    }
+                    for projection in result.projections
+                },
+                'kpi': {
+                    str(year): {k: round(v, 4) if isinstance(v, float) else v for k, v in kpis.items()}
+                    for year, kpis in result.kpis.items()
+                },
+                'warnings': validation[name] + result.warnings,
+            }
+        return data, None
+
+    def _save(self, company_id: int, definitions: List[Dict[str, Any]], user_id: Optional[int]) -> Dict[str, int]:
+        """Insert or update the definitions by (company, name); returns {name: id_scenario}"""
+        existing = {
+            scenario.name: scenario
+            for scenario in KbaiCustomScenario.query.filter(
+                KbaiCustomScenario.id_company == company_id,
+                KbaiCustomScenario.name.in_([definition["name"] for definition in definitions]),
+            ).all()
+        }
+        now = datetime.utcnow()
+        saved = []
+        for definition in definitions:
+            scenario = existing.get(definition["name"])
+            if scenario is None:
+                scenario = KbaiCustomScenario(
+                    id_company=company_id, name=definition["name"], created_by=user_id, created_at=now
+                )
+                db.session.add(scenario)
+            scenario.description = definition["description"]
+            scenario.definition = {"modifiers": definition["modifiers"], "overrides": definition["overrides"]}
+            scenario.updated_at = now
+            saved.append(scenario)
+        db.session.commit()
+        return {scenario.name: scenario.id_scenario for scenario in saved}
+
+
+custom_scenario_service = CustomScenarioService()
@@ -0,0 +1,143 @@
+"""
+Historical Aggregate Service
+
+Persisted per-company historical aggregates for the predictive engine.
+HistoricalAnalyzer metrics depend on each complete annual balance only through
+its YearContribution (series values and yearly ratios), so the contributions
+are stored per company in kbai_historical_aggregates and kept in sync one
+balance at a time: when a final balance is added, replaced or deleted only
+that balance is parsed or dropped. Forecasts then build the analyzer from the
+stored contributions and parse just the base balance.
+
+Entries carry the content_hash they were computed from, so a sync compares the
+company's balance metadata with the stored entries and never re-reads
+unchanged years.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import defer
+
+from src.app.database.models import KbaiBalance, KbaiHistoricalAggregate
+from src.extensions import db
+
+from .core.historical_analyzer import CONTRIBUTION_VERSION, YearContribution
+from .models.balance_sheet import PARSED_MODEL_VERSION, BalanceSheetData
+from .predictive_service import is_complete_balance
+
+logger = logging.getLogger(__name__)
+
+
+class HistoricalAggregateService:
+    """Keeps kbai_historical_aggregates in sync with the companies' balances"""
+
+    def sync(self, company_id: int, balances: Optional[List[KbaiBalance]] = None) -> List[YearContribution]:
+        """
+        Bring a company's aggregate up to date and return its contributions.
+
+        Only complete balances without a stored entry for their current
+        content_hash are parsed; entries of deleted or replaced balances are
+        dropped. The row is written only when something changed and every
+        complete balance has a content_hash.
+
+        Args:
+            company_id: Company ID
+            balances: The company's active balances (loaded without the JSON if omitted)
+
+        Returns:
+            Contributions of the complete annual balances, oldest first
+        """
+        if balances is None:
+            balances = (
+                KbaiBalance.query.options(defer(KbaiBalance.balance))
+                .filter(
+                    KbaiBalance.id_company == company_id,
+                    KbaiBalance.is_deleted == False,
+                )
+                .order_by(KbaiBalance.year.asc())
+                .all()
+            )
+        complete = [b for b in balances if is_complete_balance(b)]
+
+        aggregate = KbaiHistoricalAggregate.query.get(company_id)
+        current = (
+            aggregate is not None
+            and aggregate.version == CONTRIBUTION_VERSION
+            and aggregate.parsed_model_version == PARSED_MODEL_VERSION
+        )
+        stored = {entry["id_balance"]: entry for entry in aggregate.contributions} if current else {}
+
+        entries = []
+        changed = not current
+        for balance in complete:
+            entry = stored.get(balance.id_balance)
+            if entry is None or balance.content_hash is None or entry.get("content_hash") != balance.content_hash:
+                entry = self._entry(balance)
+                if entry is None:
+                    continue
+                changed = True
+            entries.append(entry)
+
+        if set(stored) - {entry["id_balance"] for entry in entries}:
+            changed = True
+
+        if changed and all(balance.content_hash is not None for balance in complete):
+            self._save(company_id, entries)
+
+        return [YearContribution.from_dict(entry) for entry in entries]
+
+    def refresh_company(self, company_id: int) -> Tuple[int, Optional[str]]:
+        """
+        Sync a company's aggregate after one of its balances changed.
+
+        Returns:
+            tuple: (number of contributions, error)
+        """
+        try:
+            return len(self.sync(company_id)), None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error syncing historical aggregate for company {company_id}: {str(e)}")
+            return 0, str(e)
+
+    def _entry(self, balance: KbaiBalance) -> Optional[Dict[str, Any]]:
+        """Stored entry of one balance (None if it cannot be parsed)"""
+        try:
+            data = BalanceSheetData.from_balance_record(balance)
+        except Exception as e:
+            logger.error(f"Error parsing balance {balance.id_balance}: {str(e)}")
+            return None
+        if data is None:
+            return None
+        return {
+            "id_balance": balance.id_balance,
+            "content_hash": balance.content_hash,
+            **YearContribution.from_balance(data).to_dict(),
+        }
+
+    def _save(self, company_id: int, entries: List[Dict[str, Any]]):
+        """Upsert the aggregate row (concurrent syncs of a company write the same content)"""
+        now = datetime.utcnow()
+        values = {
+            "version": CONTRIBUTION_VERSION,
+            "parsed_model_version": PARSED_MODEL_VERSION,
+            "contributions": entries,
+            "updated_at": now,
+        }
+        try:
+            db.session.execute(
+                insert(KbaiHistoricalAggregate)
+                .values(id_company=company_id, **values)
+                .on_conflict_do_update(index_elements=["id_company"], set_=values)
+            )
+            db.session.commit()
+        except Exception as e:
+            # The contributions are still valid for this request; the next sync retries
+            db.session.rollback()
+            logger.warning(f"Error saving historical aggregate for company {company_id}: {str(e)}")
+
+
+historical_aggregate_service = HistoricalAggregateService()
@@ -29,6 +29,9 @@ from .parameters import (
 from .scenario import (
     ScenarioType,
     ScenarioModifiers,
+    MonteCarloResult,
+    SensitivityResult,
+    GoalSeekResult,
     SCENARIO_PRESETS,
 )
 
@@ -53,5 +56,8 @@ __all__ = [
     # Scenario
     "ScenarioType",
     "ScenarioModifiers",
+    "MonteCarloResult",
+    "SensitivityResult",
+    "GoalSeekResult",
     "SCENARIO_PRESETS",
 ]
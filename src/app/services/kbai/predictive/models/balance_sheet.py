@@ -7,8 +7,8 @@ Supports both Conto Economico (Income Statement) and Stato Patrimoniale (Balance
 Following KBAI JSON structure patterns from existing comparison_report.py
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from dataclasses import MISSING, dataclass, field, fields, is_dataclass
+from typing import Dict, Any, Optional, List, Sequence, Tuple
 from datetime import datetime
 
 
@@ -566,6 +566,44 @@ class BalanceSheetData:
 
         return balance
 
+    @classmethod
+    def from_balance_record(cls, record) -> Optional["BalanceSheetData"]:
+        """
+        Bilancio da un record KbaiBalance: dal modello parsato all'ingest se della
+        versione corrente, altrimenti dal JSON (None se il record non ha dati).
+        """
+        month = record.month or 12
+        if record.parsed_model is not None and record.parsed_model_version == PARSED_MODEL_VERSION:
+            return cls.from_vector(record.parsed_model, record.year, month)
+        if not record.balance:
+            return None
+        return cls.from_kbai_json(record.balance, record.year, month)
+
+    def to_vector(self) -> List[float]:
+        """Valori CE + SP impacchettati nell'ordine di PARSED_MODEL_FIELDS"""
+        values = []
+        for path in PARSED_MODEL_FIELDS:
+            node = self
+            for name in path:
+                node = getattr(node, name)
+            values.append(float(node))
+        return values
+
+    @classmethod
+    def from_vector(cls, values: Sequence[float], year: int, month: int = 12) -> "BalanceSheetData":
+        """Ricostruisce il bilancio da un vettore di to_vector() (stessa PARSED_MODEL_VERSION)"""
+        if len(values) != len(PARSED_MODEL_FIELDS):
+            raise ValueError(
+                f"Parsed model has {len(values)} values, expected {len(PARSED_MODEL_FIELDS)}"
+            )
+        balance = cls(year=year, month=month)
+        for path, value in zip(PARSED_MODEL_FIELDS, values):
+            node = balance
+            for name in path[:-1]:
+                node = getattr(node, name)
+            setattr(node, path[-1], float(value))
+        return balance
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON export"""
         return {
@@ -614,3 +652,33 @@ class BalanceSheetData:
                 "is_balanced": self.stato_patrimoniale.is_balanced,
             },
         }
+
+
+def _leaf_paths(cls, prefix: Tuple[str, ...] = ()) -> List[Tuple[str, ...]]:
+    """Attribute paths of the float leaves of a nested dataclass, in declaration order"""
+    paths = []
+    for f in fields(cls):
+        default = f.default_factory() if f.default_factory is not MISSING else f.default
+        if is_dataclass(default):
+            paths.extend(_leaf_paths(type(default), prefix + (f.name,)))
+        elif isinstance(default, float):
+            paths.append(prefix + (f.name,))
+    return paths
+
+
+# Parsed financial model persisted per balance (KbaiBalance.parsed_model): the
+# values of every ContoEconomico/StatoPatrimoniale field as a packed float array.
+# Bump PARSED_MODEL_VERSION whenever the fields or the from_kbai_json mapping
+# change, so stored vectors are re-parsed (scripts/backfill_balance_parsed_model.py).
+PARSED_MODEL_VERSION = 1
+PARSED_MODEL_FIELDS: Tuple[Tuple[str, ...], ...] = tuple(
+    [("conto_economico",) + path for path in _leaf_paths(ContoEconomico)]
+    + [("stato_patrimoniale",) + path for path in _leaf_paths(StatoPatrimoniale)]
+)
+
+
+def parse_balance_model(json_data: Optional[Dict[str, Any]]) -> Optional[List[float]]:
+    """Parsed model vector of a KBAI balance JSON (None when there is no data)"""
+    if not json_data:
+        return None
+    return BalanceSheetData.from_kbai_json(json_data, year=0).to_vector()
@@ -196,3 +196,103 @@ class ScenarioResult:
             "kpi": self.kpi,
             "warnings": self.warnings,
         }
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Risultato di una simulazione Monte Carlo.
+    Bande P10/P50/P90 per anno delle grandezze principali e dei KPI.
+    """
+    n_paths: int
+    anni: List[int]
+    # {grandezza: {anno: {"p10", "p50", "p90", "mean"}}}
+    bande: Dict[str, Dict[int, Dict[str, float]]] = field(default_factory=dict)
+    # {kpi: {anno: {"p10", "p50", "p90", "mean"}}}
+    kpi: Dict[str, Dict[int, Dict[str, float]]] = field(default_factory=dict)
+    # {anno: {"perdita": P(utile netto < 0), "liquidita_esaurita": P(liquidità = 0)}}
+    probabilita: Dict[int, Dict[str, float]] = field(default_factory=dict)
+    # Distribuzioni usate per il campionamento
+    distribuzioni: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    seed: Optional[int] = None
+    warnings: list = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def by_year(series: Dict[str, Dict[int, Dict[str, float]]]) -> Dict[str, Any]:
+            return {
+                name: {str(year): values for year, values in years.items()}
+                for name, years in series.items()
+            }
+
+        return {
+            "n_paths": self.n_paths,
+            "anni": self.anni,
+            "bande": by_year(self.bande),
+            "kpi": by_year(self.kpi),
+            "probabilita": {str(year): values for year, values in self.probabilita.items()},
+            "distribuzioni": self.distribuzioni,
+            "seed": self.seed,
+            "warnings": self.warnings,
+        }
+
+
+@dataclass
+class SensitivityResult:
+    """
+    Risultato dell'analisi di sensitività (tornado) attorno a uno scenario.
+    Ogni parametro è perturbato di ±delta (relativo) e i KPI obiettivo sono
+    letti nell'anno di confronto.
+    """
+    anno: int
+    delta: float
+    # {parametro: valore di partenza}
+    parametri: Dict[str, float] = field(default_factory=dict)
+    # {obiettivo: valore dello scenario di partenza}
+    valori_base: Dict[str, float] = field(default_factory=dict)
+    # {obiettivo: [{"parametro", "basso", "alto", "swing", "elasticita"}] ordinati per |swing|}
+    tornado: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    warnings: list = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "anno": self.anno,
+            "delta": self.delta,
+            "parametri": self.parametri,
+            "valori_base": self.valori_base,
+            "tornado": self.tornado,
+            "warnings": self.warnings,
+        }
+
+
+@dataclass
+class GoalSeekResult:
+    """
+    Risultato della ricerca obiettivo: valore dei parametri liberi per cui
+    il KPI (o la voce) obiettivo raggiunge il valore richiesto nell'anno dato.
+    """
+    obiettivo: str
+    valore_obiettivo: float
+    anno: int
+    # {parametro: valore di partenza} e {parametro: valore risolto}
+    parametri_iniziali: Dict[str, float] = field(default_factory=dict)
+    parametri: Dict[str, float] = field(default_factory=dict)
+    valore_ottenuto: float = 0.0
+    raggiunto: bool = False
+    iterazioni: int = 0
+    # Proiezione completa con i parametri risolti
+    scenario: Optional["ScenarioResult"] = None
+    warnings: list = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "obiettivo": self.obiettivo,
+            "valore_obiettivo": self.valore_obiettivo,
+            "anno": self.anno,
+            "parametri_iniziali": self.parametri_iniziali,
+            "parametri": self.parametri,
+            "valore_ottenuto": self.valore_ottenuto,
+            "raggiunto": self.raggiunto,
+            "iterazioni": self.iterazioni,
+            "scenario": self.scenario.to_dict() if self.scenario else None,
+            "warnings": self.warnings,
+        }
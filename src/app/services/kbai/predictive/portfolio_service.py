@@ -0,0 +1,342 @@
+"""
+Portfolio Forecast Service
+
+Batch forecasting for a set of companies (e.g. all clients of an accountant).
+Balances of the whole set are loaded with a few bulk queries, each company's
+HistoricalAnalyzer + Parameterizer + ProjectionEngine run is spread over a
+process pool (batch job only; API refreshes run in-process), and the per-year revenue, EBITDA and net income of the three
+scenarios are stored in kbai_prediction_summary for the portfolio table.
+
+Companies whose balances did not change since their stored summary (same
+KbaiBalance.content_fingerprint and horizon) are skipped.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, request
+from sqlalchemy import insert
+from sqlalchemy.orm import defer
+
+from src.app.database.models import (
+    KbaiBalance,
+    KbaiCompany,
+    KbaiPredictionSummary,
+    TbUserCompany,
+)
+from src.common.localization import get_message
+from src.extensions import db
+
+from .core.historical_analyzer import HistoricalAnalyzer
+from .core.parameterizer import Parameterizer
+from .core.projection_engine import ProjectionEngine
+from .models.balance_sheet import BalanceSheetData
+from .models.scenario import Scenario
+from .predictive_service import DEFAULT_HORIZON_YEARS, is_complete_balance
+
+logger = logging.getLogger(__name__)
+
+# Voci riassunte per anno e scenario
+SUMMARY_ITEMS = ("ricavi", "ebitda", "utile_netto")
+
+
+def forecast_company_summary(
+    payload: Tuple[int, List[BalanceSheetData], int]
+) -> Tuple[int, Optional[int], Optional[List[Dict[str, Any]]], Optional[str]]:
+    """
+    Forecast one company and summarize it (runs in the worker processes).
+
+    Args:
+        payload: (company_id, complete annual balances, horizon_years)
+
+    Returns:
+        (company_id, base year, summary rows, error)
+    """
+    company_id, storico, horizon_years = payload
+    try:
+        analyzer = HistoricalAnalyzer(storico)
+        analyzer.analyze()
+
+        scenarios = []
+        for scenario_type, params in Parameterizer(historical_analyzer=analyzer).get_all_scenario_parameters().items():
+            params.orizzonte_anni = horizon_years
+            scenarios.append(Scenario(name=scenario_type.value.capitalize(), parameters=params, type=scenario_type))
+
+        rows = [
+            {
+                "scenario": result.scenario_type.value,
+                "year": projection.year,
+                **{item: round(getattr(projection, item), 2) for item in SUMMARY_ITEMS},
+            }
+            for result in ProjectionEngine(analyzer).run_scenarios(scenarios)
+            for projection in result.projections
+        ]
+        return company_id, analyzer.anno_base, rows, None
+    except Exception as e:
+        return company_id, None, None, str(e)
+
+
+class PortfolioForecastService:
+    """Runs the batch forecasting job and serves the portfolio table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Users with a refresh running in this process
+        self._active_users = set()
+
+    def run(
+        self,
+        company_ids: Optional[Iterable[int]] = None,
+        user_id: Optional[int] = None,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        force: bool = False,
+        workers: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Forecast a set of companies and store their summaries.
+
+        Args:
+            company_ids: Companies to forecast
+            user_id: Forecast the companies mapped to this user instead
+            horizon_years: Number of years to project
+            force: Recompute companies whose balances did not change
+            workers: Worker processes (default: PORTFOLIO_FORECAST_WORKERS, 0 = one per CPU)
+
+        Returns:
+            tuple: ({"companies", "computed", "unchanged", "skipped": {id: reason}}, error)
+        """
+        try:
+            ids = self._company_ids(company_ids, user_id)
+            fingerprints = KbaiBalance.content_fingerprints(ids)
+
+            stored = dict(
+                db.session.query(
+                    KbaiPredictionSummary.id_company, KbaiPredictionSummary.source_fingerprint
+                ).filter(
+                    KbaiPredictionSummary.id_company.in_(ids),
+                    KbaiPredictionSummary.horizon_years == horizon_years,
+                ).distinct().all()
+            ) if ids and not force else {}
+            pending = [
+                company_id for company_id in ids
+                if force or fingerprints[company_id] is None or stored.get(company_id) != fingerprints[company_id]
+            ]
+
+            stats = {"companies": len(ids), "computed": 0, "unchanged": len(ids) - len(pending), "skipped": {}}
+            if not pending:
+                return stats, None
+
+            payloads = []
+            for company_id, storico in self._complete_balances(pending).items():
+                if storico:
+                    payloads.append((company_id, storico, horizon_years))
+                else:
+                    stats["skipped"][company_id] = "no complete balances"
+
+            summaries = {}
+            for company_id, base_year, rows, error in self._map(payloads, workers):
+                if error:
+                    logger.warning(f"Portfolio forecast failed for company {company_id}: {error}")
+                    stats["skipped"][company_id] = error
+                else:
+                    summaries[company_id] = (base_year, rows)
+
+            self._store(summaries, fingerprints, horizon_years)
+            stats["computed"] = len(summaries)
+            logger.info(
+                f"Portfolio forecast: {stats['computed']} computed, {stats['unchanged']} unchanged, "
+                f"{len(stats['skipped'])} skipped of {stats['companies']} companies"
+            )
+            return stats, None
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error running portfolio forecast: {str(e)}", exc_info=True)
+            return {}, str(e)
+
+    def run_async(self, user_id: int, horizon_years: int = DEFAULT_HORIZON_YEARS) -> bool:
+        """
+        Run the job for a user's companies in a background thread.
+
+        The forecasts run in-process (workers=1): the process pool is reserved
+        for scripts/run_portfolio_forecast.py, so web workers never fork.
+
+        Returns:
+            False if a run for the user is already active in this process
+        """
+        with self._lock:
+            if user_id in self._active_users:
+                return False
+            self._active_users.add(user_id)
+
+        app = current_app._get_current_object()
+
+        def _run():
+            try:
+                with app.app_context():
+                    stats, error = self.run(user_id=user_id, horizon_years=horizon_years, workers=1)
+                    if error:
+                        logger.error(f"Background portfolio forecast failed for user {user_id}: {error}")
+            finally:
+                with self._lock:
+                    self._active_users.discard(user_id)
+
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        try:
+            thread.start()
+        except Exception:
+            with self._lock:
+                self._active_users.discard(user_id)
+            raise
+        return True
+
+    def get_portfolio(self, current_user, user_id: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Stored forecast summaries of the companies mapped to a user.
+
+        superadmin/staff can read any user's portfolio; other roles only their
+        own. Each company reports whether its balances changed since the
+        summary was computed ("stale").
+
+        Returns:
+            tuple: (response data, status code)
+        """
+        locale = request.headers.get('Accept-Language', 'en')
+        try:
+            target_user = user_id or current_user.id_user
+            if target_user != current_user.id_user and current_user.role.lower() not in ('superadmin', 'staff'):
+                return {'message': get_message('permission_denied', locale)}, 403
+
+            ids = self._company_ids(None, target_user)
+            companies = KbaiCompany.query.filter(KbaiCompany.id_company.in_(ids)).order_by(
+                KbaiCompany.company_name.asc()
+            ).all() if ids else []
+            rows = KbaiPredictionSummary.query.filter(
+                KbaiPredictionSummary.id_company.in_(ids)
+            ).order_by(
+                KbaiPredictionSummary.id_company, KbaiPredictionSummary.scenario, KbaiPredictionSummary.year
+            ).all() if ids else []
+            fingerprints = KbaiBalance.content_fingerprints(ids)
+
+            by_company = {}
+            for row in rows:
+                by_company.setdefault(row.id_company, []).append(row)
+
+            portfolio = []
+            for company in companies:
+                company_rows = by_company.get(company.id_company, [])
+                entry = {
+                    'id_company': company.id_company,
+                    'company_name': company.company_name,
+                    'base_year': None,
+                    'updated_at': None,
+                    'stale': True,
+                    'scenari': {},
+                }
+                if company_rows:
+                    first = company_rows[0]
+                    entry['base_year'] = first.base_year
+                    entry['updated_at'] = first.updated_at.isoformat() if first.updated_at else None
+                    entry['stale'] = (
+                        fingerprints.get(company.id_company) is None
+                        or first.source_fingerprint != fingerprints[company.id_company]
+                    )
+                    for row in company_rows:
+                        data = row.to_dict()
+                        entry['scenari'].setdefault(row.scenario, []).append(
+                            {'year': data['year'], **{item: data[item] for item in SUMMARY_ITEMS}}
+                        )
+                portfolio.append(entry)
+
+            return {
+                'message': get_message('pred_portfolio_success', locale),
+                'data': {'companies': portfolio, 'total': len(portfolio)},
+            }, 200
+
+        except Exception as e:
+            logger.error(f"Error retrieving forecast portfolio: {str(e)}", exc_info=True)
+            return {'message': get_message('default_error', locale), 'error': str(e)}, 500
+
+    def _company_ids(self, company_ids: Optional[Iterable[int]], user_id: Optional[int]) -> List[int]:
+        """Active non-competitor companies of the set, of a user, or all of them (one query)"""
+        query = db.session.query(KbaiCompany.id_company).filter(
+            KbaiCompany.is_deleted == False,
+            KbaiCompany.is_competitor == False,
+        )
+        if user_id is not None:
+            query = query.join(TbUserCompany, TbUserCompany.id_company == KbaiCompany.id_company).filter(
+                TbUserCompany.id_user == user_id
+            )
+        elif company_ids is not None:
+            query = query.filter(KbaiCompany.id_company.in_(list(company_ids)))
+        return [row.id_company for row in query.order_by(KbaiCompany.id_company).all()]
+
+    def _complete_balances(self, company_ids: List[int]) -> Dict[int, List[BalanceSheetData]]:
+        """Complete annual balances of all companies, parsed, with one balance query"""
+        balances = (
+            KbaiBalance.query.options(defer(KbaiBalance.balance))
+            .filter(
+                KbaiBalance.id_company.in_(company_ids),
+                KbaiBalance.is_deleted == False,
+            )
+            .order_by(KbaiBalance.id_company, KbaiBalance.year.asc())
+            .all()
+        )
+        storico = {company_id: [] for company_id in company_ids}
+        for balance in balances:
+            if not is_complete_balance(balance):
+                continue
+            try:
+                data = BalanceSheetData.from_balance_record(balance)
+            except Exception as e:
+                logger.error(f"Error parsing balance {balance.id_balance}: {str(e)}")
+                continue
+            if data is not None:
+                storico[balance.id_company].append(data)
+        return storico
+
+    def _map(self, payloads: List[tuple], workers: Optional[int]) -> List[tuple]:
+        """Run forecast_company_summary over the payloads, in a process pool when worthwhile"""
+        if workers is None:
+            workers = current_app.config.get('PORTFOLIO_FORECAST_WORKERS', 0)
+        workers = min(workers or os.cpu_count() or 1, len(payloads))
+        if workers <= 1:
+            return [forecast_company_summary(payload) for payload in payloads]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(payloads) // (workers * 4))
+            return list(executor.map(forecast_company_summary, payloads, chunksize=chunksize))
+
+    def _store(
+        self,
+        summaries: Dict[int, Tuple[int, List[Dict[str, Any]]]],
+        fingerprints: Dict[int, Optional[str]],
+        horizon_years: int,
+    ):
+        """Replace the summaries of the computed companies (one DELETE, one bulk INSERT)"""
+        if not summaries:
+            return
+        now = datetime.utcnow()
+        db.session.query(KbaiPredictionSummary).filter(
+            KbaiPredictionSummary.id_company.in_(list(summaries))
+        ).delete(synchronize_session=False)
+        db.session.execute(insert(KbaiPredictionSummary), [
+            {
+                'id_company': company_id,
+                'base_year': base_year,
+                'horizon_years': horizon_years,
+                'source_fingerprint': fingerprints.get(company_id),
+                'updated_at': now,
+                **row,
+            }
+            for company_id, (base_year, rows) in summaries.items()
+            for row in rows
+        ])
+        db.session.commit()
+
+
+portfolio_forecast_service = PortfolioForecastService()
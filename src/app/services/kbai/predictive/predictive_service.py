@@ -4,6 +4,7 @@ Orchestrates the predictive engine within the Flask application context.
 """
 
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
@@ -19,17 +20,54 @@ from src.app.database.models import (
 
 # Import predictive engine components
 # Adjusted imports relative to the new location
-from .models.balance_sheet import BalanceSheetData
-from .core.historical_analyzer import HistoricalAnalyzer
+from .models.balance_sheet import PARSED_MODEL_VERSION, BalanceSheetData
+from .core.historical_analyzer import CONTRIBUTION_VERSION, HistoricalAnalyzer
 from .core.parameterizer import Parameterizer, ForecastParameters
-from .core.projection_engine import ProjectionEngine
+from .core.projection_engine import (
+    ProjectionEngine,
+    SENSITIVITY_DEFAULT_DELTA,
+    SENSITIVITY_DEFAULT_TARGETS,
+)
 from .models.scenario import ScenarioType
-from flask import request
+from flask import current_app, request
+from sqlalchemy.orm import defer
 from src.common.localization import get_message
+from src.common.conditional import make_etag
+from src.app.api.v1.services.common.response_cache import response_cache, prediction_tag
 from .core.suggester_engine import SuggesterEngine
 
 logger = logging.getLogger(__name__)
 
+PREDICTION_CACHE_NAMESPACE = "prediction"
+DEFAULT_HORIZON_YEARS = 3
+# Longest projection accepted from the API (cost grows with the horizon)
+MAX_HORIZON_YEARS = 10
+
+# Version of the prediction logic (analyzer metrics, parameterizer, projection
+# engine, response layout). Bump it whenever unchanged balances would give a
+# different prediction, so memoized results and client ETags are dropped.
+PREDICTION_ENGINE_VERSION = "1"
+
+
+def engine_version() -> str:
+    """Version of everything a prediction is derived from besides the balances"""
+    return f"{PREDICTION_ENGINE_VERSION}.{PARSED_MODEL_VERSION}.{CONTRIBUTION_VERSION}"
+
+
+def is_complete_balance(balance) -> bool:
+    """A final balance of a whole year (no month, or December) can anchor a forecast"""
+    return balance.type.lower() == "final" and (balance.month is None or balance.month == 12)
+
+
+def _resolve_locale(locale: Optional[str]) -> str:
+    """Given locale, else the request's Accept-Language (en outside requests)"""
+    if locale:
+        return locale
+    try:
+        return request.headers.get("Accept-Language", "en")
+    except Exception:
+        return "en"
+
 
 class PredictiveService:
     """
@@ -38,142 +76,276 @@ class PredictiveService:
     """
 
     @staticmethod
-    def generate_prediction(
-        company_id: int, horizon_years: int = 3, locale: str = None
-    ) -> Dict[str, Any]:
+    def prediction_etag(
+        company_id: int, horizon_years: int, locale: str, monte_carlo_paths: Optional[int] = None
+    ) -> Optional[str]:
         """
-        Generate a full 3-scenario prediction for a company.
+        ETag of a prediction from the content fingerprint of the company's balances.
 
-        Args:
-            company_id: The ID of the company to predict for.
-            horizon_years: Number of years to project (default 3).
-            locale: Language for suggestions (optional).
+        Predictions are derived only from the balances and the engine version,
+        so the ETag can be checked before running the engine. None if the fingerprint is unavailable.
+        """
+        try:
+            fingerprint = KbaiBalance.content_fingerprint(company_id)
+        except Exception as e:
+            logger.warning(f"Could not compute prediction ETag for company {company_id}: {str(e)}")
+            return None
+        if fingerprint is None:
+            return None
+        parts = ["prediction", company_id, fingerprint, engine_version(), horizon_years, locale]
+        if monte_carlo_paths:
+            # Simulations are seeded per company, so the same inputs give the same bands
+            parts.append(f"monte_carlo:{monte_carlo_paths}")
+        return make_etag(*parts)
 
-        Returns:
-            Dictionary containing the full forecast results (JSON compatible).
+    @staticmethod
+    def get_prediction(
+        company_id: int,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        locale: str = None,
+        monte_carlo_paths: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
-        # Pick locale from request if not provided
-        if not locale:
-            try:
-                locale = request.headers.get("Accept-Language", "en")
-            except Exception:
-                locale = "en"
+        Memoized generate_prediction.
+
+        Results are cached per (company, balance content fingerprint, engine
+        version, horizon, locale, Monte Carlo paths), so a repeated request skips loading and
+        parsing the balances and running the engine. Balance uploads, deletes
+        and re-extractions change the fingerprint and bump the company's
+        prediction tag. Only successful results are cached; companies with
+        balances older than change tracking (no fingerprint) are always computed.
+        """
+        locale = _resolve_locale(locale)
 
         try:
-            # 1. Fetch Company Data
-            company = KbaiCompany.query.get(company_id)
-            if not company:
-                raise ValueError(f"Company {company_id} not found")
-
-            # 2. Fetch Historical Balances
-            # Get all active balance sheets, ordered by year
-            # Note: We filter out balances without JSON data
-            balances = (
-                KbaiBalance.query.filter(
-                    KbaiBalance.id_company == company_id,
-                    KbaiBalance.is_deleted == False,
-                )
-                .order_by(KbaiBalance.year.asc())
-                .all()
+            fingerprint = KbaiBalance.content_fingerprint(company_id)
+        except Exception as e:
+            logger.warning(f"Could not compute prediction fingerprint for company {company_id}: {str(e)}")
+            fingerprint = None
+
+        def compute():
+            result = PredictiveService.generate_prediction(
+                company_id, horizon_years, locale=locale, monte_carlo_paths=monte_carlo_paths
             )
+            return result, 200 if result["status"] == "success" else 400
+
+        if fingerprint is None:
+            return compute()[0]
+
+        result, _ = response_cache.get_or_compute(
+            PREDICTION_CACHE_NAMESPACE,
+            {
+                "company_id": company_id,
+                "fingerprint": fingerprint,
+                "engine_version": engine_version(),
+                "horizon_years": horizon_years,
+                "monte_carlo_paths": monte_carlo_paths,
+            },
+            compute,
+            tags=[prediction_tag(company_id)],
+            locale=locale,
+            timeout=current_app.config.get("PREDICTION_CACHE_TIMEOUT"),
+        )
+        return result
 
-            if not balances:
-                return {
-                    "status": "error",
-                    "message": get_message("no_balance_sheets_found", locale),
-                }
+    @staticmethod
+    def precompute_prediction_async(company_id: int, locale: str = "en"):
+        """
+        Warm the prediction cache in a background thread (after a balance upload).
 
-            # 3. Identify Complete Balances and Base Year
-            # Logic: year, type=="final", month == None consider as complete year.
-            complete_balances_objs = [
-                b
-                for b in balances
-                if b.type.lower() == "final" and (b.month is None or b.month == 12)
-            ]
-
-            if not complete_balances_objs:
-                return {
-                    "status": "error",
-                    "message": get_message("pred_no_complete_balances", locale),
-                }
+        Runs the default-horizon prediction so the forecast page is served from
+        the cache; disabled by PREDICTION_PRECOMPUTE_ON_UPLOAD or when the
+        response cache is off.
+        """
+        if not current_app.config.get("PREDICTION_PRECOMPUTE_ON_UPLOAD", False) or not response_cache.enabled:
+            return
+        app = current_app._get_current_object()
+
+        def _precompute():
+            with app.app_context():
+                try:
+                    result = PredictiveService.get_prediction(company_id, locale=locale)
+                    if result["status"] == "success":
+                        logger.info(f"Prediction precomputed for company {company_id} (background)")
+                    else:
+                        logger.info(
+                            f"Prediction not precomputed for company {company_id}: {result.get('message')}"
+                        )
+                except Exception as e:
+                    logger.error(f"Prediction precompute error for company {company_id} (background): {str(e)}")
 
-            # Latest complete balance is our anchor for forecast
-            base_balance_obj = max(
-                complete_balances_objs, key=lambda b: (b.year, b.month or 0)
+        thread = threading.Thread(target=_precompute)
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def _load_history(company_id: int, locale: str) -> Dict[str, Any]:
+        """
+        Load a company's balances and run the historical analysis (steps 1-4).
+
+        Returns:
+            {"status": "success", "company", "balances", "analyzer",
+            "trimester_actuals"} or {"status": "error", "message"}.
+        """
+        # 1. Fetch Company Data
+        company = KbaiCompany.query.get(company_id)
+        if not company:
+            raise ValueError(f"Company {company_id} not found")
+
+        # 2. Fetch Historical Balances
+        # Get all active balance sheets, ordered by year. The JSON is only
+        # loaded for balances without a current parsed model
+        balances = (
+            KbaiBalance.query.options(defer(KbaiBalance.balance))
+            .filter(
+                KbaiBalance.id_company == company_id,
+                KbaiBalance.is_deleted == False,
             )
-            base_year = base_balance_obj.year
+            .order_by(KbaiBalance.year.asc())
+            .all()
+        )
+
+        if not balances:
+            return {
+                "status": "error",
+                "message": get_message("no_balance_sheets_found", locale),
+            }
 
-            historical_data = []  # Complete years up to base_year
-            trimester_actuals = []  # For trimester object (data after/during base year)
+        # 3. Identify Complete Balances and Base Year
+        # Logic: year, type=="final", month == None consider as complete year.
+        complete_balances_objs = [b for b in balances if is_complete_balance(b)]
 
-            from .core.kpi_calculator import KPICalculator
+        if not complete_balances_objs:
+            return {
+                "status": "error",
+                "message": get_message("pred_no_complete_balances", locale),
+            }
+
+        # Latest complete balance is our anchor for forecast
+        base_balance_obj = max(
+            complete_balances_objs, key=lambda b: (b.year, b.month or 0)
+        )
+        base_year = base_balance_obj.year
+
+        # The complete years enter the analysis through the persisted
+        # historical aggregate: only changed balances are parsed by the sync
+        from .historical_aggregate_service import historical_aggregate_service
+
+        contributi = historical_aggregate_service.sync(company_id, balances)
+
+        # The base balance is still needed in full (values for the projections);
+        # fall back to the previous complete one if it cannot be parsed
+        base_data = None
+        for b in sorted(complete_balances_objs, key=lambda b: (b.year, b.month or 0), reverse=True):
+            try:
+                base_data = BalanceSheetData.from_balance_record(b)
+            except Exception as e:
+                logger.error(f"Error parsing balance {b.id_balance}: {str(e)}")
+            if base_data is not None:
+                base_data.company_name = company.company_name
+                break
+
+        trimester_actuals = []  # For trimester object (data after/during base year)
 
-            kpi_calc = KPICalculator()
+        from .core.kpi_calculator import KPICalculator
 
-            for b in balances:
-                if not b.balance:
+        kpi_calc = KPICalculator()
+
+        for b in balances:
+            # Trimester / Actuals: strictly only data for years AFTER the base year
+            if b.year <= base_year:
+                continue
+            try:
+                bs_data = BalanceSheetData.from_balance_record(b)
+                if bs_data is None:
                     continue
+                bs_data.company_name = company.company_name
+
+                ce = bs_data.conto_economico
+                sp = bs_data.stato_patrimoniale
+                raw_kpis = kpi_calc.calculate_all_kpis(
+                    ricavi=ce.valore_produzione.totale,
+                    ebitda=ce.ebitda,
+                    ebit=ce.ebit,
+                    utile_netto=ce.utile_netto,
+                    patrimonio_netto=sp.passivo.patrimonio_netto.totale,
+                    totale_attivo=sp.totale_attivo,
+                    debiti_finanziari=sp.passivo.totale_debiti_finanziari,
+                    costi_variabili=ce.costi_produzione.costi_variabili,
+                    attivo_circolante=sp.attivo.circolante.totale,
+                    passivo_corrente=sp.passivo.debiti_banche_breve
+                    + sp.passivo.debiti_fornitori,
+                    immobilizzazioni=sp.attivo.immobilizzato.totale,
+                    totale_debiti=sp.passivo.totale_debiti,
+                )
+                trimester_actuals.append(
+                    {
+                        "year": b.year,
+                        "month": b.month,
+                        "type": b.type,
+                        "ricavi": round(ce.valore_produzione.totale, 2),
+                        "ebitda": round(ce.ebitda, 2),
+                        "utile_netto": round(ce.utile_netto, 2),
+                        "kpi": {
+                            k: round(v.value, 4) if hasattr(v, "value") else v
+                            for k, v in raw_kpis.items()
+                        },
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error parsing balance {b.id_balance}: {str(e)}")
 
-                try:
-                    m = b.month or 12
-                    bs_data = BalanceSheetData.from_kbai_json(b.balance, b.year, m)
-                    bs_data.company_name = company.company_name
+        if base_data is None or not contributi:
+            return {
+                "status": "error",
+                "message": get_message("pred_no_historical_trend", locale),
+            }
 
-                    # Logic for grouping
-                    is_complete = b.type.lower() == "final" and (
-                        b.month is None or b.month == 12
-                    )
+        # 4. Run Analysis (Step 1)
+        # Create Analyzer instance from the aggregate and the base balance
+        analyzer = HistoricalAnalyzer([base_data], contributi=contributi)
+        # Analyze returns self, but it computes internal state
+        analyzer.analyze()
 
-                    if is_complete and b.year <= base_year:
-                        historical_data.append(bs_data)
-
-                    # Trimester / Actuals: strictly only data for years AFTER the base year
-                    if b.year > base_year:
-                        ce = bs_data.conto_economico
-                        sp = bs_data.stato_patrimoniale
-                        raw_kpis = kpi_calc.calculate_all_kpis(
-                            ricavi=ce.valore_produzione.totale,
-                            ebitda=ce.ebitda,
-                            ebit=ce.ebit,
-                            utile_netto=ce.utile_netto,
-                            patrimonio_netto=sp.passivo.patrimonio_netto.totale,
-                            totale_attivo=sp.totale_attivo,
-                            debiti_finanziari=sp.passivo.totale_debiti_finanziari,
-                            costi_variabili=ce.costi_produzione.costi_variabili,
-                            attivo_circolante=sp.attivo.circolante.totale,
-                            passivo_corrente=sp.passivo.debiti_banche_breve
-                            + sp.passivo.debiti_fornitori,
-                            immobilizzazioni=sp.attivo.immobilizzato.totale,
-                            totale_debiti=sp.passivo.totale_debiti,
-                        )
-                        trimester_actuals.append(
-                            {
-                                "year": b.year,
-                                "month": b.month,
-                                "type": b.type,
-                                "ricavi": round(ce.valore_produzione.totale, 2),
-                                "ebitda": round(ce.ebitda, 2),
-                                "utile_netto": round(ce.utile_netto, 2),
-                                "kpi": {
-                                    k: round(v.value, 4) if hasattr(v, "value") else v
-                                    for k, v in raw_kpis.items()
-                                },
-                            }
-                        )
-                except Exception as e:
-                    logger.error(f"Error parsing balance {b.id_balance}: {str(e)}")
+        return {
+            "status": "success",
+            "company": company,
+            "balances": balances,
+            "analyzer": analyzer,
+            "trimester_actuals": trimester_actuals,
+        }
 
-            if not historical_data:
-                return {
-                    "status": "error",
-                    "message": get_message("pred_no_historical_trend", locale),
-                }
+    @staticmethod
+    def generate_prediction(
+        company_id: int,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        locale: str = None,
+        monte_carlo_paths: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate a full 3-scenario prediction for a company.
+
+        Args:
+            company_id: The ID of the company to predict for.
+            horizon_years: Number of years to project (default 3).
+            locale: Language for suggestions (optional).
+            monte_carlo_paths: If set, also run a Monte Carlo simulation of the
+                base scenario with this many paths and return its P10/P50/P90 bands.
 
-            # 4. Run Analysis (Step 1)
-            # Create Analyzer instance
-            analyzer = HistoricalAnalyzer(historical_data)
-            # Analyze returns self, but it computes internal state
-            analyzer.analyze()
+        Returns:
+            Dictionary containing the full forecast results (JSON compatible).
+        """
+        # Pick locale from request if not provided
+        locale = _resolve_locale(locale)
+
+        try:
+            history = PredictiveService._load_history(company_id, locale)
+            if history["status"] == "error":
+                return history
+            company = history["company"]
+            balances = history["balances"]
+            analyzer = history["analyzer"]
+            trimester_actuals = history["trimester_actuals"]
 
             # 5. Setup Parameters (Step 2)
             parameterizer = Parameterizer(historical_analyzer=analyzer)
@@ -184,14 +356,17 @@ class PredictiveService:
             # 6. Run Projections (Step 3 & 4)
             engine = ProjectionEngine(analyzer)
 
-            results = {}
+            scenario_objs = []
             for scenario_type, params in scenarios.items():
-                name = scenario_type.value.capitalize()
-                scenario_obj = Scenario(
-                    name=name, parameters=params, type=scenario_type
-                )
-                scenario_obj.parameters.orizzonte_anni = horizon_years
-                results[name] = engine.run_scenario(scenario_obj)
+                params.orizzonte_anni = horizon_years
+                scenario_objs.append(Scenario(
+                    name=scenario_type.value.capitalize(), parameters=params, type=scenario_type
+                ))
+            # All scenarios are projected together in one pass
+            results = {
+                scenario_obj.name: result
+                for scenario_obj, result in zip(scenario_objs, engine.run_scenarios(scenario_objs))
+            }
 
             # 7. Format Output
             metrics = analyzer.metrics
@@ -419,8 +594,110 @@ class PredictiveService:
                 # "confronto_scenari": full_output["confronto_scenari"],
             }
 
+            # 10. Optional Monte Carlo bands around the base scenario (not stored)
+            if monte_carlo_paths:
+                monte_carlo = engine.run_monte_carlo(
+                    scenarios[ScenarioType.BASE],
+                    distributions=analyzer.fit_parameter_distributions(),
+                    n_paths=monte_carlo_paths,
+                    seed=company_id,
+                )
+                output["monte_carlo"] = monte_carlo.to_dict()
+
             return {"status": "success", "data": output}
 
         except Exception as e:
             logger.exception(f"Error generating prediction for company {company_id}")
             return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def generate_sensitivity(
+        company_id: int,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        delta: float = SENSITIVITY_DEFAULT_DELTA,
+        targets: Optional[List[str]] = None,
+        locale: str = None,
+    ) -> Dict[str, Any]:
+        """
+        Tornado analysis of the base scenario of a company.
+
+        Every sensitivity parameter is perturbed by ±delta and all variants are
+        projected in one batched engine run (ProjectionEngine.run_sensitivity).
+        Nothing is stored.
+
+        Args:
+            company_id: The ID of the company.
+            horizon_years: Number of years to project; targets are read in the last one.
+            delta: Relative perturbation (0.10 = ±10%).
+            targets: Line items or KPI names (default: EBITDA and net income).
+
+        Returns:
+            {"status": "success", "data": SensitivityResult dict} or an error.
+        """
+        locale = _resolve_locale(locale)
+
+        try:
+            history = PredictiveService._load_history(company_id, locale)
+            if history["status"] == "error":
+                return history
+            analyzer = history["analyzer"]
+
+            params = Parameterizer(historical_analyzer=analyzer).get_all_scenario_parameters()[ScenarioType.BASE]
+            params.orizzonte_anni = horizon_years
+            result = ProjectionEngine(analyzer).run_sensitivity(
+                params, delta=delta, targets=targets or SENSITIVITY_DEFAULT_TARGETS
+            )
+            return {"status": "success", "data": result.to_dict()}
+
+        except Exception as e:
+            logger.exception(f"Error generating sensitivity analysis for company {company_id}")
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def generate_goal_seek(
+        company_id: int,
+        target: str,
+        valore_obiettivo: float,
+        parametri: List[str],
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        year: Optional[int] = None,
+        locale: str = None,
+    ) -> Dict[str, Any]:
+        """
+        Goal seek on the base scenario of a company.
+
+        Finds the value of the free parameter(s) for which the target reaches
+        valore_obiettivo in the given year (ProjectionEngine.goal_seek).
+
+        Args:
+            company_id: The ID of the company.
+            target: Line item or KPI name.
+            valore_obiettivo: Value to reach (KPIs as ratios).
+            parametri: Free parameters (SENSITIVITY_PARAMETERS names).
+            horizon_years: Number of years to project.
+            year: Projected year of the target (default: last one).
+
+        Returns:
+            {"status": "success", "data": GoalSeekResult dict} or an error.
+        """
+        locale = _resolve_locale(locale)
+
+        try:
+            history = PredictiveService._load_history(company_id, locale)
+            if history["status"] == "error":
+                return history
+            analyzer = history["analyzer"]
+
+            params = Parameterizer(historical_analyzer=analyzer).get_all_scenario_parameters()[ScenarioType.BASE]
+            params.orizzonte_anni = horizon_years
+            if year is not None and year not in params.get_anni_previsione():
+                return {"status": "error", "message": get_message("pred_invalid_year", locale, year=year)}
+
+            result = ProjectionEngine(analyzer).goal_seek(
+                params, target, valore_obiettivo, parametri, year=year
+            )
+            return {"status": "success", "data": result.to_dict()}
+
+        except Exception as e:
+            logger.exception(f"Error running goal seek for company {company_id}")
+            return {"status": "error", "message": str(e)}
@@ -0,0 +1,58 @@
+"""
+Conditional GET Helpers
+
+Strong ETags and If-None-Match handling for large, rarely changing GET payloads
+(balance detail, comparison reports, predictions).
+
+Routes first try a cheap version (row metadata/content hash or a response cache
+tag version) and answer 304 before running the service; without one, the ETag
+is the hash of the payload and the 304 only saves the transfer.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from flask import make_response, request
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag value (unquoted) for the given version parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def locale_part() -> str:
+    """Payload messages are localized, so ETags include the requested locale"""
+    return request.headers.get('Accept-Language', 'en')
+
+
+def if_none_match(etag: Optional[str]) -> bool:
+    """True if the request's If-None-Match matches the ETag (weak comparison, as for GET)"""
+    if not etag:
+        return False
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str):
+    """304 without a body"""
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_response(response, etag: Optional[str] = None):
+    """
+    Attach the ETag to a (data, status) route response, or answer 304.
+
+    Without a precomputed etag the payload itself is hashed.
+    """
+    data, status_code = response[0], response[1]
+    if status_code != 200:
+        return response
+    if etag is None:
+        etag = make_etag(data)
+    if if_none_match(etag):
+        return not_modified_response(etag)
+    return data, status_code, {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
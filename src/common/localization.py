@@ -376,6 +376,7 @@ MESSAGES = {
         "balance_sheet_no_data": "Balance sheet has no balance data",
         "balance_sheet_id_no_data": "Balance sheet {id_balance} has no balance data",
         "kpi_calc_stored_success": "KPIs calculated and stored successfully",
+        "kpi_calc_up_to_date": "KPIs are already up to date for this balance sheet",
         "kpi_calc_failed": "Failed to calculate KPIs",
         "insufficient_balance_sheets": "Insufficient balance sheets for comparison.",
         "comparison_report_exists": "Comparison report already exists for the two most recent balance sheets",
@@ -509,6 +510,7 @@ MESSAGES = {
         "benchmark_kpi_note_updated": "Benchmark KPI note updated successfully",
         "no_benchmark_reports_found": "No benchmark reports found",
         "benchmark_reports_retrieved": "Benchmark reports retrieved successfully",
+        "invalid_pagination_cursor": "Invalid pagination cursor",
         "report_id_required": "report_id is required",
         "no_analysis_kpi_infos_found": "No analysis kpi infos found for the report",
         "benchmark_deleted_with_competitors": "Benchmark report and {count} competitor report(s) deleted successfully",
@@ -530,6 +532,8 @@ MESSAGES = {
         "competitor_companies_retrieved_failed": "Failed to retrieve competitor companies",
         "failed_retrieve_competitors": "Failed to retrieve suggested competitors",
         "competitor_already_added_to_benchmark": "This competitor balance sheet has already been added to this benchmark report",
+        "peer_position_retrieved_success": "Peer KPI position retrieved successfully",
+        "peer_position_retrieve_failed": "Failed to retrieve peer KPI position",
         # Predictive Monitoring & Suggestions
         "pred_sug_ricavi_cause": "Analyze the causes of the reduction to understand if it is a temporary or structural problem.",
         "pred_sug_ricavi_pricing": "Review the pricing strategy: Consider differentiated prices for premium clients or express services.",
@@ -572,6 +576,23 @@ MESSAGES = {
         "pred_no_complete_balances": "No complete (final) annual balance sheets found to use as a base for prediction.",
         "pred_no_historical_trend": "Could not identify historical trend from complete balances.",
         "pred_prediction_success": "Prediction generated successfully",
+        "pred_invalid_mode": "Invalid prediction mode: {mode}. Valid modes are: scenarios, monte_carlo",
+        "pred_invalid_paths": "Invalid number of simulation paths. Must be between {min_paths} and {max_paths}",
+        "pred_invalid_horizon": "Invalid horizon: {horizon}. Must be between 1 and {max_horizon} years",
+        "pred_invalid_delta": "Invalid perturbation: {delta}. Must be greater than 0 and at most {max_delta}",
+        "pred_invalid_targets": "Invalid sensitivity targets: {targets}",
+        "pred_sensitivity_success": "Sensitivity analysis generated successfully",
+        "pred_invalid_goal": "A target and a numeric target value are required",
+        "pred_invalid_parameters": "Invalid free parameters: {parameters}",
+        "pred_invalid_year": "Year {year} is not in the projected years",
+        "pred_goal_seek_success": "Goal seek completed successfully",
+        "pred_portfolio_success": "Forecast portfolio retrieved successfully",
+        "pred_portfolio_refresh_started": "Portfolio forecast started. Results will be available in the portfolio table shortly",
+        "pred_portfolio_refresh_running": "A portfolio forecast is already running. Results will be available in the portfolio table shortly",
+        "pred_invalid_scenarios": "Invalid custom scenarios: {reason}",
+        "pred_custom_scenarios_success": "Custom scenarios generated successfully",
+        "pred_custom_scenario_not_found": "Custom scenario not found",
+        "pred_custom_scenario_deleted": "Custom scenario deleted successfully",
     },
     "it": {
         # Auth / Token Verification
@@ -930,6 +951,7 @@ MESSAGES = {
         "balance_sheet_no_data": "Il bilancio non contiene dati",
         "balance_sheet_id_no_data": "Il bilancio {id_balance} non contiene dati",
         "kpi_calc_stored_success": "KPI calcolati e salvati con successo",
+        "kpi_calc_up_to_date": "I KPI sono già aggiornati per questo bilancio",
         "kpi_calc_failed": "Calcolo dei KPI fallito",
         "insufficient_balance_sheets": "Bilanci insufficienti per il confronto.",
         "comparison_report_exists": "Esiste già un report di confronto per i due bilanci più recenti",
@@ -1063,6 +1085,7 @@ MESSAGES = {
         "benchmark_kpi_note_updated": "Nota KPI benchmark aggiornata con successo",
         "no_benchmark_reports_found": "Nessun report di benchmark trovato",
         "benchmark_reports_retrieved": "Report di benchmark recuperati con successo",
+        "invalid_pagination_cursor": "Cursore di paginazione non valido",
         "report_id_required": "Il report_id è richiesto",
         "no_analysis_kpi_infos_found": "Nessuna info analisi KPI trovata per il report",
         "benchmark_deleted_with_competitors": "Report di benchmark e {count} report del concorrente eliminati con successo",
@@ -1084,6 +1107,8 @@ MESSAGES = {
         "competitor_companies_retrieved_failed": "Impossibile recuperare le aziende competitor",
         "failed_retrieve_competitors": "Impossibile recuperare i competitor suggeriti",
         "competitor_already_added_to_benchmark": "Questo bilancio del competitor è già stato aggiunto a questo rapporto benchmark",
+        "peer_position_retrieved_success": "Posizione KPI rispetto ai peer recuperata con successo",
+        "peer_position_retrieve_failed": "Impossibile recuperare la posizione KPI rispetto ai peer",
         # Monitoraggio Predittivo & Suggerimenti
         "pred_sug_ricavi_cause": "Analizza le cause della riduzione per capire se è un problema temporaneo o strutturale.",
         "pred_sug_ricavi_pricing": "Rivedi la strategia di pricing: Considera prezzi differenziati per clienti premium o servizi express.",
@@ -1126,6 +1151,23 @@ MESSAGES = {
         "pred_no_complete_balances": "Nessun bilancio annuale completo (finale) trovato da utilizzare come base per la previsione.",
         "pred_no_historical_trend": "Impossibile identificare il trend storico dai bilanci completi.",
         "pred_prediction_success": "Previsione generata con successo",
+        "pred_invalid_mode": "Modalità di previsione non valida: {mode}. Le modalità valide sono: scenarios, monte_carlo",
+        "pred_invalid_paths": "Numero di simulazioni non valido. Deve essere compreso tra {min_paths} e {max_paths}",
+        "pred_invalid_horizon": "Orizzonte non valido: {horizon}. Deve essere compreso tra 1 e {max_horizon} anni",
+        "pred_invalid_delta": "Perturbazione non valida: {delta}. Deve essere maggiore di 0 e al massimo {max_delta}",
+        "pred_invalid_targets": "Obiettivi di sensitività non validi: {targets}",
+        "pred_sensitivity_success": "Analisi di sensitività generata con successo",
+        "pred_invalid_goal": "Sono richiesti un obiettivo e un valore obiettivo numerico",
+        "pred_invalid_parameters": "Parametri liberi non validi: {parameters}",
+        "pred_invalid_year": "L'anno {year} non è tra gli anni previsti",
+        "pred_goal_seek_success": "Ricerca obiettivo completata con successo",
+        "pred_portfolio_success": "Portafoglio previsioni recuperato con successo",
+        "pred_portfolio_refresh_started": "Previsione del portafoglio avviata. I risultati saranno a breve disponibili nella tabella del portafoglio",
+        "pred_portfolio_refresh_running": "Una previsione del portafoglio è già in corso. I risultati saranno a breve disponibili nella tabella del portafoglio",
+        "pred_invalid_scenarios": "Scenari personalizzati non validi: {reason}",
+        "pred_custom_scenarios_success": "Scenari personalizzati generati con successo",
+        "pred_custom_scenario_not_found": "Scenario personalizzato non trovato",
+        "pred_custom_scenario_deleted": "Scenario personalizzato eliminato con successo",
     },
 }
 
@@ -0,0 +1,237 @@
+"""
+Keyset Pagination Helpers
+
+Opaque cursors for keyset (seek) pagination. A cursor encodes the sort-key
+values of the last row of a page, e.g. (time, id_report); the next page is
+fetched with a "(sort key, pk) < (last sort key, last pk)" filter instead of
+OFFSET, so deep pages cost the same as the first one.
+
+Model find() helpers use keyset_query/keyset_page for their opt-in keyset
+mode and resolve_total for the optional total ('exact', 'estimate', 'none').
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence
+
+from sqlalchemy import and_, or_, text
+
+# Total count modes accepted by the model find() helpers
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row of a page as an opaque cursor"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int = None) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        InvalidCursorError: if the cursor is malformed or has the wrong number of values
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        if not isinstance(values, list):
+            raise ValueError("cursor payload is not a list")
+        values = [_decode_value(value) for value in values]
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {str(e)}") from e
+    if size is not None and len(values) != size:
+        raise InvalidCursorError("Invalid pagination cursor: unexpected number of values")
+    return values
+
+
+class KeysetPage(list):
+    """Rows of a keyset page; next_cursor is None on the last page"""
+
+    def __init__(self, rows=(), next_cursor: Optional[str] = None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _seek_condition(sort_column, pk_column, sort_value, pk_value, descending: bool):
+    """Rows strictly after (sort_value, pk_value) in (sort key, pk) order, NULL sort keys last"""
+    after = (lambda column, value: column < value) if descending else (lambda column, value: column > value)
+    if sort_column is pk_column:
+        return after(pk_column, pk_value)
+    if sort_value is None:
+        return and_(sort_column.is_(None), after(pk_column, pk_value))
+
+    condition = or_(
+        after(sort_column, sort_value),
+        and_(sort_column == sort_value, after(pk_column, pk_value))
+    )
+    if getattr(getattr(sort_column, 'expression', sort_column), 'nullable', False):
+        condition = or_(condition, sort_column.is_(None))
+    return condition
+
+
+def _check_cursor_value(column, value, nullable: bool = False) -> None:
+    """Reject cursor values whose type does not match the column they seek on"""
+    if value is None:
+        if nullable:
+            return
+        raise InvalidCursorError("Invalid pagination cursor: unexpected null value")
+    try:
+        expected = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return
+    if expected in (float, Decimal):
+        expected = (int, float, Decimal)
+    if isinstance(value, bool) and expected is not bool or not isinstance(value, expected):
+        raise InvalidCursorError(f"Invalid pagination cursor: unexpected value {value!r}")
+
+
+def keyset_query(stmt, sort_column, pk_column, per_page: int, cursor: str = None, descending: bool = True):
+    """
+    Apply keyset pagination to a Query or Select.
+
+    Filters past the cursor, orders by (sort key, pk) and fetches one extra
+    row so keyset_page can tell whether another page exists. Pass the primary
+    key as sort_column to paginate on the primary key alone.
+
+    Raises:
+        InvalidCursorError: if the cursor cannot be decoded or its values do
+            not match the column types
+    """
+    if cursor:
+        sort_value, pk_value = decode_cursor(cursor, size=2)
+        nullable = getattr(getattr(sort_column, 'expression', sort_column), 'nullable', True)
+        _check_cursor_value(sort_column, sort_value, nullable=sort_column is not pk_column and nullable)
+        _check_cursor_value(pk_column, pk_value)
+        stmt = stmt.filter(_seek_condition(sort_column, pk_column, sort_value, pk_value, descending))
+
+    if sort_column is pk_column:
+        order = [pk_column.desc() if descending else pk_column.asc()]
+    elif descending:
+        order = [sort_column.desc().nulls_last(), pk_column.desc()]
+    else:
+        order = [sort_column.asc().nulls_last(), pk_column.asc()]
+    return stmt.order_by(None).order_by(*order).limit(per_page + 1)
+
+
+def _row_value(row, key: str):
+    try:
+        return getattr(row, key)
+    except AttributeError:
+        # Row wrapping a single ORM entity (session.execute(select(Model)))
+        return getattr(row[0], key)
+
+
+def keyset_page(rows, per_page: int, sort_key: str, pk_key: str) -> KeysetPage:
+    """Trim the extra row fetched by keyset_query and build the next cursor"""
+    rows = list(rows)
+    if len(rows) <= per_page:
+        return KeysetPage(rows)
+    rows = rows[:per_page]
+    last = rows[-1]
+    return KeysetPage(rows, encode_cursor([_row_value(last, sort_key), _row_value(last, pk_key)]))
+
+
+def estimated_count(stmt=None, table=None) -> Optional[int]:
+    """
+    Planner row estimate instead of an exact COUNT.
+
+    Uses pg_class.reltuples for a whole table and the EXPLAIN row estimate for
+    a filtered statement. Returns None when not running on PostgreSQL or when
+    no statistics are available.
+    """
+    from src.extensions import db
+
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+
+    if stmt is None:
+        table_name = f"{table.schema}.{table.name}" if table.schema else table.name
+        estimate = db.session.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+            {'table_name': table_name}
+        ).scalar()
+        # reltuples is -1 until the table has been analyzed
+        return int(estimate) if estimate is not None and estimate >= 0 else None
+
+    compiled = stmt.compile(dialect=bind.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def resolve_total(count_mode: str, exact: Callable[[], int], stmt=None, table=None) -> Optional[int]:
+    """
+    Total for a find() result according to count_mode.
+
+    'none' skips counting, 'estimate' uses estimated_count (falling back to
+    the exact count off PostgreSQL), anything else runs the exact count.
+    """
+    if count_mode == 'none':
+        return None
+    if count_mode == 'estimate':
+        estimate = estimated_count(stmt=stmt, table=table)
+        if estimate is not None:
+            return estimate
+    return exact()
+
+
+def pagination_args(args) -> dict:
+    """
+    Keyset/count options of a list route from its query string.
+
+    ?pagination=keyset (or a cursor) selects keyset mode; ?count=exact|estimate|none
+    chooses how the total is computed (default: exact for pages, none for keyset).
+    """
+    cursor = args.get('cursor') or None
+    keyset = args.get('pagination', 'page') == 'keyset' or cursor is not None
+    count_mode = args.get('count')
+    if count_mode not in COUNT_MODES:
+        count_mode = 'none' if keyset else 'exact'
+    return {'cursor': cursor, 'keyset': keyset, 'count_mode': count_mode}
+
+
+def keyset_pagination(records, per_page: int, total: Optional[int]) -> dict:
+    """Pagination block of a keyset list response"""
+    return {
+        'per_page': per_page,
+        'next_cursor': getattr(records, 'next_cursor', None),
+        'has_more': getattr(records, 'has_more', False),
+        'total': total
+    }
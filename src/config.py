@@ -129,6 +129,14 @@ class Config:
     CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
     CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))  # 5 minutes
     CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'flask_template_')
+    REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 3600))  # zones/sectors/provinces cache, seconds
+    REFERENCE_DATA_PRELOAD = os.environ.get('REFERENCE_DATA_PRELOAD', 'True').lower() == 'true'
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))  # tag-invalidated service results, seconds
+    PREDICTION_CACHE_TIMEOUT = int(os.environ.get('PREDICTION_CACHE_TIMEOUT', 86400))  # memoized predictions (keyed by balance fingerprint), seconds
+    PREDICTION_PRECOMPUTE_ON_UPLOAD = os.environ.get('PREDICTION_PRECOMPUTE_ON_UPLOAD', 'True').lower() == 'true'
+    PORTFOLIO_FORECAST_WORKERS = int(os.environ.get('PORTFOLIO_FORECAST_WORKERS', 0))  # batch forecast processes, 0 = one per CPU
+    PREDICTION_PARAMETER_CACHE_SIZE = int(os.environ.get('PREDICTION_PARAMETER_CACHE_SIZE', 256))  # companies kept analyzed for custom scenarios
     
     # API Configuration
     API_TITLE = 'Flask Enterprise Template API'
@@ -245,6 +253,10 @@ class TestingConfig(Config):
     # Test cache settings
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 1  # 1 second for tests
+    REFERENCE_DATA_PRELOAD = False
+    RESPONSE_CACHE_ENABLED = False
+    PREDICTION_PRECOMPUTE_ON_UPLOAD = False
+    PORTFOLIO_FORECAST_WORKERS = 1
 
 
 class ProductionConfig(Config):
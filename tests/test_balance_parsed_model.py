@@ -0,0 +1,103 @@
+"""
+Test Suite for the Persisted Parsed Balance Model
+Packed CE/SP vectors computed at ingest and read back by the predictive engine
+"""
+import dataclasses
+import types
+from unittest.mock import patch
+
+import pytest
+
+from src.app.database.models import KbaiBalance
+from src.app.services.kbai.predictive.models.balance_sheet import (
+    PARSED_MODEL_FIELDS,
+    PARSED_MODEL_VERSION,
+    BalanceSheetData,
+    parse_balance_model,
+)
+
+BALANCE_JSON = {
+    "Conto_economico": {
+        "Valore_della_produzione": {
+            "Ricavi_delle_vendite_e_delle_prestazioni": 1_200_000,
+            "Altri_ricavi_e_proventi": {"Totale_altri_ricavi_e_proventi": 15_000.5},
+        },
+        "Costi_di_produzione": {
+            "Per_materie_prime,_sussidiarie_di_consumo_merci": 400_000,
+            "Per_servizi": 180_000,
+            "Per_il_personale": {"Totale_costi_per_il_personale": 300_000, "Salari_e_stipendi": 220_000},
+            "Ammortamento_e_svalutazioni": {"Totale_ammortamenti_e_svalutazioni": 45_000},
+            "Oneri_diversi_di_gestione": 9_000,
+        },
+        "Imposte_sul_reddito": 30_000,
+    },
+    "Stato_patrimoniale": {
+        "Attivo": {
+            "Immobilizzazioni": {"Immobilizzazioni_materiali": {"Totale_immobilizzazioni_materiali": 500_000}},
+            "Attivo_circolante": {"Crediti": {"Verso_clienti": 210_000}},
+        },
+        "Passivo": {
+            "Patrimonio_netto": {"Capitale": 100_000, "Utile_perdita_dell_esercizio": 80_000},
+            "Debiti": {"Debiti_verso_fornitori": 120_000, "Debiti_tributari": "n/d"},
+        },
+    },
+}
+
+
+def _sections(balance):
+    return dataclasses.asdict(balance.conto_economico), dataclasses.asdict(balance.stato_patrimoniale)
+
+
+class TestParsedModelVector:
+    """Test the packed representation of BalanceSheetData"""
+
+    def test_vector_round_trip_matches_json_parse(self):
+        """from_vector rebuilds exactly what from_kbai_json parsed"""
+        parsed = BalanceSheetData.from_kbai_json(BALANCE_JSON, 2024)
+        vector = parse_balance_model(BALANCE_JSON)
+
+        assert len(vector) == len(PARSED_MODEL_FIELDS)
+        rebuilt = BalanceSheetData.from_vector(vector, 2024)
+        assert _sections(rebuilt) == _sections(parsed)
+        assert rebuilt.conto_economico.ebitda == parsed.conto_economico.ebitda
+        assert rebuilt.stato_patrimoniale.totale_attivo == parsed.stato_patrimoniale.totale_attivo
+
+    def test_wrong_length_is_rejected(self):
+        with pytest.raises(ValueError):
+            BalanceSheetData.from_vector([1.0, 2.0], 2024)
+
+
+class TestParsedModelPersistence:
+    """Test parsing at ingest and reading from balance records"""
+
+    def test_balance_assignment_stores_parsed_model(self):
+        """Assigning the JSON parses it once; clearing it clears the model"""
+        balance = KbaiBalance(id_company=1, year=2024, balance=BALANCE_JSON)
+        assert balance.parsed_model == parse_balance_model(BALANCE_JSON)
+        assert balance.parsed_model_version == PARSED_MODEL_VERSION
+
+        balance.balance = None
+        assert balance.parsed_model is None
+        assert balance.parsed_model_version is None
+
+    def test_record_reads_current_model_without_json(self):
+        """A current model is used as is; outdated or missing models fall back to the JSON"""
+        vector = parse_balance_model(BALANCE_JSON)
+        current = types.SimpleNamespace(
+            year=2024, month=None, balance=None,
+            parsed_model=vector, parsed_model_version=PARSED_MODEL_VERSION
+        )
+        with patch.object(BalanceSheetData, 'from_kbai_json') as from_json:
+            data = BalanceSheetData.from_balance_record(current)
+        from_json.assert_not_called()
+        assert (data.year, data.month) == (2024, 12)
+        assert _sections(data) == _sections(BalanceSheetData.from_kbai_json(BALANCE_JSON, 2024))
+
+        outdated = types.SimpleNamespace(
+            year=2023, month=6, balance=BALANCE_JSON,
+            parsed_model=[0.0] * len(vector), parsed_model_version=PARSED_MODEL_VERSION - 1
+        )
+        assert _sections(BalanceSheetData.from_balance_record(outdated)) == _sections(data)
+
+        empty = types.SimpleNamespace(year=2023, month=None, balance=None, parsed_model=None, parsed_model_version=None)
+        assert BalanceSheetData.from_balance_record(empty) is None
@@ -99,8 +99,8 @@ class BalanceRecord:
         self.is_deleted = False
         self.deleted_at = None
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, include_balance: bool = True) -> Dict[str, Any]:
+        data = {
             "id_balance": self.id_balance,
             "id_company": self.id_company,
             "year": self.year,
@@ -108,13 +108,15 @@ class BalanceRecord:
             "type": self.type,
             "mode": self.mode,
             "note": self.note,
-            "balance": self.balance,
             "file": self.file,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "is_deleted": self.is_deleted,
             "deleted_at": self.deleted_at,
         }
+        if include_balance:
+            data["balance"] = self.balance
+        return data
 
 
 class KbaiBalanceStub:
@@ -479,6 +481,41 @@ def test_get_by_company_id_success(service_instance: service_module.BalanceSheet
     assert response["pagination"]["total"] == 1
 
 
+def test_get_by_company_id_keyset_mode(
+    service_instance: service_module.BalanceSheetService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from src.common.pagination import KeysetPage
+
+    calls: Dict[str, Any] = {}
+
+    def fake_find(**kwargs: Any) -> Tuple[List[BalanceRecord], Optional[int], Optional[str]]:
+        calls.update(kwargs)
+        record = BalanceRecord({"id_company": 2, "year": 2024, "month": 1, "type": "annual", "mode": "manual", "note": ""})
+        return KeysetPage([record], next_cursor="next"), None, None
+
+    monkeypatch.setattr(KbaiBalanceStub, "find", staticmethod(fake_find))
+    response, status = service_instance.get_by_company_id(
+        company_id=2, per_page=1, cursor="abc", keyset=True, count_mode="none"
+    )
+    assert status == 200
+    assert calls["cursor"] == "abc" and calls["keyset"] is True and calls["count_mode"] == "none"
+    assert response["pagination"] == {"per_page": 1, "next_cursor": "next", "has_more": True, "total": None}
+
+
+def test_get_by_company_id_invalid_cursor(
+    service_instance: service_module.BalanceSheetService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from src.common.pagination import InvalidCursorError
+
+    def fake_find(**kwargs: Any) -> None:
+        raise InvalidCursorError("bad")
+
+    monkeypatch.setattr(KbaiBalanceStub, "find", staticmethod(fake_find))
+    response, status = service_instance.get_by_company_id(company_id=2, cursor="bad")
+    assert status == 400
+    assert response["message"] == "Invalid pagination cursor"
+
+
 def test_get_by_company_id_handles_unexpected_failure(service_instance: service_module.BalanceSheetService) -> None:
     KbaiBalanceStub.find_should_raise = True
     response, status = service_instance.get_by_company_id(company_id=1)
@@ -539,3 +576,148 @@ def test_get_by_id_handles_unexpected_failure(service_instance: service_module.B
     assert status == 500
     assert response["error"] == "Internal server error"
 
+
+
+# ---------------------------------------------------------------------------
+# Set-based cascade deletes (run against an in-memory SQLite database)
+# ---------------------------------------------------------------------------
+
+CASCADE_SCHEMA = [
+    "CREATE TABLE kbai_balance.kbai_balances (id_balance INTEGER PRIMARY KEY, id_company INTEGER, "
+    "year INTEGER, month INTEGER, is_deleted BOOLEAN DEFAULT 0, deleted_at TIMESTAMP)",
+    "CREATE TABLE kbai_balance.kbai_kpi_values (id_kpi INTEGER PRIMARY KEY, "
+    "id_balance INTEGER NOT NULL REFERENCES kbai_balances(id_balance))",
+    "CREATE TABLE kbai_balance.kpi_logic (id_kpi INTEGER PRIMARY KEY REFERENCES kbai_kpi_values(id_kpi))",
+    "CREATE TABLE kbai_balance.kbai_analysis (id_analysis INTEGER PRIMARY KEY)",
+    "CREATE TABLE kbai_balance.kbai_analysis_kpi (id_balance INTEGER REFERENCES kbai_balances(id_balance), "
+    "id_analysis INTEGER REFERENCES kbai_analysis(id_analysis), kpi_list_json TEXT, "
+    "PRIMARY KEY (id_balance, id_analysis))",
+    "CREATE TABLE kbai_balance.kbai_reports (id_report INTEGER PRIMARY KEY, "
+    "id_analysis INTEGER NOT NULL REFERENCES kbai_analysis(id_analysis))",
+    "CREATE TABLE kbai_balance.analysis_kpi_info (id_analysis INTEGER REFERENCES kbai_analysis(id_analysis), "
+    "id_kpi INTEGER REFERENCES kbai_kpi_values(id_kpi), PRIMARY KEY (id_analysis, id_kpi))",
+]
+
+ORPHAN_CHECKS = {
+    "kpi_values": "SELECT COUNT(*) FROM kbai_balance.kbai_kpi_values v WHERE NOT EXISTS "
+                  "(SELECT 1 FROM kbai_balance.kbai_balances b WHERE b.id_balance = v.id_balance)",
+    "kpi_logic": "SELECT COUNT(*) FROM kbai_balance.kpi_logic l WHERE NOT EXISTS "
+                 "(SELECT 1 FROM kbai_balance.kbai_kpi_values v WHERE v.id_kpi = l.id_kpi)",
+    "analysis_kpi": "SELECT COUNT(*) FROM kbai_balance.kbai_analysis_kpi ak WHERE NOT EXISTS "
+                    "(SELECT 1 FROM kbai_balance.kbai_balances b WHERE b.id_balance = ak.id_balance)",
+    "reports": "SELECT COUNT(*) FROM kbai_balance.kbai_reports r WHERE NOT EXISTS "
+               "(SELECT 1 FROM kbai_balance.kbai_analysis a WHERE a.id_analysis = r.id_analysis)",
+    "kpi_info": "SELECT COUNT(*) FROM kbai_balance.analysis_kpi_info i WHERE NOT EXISTS "
+                "(SELECT 1 FROM kbai_balance.kbai_analysis a WHERE a.id_analysis = i.id_analysis) "
+                "OR NOT EXISTS (SELECT 1 FROM kbai_balance.kbai_kpi_values v WHERE v.id_kpi = i.id_kpi)",
+    "empty_analyses": "SELECT COUNT(*) FROM kbai_balance.kbai_analysis a WHERE NOT EXISTS "
+                      "(SELECT 1 FROM kbai_balance.kbai_analysis_kpi ak WHERE ak.id_analysis = a.id_analysis)",
+}
+
+
+@pytest.fixture
+def cascade_db(monkeypatch: pytest.MonkeyPatch):
+    """SQLite database with the kbai_balance tables, foreign keys enforced and statements counted."""
+    from types import SimpleNamespace
+
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_connection, _record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS kbai_balance")
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    statements: List[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    class CascadeSession(Session):
+        def add(self, instance: Any, _warn: bool = True) -> None:
+            # Balances are plain objects here; their soft-delete flags are not persisted.
+            pass
+
+    session = CascadeSession(engine)
+    for ddl in CASCADE_SCHEMA:
+        session.execute(text(ddl))
+
+    def seed(balances: int, kpis_per_balance: int) -> None:
+        """Balances 1..N for company 1 / 2023 / 12 plus one surviving balance (id 100)."""
+        rows = [(i, 2023) for i in range(1, balances + 1)] + [(100, 2022)]
+        for id_balance, year in rows:
+            session.execute(text(
+                "INSERT INTO kbai_balance.kbai_balances (id_balance, id_company, year, month) "
+                "VALUES (:id, 1, :year, 12)"), {"id": id_balance, "year": year})
+            for k in range(kpis_per_balance):
+                id_kpi = id_balance * 1000 + k
+                session.execute(text("INSERT INTO kbai_balance.kbai_kpi_values VALUES (:k, :b)"),
+                                {"k": id_kpi, "b": id_balance})
+                session.execute(text("INSERT INTO kbai_balance.kpi_logic VALUES (:k)"), {"k": id_kpi})
+        for id_balance in range(1, balances + 1):
+            # comparison with the surviving balance (shared) and a benchmark only on this balance
+            shared, own = id_balance * 10, id_balance * 10 + 1
+            for id_analysis, members, balance_type in (
+                (shared, (id_balance, 100), "competitor"),
+                (own, (id_balance,), "referenceBalanceSheet"),
+            ):
+                session.execute(text("INSERT INTO kbai_balance.kbai_analysis VALUES (:a)"), {"a": id_analysis})
+                session.execute(text("INSERT INTO kbai_balance.kbai_reports (id_analysis) VALUES (:a)"),
+                                {"a": id_analysis})
+                for member in members:
+                    session.execute(text("INSERT INTO kbai_balance.kbai_analysis_kpi VALUES (:b, :a, :j)"),
+                                    {"b": member, "a": id_analysis, "j": f'{{"balance_type": "{balance_type}"}}'})
+                    session.execute(text("INSERT INTO kbai_balance.analysis_kpi_info VALUES (:a, :k)"),
+                                    {"a": id_analysis, "k": member * 1000})
+        session.commit()
+        statements.clear()
+
+    def orphans() -> Dict[str, int]:
+        return {name: session.execute(text(sql)).scalar() for name, sql in ORPHAN_CHECKS.items()}
+
+    def count(table: str) -> int:
+        return session.execute(text(f"SELECT COUNT(*) FROM kbai_balance.{table}")).scalar()
+
+    monkeypatch.setattr(service_module, "db", SimpleNamespace(session=session))
+    yield SimpleNamespace(seed=seed, orphans=orphans, count=count, statements=statements)
+    session.close()
+
+
+@pytest.mark.parametrize("balances,kpis_per_balance", [(1, 3), (4, 25)])
+def test_hard_delete_is_set_based_and_orphan_free(
+    service_instance: service_module.BalanceSheetService, cascade_db: Any, balances: int, kpis_per_balance: int
+) -> None:
+    cascade_db.seed(balances, kpis_per_balance)
+
+    assert service_instance._hard_delete_balance_and_related_data(company_id=1, year=2023, month=12) is None
+
+    # same number of statements however many KPIs/analyses are involved
+    executed = [s for s in cascade_db.statements if s.lstrip().split()[0] in ("SELECT", "DELETE")]
+    assert len(executed) == 8
+    assert all(value == 0 for value in cascade_db.orphans().values())
+    assert cascade_db.count("kbai_balances") == 1
+    assert cascade_db.count("kbai_kpi_values") == kpis_per_balance
+    # analyses shared with the surviving balance are kept (their reports are dropped)
+    assert cascade_db.count("kbai_analysis") == balances
+    assert cascade_db.count("kbai_reports") == 0
+
+
+def test_soft_delete_removes_benchmark_analyses_without_orphans(
+    service_instance: service_module.BalanceSheetService, cascade_db: Any
+) -> None:
+    from types import SimpleNamespace
+
+    cascade_db.seed(2, 2)
+    balance = SimpleNamespace(id_balance=1, year=2023, month=12, is_deleted=False, deleted_at=None)
+
+    assert service_instance._soft_delete_balance(balance) is None
+
+    assert balance.is_deleted is True
+    assert all(value == 0 for value in cascade_db.orphans().values())
+    # both analyses of balance 1 are gone, balance 2's remain
+    assert cascade_db.count("kbai_analysis") == 2
+    assert len([s for s in cascade_db.statements if s.lstrip().startswith("DELETE")]) == 4
@@ -7,6 +7,8 @@ import types
 from flask import Flask
 from flask.testing import FlaskClient
 
+from src.common.pagination import encode_cursor
+
 @pytest.fixture
 def mock_app():
     app = Flask(__name__)
@@ -56,6 +58,38 @@ def test_create_benchmark_invalid_input(benchmark_service_cls, fake_user, monkey
     assert code == 400
     assert "company_id and at least one balance sheet" in result["message"]
 
+def test_create_benchmark_duplicate_detected_by_fingerprint(benchmark_service_cls, fake_user, monkeypatch):
+    from src.app.api.v1.services.k_balance import benchmark as benchmark_mod
+    service = benchmark_service_cls()
+    balances = [
+        types.SimpleNamespace(id_balance=7, year=2022, type="final", month=None),
+        types.SimpleNamespace(id_balance=3, year=2021, type="final", month=None),
+    ]
+    balance_query = MagicMock()
+    balance_query.filter.return_value.all.return_value = balances
+    monkeypatch.setattr(benchmark_mod.KbaiBalance, "metadata_query", MagicMock(return_value=balance_query))
+    monkeypatch.setattr(benchmark_mod.ComparisonReportService, "check_company_access", lambda *a, **kw: (True, ""))
+    fingerprint_query = MagicMock()
+    fingerprint_query.return_value.with_entities.return_value.first.return_value = (42,)
+    monkeypatch.setattr(benchmark_mod.KbaiAnalysis, "fingerprint_query", fingerprint_query)
+    kpi_query = MagicMock()
+    monkeypatch.setattr(benchmark_mod.KbaiKpiValue, "query", kpi_query)
+
+    app = Flask(__name__)
+    payload = {
+        "balanceSheetToCompare": {"year": 2022, "budgetType": "final"},
+        "comparitiveBalancesheet": {"year": 2021, "budgetType": "final"},
+    }
+    with app.test_request_context(json=payload):
+        result, code = service.create_benchmark(fake_user, 5)
+
+    assert code == 400
+    expected = benchmark_mod.KbaiAnalysis.compute_balance_fingerprint(
+        [(7, "balanceSheetToCompare"), (3, "comparitiveBalancesheet")]
+    )
+    fingerprint_query.assert_called_once_with(expected, analysis_type="BENCHMARK")
+    kpi_query.filter.assert_not_called()
+
 def test_get_benchmarks_by_report_no_reportid(benchmark_service_cls, fake_user):
     service = benchmark_service_cls()
     result, code = service.get_benchmarks_by_report(fake_user, None)
@@ -144,6 +178,144 @@ def test_get_benchmark_report_list_pagination(monkeypatch, benchmark_service_cls
     assert code == 200
     assert "reports" in out
 
+def _report_list_db(monkeypatch, rows, total=0):
+    """Fake db for get_benchmark_report_list: exists subquery, report query, page join"""
+    chains = []
+
+    def fake_query(*entities):
+        chain = MagicMock()
+        for method in ("join", "outerjoin", "filter", "order_by", "offset", "limit", "select_from"):
+            getattr(chain, method).return_value = chain
+        chain.count.return_value = total
+        chain.all.return_value = rows
+        chains.append(chain)
+        return chain
+
+    fake_db = MagicMock()
+    fake_db.session.query.side_effect = fake_query
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.db", fake_db)
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.ComparisonReportService.check_company_access", lambda *a, **kw: (True, ""))
+    return chains
+
+
+def _report_row(id_report, time, balance_type, id_balance, file):
+    return types.SimpleNamespace(id_report=id_report, name=f"R{id_report}", time=time,
+                                 balance_type=balance_type, id_balance=id_balance, file=file)
+
+
+def test_get_benchmark_report_list_single_joined_page(monkeypatch, benchmark_service_cls, fake_user):
+    """Report page and balance slots come from one joined query; totals from one count"""
+    from datetime import datetime
+    service = benchmark_service_cls()
+    t1, t2 = datetime(2025, 1, 2), datetime(2025, 1, 1)
+    rows = [
+        _report_row(9, t1, "referenceBalanceSheet", 1, "a.xbrl"),
+        _report_row(9, t1, "balanceSheetToCompare", 2, None),
+        _report_row(4, t2, "referenceBalanceSheet", None, None),
+    ]
+    chains = _report_list_db(monkeypatch, rows, total=12)
+    app = Flask(__name__)
+    with app.test_request_context():
+        out, code = service.get_benchmark_report_list(2, fake_user, page=2, per_page=2)
+    assert code == 200
+    assert out["data"]["balance_sheets"] == [
+        {"id_report": 9, "name": "R9", "time": t1.isoformat(),
+         "balances": {"referenceBalanceSheet": "a.xbrl", "balanceSheetToCompare": ""}},
+        {"id_report": 4, "name": "R4", "time": t2.isoformat(), "balances": {}},
+    ]
+    assert out["data"]["pagination"] == {"page": 2, "per_page": 2, "total": 12, "total_pages": 6}
+    # exists subquery + report query + page join; one round trip for the page rows
+    assert len(chains) == 3
+    chains[1].offset.assert_called_once_with(2)
+    assert chains[2].all.call_count == 1
+
+
+def test_get_benchmark_report_list_keyset(monkeypatch, benchmark_service_cls, fake_user):
+    """Keyset mode fetches per_page + 1 reports and returns a cursor for the next page"""
+    from datetime import datetime
+    from src.common.pagination import decode_cursor
+    service = benchmark_service_cls()
+    times = [datetime(2025, 1, d) for d in (3, 2, 1)]
+    rows = [_report_row(10 - i, t, "referenceBalanceSheet", i, "f") for i, t in enumerate(times)]
+    chains = _report_list_db(monkeypatch, rows)
+    app = Flask(__name__)
+    with app.test_request_context():
+        out, code = service.get_benchmark_report_list(2, fake_user, per_page=2, keyset=True)
+    assert code == 200
+    assert [r["id_report"] for r in out["data"]["balance_sheets"]] == [10, 9]
+    pagination = out["data"]["pagination"]
+    assert pagination["has_more"] is True
+    assert decode_cursor(pagination["next_cursor"]) == [times[1], 9]
+    chains[1].limit.assert_called_once_with(3)
+    chains[1].count.assert_not_called()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "e30",  # valid base64 of a non-list payload
+    encode_cursor(["abc", "x"]),  # decodable, but not a (time, id_report) pair
+    encode_cursor([None, 9]),  # report time is never null
+])
+def test_get_benchmark_report_list_invalid_cursor(monkeypatch, benchmark_service_cls, fake_user, cursor):
+    """Malformed or tampered cursors are rejected before reaching the database"""
+    service = benchmark_service_cls()
+    chains = _report_list_db(monkeypatch, [])
+    app = Flask(__name__)
+    with app.test_request_context():
+        out, code = service.get_benchmark_report_list(2, fake_user, cursor=cursor)
+    assert code == 400
+    assert out["error"] == "Validation error"
+    assert out["message"] == "Invalid pagination cursor"
+    chains[1].limit.assert_not_called()
+
+@pytest.mark.parametrize("competitor_count", [2, 200])
+def test_get_suggested_competitors_constant_queries(monkeypatch, benchmark_service_cls, fake_user, competitor_count):
+    """Parent context, competitors and their balances come from a fixed number of queries"""
+    service = benchmark_service_cls()
+    parent_row = types.SimpleNamespace(id_report=7, id_balance=1, id_company=2)
+    reference_cache = MagicMock()
+    reference_cache.company_profile.return_value = {"region": "Lazio", "country": None, "division": "62", "geographic_area": 3}
+    reference_cache.sector_ids.return_value = [5, 6]
+    companies = [
+        types.SimpleNamespace(
+            id_company=100 + i,
+            company_name=f"Competitor {i}",
+            balances=[types.SimpleNamespace(id_balance=1000 + i, year=2023, type="annual", file="f")]
+        )
+        for i in range(competitor_count)
+    ]
+    results = iter([parent_row])
+    queries = []
+
+    def fake_query(*entities):
+        chain = MagicMock()
+        for method in ("outerjoin", "filter", "select_from", "options", "join"):
+            getattr(chain, method).return_value = chain
+        chain.first.side_effect = lambda: next(results)
+        chain.all.return_value = companies
+        queries.append(chain)
+        return chain
+
+    fake_db = MagicMock()
+    fake_db.session.query.side_effect = fake_query
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.db", fake_db)
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.reference_data_cache", reference_cache)
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.ComparisonReportService.check_company_access", lambda *a, **kw: (True, ""))
+    metadata_query = MagicMock()
+    monkeypatch.setattr("src.app.api.v1.services.k_balance.benchmark.KbaiBalance.metadata_query", metadata_query)
+
+    app = Flask(__name__)
+    with app.test_request_context():
+        out, code = service.get_suggested_competitors(fake_user, 7, tipologia="Regionale")
+
+    assert code == 200
+    assert len(queries) == 2
+    reference_cache.company_profile.assert_called_once_with(2)
+    reference_cache.sector_ids.assert_called_once_with("62")
+    metadata_query.assert_not_called()
+    assert len(out["data"]) == competitor_count
+    assert out["data"][0]["balances"] == [{"id_balance": 1000, "year": 2023, "type": "annual", "file": "f"}]
+
 # --- Routes Layer Tests --- #
 
 def test_benchmark_routes_post_success(monkeypatch, benchmark_routes_ns, fake_user):
@@ -60,6 +60,21 @@ class MockKbaiBalance:
         # Mode is used by get_balance_sheets_for_comparison when building the response
         self.mode = kwargs.get('mode', 'manual')
         self.balance = kwargs.get('balance', {})
+        self.content_hash = kwargs.get('content_hash')
+        self.kpi_content_hash = kwargs.get('kpi_content_hash')
+        self.kpi_formula_version = kwargs.get('kpi_formula_version')
+
+    def update(self, data):
+        for key, value in data.items():
+            setattr(self, key, value)
+        return True, None
+
+    def kpis_up_to_date(self, formula_version):
+        return (
+            self.content_hash is not None
+            and self.kpi_content_hash == self.content_hash
+            and self.kpi_formula_version == formula_version
+        )
     
     @classmethod
     def query(cls):
@@ -69,6 +84,10 @@ class MockKbaiBalance:
     def findOne(cls, **kwargs):
         return MockKbaiBalance.findone_result
 
+    @classmethod
+    def metadata_query(cls, **kwargs):
+        return MockKbaiBalance.query
+
 
 class MockQuery:
     """Mock SQLAlchemy query with simple first()/all() semantics."""
@@ -855,3 +874,147 @@ def test_get_comparison_report_by_id_exception(service_instance):
         response, status = service_instance.get_comparison_report_by_id(1, user)
         assert status == 500
 
+
+
+# ============================================================================
+# get_comparison_report_by_company_id Query Count Tests
+# ============================================================================
+
+class CountingQuery:
+    """Chainable query stub that records each executed statement."""
+
+    def __init__(self, executed: list, results: list):
+        self._executed = executed
+        self._results = results
+
+    def __getattr__(self, name):
+        # options/filter/join/order_by/group_by/having/... just chain
+        return lambda *args, **kwargs: self
+
+    def all(self):
+        self._executed.append('all')
+        return self._results
+
+    def first(self):
+        self._executed.append('first')
+        return self._results[0] if self._results else None
+
+
+def _run_company_comparison(app, service_instance, monkeypatch, analyses_count):
+    """Run get_comparison_report_by_company_id over N comparisons and return (executed, response, status)"""
+    from types import SimpleNamespace
+    from src.app.database.models import KbaiAnalysis, KbaiAnalysisKpi, KbaiBalance, KbaiKpiValue
+
+    # Use the real mapped classes so column expressions and loader options are built for real
+    monkeypatch.setattr(service_module, 'KbaiAnalysis', KbaiAnalysis)
+    monkeypatch.setattr(service_module, 'KbaiAnalysisKpi', KbaiAnalysisKpi)
+    monkeypatch.setattr(service_module, 'KbaiBalance', KbaiBalance)
+    monkeypatch.setattr(service_module, 'KbaiKpiValue', KbaiKpiValue)
+
+    years = list(range(2010, 2011 + analyses_count))
+    balances = [
+        SimpleNamespace(id_balance=i + 1, year=year, is_deleted=False, content_hash=f"hash-{year}")
+        for i, year in enumerate(sorted(years, reverse=True))
+    ]
+    by_year = {b.year: b for b in balances}
+    analyses = []
+    for i, year in enumerate(sorted(years[1:], reverse=True)):
+        analysis_kpis = [
+            SimpleNamespace(id_balance=by_year[y].id_balance, balance=by_year[y],
+                            kpi_list_json={"kpis": {"EBITDA": float(y)}, "missing_fields": []})
+            for y in (year - 1, year)
+        ]
+        analyses.append(SimpleNamespace(id_analysis=i + 1, analysis_kpis=analysis_kpis))
+    kpi_rows = [(b.id_balance, "ROE", 1.5) for b in balances]
+
+    executed = []
+
+    def fake_query(*entities):
+        if entities[0] is KbaiAnalysis:
+            return CountingQuery(executed, analyses)
+        if entities[0] is KbaiKpiValue.id_balance:
+            return CountingQuery(executed, kpi_rows)
+        return CountingQuery(executed, [])
+
+    service_module.db.session.query = fake_query
+    monkeypatch.setattr(KbaiBalance, 'metadata_query', classmethod(lambda cls, **kw: CountingQuery(executed, balances)))
+    monkeypatch.setattr(service_instance, 'check_company_access', lambda user, company_id: (True, None))
+
+    with app.test_request_context():
+        response, status = service_instance.get_comparison_report_by_company_id(1, SimpleUser(role="superadmin"))
+    return executed, response, status
+
+
+def test_get_comparison_report_by_company_id_fixed_query_count(app, service_instance, monkeypatch):
+    """The read path issues the same number of queries regardless of how many comparisons exist"""
+    few_executed, few_response, few_status = _run_company_comparison(app, service_instance, monkeypatch, 2)
+    many_executed, many_response, many_status = _run_company_comparison(app, service_instance, monkeypatch, 12)
+
+    assert few_status == 200 and many_status == 200
+    # balances, existing-comparison check, analyses (+ selectin loads), bulk KPI values
+    assert len(few_executed) == len(many_executed) == 4
+
+    comparison = many_response['data']['Comparison']
+    assert set(comparison['EBITDA']) >= {str(y) for y in range(2010, 2023)}
+    assert comparison['EBITDA']['Absolute_Change'] is not None
+    assert comparison['ROE']['2010'] == 1.5
+
+
+# ============================================================================
+# Change Tracking Tests
+# ============================================================================
+
+def _tracked_balance(sample_balance_data, formula_version):
+    from src.app.database.models import KbaiBalance
+    balance = KbaiBalance(id_balance=7, id_company=1, year=2023, balance=sample_balance_data)
+    balance.kpi_content_hash = balance.content_hash
+    balance.kpi_formula_version = formula_version
+    return balance
+
+
+def test_calculate_kpis_skipped_when_unchanged(service_instance, sample_balance_data):
+    """KPIs are not recalculated when content hash and formula version are unchanged"""
+    balance = _tracked_balance(sample_balance_data, service_module.KPI_FORMULA_VERSION)
+    MockKbaiBalance.query.first_results = [balance]
+
+    with patch.object(service_instance, '_store_kpis_for_balance') as store:
+        response, status = service_instance.calculate_and_store_kpis_for_balance(7)
+
+    assert status == 200
+    assert response['data']['unchanged'] is True
+    store.assert_not_called()
+
+
+def test_calculate_kpis_recomputed_on_formula_change(service_instance, sample_balance_data):
+    """A KPI set calculated with an older formula version is recalculated and re-stamped"""
+    balance = _tracked_balance(sample_balance_data, "0")
+    MockKbaiBalance.query.first_results = [balance]
+
+    with patch.object(service_instance, '_store_kpis_for_balance') as store, \
+            patch.object(service_instance, '_mark_kpis_current') as mark:
+        response, status = service_instance.calculate_and_store_kpis_for_balance(7)
+
+    assert status == 200
+    store.assert_called_once()
+    mark.assert_called_once_with(balance)
+
+
+def test_find_current_comparison_detects_stale_pair(service_instance, monkeypatch):
+    """A comparison built from an older balance content is not reused"""
+    from types import SimpleNamespace
+    from src.app.database.models import KbaiAnalysis, KbaiAnalysisKpi
+    monkeypatch.setattr(service_module, 'KbaiAnalysis', KbaiAnalysis)
+    monkeypatch.setattr(service_module, 'KbaiAnalysisKpi', KbaiAnalysisKpi)
+    older = SimpleNamespace(id_balance=1, content_hash="a")
+    newer = SimpleNamespace(id_balance=2, content_hash="b")
+    analysis = SimpleNamespace(id_analysis=5, analysis_kpis=[
+        SimpleNamespace(id_balance=1, kpi_list_json={"content_hash": "a", "formula_version": service_module.KPI_FORMULA_VERSION}),
+        SimpleNamespace(id_balance=2, kpi_list_json={"content_hash": "old", "formula_version": service_module.KPI_FORMULA_VERSION}),
+    ])
+    service_module.db.session.query.return_value.options.return_value.join.return_value.filter.return_value \
+        .group_by.return_value.having.return_value.order_by.return_value.first.return_value = analysis
+
+    assert service_instance._find_current_comparison(older, newer) is None
+
+    analysis.analysis_kpis[1].kpi_list_json["content_hash"] = "b"
+    assert service_instance._find_current_comparison(older, newer) is analysis
@@ -0,0 +1,150 @@
+"""
+Test Suite for Competitor Benchmark Insights
+Batch insight computation, bulk persistence and change-only recomputation
+"""
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import src.app.api.v1.services.k_balance.competitor_insight_service as insight_module
+from src.app.api.v1.services.k_balance.competitor_insight_service import (
+    CompetitorInsightService,
+    benchmark_stats,
+    build_competitor_insights,
+    insights_source,
+)
+from src.app.api.v1.services.k_balance.comparison_report_service import ComparisonReportService
+from src.app.database.models import KbaiAnalysisKpi, KbaiBalance
+
+app = Flask(__name__)
+
+
+@pytest.fixture(autouse=True)
+def request_context():
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield
+
+
+def _kv(id_kpi, id_balance, kpi_name, value):
+    return types.SimpleNamespace(id_kpi=id_kpi, id_balance=id_balance, kpi_name=kpi_name, value=value)
+
+
+def _balance(id_balance, year, kpi_content_hash='h'):
+    return types.SimpleNamespace(
+        id_balance=id_balance, id_company=id_balance * 10, year=year,
+        kpi_content_hash=kpi_content_hash, kpi_formula_version='v1'
+    )
+
+
+def _mappings(id_analysis, benchmark_ids, competitor_id, source=None):
+    mappings = [KbaiAnalysisKpi(id_analysis=id_analysis, id_balance=id_balance, kpi_list_json={})
+                for id_balance in benchmark_ids]
+    competitor_json = {'balance_type': 'competitor', 'kpis': {}}
+    if source:
+        competitor_json['insights_source'] = source
+    mappings.append(KbaiAnalysisKpi(id_analysis=id_analysis, id_balance=competitor_id, kpi_list_json=competitor_json))
+    return mappings
+
+
+class TestCompetitorInsightBuild:
+    """Test the pure batch computation"""
+
+    def test_benchmark_stats(self):
+        """Baseline/min/max per KPI and distinct years; missing values are ignored"""
+        stats, years = benchmark_stats([
+            (2023, _kv(1, 1, 'EBITDA', 100)),
+            (2024, _kv(2, 2, 'EBITDA', 200)),
+            (2024, _kv(3, 2, 'ROE', None)),
+        ])
+        assert stats == {'EBITDA': (150.0, 100.0, 200.0)}
+        assert years == [2023, 2024]
+
+    def test_competitor_insights(self):
+        """Deviation against the baseline; KPIs without benchmark values are skipped"""
+        stats = {'EBITDA': (100.0, 80.0, 120.0), 'ROE': (0.0, 0.0, 0.0)}
+        rows = build_competitor_insights(
+            [_kv(7, 9, 'EBITDA', 125), _kv(8, 9, 'ROI', 1)],
+            stats, [2023, 2024]
+        )
+        assert len(rows) == 1
+        assert rows[0]['id_kpi'] == 7
+        assert rows[0]['deviation'] == 25.0
+        assert rows[0]['synthesis']
+
+    @pytest.mark.parametrize("baseline", [100.0, 0.0])
+    def test_competitor_kpi_without_value_is_emitted(self, baseline):
+        """A competitor KPI with no value keeps its insight row, without a deviation"""
+        rows = build_competitor_insights(
+            [_kv(9, 9, 'ROE', None)], {'ROE': (baseline, baseline, baseline)}, [2023, 2024]
+        )
+        assert [(row['id_kpi'], row['deviation']) for row in rows] == [(9, None)]
+        assert rows[0]['synthesis'] == "Insufficient data for competitor comparison."
+
+    def test_insights_source_follows_kpi_versions(self):
+        """The source changes when any balance's KPI set changes"""
+        first = insights_source([_balance(1, 2023), _balance(9, 2024)])
+        assert first == insights_source([_balance(9, 2024), _balance(1, 2023)])
+        assert first != insights_source([_balance(1, 2023), _balance(9, 2024, kpi_content_hash='h2')])
+
+
+class TestCompetitorInsightPersistence:
+    """Test bulk writes and change-only recomputation"""
+
+    def test_persist_runs_three_bulk_statements(self, monkeypatch):
+        """All rows go out in one upsert/update per table with KpiLogic thresholds from the deviations"""
+        fake_db = MagicMock()
+        monkeypatch.setattr(insight_module, 'db', fake_db)
+
+        CompetitorInsightService().persist([
+            {'id_analysis': 1, 'id_kpi': 7, 'deviation': -10.0, 'synthesis': 's', 'suggestion': 'x'},
+            {'id_analysis': 1, 'id_kpi': 8, 'deviation': 5.0, 'synthesis': 's', 'suggestion': 'x'},
+        ], source='competitor_benchmark_3')
+
+        assert fake_db.session.execute.call_count == 3
+        insights, deviations, logic = [c.args[1] for c in fake_db.session.execute.call_args_list]
+        assert insights['id_kpi'] == [7, 8]
+        assert deviations == {'source': 'competitor_benchmark_3', 'id_kpi': [7, 8], 'deviation': [-10.0, 5.0]}
+        assert logic['critical_percentage'] == [-10.0, 0.0]
+        assert logic['acceptable_percentage'] == [0.0, 5.0]
+
+    def test_recompute_skips_unchanged_competitors(self, monkeypatch):
+        """Only analyses whose balances changed are recomputed, sharing the benchmark statistics"""
+        balances = [_balance(1, 2023), _balance(2, 2024), _balance(9, 2024), _balance(10, 2024)]
+        current = insights_source([balances[0], balances[1], balances[2]])
+        mappings = _mappings(100, [1, 2], 9, source=current) + _mappings(101, [1, 2], 10, source='old')
+
+        fake_db = MagicMock()
+        fake_db.session.query.return_value.filter.return_value.all.side_effect = [
+            balances,
+            [_kv(1, 1, 'EBITDA', 100), _kv(2, 2, 'EBITDA', 200), _kv(5, 10, 'EBITDA', 300)],
+        ]
+        monkeypatch.setattr(insight_module, 'db', fake_db)
+
+        service = CompetitorInsightService()
+        with patch.object(service, 'persist') as persist:
+            count, company_ids = service.recompute_analyses(3, mappings)
+
+        assert count == 1
+        rows = persist.call_args.args[0]
+        assert [(row['id_analysis'], row['id_kpi'], row['deviation']) for row in rows] == [(101, 5, 100.0)]
+        assert persist.call_args.kwargs == {'source': 'competitor_benchmark_3'}
+        assert mappings[-1].kpi_list_json['kpis'] == {'EBITDA': 300.0}
+        assert mappings[-1].kpi_list_json['insights_source'] == insights_source(
+            [balances[0], balances[1], balances[3]]
+        )
+        # Balance 9 only belongs to the skipped analysis
+        assert company_ids == [10, 20, 100]
+
+    def test_mark_kpis_current_refreshes_competitor_insights(self):
+        """A changed KPI set triggers the competitor insight refresh of the balance"""
+        from src.app.api.v1.services.k_balance import comparison_report_service as service_module
+
+        balance = KbaiBalance(id_balance=9, id_company=5, year=2024, balance={"a": 1})
+        with patch.object(KbaiBalance, "update", return_value=(True, None)), \
+             patch.object(service_module.peer_distribution_service, "refresh_for_company_year"), \
+             patch.object(service_module.competitor_insight_service, "refresh_for_balance") as refresh:
+            ComparisonReportService()._mark_kpis_current(balance)
+
+        refresh.assert_called_once_with(9)
@@ -0,0 +1,135 @@
+"""
+Test Suite for Conditional GET Helpers
+ETag generation, If-None-Match matching and 304 responses
+"""
+import importlib
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.app.services.kbai.predictive.predictive_service import PredictiveService
+from src.common.conditional import conditional_response, if_none_match, make_etag, not_modified_response
+
+BalanceVersionRow = namedtuple(
+    'BalanceVersionRow', 'id_company content_hash no_data year month type mode file note created_at'
+)
+balance_module = importlib.import_module("src.app.api.v1.services.k_balance.balance_sheet_service")
+fingerprint_module = importlib.import_module("src.app.database.models.kbai_balance.kbai_balances")
+BalanceSheetService = balance_module.BalanceSheetService
+
+app = Flask(__name__)
+
+
+class TestConditionalHelpers:
+    """Test make_etag / if_none_match / conditional_response"""
+
+    def test_make_etag_is_stable_and_version_sensitive(self):
+        """Same parts give the same ETag, any changed part a different one"""
+        assert make_etag('balance', 1, 'abc') == make_etag('balance', 1, 'abc')
+        assert make_etag('balance', 1, 'abc') != make_etag('balance', 1, 'abd')
+        assert len(make_etag('x')) == 32
+
+    def test_if_none_match(self):
+        """Quoted, weak and wildcard If-None-Match values match; missing ETags never do"""
+        etag = make_etag('v1')
+        for header in (f'"{etag}"', f'W/"{etag}"', f'"other", "{etag}"', '*'):
+            with app.test_request_context(headers={'If-None-Match': header}):
+                assert if_none_match(etag)
+        with app.test_request_context(headers={'If-None-Match': '"other"'}):
+            assert not if_none_match(etag)
+            assert not if_none_match(None)
+
+    def test_not_modified_response(self):
+        """304 carries the ETag and no body"""
+        with app.test_request_context():
+            response = not_modified_response('abc')
+        assert response.status_code == 304
+        assert response.headers['ETag'] == '"abc"'
+        assert response.get_data() == b''
+
+    def test_conditional_response_hashes_payload(self):
+        """Without a precomputed ETag the payload hash is used, and matches answer 304"""
+        payload = ({'data': {'a': 1}}, 200)
+        with app.test_request_context():
+            data, status, headers = conditional_response(payload)
+        assert status == 200
+        assert headers['ETag'] == f'"{make_etag(payload[0])}"'
+
+        with app.test_request_context(headers={'If-None-Match': headers['ETag']}):
+            assert conditional_response(payload).status_code == 304
+
+    def test_conditional_response_leaves_errors_alone(self):
+        """Non-200 responses get no ETag"""
+        with app.test_request_context(headers={'If-None-Match': '*'}):
+            assert conditional_response(({'message': 'nope'}, 404)) == ({'message': 'nope'}, 404)
+
+
+class TestVersionETags:
+    """Test the cheap version lookups used before running the services"""
+
+    def _balance_row(self, content_hash='h1', no_data=False):
+        return BalanceVersionRow(
+            id_company=5, content_hash=content_hash, no_data=no_data, year=2024, month=12,
+            type='XBRL', mode='file', file='a.xml', note=None, created_at=None
+        )
+
+    def _patch_row(self, monkeypatch, row):
+        fake_db = MagicMock()
+        fake_db.session.query.return_value.filter.return_value.first.return_value = row
+        monkeypatch.setattr(balance_module, 'db', fake_db)
+
+    def test_balance_etag_follows_content_hash(self, monkeypatch):
+        """The balance ETag changes with the content hash"""
+        service = BalanceSheetService()
+        monkeypatch.setattr(service, 'check_company_access', lambda user, company_id: (True, ''))
+        with app.test_request_context():
+            self._patch_row(monkeypatch, self._balance_row('h1'))
+            first = service.get_balance_etag(9, MagicMock())
+            self._patch_row(monkeypatch, self._balance_row('h2'))
+            second = service.get_balance_etag(9, MagicMock())
+        assert first and second and first != second
+
+    def test_balance_etag_unavailable(self, monkeypatch):
+        """No ETag without access, for missing balances or legacy rows without a content hash"""
+        service = BalanceSheetService()
+        with app.test_request_context():
+            monkeypatch.setattr(service, 'check_company_access', lambda user, company_id: (False, 'denied'))
+            self._patch_row(monkeypatch, self._balance_row())
+            assert service.get_balance_etag(9, MagicMock()) is None
+
+            monkeypatch.setattr(service, 'check_company_access', lambda user, company_id: (True, ''))
+            self._patch_row(monkeypatch, None)
+            assert service.get_balance_etag(9, MagicMock()) is None
+            self._patch_row(monkeypatch, self._balance_row(content_hash=None))
+            assert service.get_balance_etag(9, MagicMock()) is None
+
+    def test_prediction_etag(self):
+        """Prediction ETags depend on the balance fingerprint, horizon and locale"""
+        target = 'src.app.services.kbai.predictive.predictive_service.KbaiBalance.content_fingerprint'
+        with patch(target, return_value='fp1'):
+            base = PredictiveService.prediction_etag(5, 3, 'en')
+            assert base == PredictiveService.prediction_etag(5, 3, 'en')
+            assert base != PredictiveService.prediction_etag(5, 5, 'en')
+            assert base != PredictiveService.prediction_etag(5, 3, 'it')
+        with patch(target, return_value='fp2'):
+            assert base != PredictiveService.prediction_etag(5, 3, 'en')
+        with patch(target, return_value=None):
+            assert PredictiveService.prediction_etag(5, 3, 'en') is None
+
+    def test_balance_type_change_changes_fingerprint_and_prediction_etag(self, monkeypatch):
+        """A draft/final switch of an unchanged balance changes the set of forecast anchors"""
+        fingerprint_row = namedtuple('FingerprintRow', 'id_company id_balance year month type content_hash')
+        rows = [fingerprint_row(5, 1, 2023, None, 'final', 'h1'), fingerprint_row(5, 2, 2024, None, 'draft', 'h2')]
+        fake_db = MagicMock()
+        query = fake_db.session.query.return_value.filter.return_value.order_by.return_value
+        query.all.side_effect = lambda: list(rows)
+        monkeypatch.setattr(fingerprint_module, 'db', fake_db)
+
+        fingerprint = fingerprint_module.KbaiBalance.content_fingerprint(5)
+        etag = PredictiveService.prediction_etag(5, 3, 'en')
+        assert fingerprint_module.KbaiBalance.content_fingerprint(5) == fingerprint
+
+        rows[1] = rows[1]._replace(type='final')
+        assert fingerprint_module.KbaiBalance.content_fingerprint(5) != fingerprint
+        assert PredictiveService.prediction_etag(5, 3, 'en') != etag
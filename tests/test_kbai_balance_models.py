@@ -42,6 +42,65 @@ class TestKbaiBalance:
         assert hasattr(KbaiBalance, 'create')
         assert hasattr(KbaiBalance, 'findOne')
         assert hasattr(KbaiBalance, 'find')
+        assert hasattr(KbaiBalance, 'metadata_query')
+        assert hasattr(KbaiBalance, 'count_with_data')
+
+    def test_to_dict_without_balance(self):
+        """Test that to_dict can skip the balance JSON field"""
+        balance = KbaiBalance(id_balance=1, id_company=2, year=2024, balance={'a': 1})
+        assert balance.to_dict()['balance'] == {'a': 1}
+        assert 'balance' not in balance.to_dict(include_balance=False)
+
+    def test_metadata_query_defers_balance_column(self, app):
+        """Test that metadata_query does not select the balance JSON column"""
+        sql = str(KbaiBalance.metadata_query(with_data=True, id_company=1).statement)
+        select_list = sql.split('FROM')[0]
+        assert 'kbai_balances.year' in select_list
+        assert 'kbai_balances.balance' not in select_list
+
+    def test_balance_is_jsonb_with_generated_kpi_columns(self):
+        """Test that the balance column is JSONB and KPI source columns are generated from it"""
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateTable
+
+        ddl = str(CreateTable(KbaiBalance.__table__).compile(dialect=postgresql.dialect()))
+        assert 'balance JSONB' in ddl
+        assert 'tot_valore_produzione NUMERIC GENERATED ALWAYS AS' in ddl
+        assert "'{Stato_patrimoniale,Attivo,Totale_attivo}'" in ddl
+
+    def test_kpi_sources(self):
+        """Test kpi_sources converts generated column values to floats"""
+        from decimal import Decimal
+        balance = KbaiBalance(tot_valore_produzione=Decimal('1500.50'), totale_attivo=None)
+        sources = balance.kpi_sources()
+        assert sources['tot_valore_produzione'] == 1500.5
+        assert sources['totale_attivo'] is None
+        assert 'totale_patrimonio_netto' in sources
+
+    def test_content_hash_tracks_balance(self):
+        """Test content_hash is set on assignment and ignores key order"""
+        first = KbaiBalance(balance={'a': 1, 'b': {'c': 2}})
+        second = KbaiBalance(balance={'b': {'c': 2}, 'a': 1})
+        assert first.content_hash is not None
+        assert first.content_hash == second.content_hash
+        second.balance = {'a': 2}
+        assert second.content_hash != first.content_hash
+        assert KbaiBalance(balance=None).content_hash is None
+
+    def test_kpis_up_to_date(self):
+        """Test kpis_up_to_date compares stored hash and formula version"""
+        balance = KbaiBalance(balance={'a': 1})
+        assert not balance.kpis_up_to_date('1')
+        balance.kpi_content_hash = balance.content_hash
+        balance.kpi_formula_version = '1'
+        assert balance.kpis_up_to_date('1')
+        assert not balance.kpis_up_to_date('2')
+
+    def test_find_by_kpi_source_rejects_unknown_column(self):
+        """Test find_by_kpi_source returns an error for unsupported columns"""
+        records, error = KbaiBalance.find_by_kpi_source('not_a_column')
+        assert records == []
+        assert 'Unsupported' in error
 
 
 # ============================================================================
@@ -123,6 +182,14 @@ class TestKbaiAnalysis:
         assert hasattr(KbaiAnalysis, 'findOne')
         assert hasattr(KbaiAnalysis, 'find')
 
+    def test_balance_fingerprint(self):
+        """Fingerprint is order-independent, type-sensitive and None for no balances"""
+        fingerprint = KbaiAnalysis.compute_balance_fingerprint([(2, 'competitor'), (1, 'referenceBalanceSheet')])
+        assert fingerprint == KbaiAnalysis.compute_balance_fingerprint([(1, 'referenceBalanceSheet'), (2, 'competitor')])
+        assert len(fingerprint) == 64
+        assert fingerprint != KbaiAnalysis.compute_balance_fingerprint([(1, 'competitor'), (2, 'referenceBalanceSheet')])
+        assert KbaiAnalysis.compute_balance_fingerprint([]) is None
+
 
 # ============================================================================
 # KbaiGoalObjective Tests
@@ -0,0 +1,107 @@
+"""
+Test Suite for Keyset Pagination Cursors
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from src.common.pagination import encode_cursor, decode_cursor, InvalidCursorError
+
+
+def test_cursor_round_trip():
+    """Cursor values survive encoding, including datetimes and decimals"""
+    values = [datetime(2025, 3, 1, 12, 30), date(2024, 1, 1), Decimal("1.50"), "Acme", 42, None]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, size=6) == values
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1, 2, 3])[:-2], ""])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, size=3)
+
+
+def test_cursor_size_mismatch():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor([1]), size=2)
+
+
+@pytest.fixture
+def items_session():
+    """SQLite table with a nullable, partly duplicated sort key"""
+    from sqlalchemy import Column, DateTime, Integer, create_engine
+    from sqlalchemy.orm import Session, declarative_base
+
+    Base = declarative_base()
+
+    class Item(Base):
+        __tablename__ = 'items'
+        id = Column(Integer, primary_key=True)
+        created_at = Column(DateTime, nullable=True)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for i in range(1, 24):
+        created_at = None if i % 7 == 0 else datetime(2025, 1, 1 + i % 5)
+        session.add(Item(id=i, created_at=created_at))
+    session.commit()
+    yield session, Item
+    session.close()
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_keyset_pages_cover_table_in_order(items_session, descending):
+    """Walking next_cursor visits every row once, in (sort key, pk) order with NULLs last"""
+    from src.common.pagination import keyset_query, keyset_page
+
+    session, Item = items_session
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows = keyset_query(session.query(Item), Item.created_at, Item.id, 5, cursor, descending=descending).all()
+        page = keyset_page(rows, 5, 'created_at', 'id')
+        seen.extend(item.id for item in page)
+        pages += 1
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+
+    items = session.query(Item).all()
+    with_key = sorted((i for i in items if i.created_at), key=lambda i: (i.created_at, i.id), reverse=descending)
+    without_key = sorted((i for i in items if not i.created_at), key=lambda i: i.id, reverse=descending)
+    assert seen == [i.id for i in with_key + without_key]
+    assert pages == 5
+
+
+@pytest.mark.parametrize("values", [["abc", 3], [datetime(2025, 1, 1), "3"], [datetime(2025, 1, 1), True], [None, None]])
+def test_keyset_query_rejects_mistyped_cursor(items_session, values):
+    """Decodable cursors whose values do not fit the seek columns never reach the database"""
+    from src.common.pagination import keyset_query
+
+    session, Item = items_session
+    with pytest.raises(InvalidCursorError):
+        keyset_query(session.query(Item), Item.created_at, Item.id, 5, encode_cursor(values))
+
+
+def test_pagination_args_defaults():
+    from src.common.pagination import pagination_args
+
+    assert pagination_args({}) == {'cursor': None, 'keyset': False, 'count_mode': 'exact'}
+    assert pagination_args({'pagination': 'keyset'}) == {'cursor': None, 'keyset': True, 'count_mode': 'none'}
+    assert pagination_args({'cursor': 'abc', 'count': 'estimate'}) == {'cursor': 'abc', 'keyset': True, 'count_mode': 'estimate'}
+    assert pagination_args({'count': 'bogus'})['count_mode'] == 'exact'
+
+
+def test_resolve_total_modes(monkeypatch):
+    import src.common.pagination as pagination
+
+    exact = lambda: 7
+    assert pagination.resolve_total('none', exact) is None
+    assert pagination.resolve_total('exact', exact) == 7
+    monkeypatch.setattr(pagination, 'estimated_count', lambda stmt=None, table=None: 1200)
+    assert pagination.resolve_total('estimate', exact) == 1200
+    # off PostgreSQL the estimate is unavailable and the exact count is used
+    monkeypatch.setattr(pagination, 'estimated_count', lambda stmt=None, table=None: None)
+    assert pagination.resolve_total('estimate', exact) == 7
@@ -0,0 +1,177 @@
+"""
+Test Suite for Peer KPI Distributions
+Percentile placement, incremental group refresh and the peer position endpoint service
+"""
+import types
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import src.app.api.v1.services.k_balance.peer_distribution_service as peer_module
+from src.app.api.v1.services.k_balance.peer_distribution_service import PeerDistributionService
+from src.app.api.v1.services.k_balance.comparison_report_service import ComparisonReportService
+from src.app.database.models import KbaiBalance, KbaiKpiPeerDistribution
+
+
+def _distribution(kpi_name="EBITDA", **percentiles):
+    values = {"p10": 10, "p25": 20, "p50": 30, "p75": 40, "p90": 50}
+    values.update(percentiles)
+    return KbaiKpiPeerDistribution(
+        division="62", region="LAZIO", year=2024, kpi_name=kpi_name, sample_size=12,
+        mean=Decimal("31"), **{k: Decimal(str(v)) if v is not None else None for k, v in values.items()}
+    )
+
+
+class TestPeerDistributionModel:
+    """Test KbaiKpiPeerDistribution placement helpers"""
+
+    def test_position_interpolates_between_percentiles(self):
+        """Values between two stored percentiles are interpolated linearly"""
+        distribution = _distribution()
+        assert distribution.position(30) == {"percentile": 50.0, "band": "p25_p50"}
+        assert distribution.position(35) == {"percentile": 62.5, "band": "p50_p75"}
+
+    def test_position_outside_range(self):
+        """Values outside p10..p90 are reported as below/above the tails"""
+        distribution = _distribution()
+        assert distribution.position(1) == {"percentile": 10, "band": "below_p10"}
+        assert distribution.position(99) == {"percentile": 90, "band": "above_p90"}
+        assert distribution.position(None) == {"percentile": None, "band": None}
+
+    def test_to_dict_converts_numerics(self):
+        """to_dict returns floats for percentiles"""
+        data = _distribution().to_dict()
+        assert data["p50"] == 30.0
+        assert data["mean"] == 31.0
+        assert data["sample_size"] == 12
+
+
+class TestPeerDistributionRefresh:
+    """Test incremental refresh of peer groups"""
+
+    def test_refresh_group_deletes_and_upserts_one_group(self, monkeypatch):
+        """A group refresh runs one DELETE and one aggregated upsert with the normalized region"""
+        fake_db = MagicMock()
+        fake_db.session.execute.return_value = types.SimpleNamespace(rowcount=11)
+        monkeypatch.setattr(peer_module, "db", fake_db)
+
+        rows, error = PeerDistributionService().refresh_group("62", " Lazio ", 2024)
+
+        assert (rows, error) == (11, None)
+        statements = [str(call.args[0]) for call in fake_db.session.execute.call_args_list]
+        params = [call.args[1] for call in fake_db.session.execute.call_args_list]
+        assert len(statements) == 2
+        assert statements[0].strip().startswith("DELETE FROM kbai_balance.kbai_kpi_peer_distribution")
+        assert "percentile_cont(0.90)" in statements[1]
+        assert "ON CONFLICT (division, region, year, kpi_name)" in statements[1]
+        assert "COALESCE(c.is_competitor, FALSE) = FALSE" in statements[1]
+        assert params[0] == params[1] == {"division": "62", "region": "LAZIO", "year": 2024}
+        fake_db.session.commit.assert_called_once()
+
+    def test_refresh_group_rolls_back_on_error(self, monkeypatch):
+        """Database errors are returned, not raised"""
+        fake_db = MagicMock()
+        fake_db.session.execute.side_effect = Exception("boom")
+        monkeypatch.setattr(peer_module, "db", fake_db)
+
+        rows, error = PeerDistributionService().refresh_group("62", "Lazio", 2024)
+
+        assert rows == 0
+        assert error == "boom"
+        fake_db.session.rollback.assert_called_once()
+
+    @pytest.mark.parametrize("is_competitor, profile, expected_group", [
+        (False, {"division": "62", "region": "Lazio"}, ("62", "Lazio", 2024)),
+        (True, {"division": "62", "region": "Lazio"}, None),
+        (False, {"division": None, "region": "Lazio"}, None),
+    ])
+    def test_refresh_for_company_year(self, monkeypatch, is_competitor, profile, expected_group):
+        """Only non-competitor companies with a primary zone and sector refresh their group"""
+        fake_db = MagicMock()
+        fake_db.session.query.return_value.filter.return_value.scalar.return_value = is_competitor
+        monkeypatch.setattr(peer_module, "db", fake_db)
+        cache = MagicMock()
+        cache.company_profile.return_value = profile
+        monkeypatch.setattr(peer_module, "reference_data_cache", cache)
+
+        service = PeerDistributionService()
+        with patch.object(service, "refresh_group", return_value=(3, None)) as refresh_group:
+            service.refresh_for_company_year(5, 2024)
+
+        if expected_group:
+            refresh_group.assert_called_once_with(*expected_group)
+        else:
+            refresh_group.assert_not_called()
+
+    @pytest.mark.parametrize("previously_current, expect_refresh", [(False, True), (True, False)])
+    def test_mark_kpis_current_refreshes_changed_kpi_sets(self, previously_current, expect_refresh):
+        """The peer group is refreshed only when a balance's KPI set actually changed"""
+        from src.app.api.v1.services.k_balance import comparison_report_service as service_module
+
+        balance = KbaiBalance(id_balance=9, id_company=5, year=2024, balance={"a": 1})
+        if previously_current:
+            balance.kpi_content_hash = balance.content_hash
+            balance.kpi_formula_version = service_module.KPI_FORMULA_VERSION
+
+        with patch.object(KbaiBalance, "update", return_value=(True, None)), \
+             patch.object(service_module.peer_distribution_service, "refresh_for_company_year") as refresh, \
+             patch.object(service_module.competitor_insight_service, "refresh_for_balance"):
+            ComparisonReportService()._mark_kpis_current(balance)
+
+        if expect_refresh:
+            refresh.assert_called_once_with(5, 2024)
+        else:
+            refresh.assert_not_called()
+
+
+class TestCompanyPeerPosition:
+    """Test get_company_peer_position"""
+
+    def test_places_company_kpis_in_peer_distribution(self, monkeypatch):
+        """KPI values are returned with their peer distribution and position"""
+        cache = MagicMock()
+        cache.company_profile.return_value = {"division": "62", "region": "Lazio"}
+        monkeypatch.setattr(peer_module, "reference_data_cache", cache)
+        monkeypatch.setattr(
+            "src.app.api.v1.services.k_balance.comparison_report_service.ComparisonReportService.check_company_access",
+            lambda *a, **kw: (True, "")
+        )
+
+        balance = types.SimpleNamespace(id_balance=9, year=2024)
+        balance_query = MagicMock()
+        balance_query.filter.return_value = balance_query
+        balance_query.order_by.return_value.first.return_value = balance
+        monkeypatch.setattr(peer_module.KbaiBalance, "metadata_query", MagicMock(return_value=balance_query))
+
+        fake_db = MagicMock()
+        fake_db.session.query.return_value.filter.return_value.all.return_value = [
+            ("EBITDA", Decimal("35")), ("Mark_Up", Decimal("1.2"))
+        ]
+        monkeypatch.setattr(peer_module, "db", fake_db)
+        lookup = MagicMock(return_value=[_distribution("EBITDA")])
+        monkeypatch.setattr(peer_module.KbaiKpiPeerDistribution, "lookup", lookup)
+
+        app = Flask(__name__)
+        with app.test_request_context():
+            out, code = PeerDistributionService().get_company_peer_position(MagicMock(), 5, year=2024)
+
+        assert code == 200
+        lookup.assert_called_once_with("62", "Lazio", 2024)
+        kpis = {item["kpi_name"]: item for item in out["data"]["kpis"]}
+        assert kpis["EBITDA"]["position"] == {"percentile": 62.5, "band": "p50_p75"}
+        assert kpis["EBITDA"]["distribution"]["p50"] == 30.0
+        assert kpis["Mark_Up"]["distribution"] is None
+
+    def test_access_denied(self, monkeypatch):
+        """Users without access to the company get 403"""
+        monkeypatch.setattr(
+            "src.app.api.v1.services.k_balance.comparison_report_service.ComparisonReportService.check_company_access",
+            lambda *a, **kw: (False, "denied")
+        )
+        app = Flask(__name__)
+        with app.test_request_context():
+            out, code = PeerDistributionService().get_company_peer_position(MagicMock(), 5)
+        assert code == 403
+        assert out["message"] == "denied"
@@ -234,3 +234,90 @@ class TestPreDashboardService:
         assert 'Pre-dashboard record not found' in result['message']
 
 
+
+
+class TestPreDashboardCounters:
+    """Stored balance counters: maintained on writes, read with one lookup"""
+
+    def _pre_dashboard(self, **fields):
+        from datetime import datetime
+        from src.app.database.models import KbaiPreDashboard
+
+        values = dict(id_company=7, step_upload=False, step_compare=False, step_competitor=False,
+                      step_predictive=False, completed_flag=False, balance_count=0, first_balances=[],
+                      counters_updated_at=datetime(2026, 1, 1))
+        values.update(fields)
+        return KbaiPreDashboard(**values)
+
+    def test_balance_status_from_stored_counters(self):
+        files = [{'id_balance': 1, 'file': 'XBRL 2023'}, {'id_balance': 2, 'file': None}]
+        status = self._pre_dashboard(balance_count=3, first_balances=files).balance_status()
+
+        assert status['balance_sheet_count'] == 2
+        assert status['file_names'] == files
+        assert status['flag'] is True
+        assert self._pre_dashboard(balance_count=1).balance_status()['flag'] is False
+
+    def test_find_one_reads_stored_counters(self, monkeypatch):
+        from unittest.mock import MagicMock
+        from flask import Flask
+        from src.app.api.v1.services.kbai import pre_dashboard_service as service_module
+
+        pre_dashboard = self._pre_dashboard(balance_count=2, first_balances=[{'id_balance': 1, 'file': 'a'}])
+        monkeypatch.setattr(service_module.KbaiPreDashboard, 'findOne', MagicMock(return_value=pre_dashboard))
+        refresh = MagicMock()
+        monkeypatch.setattr(service_module.KbaiPreDashboard, 'refresh_balance_counters', refresh)
+        company_lookup = MagicMock()
+        monkeypatch.setattr(service_module.KbaiCompany, 'findOne', company_lookup)
+
+        with Flask(__name__).test_request_context():
+            result, status_code = service_module.KbaiPreDashboardService().findOne(7)
+
+        assert status_code == 200
+        assert result['data']['step_status'] == {'balance_sheet_count': 1, 'file_names': [{'id_balance': 1, 'file': 'a'}]}
+        refresh.assert_not_called()
+        company_lookup.assert_not_called()
+
+    def test_find_one_computes_missing_counters_once(self, monkeypatch):
+        from unittest.mock import MagicMock
+        from flask import Flask
+        from src.app.api.v1.services.kbai import pre_dashboard_service as service_module
+
+        legacy = self._pre_dashboard(counters_updated_at=None)
+        refreshed = self._pre_dashboard(balance_count=1, first_balances=[{'id_balance': 4, 'file': 'b'}])
+        monkeypatch.setattr(service_module.KbaiPreDashboard, 'findOne', MagicMock(return_value=legacy))
+        refresh = MagicMock(return_value=(refreshed, None))
+        monkeypatch.setattr(service_module.KbaiPreDashboard, 'refresh_balance_counters', refresh)
+
+        with Flask(__name__).test_request_context():
+            result, status_code = service_module.KbaiPreDashboardService().findOne(7)
+
+        assert status_code == 200
+        refresh.assert_called_once_with(7)
+        assert result['data']['step_status']['file_names'] == [{'id_balance': 4, 'file': 'b'}]
+
+    def test_refresh_balance_counters_marks_upload_step(self, monkeypatch):
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+        from src.app.database.models import KbaiBalance, KbaiPreDashboard
+        from src.app.database.models.kbai import kbai_pre_dashboard as model_module
+
+        pre_dashboard = self._pre_dashboard(counters_updated_at=None)
+        fake_db = MagicMock()
+        fake_db.session.get.return_value = pre_dashboard
+        monkeypatch.setattr(model_module, 'db', fake_db)
+        monkeypatch.setattr(KbaiBalance, 'count_with_data', MagicMock(return_value=3))
+        query = MagicMock()
+        query.with_entities.return_value.order_by.return_value.limit.return_value.all.return_value = [
+            SimpleNamespace(id_balance=1, file='XBRL 2022'), SimpleNamespace(id_balance=2, file='')
+        ]
+        monkeypatch.setattr(KbaiBalance, 'metadata_query', MagicMock(return_value=query))
+
+        refreshed, error = KbaiPreDashboard.refresh_balance_counters(7)
+
+        assert error is None
+        assert refreshed.balance_count == 3
+        assert refreshed.first_balances == [{'id_balance': 1, 'file': 'XBRL 2022'}, {'id_balance': 2, 'file': None}]
+        assert refreshed.step_upload is True
+        assert refreshed.counters_updated_at is not None
+        fake_db.session.commit.assert_called_once()
@@ -0,0 +1,110 @@
+"""
+Test Suite for the Predictive Benchmark
+Synthetic/anonymized histories, machine-readable results, profiles and regression checks
+"""
+import json
+import pstats
+import random
+
+import pytest
+from flask import Flask
+
+from benchmarks.predictive import (
+    STAGES,
+    anonymize_history,
+    compare_results,
+    histories_to_json,
+    load_histories,
+    run_benchmark,
+    synthetic_history,
+)
+from src.app.services.kbai.predictive.models.balance_sheet import BalanceSheetData
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def _record(stage, median_ms, history="synthetic"):
+    return {"history": history, "years": 5, "horizon": 3, "stage": stage, "median_ms": median_ms}
+
+
+class TestHistories:
+    """Test the benchmark histories"""
+
+    def test_synthetic_history_is_deterministic_and_parsable(self):
+        history = synthetic_history(4, seed=7)
+
+        assert [year for year, _ in history] == [2021, 2022, 2023, 2024]
+        assert history == synthetic_history(4, seed=7)
+        parsed = [BalanceSheetData.from_kbai_json(balance, year) for year, balance in history]
+        for data in parsed:
+            assert data.conto_economico.valore_produzione.ricavi_totali > 0
+            assert data.conto_economico.costi_produzione.personale > 0
+            assert data.stato_patrimoniale.attivo.circolante.crediti_commerciali > 0
+        passivo = parsed[-1].stato_patrimoniale.passivo
+        assert passivo.debiti_banche_breve != passivo.debiti_banche_lungo
+
+    def test_anonymized_history_keeps_ratios_only(self, tmp_path):
+        real = [
+            (2019, {"informazioni_generali": {"ragione_sociale": "Alfa Srl"},
+                    "Conto_economico": {"Valore_della_produzione": {"Ricavi_delle_vendite_e_delle_prestazioni": 1000.0}},
+                    "Stato_patrimoniale": {"Passivo": {"Debiti": {"Debiti_verso_fornitori": 250}}}}),
+            (2020, {"Conto_economico": {"Valore_della_produzione": {"Ricavi_delle_vendite_e_delle_prestazioni": 1200.0}}}),
+        ]
+        anonymized = anonymize_history(real, random.Random(1))
+
+        assert [year for year, _ in anonymized] == [2023, 2024]
+        first = anonymized[0][1]
+        assert "informazioni_generali" not in first
+        ricavi = first["Conto_economico"]["Valore_della_produzione"]["Ricavi_delle_vendite_e_delle_prestazioni"]
+        assert ricavi != 1000.0
+        assert first["Stato_patrimoniale"]["Passivo"]["Debiti"]["Debiti_verso_fornitori"] / ricavi == pytest.approx(0.25, rel=1e-3)
+
+        path = tmp_path / "histories.json"
+        path.write_text(json.dumps(histories_to_json({"real_01": anonymized})))
+        assert load_histories(str(path)) == {"real_01": anonymized}
+
+
+class TestRunBenchmark:
+    """Test run_benchmark"""
+
+    def test_every_case_and_stage_is_recorded(self, app, tmp_path):
+        real = {"real_01": synthetic_history(3, seed=1)}
+        report = run_benchmark(
+            years=[2], horizons=[1, 2], repeat=2, histories=real, profile_dir=str(tmp_path),
+        )
+
+        assert json.loads(json.dumps(report)) == report
+        assert report["settings"]["repeat"] == 2
+        results = report["results"]
+        assert len(results) == 2 * 2 * len(STAGES)
+        assert {(r["history"], r["years"]) for r in results} == {("synthetic", 2), ("real_01", 3)}
+        for record in results:
+            assert 0 <= record["min_ms"] <= record["median_ms"] <= record["p95_ms"]
+            assert pstats.Stats(record["profile"]).total_calls > 0
+
+    def test_unknown_stage_is_rejected(self, app):
+        with pytest.raises(ValueError):
+            run_benchmark(years=[2], horizons=[1], stages=["nope"])
+
+
+class TestCompareResults:
+    """Test compare_results"""
+
+    def test_only_slowdowns_above_tolerance_are_reported(self):
+        baseline = {"results": [_record("analyze", 1.0), _record("parameters", 0.01), _record("run_scenario", 2.0)]}
+        current = {"results": [
+            _record("analyze", 1.5),
+            _record("parameters", 0.04),
+            _record("run_scenario", 2.2),
+            _record("compare_scenarios", 9.0),
+        ]}
+
+        regressions = compare_results(baseline, current, tolerance=0.2)
+
+        assert [r["stage"] for r in regressions] == ["analyze"]
+        assert regressions[0]["ratio"] == 1.5
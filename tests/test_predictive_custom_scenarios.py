@@ -0,0 +1,279 @@
+"""
+Test Suite for Custom Scenarios
+Validated definitions, the per-company parameter cache and one-pass evaluation
+"""
+import dataclasses
+import importlib
+import types
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import src.app.services.kbai.predictive.custom_scenario_service as custom_module
+from src.app.database.models import KbaiCustomScenario
+from src.app.services.kbai.predictive.core.historical_analyzer import HistoricalAnalyzer
+from src.app.services.kbai.predictive.core.parameterizer import CUSTOM_PARAMETER_KEYS, Parameterizer
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.custom_scenario_service import (
+    CUSTOM_SCENARIO_MAX,
+    CustomScenarioService,
+    ParameterCache,
+    parse_scenario_definitions,
+)
+from src.app.services.kbai.predictive.models.balance_sheet import BalanceSheetData
+from src.app.services.kbai.predictive.models.scenario import Scenario, ScenarioType
+
+balance_model_module = importlib.import_module("src.app.database.models.kbai_balance.kbai_balances")
+FingerprintRow = namedtuple("FingerprintRow", "id_company id_balance year month type content_hash")
+
+
+def _balance_json(ricavi, utile):
+    return {
+        "Conto_economico": {
+            "Valore_della_produzione": {"Ricavi_delle_vendite_e_delle_prestazioni": ricavi},
+            "Costi_di_produzione": {
+                "Per_materie_prime,_sussidiarie_di_consumo_merci": ricavi * 0.4,
+                "Per_servizi": ricavi * 0.15,
+                "Per_il_personale": {"Totale_costi_per_il_personale": ricavi * 0.2},
+            },
+        },
+        "Stato_patrimoniale": {
+            "Passivo": {"Patrimonio_netto": {"Capitale": 100_000, "Utile_perdita_dell_esercizio": utile}},
+        },
+    }
+
+
+STORICO = [
+    BalanceSheetData.from_kbai_json(_balance_json(900_000, 40_000), 2023),
+    BalanceSheetData.from_kbai_json(_balance_json(1_000_000, 55_000), 2024),
+]
+
+def _full_balance_json(ricavi, utile):
+    """Balance with working capital and bank debt, so every driver has something to act on"""
+    balance = _balance_json(ricavi, utile)
+    balance["Stato_patrimoniale"]["Attivo"] = {"Attivo_circolante": {
+        "Rimanenze": {"Totale_rimanenze": ricavi * 0.1},
+        "Crediti": {"Verso_clienti": ricavi * 0.2},
+    }}
+    balance["Stato_patrimoniale"]["Passivo"]["Debiti"] = {
+        "Debiti_verso_fornitori": ricavi * 0.15,
+        "Debiti_verso_banche_esigibili_oltre_esercizio_successivo": ricavi * 0.3,
+    }
+    return balance
+
+
+SCENARIOS = [
+    {"name": "Espansione", "modifiers": {"revenue_growth_modifier": 0.5}, "overrides": {"variazione_organico": 3}},
+    {"name": "Crisi", "description": "Calo domanda", "overrides": {"tasso_crescita": -0.2, "growth_mode": "constant"}},
+]
+
+
+def _history(company_id, locale):
+    analyzer = HistoricalAnalyzer(STORICO)
+    analyzer.analyze()
+    return {"status": "success", "company": types.SimpleNamespace(company_name="Alfa"), "analyzer": analyzer}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield app
+
+
+@pytest.fixture
+def load_history():
+    with patch.object(custom_module.PredictiveService, "_load_history", side_effect=_history) as load:
+        yield load
+
+
+@pytest.fixture
+def fingerprint(monkeypatch):
+    monkeypatch.setattr(custom_module, "parameter_cache", ParameterCache(max_entries=2))
+    with patch.object(custom_module.KbaiBalance, "content_fingerprint", return_value="fp1") as mock:
+        yield mock
+
+
+class TestScenarioDefinitions:
+    """Test parse_scenario_definitions"""
+
+    def test_valid_definitions_are_normalized(self):
+        definitions, reason = parse_scenario_definitions(SCENARIOS)
+        assert reason is None
+        assert definitions[0] == {
+            "name": "Espansione", "description": "",
+            "modifiers": {"revenue_growth_modifier": 0.5}, "overrides": {"variazione_organico": 3},
+        }
+        assert definitions[1]["modifiers"] == {}
+
+    @pytest.mark.parametrize("raw", [
+        [],
+        [{"name": "Base", "overrides": {"dso": 60}}],
+        [{"name": "A", "overrides": {"dso": 60}}, {"name": "a", "overrides": {"dpo": 60}}],
+        [{"name": "A", "overrides": {"unknown": 1}}],
+        [{"name": "A", "overrides": {"orizzonte_anni": 5}}],
+        [{"name": "A", "overrides": {"dso": "60"}}],
+        [{"name": "A", "overrides": {"growth_mode": "exponential"}}],
+        [{"name": "A"}],
+        [{"name": "A%d" % i, "overrides": {"dso": 60}} for i in range(CUSTOM_SCENARIO_MAX + 1)],
+    ])
+    def test_invalid_definitions_are_rejected(self, raw):
+        definitions, reason = parse_scenario_definitions(raw)
+        assert definitions == []
+        assert reason
+
+
+class TestParameterCache:
+    """Test the per-company analysis cache"""
+
+    def test_context_is_reused_until_balances_change(self, app, fingerprint, load_history):
+        cache = custom_module.parameter_cache
+        first, _ = cache.get(1, "en")
+        assert cache.get(1, "en")[0] is first
+        assert load_history.call_count == 1
+
+        fingerprint.return_value = "fp2"
+        assert cache.get(1, "en")[0] is not first
+        assert load_history.call_count == 2
+
+        fingerprint.return_value = None
+        cache.get(1, "en")
+        cache.get(1, "en")
+        assert load_history.call_count == 4
+
+    def test_balance_type_change_rebuilds_context(self, app, load_history, monkeypatch):
+        """A draft balance turned final (same content) changes the complete history, so the context is rebuilt"""
+        monkeypatch.setattr(custom_module, "parameter_cache", ParameterCache(max_entries=2))
+        rows = [FingerprintRow(1, 10, 2023, None, "final", "h1"), FingerprintRow(1, 11, 2024, None, "draft", "h2")]
+        balance_db = MagicMock()
+        balance_db.session.query.return_value.filter.return_value.order_by.return_value.all.side_effect = (
+            lambda: list(rows)
+        )
+        monkeypatch.setattr(balance_model_module, "db", balance_db)
+
+        cache = custom_module.parameter_cache
+        first, _ = cache.get(1, "en")
+        assert cache.get(1, "en")[0] is first
+
+        rows[1] = rows[1]._replace(type="final")
+        assert cache.get(1, "en")[0] is not first
+        assert load_history.call_count == 2
+
+    def test_least_recently_used_company_is_evicted(self, app, fingerprint, load_history):
+        cache = custom_module.parameter_cache
+        for company_id in (1, 2, 1, 3):
+            cache.get(company_id, "en")
+        assert load_history.call_count == 3
+
+        cache.get(1, "en")
+        assert load_history.call_count == 3
+        cache.get(2, "en")
+        assert load_history.call_count == 4
+
+    def test_errors_are_not_cached(self, app, fingerprint):
+        error = {"status": "error", "message": "no balances"}
+        with patch.object(custom_module.PredictiveService, "_load_history", return_value=error) as load:
+            assert custom_module.parameter_cache.get(1, "en") == (None, error)
+            custom_module.parameter_cache.get(1, "en")
+        assert load.call_count == 2
+
+
+class TestCustomScenarioRun:
+    """Test CustomScenarioService.run_scenarios"""
+
+    def test_scenarios_are_projected_with_base_in_one_pass(self, app, fingerprint, load_history):
+        service = CustomScenarioService()
+        context, _ = custom_module.parameter_cache.get(1, "en")
+        with patch.object(context.engine, "run_scenarios", wraps=context.engine.run_scenarios) as run:
+            result, status = service.run_scenarios(1, SCENARIOS, horizon_years=2)
+
+        assert status == 200
+        run.assert_called_once()
+        assert [scenario.name for scenario in run.call_args.args[0]] == ["Base", "Espansione", "Crisi"]
+        assert load_history.call_count == 1
+
+        scenari = result["data"]["scenari"]
+        assert scenari["Crisi"]["tipo"] == "custom"
+        assert scenari["Crisi"]["descrizione"] == "Calo domanda"
+        assert list(scenari["Crisi"]["previsioni"]) == ["2025", "2026"]
+        assert scenari["Crisi"]["previsioni"]["2026"]["ricavi"] < scenari["Base"]["previsioni"]["2026"]["ricavi"]
+        assert "Base_vs_Crisi" in result["data"]["confronto_scenari"]["confronti"]
+
+    def test_invalid_request_does_not_touch_the_engine(self, app, fingerprint, load_history):
+        result, status = CustomScenarioService().run_scenarios(1, [{"name": "A", "overrides": {"x": 1}}])
+        assert status == 400
+        assert "unknown overrides x" in result["message"]
+        load_history.assert_not_called()
+
+    def test_save_upserts_by_name(self, app, fingerprint, load_history, monkeypatch):
+        fake_db = MagicMock()
+        monkeypatch.setattr(custom_module, "db", fake_db)
+        existing = KbaiCustomScenario(id_scenario=9, id_company=1, name="Crisi", definition={})
+
+        with patch.object(custom_module.KbaiCustomScenario, "query") as query:
+            query.filter.return_value.all.return_value = [existing]
+            result, status = CustomScenarioService().run_scenarios(1, SCENARIOS, save=True, user_id=4)
+
+        assert status == 200
+        added = fake_db.session.add.call_args.args[0]
+        assert (added.name, added.created_by) == ("Espansione", 4)
+        assert existing.definition == {"modifiers": {}, "overrides": {"tasso_crescita": -0.2, "growth_mode": "constant"}}
+        assert existing.description == "Calo domanda"
+        fake_db.session.commit.assert_called_once()
+        assert result["data"]["scenari"]["Crisi"]["id_scenario"] == 9
+
+
+# Override di riferimento e override modificato per ogni chiave accettata
+OVERRIDE_CASES = {
+    "tasso_crescita": ({}, {"tasso_crescita": 0.2}),
+    "growth_mode": ({}, {"growth_mode": "constant"}),
+    "inflazione": ({}, {"inflazione": 0.08}),
+    "aliquota_imposte": ({}, {"aliquota_imposte": 0.4}),
+    "variazione_materie": ({}, {"variazione_materie": 0.1}),
+    "variazione_servizi": ({}, {"variazione_servizi": 0.1}),
+    "n_dipendenti": ({}, {"n_dipendenti": 40}),
+    "variazione_organico": ({}, {"variazione_organico": 3}),
+    "aumento_salariale": ({}, {"aumento_salariale": 0.1}),
+    "salario_medio": ({}, {"salario_medio": 60_000}),
+    "dso": ({}, {"dso": 120}),
+    "dpo": ({}, {"dpo": 120}),
+    "doh": ({}, {"doh": 120}),
+    "investimento": ({}, {"investimento": 200_000}),
+    "anno_investimento": ({"investimento": 200_000}, {"investimento": 200_000, "anno_investimento": 2}),
+    "vita_utile": ({"investimento": 200_000}, {"investimento": 200_000, "vita_utile": 3}),
+    "tasso_interesse_debito": ({}, {"tasso_interesse_debito": 0.12}),
+    "orizzonte_anni": ({"orizzonte_anni": 3}, {"orizzonte_anni": 4}),
+}
+
+
+class TestCustomParameterKeys:
+    """Every accepted override reaches the projection"""
+
+    def test_every_accepted_key_has_a_case(self):
+        assert set(OVERRIDE_CASES) == set(CUSTOM_PARAMETER_KEYS)
+
+    @pytest.mark.parametrize("key", sorted(OVERRIDE_CASES))
+    def test_override_changes_the_projection(self, key):
+        analyzer = HistoricalAnalyzer([
+            BalanceSheetData.from_kbai_json(_full_balance_json(900_000, 40_000), 2023),
+            BalanceSheetData.from_kbai_json(_full_balance_json(1_000_000, 55_000), 2024),
+        ])
+        analyzer.analyze()
+        parameterizer = Parameterizer(historical_analyzer=analyzer)
+        engine = ProjectionEngine(analyzer)
+
+        projections = []
+        for overrides in OVERRIDE_CASES[key]:
+            params = parameterizer.create_custom_parameters(**{"orizzonte_anni": 3, **overrides})
+            result = engine.run_scenario(Scenario(name=key, parameters=params, type=ScenarioType.CUSTOM))
+            projections.append([dataclasses.asdict(projection) for projection in result.projections])
+
+        assert projections[0] != projections[1]
+
+    @pytest.mark.parametrize("key", ["perc_costi_variabili", "costo_denaro", "tasso_crescita_settore"])
+    def test_ignored_parameters_are_rejected(self, key):
+        definitions, reason = parse_scenario_definitions([{"name": "A", "overrides": {key: 0.5}}])
+        assert definitions == []
+        assert key in reason
@@ -0,0 +1,76 @@
+"""
+Test Suite for the Goal-seek Solver
+Free parameters solved for a target KPI with bracketing and secant steps
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.models.parameters import ForecastParameters
+
+BASE_VALUES = {
+    "anno_base": 2024, "ricavi": 1_000_000, "altri_ricavi": 20_000, "materie_prime": 300_000,
+    "servizi": 150_000, "godimento_terzi": 30_000, "personale": 250_000, "ammortamenti": 40_000,
+    "accantonamenti": 5_000, "oneri_diversi": 10_000, "immobilizzazioni": 400_000, "crediti": 160_000,
+    "magazzino": 50_000, "liquidita": 80_000, "patrimonio_netto": 300_000, "debiti_finanziari": 200_000,
+    "debiti_fornitori": 90_000, "tfr": 30_000,
+}
+
+
+@pytest.fixture
+def engine():
+    return ProjectionEngine(MagicMock(), base_values=BASE_VALUES)
+
+
+@pytest.fixture
+def params():
+    params = ForecastParameters(anno_base=2024, orizzonte_anni=3)
+    params.personnel.n_dipendenti_attuali = 7
+    params.personnel.salario_medio = 30_000
+    return params
+
+
+class TestGoalSeek:
+    """Test ProjectionEngine.goal_seek"""
+
+    def test_solves_growth_for_target_margin(self, engine, params):
+        """The solved growth reproduces the target in the returned projection"""
+        result = engine.goal_seek(params, "EBITDA_Margin", 0.30, "tasso_crescita")
+
+        assert result.raggiunto
+        assert result.anno == 2027
+        assert result.valore_ottenuto == pytest.approx(0.30, abs=1e-6)
+        assert result.parametri["tasso_crescita"] > params.revenue.tasso_crescita
+        assert result.scenario.kpis[2027]["EBITDA_Margin"] == pytest.approx(0.30, abs=1e-6)
+        assert params.revenue.tasso_crescita == result.parametri_iniziali["tasso_crescita"]
+
+    def test_only_solution_is_fully_formatted(self, engine, params):
+        """Iterations use project_array; run_scenario runs once, on the solution"""
+        with patch.object(engine, "project_array", wraps=engine.project_array) as project_array, \
+                patch.object(engine, "run_scenario", wraps=engine.run_scenario) as run_scenario:
+            result = engine.goal_seek(params, "ebitda", 300_000, "salario_medio", year=2025)
+
+        assert result.raggiunto
+        assert project_array.call_count == result.iterazioni + 1
+        assert result.iterazioni < 15
+        run_scenario.assert_called_once()
+        assert result.scenario.projections[0].ebitda == pytest.approx(300_000, rel=1e-6)
+
+    def test_several_parameters_share_a_multiplier(self, engine, params):
+        """Several free parameters are scaled together from their starting values"""
+        result = engine.goal_seek(params, "EBITDA_Margin", 0.30, ["salario_medio", "n_dipendenti"])
+
+        assert result.raggiunto
+        scale = result.parametri["salario_medio"] / 30_000
+        assert result.parametri["n_dipendenti"] == pytest.approx(7 * scale, rel=1e-5)
+
+    def test_unreachable_target_returns_closest_point(self, engine, params):
+        """Without a sign change in the bounds the closest grid point is returned"""
+        result = engine.goal_seek(params, "EBITDA_Margin", 5.0, "tasso_crescita")
+
+        assert not result.raggiunto
+        assert result.iterazioni == 1
+        assert result.parametri["tasso_crescita"] == 1.0
+        assert result.warnings
+        assert result.to_dict()["scenario"]["scenario_type"] == "base"
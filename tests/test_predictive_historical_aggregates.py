@@ -0,0 +1,205 @@
+"""
+Test Suite for Historical Aggregates
+Per-balance contributions, incremental sync and analysis from the stored aggregate
+"""
+import dataclasses
+import json
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import src.app.services.kbai.predictive.historical_aggregate_service as aggregate_module
+import src.app.services.kbai.predictive.predictive_service as predictive_module
+from src.app.database.models import KbaiBalance, KbaiHistoricalAggregate
+from src.app.services.kbai.predictive.core.historical_analyzer import (
+    CONTRIBUTION_VERSION,
+    HistoricalAnalyzer,
+    YearContribution,
+)
+from src.app.services.kbai.predictive.historical_aggregate_service import HistoricalAggregateService
+from src.app.services.kbai.predictive.models.balance_sheet import PARSED_MODEL_VERSION, BalanceSheetData
+
+
+def _balance_json(ricavi, utile, crediti=0):
+    return {
+        "Conto_economico": {
+            "Valore_della_produzione": {"Ricavi_delle_vendite_e_delle_prestazioni": ricavi},
+            "Costi_di_produzione": {
+                "Per_materie_prime,_sussidiarie_di_consumo_merci": ricavi * 0.4,
+                "Per_servizi": ricavi * 0.15,
+                "Per_il_personale": {"Totale_costi_per_il_personale": ricavi * 0.2},
+            },
+        },
+        "Stato_patrimoniale": {
+            "Attivo": {"Attivo_circolante": {"Crediti": {"Verso_clienti": crediti}}},
+            "Passivo": {"Patrimonio_netto": {"Capitale": 100_000, "Utile_perdita_dell_esercizio": utile}},
+        },
+    }
+
+
+def _record(id_balance, year, ricavi, utile, type="final", month=None):
+    return KbaiBalance(
+        id_balance=id_balance, id_company=1, year=year, month=month, type=type,
+        balance=_balance_json(ricavi, utile, crediti=ricavi * 0.2),
+    )
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake_db = MagicMock()
+    monkeypatch.setattr(aggregate_module, "db", fake_db)
+    return fake_db
+
+
+@pytest.fixture
+def stored():
+    """Patch the aggregate lookup; set .return_value to a stored row"""
+    with patch.object(aggregate_module.KbaiHistoricalAggregate, "query") as query:
+        query.get.return_value = None
+        yield query.get
+
+
+def _saved_entries(fake_db):
+    statement = fake_db.session.execute.call_args.args[0]
+    return statement.compile().params["contributions"]
+
+
+class TestAnalysisFromContributions:
+    """The analyzer gives the same results from stored contributions"""
+
+    def test_metrics_match_full_analysis(self):
+        storico = [
+            BalanceSheetData.from_kbai_json(_balance_json(ricavi, utile, crediti=ricavi * 0.25), year)
+            for year, ricavi, utile in [(2021, 800_000, 20_000), (2022, 0, -5_000), (2023, 900_000, 40_000),
+                                        (2024, 1_000_000, 55_000)]
+        ]
+        full = HistoricalAnalyzer(storico)
+        full.analyze()
+
+        contributi = [
+            YearContribution.from_dict(json.loads(json.dumps(contributo.to_dict())))
+            for contributo in full.contributi
+        ]
+        from_aggregate = HistoricalAnalyzer([storico[-1]], contributi=contributi)
+        from_aggregate.analyze()
+
+        assert dataclasses.asdict(from_aggregate.metrics) == dataclasses.asdict(full.metrics)
+        assert from_aggregate.warnings == full.warnings
+        assert from_aggregate.n_years == 4
+        assert from_aggregate.get_base_values() == full.get_base_values()
+        assert {k: v.to_dict() for k, v in from_aggregate.fit_parameter_distributions().items()} == {
+            k: v.to_dict() for k, v in full.fit_parameter_distributions().items()
+        }
+
+    def test_years_without_revenue_have_no_ratios(self):
+        contributo = YearContribution.from_balance(BalanceSheetData.from_kbai_json(_balance_json(0, -5_000), 2022))
+        assert contributo.ricavi == 0
+        assert contributo.ros is None
+        assert contributo.dso is None
+
+
+class TestHistoricalAggregateSync:
+    """Test HistoricalAggregateService.sync"""
+
+    def test_first_sync_parses_complete_balances_and_saves(self, fake_db, stored):
+        balances = [
+            _record(1, 2023, 900_000, 40_000),
+            _record(2, 2024, 1_000_000, 55_000),
+            _record(3, 2025, 300_000, 10_000, month=3),
+        ]
+        with patch.object(BalanceSheetData, "from_balance_record", wraps=BalanceSheetData.from_balance_record) as parse:
+            contributi = HistoricalAggregateService().sync(1, balances)
+
+        assert [c.year for c in contributi] == [2023, 2024]
+        assert parse.call_count == 2
+        entries = _saved_entries(fake_db)
+        assert [(e["id_balance"], e["content_hash"]) for e in entries] == [
+            (1, balances[0].content_hash), (2, balances[1].content_hash),
+        ]
+        fake_db.session.commit.assert_called_once()
+
+    def test_only_changed_balances_are_parsed(self, fake_db, stored):
+        service = HistoricalAggregateService()
+        old = [_record(1, 2022, 800_000, 20_000), _record(2, 2023, 900_000, 40_000), _record(3, 2024, 950_000, 45_000)]
+        entries = [service._entry(balance) for balance in old]
+        stored.return_value = KbaiHistoricalAggregate(
+            id_company=1, version=CONTRIBUTION_VERSION, parsed_model_version=PARSED_MODEL_VERSION,
+            contributions=entries,
+        )
+
+        # Unchanged: nothing parsed, nothing written
+        with patch.object(BalanceSheetData, "from_balance_record") as parse:
+            contributi = service.sync(1, old)
+        parse.assert_not_called()
+        fake_db.session.execute.assert_not_called()
+        assert [c.ricavi for c in contributi] == [800_000, 900_000, 950_000]
+
+        # 2024 replaced by a new upload, 2022 deleted
+        replaced = _record(4, 2024, 1_000_000, 55_000)
+        with patch.object(BalanceSheetData, "from_balance_record", wraps=BalanceSheetData.from_balance_record) as parse:
+            contributi = service.sync(1, [old[1], replaced])
+
+        assert [call.args[0] for call in parse.call_args_list] == [replaced]
+        assert [(c.year, c.ricavi) for c in contributi] == [(2023, 900_000), (2024, 1_000_000)]
+        assert [e["id_balance"] for e in _saved_entries(fake_db)] == [2, 4]
+
+    def test_outdated_aggregate_is_rebuilt(self, fake_db, stored):
+        service = HistoricalAggregateService()
+        balances = [_record(1, 2024, 1_000_000, 55_000)]
+        stored.return_value = KbaiHistoricalAggregate(
+            id_company=1, version=CONTRIBUTION_VERSION - 1, parsed_model_version=PARSED_MODEL_VERSION,
+            contributions=[service._entry(balances[0])],
+        )
+        with patch.object(BalanceSheetData, "from_balance_record", wraps=BalanceSheetData.from_balance_record) as parse:
+            service.sync(1, balances)
+        parse.assert_called_once()
+        fake_db.session.execute.assert_called_once()
+
+    def test_balances_without_hash_are_not_persisted(self, fake_db, stored):
+        balance = _record(1, 2024, 1_000_000, 55_000)
+        balance.content_hash = None
+        contributi = HistoricalAggregateService().sync(1, [balance])
+        assert len(contributi) == 1
+        fake_db.session.execute.assert_not_called()
+
+    def test_refresh_company_reports_errors(self, fake_db, stored):
+        stored.side_effect = RuntimeError("db down")
+        with patch.object(aggregate_module.KbaiBalance, "query"):
+            assert HistoricalAggregateService().refresh_company(1) == (0, "db down")
+        fake_db.session.rollback.assert_called_once()
+
+
+class TestLoadHistoryFromAggregate:
+    """PredictiveService._load_history starts from the synced aggregate"""
+
+    def test_only_base_and_later_balances_are_parsed(self):
+        balances = [
+            _record(1, 2022, 800_000, 20_000),
+            _record(2, 2023, 900_000, 40_000),
+            _record(5, 2024, 100_000, 5_000, type="partial", month=6),
+            _record(3, 2024, 1_000_000, 55_000),
+            _record(4, 2025, 300_000, 10_000, month=3),
+        ]
+        complete = [balances[0], balances[1], balances[3]]
+        contributi = [
+            YearContribution.from_balance(BalanceSheetData.from_balance_record(balance)) for balance in complete
+        ]
+        company = types.SimpleNamespace(company_name="Alfa")
+
+        with patch.object(predictive_module.KbaiCompany, "query") as company_query, \
+                patch.object(predictive_module.KbaiBalance, "query") as balance_query, \
+                patch.object(aggregate_module.historical_aggregate_service, "sync", return_value=contributi) as sync, \
+                patch.object(BalanceSheetData, "from_balance_record",
+                             wraps=BalanceSheetData.from_balance_record) as parse:
+            company_query.get.return_value = company
+            balance_query.options.return_value.filter.return_value.order_by.return_value.all.return_value = balances
+            result = predictive_module.PredictiveService._load_history(1, "en")
+
+        assert result["status"] == "success"
+        sync.assert_called_once_with(1, balances)
+        assert [call.args[0].id_balance for call in parse.call_args_list] == [3, 4]
+        analyzer = result["analyzer"]
+        assert analyzer.anno_base == 2024
+        assert analyzer.metrics.anni == [2022, 2023, 2024]
+        assert [actual["year"] for actual in result["trimester_actuals"]] == [2025]
@@ -0,0 +1,106 @@
+"""
+Test Suite for the Predictive Monte Carlo Mode
+Vectorized stochastic projection, fitted parameter distributions and the ETag option
+"""
+from unittest.mock import MagicMock, patch
+
+from src.app.services.kbai.predictive.core.historical_analyzer import HistoricalAnalyzer, ParameterDistribution
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.models.parameters import ForecastParameters
+from src.app.services.kbai.predictive.models.scenario import Scenario, ScenarioType
+from src.app.services.kbai.predictive.predictive_service import PredictiveService
+
+BASE_VALUES = {
+    "anno_base": 2024, "ricavi": 1_000_000, "altri_ricavi": 20_000, "materie_prime": 300_000,
+    "servizi": 150_000, "godimento_terzi": 30_000, "personale": 250_000, "ammortamenti": 40_000,
+    "accantonamenti": 5_000, "oneri_diversi": 10_000, "immobilizzazioni": 400_000, "crediti": 160_000,
+    "magazzino": 50_000, "liquidita": 80_000, "patrimonio_netto": 300_000, "debiti_finanziari": 200_000,
+    "debiti_fornitori": 90_000, "tfr": 30_000,
+}
+STOCHASTIC = ["tasso_crescita", "inflazione", "perc_materie_prime", "perc_servizi",
+              "perc_godimento_terzi", "dso", "dpo", "doh"]
+
+
+def _params():
+    params = ForecastParameters(anno_base=2024, orizzonte_anni=3)
+    params.personnel.n_dipendenti_attuali = 7
+    params.personnel.salario_medio = 30_000
+    params.investment.investimento_totale = 50_000
+    params.investment.anno_investimento = 2
+    return params
+
+
+def _engine():
+    return ProjectionEngine(MagicMock(), base_values=BASE_VALUES)
+
+
+class TestMonteCarloProjection:
+    """Test ProjectionEngine.run_monte_carlo"""
+
+    def test_zero_spread_matches_deterministic_projection(self):
+        """With zero-width distributions every path equals the deterministic base scenario"""
+        engine = _engine()
+        params = _params()
+        deterministic = engine.run_scenario(Scenario(name="Base", parameters=params, type=ScenarioType.BASE))
+        zero = {name: ParameterDistribution(mean=0.0, std=0.0) for name in STOCHASTIC}
+        result = engine.run_monte_carlo(params, distributions=zero, n_paths=20, seed=1)
+
+        for projection in deterministic.projections:
+            for name in ("ricavi", "ebitda", "utile_netto", "liquidita", "patrimonio_netto"):
+                band = result.bande[name][projection.year]
+                assert abs(band["p50"] - getattr(projection, name)) < 0.01
+                assert band["p10"] == band["p90"]
+            assert abs(result.kpi["ROE"][projection.year]["p50"]
+                       - deterministic.kpis[projection.year]["ROE"]) < 1e-4
+
+    def test_bands_are_ordered_and_reproducible(self):
+        """Bands widen with uncertainty, are ordered P10 <= P50 <= P90 and repeat for the same seed"""
+        engine = _engine()
+        distributions = {
+            "tasso_crescita": ParameterDistribution(0.0, 0.05, -0.5, 0.5),
+            "dso": ParameterDistribution(0.0, 6.0, 0.0, 365.0),
+        }
+        result = engine.run_monte_carlo(_params(), distributions=distributions, n_paths=10_000, seed=7)
+        again = engine.run_monte_carlo(_params(), distributions=distributions, n_paths=10_000, seed=7)
+
+        assert result.to_dict() == again.to_dict()
+        ricavi = result.bande["ricavi"]
+        for year in result.anni:
+            assert ricavi[year]["p10"] < ricavi[year]["p50"] < ricavi[year]["p90"]
+        # Annual growth shocks compound: the last year has the widest band
+        first, last = result.anni[0], result.anni[-1]
+        assert ricavi[last]["p90"] - ricavi[last]["p10"] > ricavi[first]["p90"] - ricavi[first]["p10"]
+        assert set(result.probabilita[last]) == {"perdita", "liquidita_esaurita"}
+
+
+class TestParameterDistributions:
+    """Test HistoricalAnalyzer.fit_parameter_distributions"""
+
+    def test_spread_from_history_with_floors(self):
+        """Historical variability is used, never below the minimum spreads"""
+        analyzer = HistoricalAnalyzer([])
+        analyzer.metrics.ricavi_storici = [100.0, 120.0, 108.0]
+        analyzer.metrics.cagr_ricavi = 0.04
+        analyzer.metrics.perc_materie_prime = 0.30
+        analyzer.metrics.dso_medio = 60.0
+        analyzer._serie_annuali = {"perc_materie_prime": [0.30, 0.30], "dso": [40.0, 80.0]}
+
+        distributions = analyzer.fit_parameter_distributions()
+
+        assert distributions["tasso_crescita"].mean == 0.04
+        assert distributions["tasso_crescita"].std > 0.1  # +20% then -10%
+        assert distributions["perc_materie_prime"].std == 0.30 * 0.05
+        assert round(distributions["dso"].std, 2) == 28.28
+        assert distributions["inflazione"].std == 0.01
+        assert set(distributions) == set(STOCHASTIC)
+
+
+def test_prediction_etag_includes_monte_carlo_option():
+    """Monte Carlo responses get their own ETag; plain predictions keep theirs"""
+    target = 'src.app.services.kbai.predictive.predictive_service.KbaiBalance.content_fingerprint'
+    with patch(target, return_value='fp1'):
+        plain = PredictiveService.prediction_etag(5, 3, 'en')
+        assert plain == PredictiveService.prediction_etag(5, 3, 'en', None)
+        assert plain != PredictiveService.prediction_etag(5, 3, 'en', 10_000)
+        assert (PredictiveService.prediction_etag(5, 3, 'en', 10_000)
+                != PredictiveService.prediction_etag(5, 3, 'en', 20_000))
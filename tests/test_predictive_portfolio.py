@@ -0,0 +1,246 @@
+"""
+Test Suite for the Portfolio Forecast Job
+Batch forecasts per company, change-only recompute and the portfolio table
+"""
+import importlib
+import threading
+import time
+import types
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import src.app.services.kbai.predictive.portfolio_service as portfolio_module
+from src.app.database.models import KbaiPredictionSummary
+from src.app.services.kbai.predictive.models.balance_sheet import BalanceSheetData
+from src.app.services.kbai.predictive.portfolio_service import (
+    PortfolioForecastService,
+    forecast_company_summary,
+)
+
+
+def _balance_json(ricavi, utile):
+    return {
+        "Conto_economico": {
+            "Valore_della_produzione": {"Ricavi_delle_vendite_e_delle_prestazioni": ricavi},
+            "Costi_di_produzione": {
+                "Per_materie_prime,_sussidiarie_di_consumo_merci": ricavi * 0.4,
+                "Per_servizi": ricavi * 0.15,
+                "Per_il_personale": {"Totale_costi_per_il_personale": ricavi * 0.2},
+            },
+        },
+        "Stato_patrimoniale": {
+            "Passivo": {"Patrimonio_netto": {"Capitale": 100_000, "Utile_perdita_dell_esercizio": utile}},
+        },
+    }
+
+
+balance_model_module = importlib.import_module("src.app.database.models.kbai_balance.kbai_balances")
+FingerprintRow = namedtuple("FingerprintRow", "id_company id_balance year month type content_hash")
+
+STORICO = [
+    BalanceSheetData.from_kbai_json(_balance_json(900_000, 40_000), 2023),
+    BalanceSheetData.from_kbai_json(_balance_json(1_000_000, 55_000), 2024),
+]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(PORTFOLIO_FORECAST_WORKERS=1)
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield app
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake_db = MagicMock()
+    monkeypatch.setattr(portfolio_module, "db", fake_db)
+    return fake_db
+
+
+class TestForecastCompanySummary:
+    """Test the per-company worker"""
+
+    def test_summarizes_three_scenarios_per_year(self):
+        """Revenue, EBITDA and net income for each scenario and projected year"""
+        company_id, base_year, rows, error = forecast_company_summary((7, STORICO, 2))
+
+        assert (company_id, base_year, error) == (7, 2024, None)
+        assert len(rows) == 6
+        assert {row["scenario"] for row in rows} == {"base", "ottimistico", "pessimistico"}
+        assert {row["year"] for row in rows} == {2025, 2026}
+        assert set(rows[0]) == {"scenario", "year", "ricavi", "ebitda", "utile_netto"}
+
+    def test_errors_are_returned_not_raised(self):
+        """A failing company does not stop the pool"""
+        with patch.object(portfolio_module, "HistoricalAnalyzer", side_effect=ValueError("bad history")):
+            result = forecast_company_summary((8, STORICO, 3))
+        assert result == (8, None, None, "bad history")
+
+
+class TestPortfolioForecastRun:
+    """Test PortfolioForecastService.run"""
+
+    def test_only_changed_companies_are_recomputed(self, app, fake_db):
+        """Companies with the stored fingerprint are skipped; the rest share one bulk load"""
+        service = PortfolioForecastService()
+        fake_db.session.query.return_value.filter.return_value.distinct.return_value.all.return_value = [
+            (1, "fp1"), (2, "old"),
+        ]
+        with patch.object(service, "_company_ids", return_value=[1, 2, 3]), \
+                patch.object(portfolio_module.KbaiBalance, "content_fingerprints",
+                             return_value={1: "fp1", 2: "fp2", 3: "fp3"}), \
+                patch.object(service, "_complete_balances", return_value={2: STORICO, 3: []}) as load, \
+                patch.object(service, "_store") as store:
+            stats, error = service.run(company_ids=[1, 2, 3], horizon_years=2)
+
+        assert error is None
+        load.assert_called_once_with([2, 3])
+        assert stats["computed"] == 1
+        assert stats["unchanged"] == 1
+        assert stats["skipped"] == {3: "no complete balances"}
+        summaries, fingerprints, horizon = store.call_args.args
+        assert list(summaries) == [2]
+        assert summaries[2][0] == 2024
+        assert horizon == 2
+
+    def test_balance_type_change_forces_recompute(self, app, fake_db, monkeypatch):
+        """A draft balance turned final (same content) changes the history, so the company is recomputed"""
+        balance_rows = [FingerprintRow(1, 10, 2023, None, "final", "h1"), FingerprintRow(1, 11, 2024, None, "draft", "h2")]
+        balance_db = MagicMock()
+        balance_db.session.query.return_value.filter.return_value.order_by.return_value.all.side_effect = (
+            lambda: list(balance_rows)
+        )
+        monkeypatch.setattr(balance_model_module, "db", balance_db)
+        stored = portfolio_module.KbaiBalance.content_fingerprint(1)
+        fake_db.session.query.return_value.filter.return_value.distinct.return_value.all.return_value = [(1, stored)]
+
+        service = PortfolioForecastService()
+        with patch.object(service, "_company_ids", return_value=[1]), \
+                patch.object(service, "_complete_balances", return_value={1: STORICO}) as load, \
+                patch.object(service, "_store") as store:
+            stats, _ = service.run(company_ids=[1], horizon_years=2)
+            assert stats["unchanged"] == 1
+            load.assert_not_called()
+
+            balance_rows[1] = balance_rows[1]._replace(type="final")
+            stats, _ = service.run(company_ids=[1], horizon_years=2)
+
+        assert stats["computed"] == 1
+        load.assert_called_once_with([1])
+        assert store.call_args.args[1][1] != stored
+
+        # Until the job runs again, the stored summary is flagged stale
+        summary = KbaiPredictionSummary(id_company=1, scenario="base", year=2025, base_year=2024, horizon_years=2,
+                                        ricavi=Decimal("1"), ebitda=Decimal("1"), utile_netto=Decimal("1"),
+                                        source_fingerprint=stored)
+        with patch.object(service, "_company_ids", return_value=[1]), \
+                patch.object(portfolio_module.KbaiCompany, "query") as company_query, \
+                patch.object(portfolio_module.KbaiPredictionSummary, "query") as summary_query:
+            company_query.filter.return_value.order_by.return_value.all.return_value = [
+                types.SimpleNamespace(id_company=1, company_name="Alfa"),
+            ]
+            summary_query.filter.return_value.order_by.return_value.all.return_value = [summary]
+            result, _ = service.get_portfolio(types.SimpleNamespace(id_user=1, role="user"))
+        assert result["data"]["companies"][0]["stale"] is True
+
+    def test_process_pool_is_used_for_several_companies(self, app):
+        """With more than one worker the companies are mapped over a process pool"""
+        service = PortfolioForecastService()
+        payloads = [(1, STORICO, 1), (2, STORICO, 1), (3, STORICO, 1)]
+        executor = MagicMock()
+        executor.__enter__.return_value.map.side_effect = lambda fn, items, chunksize: map(fn, items)
+
+        with patch.object(portfolio_module, "ProcessPoolExecutor", return_value=executor) as pool:
+            results = service._map(payloads, workers=4)
+
+        pool.assert_called_once_with(max_workers=3)
+        assert [result[0] for result in results] == [1, 2, 3]
+        with patch.object(portfolio_module, "ProcessPoolExecutor") as pool:
+            assert len(service._map(payloads, workers=1)) == 3
+        pool.assert_not_called()
+
+    def test_background_refresh_runs_in_process_once_per_user(self, app):
+        """API refreshes never fork a pool and refuse to overlap for the same user"""
+        service = PortfolioForecastService()
+        release = threading.Event()
+        finished = threading.Event()
+
+        def _run(**kwargs):
+            release.wait(5)
+            finished.set()
+            return {}, None
+
+        with patch.object(service, "run", side_effect=_run) as run:
+            assert service.run_async(user_id=7, horizon_years=2) is True
+            assert service.run_async(user_id=7, horizon_years=2) is False
+            release.set()
+            assert finished.wait(5)
+            for _ in range(50):
+                if 7 not in service._active_users:
+                    break
+                time.sleep(0.01)
+            assert service.run_async(user_id=7, horizon_years=2) is True
+
+        run.assert_called_with(user_id=7, horizon_years=2, workers=1)
+
+    def test_store_replaces_rows_in_bulk(self, app, fake_db):
+        """One DELETE for the computed companies and one multi-row INSERT"""
+        rows = [{"scenario": "base", "year": 2025, "ricavi": 1.0, "ebitda": 0.5, "utile_netto": 0.2}]
+        PortfolioForecastService()._store({4: (2024, rows), 5: (2023, rows)}, {4: "fp4", 5: None}, 3)
+
+        fake_db.session.query.return_value.filter.return_value.delete.assert_called_once()
+        fake_db.session.execute.assert_called_once()
+        inserted = fake_db.session.execute.call_args.args[1]
+        assert [(row["id_company"], row["base_year"], row["source_fingerprint"]) for row in inserted] == [
+            (4, 2024, "fp4"), (5, 2023, None),
+        ]
+        fake_db.session.commit.assert_called_once()
+
+
+class TestPortfolioTable:
+    """Test PortfolioForecastService.get_portfolio"""
+
+    def test_other_users_portfolio_requires_staff(self, app):
+        user = types.SimpleNamespace(id_user=1, role="admin")
+        result, status = PortfolioForecastService().get_portfolio(user, user_id=2)
+        assert status == 403
+
+    def test_rows_are_pivoted_and_flagged_stale(self, app):
+        """Summaries are grouped by scenario; changed balances mark the company stale"""
+        user = types.SimpleNamespace(id_user=1, role="user")
+        companies = [
+            types.SimpleNamespace(id_company=1, company_name="Alfa"),
+            types.SimpleNamespace(id_company=2, company_name="Beta"),
+        ]
+        updated = datetime(2026, 1, 1)
+        rows = [
+            KbaiPredictionSummary(id_company=1, scenario=scenario, year=year, base_year=2024, horizon_years=2,
+                                  ricavi=Decimal("100"), ebitda=Decimal("10"), utile_netto=Decimal("5"),
+                                  source_fingerprint="fp1", updated_at=updated)
+            for scenario in ("base", "ottimistico") for year in (2025, 2026)
+        ]
+        service = PortfolioForecastService()
+        with patch.object(service, "_company_ids", return_value=[1, 2]), \
+                patch.object(portfolio_module.KbaiCompany, "query") as company_query, \
+                patch.object(portfolio_module.KbaiPredictionSummary, "query") as summary_query, \
+                patch.object(portfolio_module.KbaiBalance, "content_fingerprints", return_value={1: "fp1", 2: "fp2"}):
+            company_query.filter.return_value.order_by.return_value.all.return_value = companies
+            summary_query.filter.return_value.order_by.return_value.all.return_value = rows
+            result, status = service.get_portfolio(user)
+
+        assert status == 200
+        alfa, beta = result["data"]["companies"]
+        assert alfa["stale"] is False
+        assert alfa["base_year"] == 2024
+        assert alfa["scenari"]["base"] == [
+            {"year": 2025, "ricavi": 100.0, "ebitda": 10.0, "utile_netto": 5.0},
+            {"year": 2026, "ricavi": 100.0, "ebitda": 10.0, "utile_netto": 5.0},
+        ]
+        assert beta["stale"] is True
+        assert beta["scenari"] == {}
@@ -0,0 +1,127 @@
+"""
+Test Suite for Memoized Predictions
+Results keyed by balance fingerprint, engine version, horizon, locale and Monte Carlo paths
+"""
+import types
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+import src.app.api.v1.services.common.response_cache as cache_module
+import src.app.services.kbai.predictive.predictive_service as predictive_module
+from src.app.api.v1.services.common.response_cache import ResponseCache, prediction_tag
+from src.app.services.kbai.predictive.predictive_service import PredictiveService
+from src.extensions import cache
+
+FINGERPRINT = 'src.app.services.kbai.predictive.predictive_service.KbaiBalance.content_fingerprint'
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='simple', RESPONSE_CACHE_ENABLED=True, PREDICTION_CACHE_TIMEOUT=3600)
+    cache.init_app(app)
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield app
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    instance = ResponseCache()
+    monkeypatch.setattr(predictive_module, 'response_cache', instance)
+    monkeypatch.setattr(cache_module, 'response_cache', instance)
+    return instance
+
+
+@pytest.fixture
+def generate():
+    calls = []
+
+    def fake_generate(company_id, horizon_years=3, locale=None, monte_carlo_paths=None):
+        calls.append((company_id, horizon_years, locale, monte_carlo_paths))
+        return {'status': 'success', 'data': {'call': len(calls)}}
+
+    with patch.object(PredictiveService, 'generate_prediction', side_effect=fake_generate) as mock:
+        mock.calls = calls
+        yield mock
+
+
+class TestPredictionCache:
+    """Test PredictiveService.get_prediction"""
+
+    def test_same_inputs_are_served_from_cache(self, app, response_cache, generate):
+        """Only a change of fingerprint, horizon, locale or paths reaches the engine"""
+        with patch(FINGERPRINT, return_value='fp1') as fingerprint:
+            first = PredictiveService.get_prediction(5)
+            assert PredictiveService.get_prediction(5, 3, 'en') == first
+            assert generate.call_count == 1
+
+            PredictiveService.get_prediction(5, 5)
+            PredictiveService.get_prediction(5, 3, 'it')
+            PredictiveService.get_prediction(5, 3, 'en', monte_carlo_paths=1000)
+            assert generate.call_count == 4
+
+            fingerprint.return_value = 'fp2'
+            assert PredictiveService.get_prediction(5) != first
+            assert generate.call_count == 5
+
+    def test_engine_version_bump_drops_cached_predictions(self, app, response_cache, generate, monkeypatch):
+        """Unchanged balances are recomputed, with a new ETag, after an engine release"""
+        with patch(FINGERPRINT, return_value='fp1'):
+            PredictiveService.get_prediction(5)
+            etag = PredictiveService.prediction_etag(5, 3, 'en')
+
+            monkeypatch.setattr(predictive_module, 'PREDICTION_ENGINE_VERSION', '2')
+            PredictiveService.get_prediction(5)
+            assert generate.call_count == 2
+            assert PredictiveService.prediction_etag(5, 3, 'en') != etag
+
+    def test_balance_writes_invalidate_predictions(self, app, response_cache, generate):
+        """The company's prediction tag is bumped by balance writes and company invalidation"""
+        with patch(FINGERPRINT, return_value='fp1'):
+            PredictiveService.get_prediction(5)
+            response_cache.invalidate(prediction_tag(6))
+            PredictiveService.get_prediction(5)
+            assert generate.call_count == 1
+
+            response_cache.invalidate_company(5)
+            PredictiveService.get_prediction(5)
+            assert generate.call_count == 2
+
+        pending = set()
+        with patch.object(cache_module, '_pending_tags', return_value=pending):
+            cache_module._on_balance_write(None, None, types.SimpleNamespace(id_company=5))
+        assert prediction_tag(5) in pending
+
+    def test_errors_and_untracked_balances_are_not_cached(self, app, response_cache, generate):
+        """Failed predictions and companies without a fingerprint are always computed"""
+        generate.side_effect = lambda *args, **kwargs: {'status': 'error', 'message': 'x'}
+        with patch(FINGERPRINT, return_value='fp1'):
+            PredictiveService.get_prediction(5)
+            PredictiveService.get_prediction(5)
+        assert generate.call_count == 2
+
+        generate.side_effect = lambda *args, **kwargs: {'status': 'success', 'data': {}}
+        with patch(FINGERPRINT, return_value=None):
+            PredictiveService.get_prediction(5)
+            PredictiveService.get_prediction(5)
+        assert generate.call_count == 4
+
+    def test_precompute_warms_cache_in_background(self, app, response_cache, generate):
+        """The upload hook runs the default prediction in a thread, unless disabled"""
+        app.config['PREDICTION_PRECOMPUTE_ON_UPLOAD'] = False
+        with patch.object(predictive_module.threading, 'Thread') as thread:
+            PredictiveService.precompute_prediction_async(5, 'it')
+        thread.assert_not_called()
+
+        app.config['PREDICTION_PRECOMPUTE_ON_UPLOAD'] = True
+        with patch.object(predictive_module.threading, 'Thread') as thread:
+            PredictiveService.precompute_prediction_async(5, 'it')
+        target = thread.call_args.kwargs['target']
+
+        with patch(FINGERPRINT, return_value='fp1'):
+            target()
+            assert generate.calls == [(5, 3, 'it', None)]
+            PredictiveService.get_prediction(5, locale='it')
+        assert generate.call_count == 1
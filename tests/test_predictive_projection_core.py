@@ -0,0 +1,105 @@
+"""
+Test Suite for the Array-backed Projection Core
+Parity with the golden projections of the scalar engine and one-pass scenario runs
+"""
+import dataclasses
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.app.services.kbai.predictive.core.parameterizer import Parameterizer
+from src.app.services.kbai.predictive.core.projection_core import BaseRatios
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.models.parameters import ForecastParameters, GrowthMode
+from src.app.services.kbai.predictive.models.scenario import Scenario, ScenarioType
+
+# Generated with the scalar per-year engine before the array core replaced it
+GOLDEN = json.loads((Path(__file__).parent / "fixtures" / "predictive_projection_parity.json").read_text())
+
+BASE_VALUES = {
+    "anno_base": 2024, "ricavi": 1_000_000, "altri_ricavi": 20_000, "materie_prime": 300_000,
+    "servizi": 150_000, "godimento_terzi": 30_000, "personale": 250_000, "ammortamenti": 40_000,
+    "accantonamenti": 5_000, "oneri_diversi": 10_000, "immobilizzazioni": 400_000, "crediti": 160_000,
+    "magazzino": 50_000, "liquidita": 80_000, "patrimonio_netto": 300_000, "debiti_finanziari": 200_000,
+    "debiti_fornitori": 90_000, "tfr": 30_000,
+}
+
+
+def _cases():
+    growing = ForecastParameters(anno_base=2024, orizzonte_anni=3)
+    growing.personnel.n_dipendenti_attuali = 7
+    growing.personnel.salario_medio = 30_000
+    growing.investment.investimento_totale = 50_000
+    growing.investment.anno_investimento = 2
+
+    declining = ForecastParameters(anno_base=2024, orizzonte_anni=10)
+    declining.revenue.growth_mode = GrowthMode.CONSTANT
+    declining.revenue.tasso_crescita = -0.07
+    declining.personnel.n_dipendenti_attuali = 25
+    declining.personnel.aumento_salariale = 0.04
+    declining.financial.distribuzione_dividendi = 0.4
+    declining.financial.variazione_debito_finanziario = 0.1
+    declining.costs.variazione_oneri_diversi = 0.03
+    declining.working_capital.dso = 120
+
+    no_revenue = ForecastParameters(anno_base=2023, orizzonte_anni=5)
+    no_revenue.investment.investimento_totale = 30_000
+    no_revenue.investment.vita_utile = 0
+    no_revenue.personnel.n_dipendenti_attuali = 2
+    no_revenue_base = {"anno_base": 2023, "ricavi": 0, "patrimonio_netto": -50_000, "debiti_finanziari": 80_000}
+
+    return {
+        "growing": (BASE_VALUES, growing),
+        "declining_long": (BASE_VALUES, declining),
+        "no_revenue": (no_revenue_base, no_revenue),
+    }
+
+
+def _scenarios(params):
+    return [
+        Scenario(name=scenario_type.value.capitalize(), parameters=scenario_params, type=scenario_type)
+        for scenario_type, scenario_params in Parameterizer(base_parameters=params).get_all_scenario_parameters().items()
+    ]
+
+
+def _as_golden(result):
+    return json.loads(json.dumps({
+        "projections": [dataclasses.asdict(projection) for projection in result.projections],
+        "kpis": {str(year): kpis for year, kpis in result.kpis.items()},
+    }))
+
+
+@pytest.mark.parametrize("case", sorted(GOLDEN))
+def test_one_pass_matches_scalar_projection(case):
+    """All scenarios projected together reproduce the scalar engine exactly"""
+    base, params = _cases()[case]
+    scenarios = _scenarios(params)
+    results = ProjectionEngine(MagicMock(), base_values=base).run_scenarios(scenarios)
+
+    assert len(results) == len(GOLDEN[case])
+    for scenario, result in zip(scenarios, results):
+        assert result.scenario_type == scenario.type
+        assert _as_golden(result) == GOLDEN[case][scenario.type.value]
+
+
+def test_single_scenario_matches_one_pass():
+    """run_scenario is the one-scenario case of run_scenarios"""
+    base, params = _cases()["declining_long"]
+    engine = ProjectionEngine(MagicMock(), base_values=base)
+    scenarios = _scenarios(params)
+
+    together = engine.run_scenarios(scenarios)
+    for scenario, result in zip(scenarios, together):
+        assert _as_golden(engine.run_scenario(scenario)) == _as_golden(result)
+
+    by_name = engine.project_all_scenarios(params, {s.type: s.parameters for s in scenarios})
+    assert by_name["Pessimistico"].scenario_type == ScenarioType.PESSIMISTICO
+    assert _as_golden(by_name["Base"]) == GOLDEN["declining_long"]["base"]
+
+
+def test_base_ratios_default_without_revenue():
+    """Historical cost ratios, or the defaults when the base year has no revenue"""
+    assert BaseRatios.from_base_values(BASE_VALUES) == BaseRatios(0.3, 0.15, 0.03)
+    assert BaseRatios.from_base_values({"ricavi": 0}) == BaseRatios(0.30, 0.20, 0.05)
@@ -0,0 +1,35 @@
+"""
+Test Suite for the Predictive Routes
+Request validation shared by the forecast endpoints
+"""
+import pytest
+from flask import Flask
+
+from src.app.api.v1.routes.kbai.predictive_routes import _check_horizon
+from src.app.services.kbai.predictive.predictive_service import MAX_HORIZON_YEARS
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield app
+
+
+class TestHorizonValidation:
+    """Test _check_horizon"""
+
+    @pytest.mark.parametrize("horizon", [1, 3, MAX_HORIZON_YEARS])
+    def test_horizons_in_range_are_accepted(self, app, horizon):
+        assert _check_horizon(horizon, 'en') is None
+
+    @pytest.mark.parametrize("horizon", [0, -1, MAX_HORIZON_YEARS + 1, 1000, True, "3", 2.5, None])
+    def test_other_horizons_are_rejected(self, app, horizon):
+        body, status = _check_horizon(horizon, 'en')
+        assert status == 400
+        assert body['success'] is False
+        assert str(MAX_HORIZON_YEARS) in body['message']
+
+    def test_message_is_localized(self, app):
+        body, _ = _check_horizon(0, 'it')
+        assert body['message'].startswith("Orizzonte non valido")
@@ -0,0 +1,82 @@
+"""
+Test Suite for the Sensitivity (Tornado) Analysis
+Parameters perturbed by ±delta and projected in one batched engine run
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.app.services.kbai.predictive.core.projection_engine import ProjectionEngine
+from src.app.services.kbai.predictive.models.parameters import ForecastParameters
+
+BASE_VALUES = {
+    "anno_base": 2024, "ricavi": 1_000_000, "altri_ricavi": 20_000, "materie_prime": 300_000,
+    "servizi": 150_000, "godimento_terzi": 30_000, "personale": 250_000, "ammortamenti": 40_000,
+    "accantonamenti": 5_000, "oneri_diversi": 10_000, "immobilizzazioni": 400_000, "crediti": 160_000,
+    "magazzino": 50_000, "liquidita": 80_000, "patrimonio_netto": 300_000, "debiti_finanziari": 200_000,
+    "debiti_fornitori": 90_000, "tfr": 30_000,
+}
+
+
+@pytest.fixture
+def engine():
+    return ProjectionEngine(MagicMock(), base_values=BASE_VALUES)
+
+
+@pytest.fixture
+def params():
+    params = ForecastParameters(anno_base=2024, orizzonte_anni=3)
+    params.revenue.tasso_crescita = 0.05
+    params.personnel.n_dipendenti_attuali = 7
+    params.personnel.salario_medio = 30_000
+    return params
+
+
+class TestSensitivity:
+    """Test ProjectionEngine.run_sensitivity"""
+
+    def test_tornado_is_ranked_with_expected_signs(self, engine, params):
+        """Rows are sorted by |swing|; revenue growth raises EBITDA, salaries lower it"""
+        result = engine.run_sensitivity(params, delta=0.1, targets=["ebitda", "ricavi"])
+
+        assert result.anno == 2027
+        rows = result.tornado["ebitda"]
+        swings = [abs(row["swing"]) for row in rows]
+        assert swings == sorted(swings, reverse=True)
+
+        by_name = {row["parametro"]: row for row in rows}
+        assert by_name["tasso_crescita"]["elasticita"] > 0
+        assert by_name["salario_medio"]["elasticita"] < 0
+        assert by_name["dso"]["swing"] == 0
+
+        ricavi = {row["parametro"]: row for row in result.tornado["ricavi"]}
+        assert ricavi["tasso_crescita"]["alto"] > result.valori_base["ricavi"] > ricavi["tasso_crescita"]["basso"]
+
+    def test_variants_are_projected_in_one_pass(self, engine, params):
+        """The starting scenario and both perturbations of each parameter share one run"""
+        with patch.object(engine, "project_array", wraps=engine.project_array) as project_array:
+            result = engine.run_sensitivity(params, parameters=["tasso_crescita", "inflazione"])
+
+        project_array.assert_called_once()
+        assert len(project_array.call_args.args[0]) == 5
+        assert set(result.parametri) == {"tasso_crescita", "inflazione"}
+        assert params.revenue.tasso_crescita == 0.05
+
+    def test_zero_parameter_has_no_elasticity(self, engine, params):
+        """A parameter at zero cannot be perturbed relatively"""
+        params.financial.tasso_interesse_debito = 0.0
+        result = engine.run_sensitivity(params, parameters=["tasso_interesse", "tasso_crescita"])
+
+        row = next(row for row in result.tornado["utile_netto"] if row["parametro"] == "tasso_interesse")
+        assert row["swing"] == 0
+        assert row["elasticita"] is None
+
+    def test_kpi_targets_and_year(self, engine, params):
+        """KPI targets are computed on the requested projected year"""
+        result = engine.run_sensitivity(params, targets=["ROE", "EBITDA_Margin"], year=2025)
+
+        assert result.anno == 2025
+        assert set(result.tornado) == {"ROE", "EBITDA_Margin"}
+        margin = {row["parametro"]: row for row in result.tornado["EBITDA_Margin"]}
+        assert margin["salario_medio"]["swing"] < 0
+        assert result.to_dict()["valori_base"]["ROE"] == result.valori_base["ROE"]
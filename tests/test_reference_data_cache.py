@@ -0,0 +1,156 @@
+"""
+Test Suite for the Reference Data Cache
+Zones, sectors, provinces and company primary mappings served from memory
+"""
+import types
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+import src.app.api.v1.services.common.reference_data_cache as cache_module
+from src.app.api.v1.services.common.reference_data_cache import ReferenceDataCache
+from src.app.database.models.kbai import KbaiCompany, KbaiSector, KbaiZone, ProvinceRegion
+
+
+def _sector(id_sector, division, region, geographic_area=1):
+    return types.SimpleNamespace(
+        id_sector=id_sector, section="J", division=division, region=region,
+        year=2024, geographic_area=geographic_area
+    )
+
+
+SECTORS = [
+    _sector(1, "62", "Lazio", 3),
+    _sector(2, "62", "Lombardia", 1),
+    _sector(3, "47", "Lazio", 3),
+]
+PROVINCES = [types.SimpleNamespace(province="Roma", region="Lazio")]
+PROFILE_ROW = types.SimpleNamespace(
+    id_company=10, id_zone=5, region="Lazio", country="Italy",
+    id_sector=1, division="62", geographic_area=3
+)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Fake db whose queries are dispatched on the first selected column"""
+    calls = []
+
+    def fake_query(*entities):
+        first = entities[0]
+        chain = MagicMock()
+        for method in ("filter", "order_by", "outerjoin"):
+            getattr(chain, method).return_value = chain
+        if first is KbaiSector.id_sector:
+            calls.append("sectors")
+            chain.all.return_value = SECTORS
+            chain.first.return_value = None
+        elif first is ProvinceRegion.province:
+            calls.append("provinces")
+            chain.all.return_value = PROVINCES
+        elif first is ProvinceRegion.region:
+            calls.append("province_lookup")
+            chain.scalar.return_value = None
+        elif first is KbaiCompany.id_company:
+            calls.append("profile")
+            chain.first.return_value = PROFILE_ROW
+        elif first is KbaiZone.id_zone:
+            calls.append("zone")
+            chain.first.return_value = types.SimpleNamespace(id_zone=5, city="Roma", region="Lazio", country="Italy")
+        return chain
+
+    db = MagicMock()
+    db.session.query.side_effect = fake_query
+    monkeypatch.setattr(cache_module, "db", db)
+    return calls
+
+
+def test_sector_and_province_lookups_are_served_from_memory(fake_db):
+    """Sectors and provinces are loaded once and keyed by id, division/region and province"""
+    cache = ReferenceDataCache(ttl=3600)
+
+    assert cache.find_sector("62", " lazio ")["id_sector"] == 1
+    assert cache.find_sector("62", "LOMBARDIA")["id_sector"] == 2
+    assert cache.get_sector(3)["division"] == "47"
+    assert sorted(cache.sector_ids("62")) == [1, 2]
+    assert cache.sector_ids("62", geographic_area=3) == [1]
+    assert cache.region_for_province("ROMA") == "Lazio"
+    assert fake_db == ["sectors", "provinces"]
+
+
+def test_missing_sector_falls_through_to_database(fake_db):
+    """A miss queries the database instead of trusting the snapshot"""
+    cache = ReferenceDataCache(ttl=3600)
+    assert cache.find_sector("99", "Lazio") is None
+    assert cache.region_for_province("Atlantide") is None
+    assert fake_db == ["sectors", "provinces", "sectors", "province_lookup"]
+
+
+def test_invalidate_bumps_version_and_reloads(fake_db):
+    """invalidate() forces a reload on the next lookup"""
+    cache = ReferenceDataCache(ttl=3600)
+    cache.find_sector("62", "Lazio")
+    version = cache.version
+
+    cache.invalidate()
+    cache.find_sector("62", "Lazio")
+
+    assert cache.version == version + 1
+    assert fake_db.count("sectors") == 2
+
+
+def test_ttl_expiry_reloads(fake_db):
+    """An expired snapshot is reloaded"""
+    cache = ReferenceDataCache(ttl=-1)
+    cache.get_sector(1)
+    cache.get_sector(1)
+    assert fake_db.count("sectors") == 2
+
+
+def test_company_profile_is_read_live(fake_db):
+    """Company primary zone/sector is queried on every call, so mapping changes are seen at once"""
+    cache = ReferenceDataCache(ttl=3600)
+
+    profile = cache.company_profile(10)
+    assert profile["region"] == "Lazio"
+    assert profile["division"] == "62"
+    cache.company_profile(10)
+    assert fake_db == ["profile", "profile"]
+
+
+def test_reference_writes_invalidate_on_commit(fake_db, monkeypatch):
+    """Zone and sector writes invalidate when the session commits, not at flush or on rollback"""
+    cache = ReferenceDataCache(ttl=3600)
+    monkeypatch.setattr(cache_module, "reference_data_cache", cache)
+    cache.get_zone(5)
+    version = cache.version
+
+    session = Session()
+    zone = KbaiZone(id_zone=5)
+    sector = KbaiSector(id_sector=1)
+    session.add_all([zone, sector])
+    cache_module._on_zone_change(None, None, zone)
+    cache_module._on_reference_table_change(None, None, sector)
+    cache.get_zone(5)
+    assert cache.version == version
+    assert fake_db.count("zone") == 1
+
+    cache_module._after_rollback(session, None)
+    cache_module._after_commit(session)
+    assert cache.version == version
+
+    cache_module._on_zone_change(None, None, zone)
+    cache_module._on_reference_table_change(None, None, sector)
+    cache_module._after_commit(session)
+    assert cache.version == version + 1
+    cache.get_zone(5)
+    assert fake_db.count("zone") == 2
+
+
+def test_get_zone_fills_on_demand(fake_db):
+    """Zones are fetched by id once and then served from memory"""
+    cache = ReferenceDataCache(ttl=3600)
+    assert cache.get_zone(5)["region"] == "Lazio"
+    assert cache.get_zone(5)["city"] == "Roma"
+    assert fake_db.count("zone") == 1
@@ -0,0 +1,233 @@
+"""
+Test Suite for the Response Cache
+Scoped keys, tag invalidation and ORM write hooks on the simple cache backend
+"""
+import importlib
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+from sqlalchemy.orm import Session
+
+import src.app.api.v1.services.common.response_cache as cache_module
+from src.app.api.v1.services.common.response_cache import (
+    COMPANIES_TAG,
+    ResponseCache,
+    cache_scope,
+    company_tag,
+)
+from src.app.api.v1.services.public.tb_user_company_service import TbUserCompanyService
+from src.app.database.models import KbaiAnalysis, KbaiCompany, KbaiReport
+from src.extensions import cache
+
+# The package re-exports the service instance under the module's name
+user_company_module = importlib.import_module('src.app.api.v1.services.public.tb_user_company_service')
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='simple', RESPONSE_CACHE_ENABLED=True, RESPONSE_CACHE_TIMEOUT=60)
+    cache.init_app(app)
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        yield app
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    instance = ResponseCache()
+    monkeypatch.setattr(cache_module, 'response_cache', instance)
+    return instance
+
+
+def _user(id_user, role='user'):
+    return types.SimpleNamespace(id_user=id_user, role=role)
+
+
+def _service(response_cache, status=200):
+    class Service:
+        calls = 0
+
+        @response_cache.cached('balances', tags=lambda params: [company_tag(params['company_id'])])
+        def get_by_company_id(self, company_id, page=1, current_user=None):
+            Service.calls += 1
+            return {'data': [company_id, page, Service.calls]}, status
+
+    return Service()
+
+
+class TestResponseCache:
+    """Test cached service results"""
+
+    def test_repeated_call_is_served_from_cache(self, app, response_cache):
+        """The second identical call does not reach the service"""
+        service = _service(response_cache)
+        first = service.get_by_company_id(5, current_user=_user(1))
+        second = service.get_by_company_id(5, page=1, current_user=_user(1))
+        assert first == second
+        assert service.calls == 1
+
+        service.get_by_company_id(5, page=2, current_user=_user(1))
+        assert service.calls == 2
+
+    def test_scope_separates_users_and_shares_roles(self, app, response_cache):
+        """Regular users get their own entries, staff users share one"""
+        service = _service(response_cache)
+        service.get_by_company_id(5, current_user=_user(1))
+        service.get_by_company_id(5, current_user=_user(2))
+        assert service.calls == 2
+
+        service.get_by_company_id(5, current_user=_user(3, 'staff'))
+        service.get_by_company_id(5, current_user=_user(4, 'Staff'))
+        assert service.calls == 3
+
+        assert cache_scope(None) == 'anonymous'
+        assert cache_scope(_user(9, 'superadmin')) == 'role:superadmin'
+        assert cache_scope(_user(9, 'admin')) == 'user:9'
+
+    def test_company_invalidation(self, app, response_cache):
+        """Invalidating a company recomputes its entries only"""
+        service = _service(response_cache)
+        service.get_by_company_id(5, current_user=_user(1))
+        service.get_by_company_id(6, current_user=_user(1))
+
+        response_cache.invalidate_company(5)
+        service.get_by_company_id(5, current_user=_user(1))
+        service.get_by_company_id(6, current_user=_user(1))
+        assert service.calls == 3
+
+    def test_errors_are_not_cached(self, app, response_cache):
+        """Only 200 results are stored"""
+        service = _service(response_cache, status=404)
+        service.get_by_company_id(5, current_user=_user(1))
+        service.get_by_company_id(5, current_user=_user(1))
+        assert service.calls == 2
+
+    def test_disabled_cache_passes_through(self, app, response_cache):
+        """With RESPONSE_CACHE_ENABLED off every call is computed"""
+        app.config['RESPONSE_CACHE_ENABLED'] = False
+        service = _service(response_cache)
+        service.get_by_company_id(5, current_user=_user(1))
+        service.get_by_company_id(5, current_user=_user(1))
+        assert service.calls == 2
+
+    def test_uninitialized_cache_passes_through(self, response_cache):
+        """Apps without an initialized cache fall back to the service"""
+        app = Flask(__name__)
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        with app.test_request_context():
+            service = _service(response_cache)
+            service.get_by_company_id(5, current_user=_user(1))
+            service.get_by_company_id(5, current_user=_user(1))
+        assert service.calls == 2
+
+
+class TestResponseCacheWriteHooks:
+    """Test invalidation collected from ORM writes"""
+
+    def test_commit_invalidates_collected_tags(self, app, response_cache):
+        """Tags collected during a flush are invalidated when the session commits"""
+        service = _service(response_cache)
+        service.get_by_company_id(5, current_user=_user(1))
+
+        session = Session()
+        company = KbaiCompany(id_company=5)
+        session.add(company)
+        cache_module._on_company_row_change(None, None, company)
+        assert session.info['response_cache_tags'] == {COMPANIES_TAG, company_tag(5)}
+
+        cache_module._after_commit(session)
+        assert 'response_cache_tags' not in session.info
+        service.get_by_company_id(5, current_user=_user(1))
+        assert service.calls == 2
+
+    def test_rollback_discards_collected_tags(self, app, response_cache):
+        """Rolled back writes do not invalidate anything"""
+        service = _service(response_cache)
+        service.get_by_company_id(5, current_user=_user(1))
+
+        session = Session()
+        company = KbaiCompany(id_company=5)
+        session.add(company)
+        cache_module._on_company_row_change(None, None, company)
+        cache_module._after_rollback(session, None)
+
+        service.get_by_company_id(5, current_user=_user(1))
+        assert service.calls == 1
+
+    def test_analysis_companies_are_resolved_once_per_flush(self, app, response_cache, monkeypatch):
+        """Rows of the same analyses are collected and resolved with one query in after_flush"""
+        lookups = []
+
+        def fake_lookup(connection, analysis_ids):
+            lookups.append(sorted(analysis_ids))
+            return {id_analysis: [id_analysis * 10] for id_analysis in analysis_ids}
+
+        monkeypatch.setattr(cache_module, '_companies_by_analysis', fake_lookup)
+        session = Session()
+        monkeypatch.setattr(session, 'connection', lambda: None)
+        rows = [KbaiAnalysis(id_analysis=1), KbaiReport(id_analysis=1), KbaiReport(id_analysis=2)]
+        session.add_all(rows)
+
+        for row in rows:
+            cache_module._on_analysis_row_change(None, None, row)
+        cache_module._after_flush(session, None)
+        assert lookups == [[1, 2]]
+        assert session.info['response_cache_tags'] == {COMPANIES_TAG, company_tag(10), company_tag(20)}
+
+        # A later flush of the transaction reuses the resolved analyses
+        cache_module._on_analysis_row_change(None, None, rows[0])
+        cache_module._after_flush(session, None)
+        assert lookups == [[1, 2]]
+
+        cache_module._after_commit(session)
+        assert session.info == {}
+
+
+def _guarded_service(response_cache, access):
+    """Cached service that checks the user's company mappings inside the computation"""
+    class Service:
+        @response_cache.cached('balances', tags=lambda params: [company_tag(params['company_id'])])
+        def get_by_company_id(self, company_id, current_user=None):
+            if company_id not in access.get(current_user.id_user, set()):
+                return {'message': 'Access denied'}, 403
+            return {'data': [company_id]}, 200
+
+    return Service()
+
+
+class TestAccessRevocation:
+    """Bulk mapping deletes invalidate the cached results of the revoked companies"""
+
+    @pytest.fixture
+    def mappings(self, monkeypatch, response_cache):
+        monkeypatch.setattr(user_company_module, 'response_cache', response_cache)
+        monkeypatch.setattr(user_company_module, 'db', MagicMock())
+        access = {1: {5, 6}}
+        rows = [types.SimpleNamespace(id_company=company_id) for company_id in sorted(access[1])]
+        user_company_module.db.session.query.return_value.filter_by.return_value.all.return_value = rows
+        with patch.object(user_company_module.TbUserCompany, 'query') as query:
+            query.filter_by.return_value.all.return_value = rows
+            yield access
+
+    def test_removed_company_is_denied_on_next_call(self, app, mappings):
+        service = _guarded_service(user_company_module.response_cache, mappings)
+        assert service.get_by_company_id(5, current_user=_user(1))[1] == 200
+
+        mappings[1].discard(5)
+        success, _, info = TbUserCompanyService.update_user_companies(1, [6])
+        assert success and info['companies_removed'] == 1
+
+        assert service.get_by_company_id(5, current_user=_user(1))[1] == 403
+
+    def test_all_mappings_removed_is_denied_on_next_call(self, app, mappings):
+        service = _guarded_service(user_company_module.response_cache, mappings)
+        assert service.get_by_company_id(5, current_user=_user(1))[1] == 200
+        assert service.get_by_company_id(6, current_user=_user(1))[1] == 200
+
+        mappings[1].clear()
+        TbUserCompanyService.remove_all_user_mappings(1)
+
+        assert service.get_by_company_id(5, current_user=_user(1))[1] == 403
+        assert service.get_by_company_id(6, current_user=_user(1))[1] == 403